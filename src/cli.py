@@ -0,0 +1,402 @@
+# -*- coding: utf-8 -*-
+"""
+学年鉴定表自动化处理工具 - 命令行批处理入口
+以非交互方式运行完整流程，支持按学号哈希分片，在多台机器上并行处理
+"""
+
+import argparse
+import os
+import sys
+from contextlib import ExitStack
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.core import tracing
+from src.core.build_manifest import MANIFEST_NAME
+from src.core.source_watcher import DebouncedWatcher
+from src.core.workflow import filter_shard
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """
+    解析分片参数 i/n（i从1开始）
+
+    Returns:
+        Tuple[int, int]: (分片序号（从0开始）, 分片总数)
+    """
+    try:
+        index_text, count_text = value.split('/')
+        index, count = int(index_text), int(count_text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"分片格式应为 i/n，例如 1/4: {value}")
+    if count < 1 or not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"分片序号应在 1 到 {count} 之间: {value}")
+    return index - 1, count
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """构建命令行参数解析器"""
+    parser = argparse.ArgumentParser(
+        prog='student-evaluation',
+        description='学年鉴定表批处理：重命名、填写评语、转换PDF（非交互）'
+    )
+    parser.add_argument('--serve', action='store_true',
+                        help='以HTTP批处理服务方式运行（上传名单和文档压缩包，下载结果）')
+    parser.add_argument('--host', help='服务监听地址（默认使用配置文件）')
+    parser.add_argument('--port', type=int, help='服务监听端口（默认使用配置文件）')
+    parser.add_argument('--workers', type=int, help='服务工作进程数（默认使用配置文件）')
+    parser.add_argument('--excel', nargs='+',
+                        help='Excel名单文件路径（默认使用配置文件），可以指定多个学院的名单一起处理')
+    parser.add_argument('--source', nargs='+',
+                        help='学年鉴定表源文件夹（默认使用配置文件），可以指定多个；'
+                             '数量与名单相同时一一对应，否则合并查找')
+    parser.add_argument('--output', help='输出文件夹（默认使用配置文件）')
+    parser.add_argument('--classes', help='只处理这些班级，用逗号分隔（默认全部）')
+    parser.add_argument('--jobs', '-j', type=int, help='评语填写并发数')
+    parser.add_argument('--shard', type=parse_shard, metavar='i/n',
+                        help='只处理第i个分片（共n个，按学号哈希划分），各分片输出可直接合并到同一目录')
+    parser.add_argument('--backend', choices=['wps', 'native'], help='PDF转换后端')
+    pdf_group = parser.add_mutually_exclusive_group()
+    pdf_group.add_argument('--pdf', dest='pdf', action='store_true', default=None,
+                           help='转换PDF（默认按配置）')
+    pdf_group.add_argument('--no-pdf', dest='pdf', action='store_false', help='不转换PDF')
+    parser.add_argument('--force', action='store_true', help='忽略构建清单，重建所有文件')
+    parser.add_argument('--no-bundle', action='store_true', help='不合并班级PDF')
+    parser.add_argument('--output-mode', choices=['files', 'archive', 'both'],
+                        help='输出方式：files 散装文件，archive 只生成班级压缩包，both 两者都生成')
+    staging_group = parser.add_mutually_exclusive_group()
+    staging_group.add_argument('--staging', dest='staging', action='store_true', default=None,
+                               help='先写入本地暂存目录，处理结束后批量发布到输出目录（输出目录位于网络共享时使用）')
+    staging_group.add_argument('--no-staging', dest='staging', action='store_false',
+                               help='直接写入输出目录')
+    parser.add_argument('--bundle-only', action='store_true',
+                        help='只合并输出目录中已有的班级PDF（所有分片完成后运行）')
+    parser.add_argument('--watch', action='store_true',
+                        help='持续监视源文件夹，新增或修改的文件到达后自动处理（Ctrl+C 停止）')
+    parser.add_argument('--debounce', type=float, default=2.0,
+                        help='监视模式下文件静止多少秒后开始处理（默认2秒）')
+    parser.add_argument('--poll', action='store_true',
+                        help='监视模式下强制使用定时扫描（源文件夹位于网络共享时使用）')
+    parser.add_argument('--profile', action='store_true',
+                        help='用cProfile剖析各阶段，保存剖析结果并报告最慢的文档和主要耗时函数')
+    parser.add_argument('--profile-top', type=int, default=10, metavar='N',
+                        help='剖析模式下保留最慢的N个文档的剖析结果（默认10）')
+    parser.add_argument('--profile-dir',
+                        help='剖析结果保存目录（默认为输出目录下的 profile）')
+    parser.add_argument('--memory', action='store_true',
+                        help='统计各阶段和每个文档的内存占用，并检查内存是否随文档数线性增长')
+    parser.add_argument('--memory-dir',
+                        help='内存报告保存目录（默认为输出目录下的 memory）')
+    parser.add_argument('--leak-threshold-kb', type=float, default=64,
+                        help='每个文档仍占用的内存超过多少KB且线性增长时判定为泄漏（默认64）')
+    console_group = parser.add_mutually_exclusive_group()
+    console_group.add_argument('--quiet', '-q', dest='console', action='store_const', const='quiet',
+                               help='控制台只输出警告、错误和汇总')
+    console_group.add_argument('--verbose', '-v', dest='console', action='store_const', const='verbose',
+                               help='控制台逐文件输出处理结果')
+    parser.add_argument('--log-file', help='运行日志（JSONL）路径（默认为输出目录下的 logs/run-<时间>.jsonl）')
+    parser.add_argument('--no-log', action='store_true', help='不写运行日志')
+    parser.add_argument('--trace', metavar='FILE',
+                        help='记录各工作单元的时间线，保存为Chrome trace JSON（可在 ui.perfetto.dev 中查看）')
+    return parser
+
+
+def select_classes(available: List[str], class_filter: Optional[str]) -> List[str]:
+    """按 --classes 参数筛选班级"""
+    if not class_filter:
+        return available
+    wanted = [name.strip() for name in class_filter.split(',') if name.strip()]
+    unknown = [name for name in wanted if name not in available]
+    if unknown:
+        print(f"警告: 名单中没有这些班级: {', '.join(unknown)}")
+    return [name for name in available if name in wanted]
+
+
+def watch(app, args, excel_file: str, source_dir: str, output_dir: str, classes: List[str],
+          convert: bool, bundle: bool, manifest_name: str) -> int:
+    """
+    监视模式：先补齐已有文件，然后持续处理新到达或修改的文件
+
+    名单索引常驻内存（Excel文件修改后自动重新加载），
+    构建清单记录已完成的输出，不会重复处理未变化的文件
+    """
+    def load_index():
+        data = app.file_renamer.load_excel_data(excel_file) or []
+        app.file_renamer.student_data = data
+        students = [s for s in data if s['班级'] in classes]
+        if args.shard:
+            students = filter_shard(students, *args.shard)
+        return {s['学号']: s for s in students}
+
+    def process(students):
+        results = app.run_streaming(students, source_dir, output_dir, classes, convert,
+                                    bundle=False, force=False, manifest_name=manifest_name)
+        # 只重新合并有文件更新的班级
+        changed = {item.data['class_name'] for item in results or []
+                   if item.status != 'failed' and not item.data.get('up_to_date')}
+        if convert and bundle and app.config.get('pdf_conversion.bundle_classes', True):
+            for class_name in sorted(changed):
+                pdf_dir = os.path.join(output_dir, class_name) + "_PDF"
+                if os.path.exists(pdf_dir):
+                    app.bundle_class(class_name, pdf_dir, output_dir)
+
+    index = load_index()
+    roster_mtime = os.path.getmtime(excel_file)
+    # 启动时先处理上次停止后到达的文件
+    existing = app.file_renamer.build_source_index(source_dir)
+    initial = [student for student_id, student in index.items() if student_id in existing]
+    if initial:
+        process(initial)
+
+    watcher = DebouncedWatcher(source_dir, debounce=args.debounce, force_polling=args.poll)
+    print(f"\n👀 正在监视 {source_dir}（{watcher.backend}），按 Ctrl+C 停止")
+    try:
+        for batch in watcher.batches():
+            if os.path.getmtime(excel_file) != roster_mtime:
+                print("名单已修改，重新加载")
+                index = load_index()
+                roster_mtime = os.path.getmtime(excel_file)
+            students = []
+            for path in batch:
+                student_id = os.path.basename(path).replace('.docx', '')
+                if student_id in index:
+                    students.append(index[student_id])
+                else:
+                    print(f"⚠️  名单中没有学号 {student_id}（或不属于本次处理的班级/分片），跳过")
+            if students:
+                print(f"\n检测到 {len(students)} 个新文件或修改的文件")
+                process(students)
+    except KeyboardInterrupt:
+        print("\n已停止监视")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    命令行入口
+
+    Returns:
+        int: 退出码，0表示全部成功，1表示有文件处理失败，2表示参数或输入错误，
+            3表示内存统计模式下检测到内存泄漏
+    """
+    args = build_parser().parse_args(argv)
+
+    if args.serve:
+        from src.service import create_service
+        service = create_service(args.host, args.port, args.workers)
+        service.start()
+        service.serve_forever()
+        return 0
+
+    from src.main import AutomationApp
+
+    app = AutomationApp()
+    config = app.config
+
+    excel_files = args.excel or [config.get('paths.excel_file')]
+    source_dirs = args.source or [config.get('paths.source_dir')]
+    excel_file, source_dir = excel_files[0], source_dirs[0]
+    # 多个名单或多个源文件夹：合并为全局索引，由同一条流水线处理
+    federated = len(excel_files) > 1 or len(source_dirs) > 1
+    output_dir = args.output or config.get('paths.output_dir')
+
+    if args.console:
+        config.set('logging.console', args.console)
+        app.setup_logging()
+    if args.log_file:
+        config.set('logging.file', args.log_file)
+    if args.no_log:
+        config.set('logging.run_log', False)
+    if args.output_mode:
+        config.set('output.mode', args.output_mode)
+    if args.staging is not None:
+        config.set('output.staging.enabled', args.staging)
+    if args.backend:
+        config.set('pdf_conversion.backend', args.backend)
+        app.pdf_converter = app.create_pdf_converter()
+    if args.jobs:
+        config.set('pipeline.fill_workers', args.jobs)
+        if config.get_pdf_backend() == 'native':
+            config.set('pipeline.convert_workers', args.jobs)
+        # 指定了并发数时不再自动调整
+        config.set('pipeline.autotune.enabled', False)
+
+    for path in excel_files:
+        if not path or not os.path.exists(path):
+            print(f"❌ Excel名单文件不存在: {path}")
+            return 2
+
+    profiler = None
+    memory = None
+    source_index = None
+    try:
+        if federated:
+            missing = [path for path in source_dirs if not path or not os.path.exists(path)]
+            if missing and not args.bundle_only:
+                print(f"❌ 源文件夹不存在: {', '.join(map(str, missing))}")
+                return 2
+            if args.watch:
+                print("❌ 监视模式只支持一个名单和一个源文件夹")
+                return 2
+            app.open_run_log(output_dir)
+            index = app.load_federated(excel_files, [] if args.bundle_only else source_dirs)
+            student_data = index.students if index else []
+            source_index = index.source_index if index else None
+        else:
+            student_data = app.file_renamer.load_excel_data(excel_file)
+        if not student_data:
+            print("❌ Excel文件读取失败或为空")
+            return 2
+        app.file_renamer.student_data = student_data
+        classes = select_classes(app.file_renamer.get_available_classes(student_data), args.classes)
+        if not classes:
+            print("❌ 没有需要处理的班级")
+            return 2
+
+        if args.bundle_only:
+            for class_name in classes:
+                pdf_dir = os.path.join(output_dir, class_name) + "_PDF"
+                if os.path.exists(pdf_dir):
+                    app.bundle_class(class_name, pdf_dir, output_dir)
+            return 0
+
+        if not federated and (not source_dir or not os.path.exists(source_dir)):
+            print(f"❌ 源文件夹不存在: {source_dir}")
+            return 2
+
+        students = [s for s in student_data if s['班级'] in classes]
+        bundle = not args.no_bundle
+        manifest_name = MANIFEST_NAME
+        archive_suffix = '.zip'
+        metrics_name = 'metrics'
+        if args.shard:
+            shard_index, shard_count = args.shard
+            students = filter_shard(students, shard_index, shard_count)
+            print(f"分片 {shard_index + 1}/{shard_count}: {len(students)} 名学生")
+            # 单个分片只有部分学生，合并需在所有分片完成后用 --bundle-only 进行
+            bundle = bundle and shard_count == 1
+            # 各分片并行写入同一输出目录，清单分开保存以免互相覆盖
+            manifest_name = f".build_manifest.{shard_index + 1}-of-{shard_count}.json"
+            archive_suffix = f".{shard_index + 1}-of-{shard_count}.zip"
+            metrics_name = f"metrics.{shard_index + 1}-of-{shard_count}"
+            if config.get('output.staging.enabled', False):
+                # 发布时整体替换班级文件夹，会覆盖其他分片写入的文件
+                print("分片运行不支持暂存模式，直接写入输出目录")
+                config.set('output.staging.enabled', False)
+
+        convert = config.is_pdf_conversion_enabled() if args.pdf is None else args.pdf
+        if args.profile:
+            from src.core.profiler import StageProfiler
+            profiler = StageProfiler(args.profile_top)
+        if args.memory:
+            from src.core.memory_monitor import MemoryMonitor
+            memory = MemoryMonitor(leak_threshold=int(args.leak_threshold_kb * 1024))
+            # tracemalloc按进程统计，各阶段只有一个工作线程时内存变化才能归到对应阶段和文档
+            print("内存统计模式: 各阶段改为单线程执行")
+            for key in ('pipeline.rename_workers', 'pipeline.fill_workers', 'pipeline.convert_workers'):
+                config.set(key, 1)
+            config.set('pipeline.autotune.enabled', False)
+        if (profiler or memory) and config.get('pipeline.fill_use_processes', True):
+            # 子进程中的调用无法被剖析或统计
+            print("剖析/内存统计模式: 评语填写改为在线程中执行")
+            config.set('pipeline.fill_use_processes', False)
+        if args.trace:
+            tracing.start()
+        with ExitStack() as stack:
+            if profiler:
+                stack.enter_context(profiler.installed())
+            if memory:
+                stack.enter_context(memory.installed())
+            if args.watch:
+                if config.get('output.mode', 'files') != 'files':
+                    # 压缩包每次运行都会重新生成，只会包含最后一批文件
+                    print("监视模式不支持压缩包输出，改为散装文件")
+                    config.set('output.mode', 'files')
+                if config.get('output.staging.enabled', False):
+                    # 监视模式在每批文件后直接合并输出目录中的班级PDF
+                    print("监视模式不支持暂存模式，直接写入输出目录")
+                    config.set('output.staging.enabled', False)
+                try:
+                    return watch(app, args, excel_file, source_dir, output_dir, classes, convert,
+                                 bundle, manifest_name)
+                finally:
+                    app.write_metrics(output_dir, metrics_name)
+            results = app.run_streaming(students, source_dir, output_dir, classes, convert,
+                                        bundle=bundle, force=args.force,
+                                        manifest_name=manifest_name,
+                                        archive_suffix=archive_suffix,
+                                        source_index=source_index)
+        app.write_metrics(output_dir, metrics_name)
+        if results is None:
+            return 2
+        if not args.shard:
+            # 分片运行时每个分片只有部分学生的结果
+            app.write_back_results(index.workbooks if federated else {'': excel_file},
+                                   results, output_dir, namespaced=federated,
+                                   notes=index.notes() if federated else None)
+        if memory is not None and report_memory(
+                memory, args.memory_dir or os.path.join(output_dir, 'memory')):
+            return 3
+        return 1 if any(item.status == 'failed' for item in results) else 0
+    finally:
+        app.pdf_converter.cleanup()
+        app.close_run_log()
+        tracer = tracing.stop()
+        if tracer is not None:
+            tracer.write(args.trace)
+            print(f"🕒 时间线已保存: {args.trace}（{tracer.span_count} 个区间，可在 ui.perfetto.dev 中打开）")
+        if profiler is not None:
+            report_profile(profiler, args.profile_dir or os.path.join(output_dir, 'profile'))
+
+
+def report_memory(memory, memory_dir: str) -> bool:
+    """
+    打印并保存内存报告
+
+    Returns:
+        bool: 是否检测到内存泄漏
+    """
+    from src.core.memory_monitor import format_bytes
+    path, report = memory.write_report(memory_dir)
+    print("\n🧠 内存统计:")
+    if report['peak_rss_bytes']:
+        print(f"  峰值RSS: {format_bytes(report['peak_rss_bytes'])}，"
+              f"tracemalloc峰值: {format_bytes(report['traced_peak_bytes'] or 0)}")
+    for stage, stats in sorted(report['stages'].items()):
+        print(f"  [{stage}] {stats['calls']} 次调用，每次调用后仍占用 "
+              f"{format_bytes(stats['retained_per_call'])}，期间峰值RSS增长 "
+              f"{format_bytes(stats['rss_growth_bytes'])}")
+    print("  主要分配位置（相对开始时）:")
+    for allocation in report['top_allocations'][:5]:
+        print(f"    {format_bytes(allocation['size_diff']):>10}  {allocation['site']}")
+    leak = report['leak_check']
+    print(f"报告已保存: {path}")
+    if not leak['enough_samples']:
+        print(f"泄漏检查: 文档数不足，未检查（{report['documents']} 个文档，{leak['samples']} 个样本）")
+        return False
+    per_document = format_bytes(leak['bytes_per_document'])
+    if leak['leak']:
+        print(f"❌ 泄漏检查失败: 每处理一个文档内存增长约 {per_document}（R²={leak['r2']:.2f}）")
+        return True
+    print(f"✓ 泄漏检查通过: 每个文档 {per_document}（R²={leak['r2']:.2f}）")
+    return False
+
+
+def report_profile(profiler, profile_dir: str):
+    """打印并保存剖析报告"""
+    report_path = profiler.write_report(profile_dir)
+    if report_path is None:
+        print("剖析模式: 没有记录到任何调用")
+        return
+    print("\n🔍 剖析结果（各阶段占用时间最多的函数）:")
+    for line in profiler.report_lines():
+        print(f"  {line}")
+    print(f"剖析文件已保存到: {profile_dir}（可用 python -m pstats 查看）")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
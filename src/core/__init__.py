@@ -2,11 +2,11 @@
 """
 核心模块包
 包含主要的业务逻辑类
+
+各模块在首次访问时才导入（PEP 562），导入本包不会加载 pandas 和 python-docx
 """
 
-from .file_renamer import FileRenamer
-from .evaluation_filler import EvaluationFiller
-from .pdf_converter import PDFConverter
+import importlib
 
 __version__ = "2.0.0"
 __author__ = "学年鉴定表自动化处理工具"
@@ -16,3 +16,24 @@ __all__ = [
     'EvaluationFiller', 
     'PDFConverter'
 ]
+
+# 导出名称 -> 所在模块
+_LAZY_EXPORTS = {
+    'FileRenamer': '.file_renamer',
+    'EvaluationFiller': '.evaluation_filler',
+    'PDFConverter': '.pdf_converter',
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    # 缓存到包中，之后的访问不再经过 __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
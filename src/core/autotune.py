@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+并发自动调整模块
+按AIMD（加性增、乘性减）反馈在运行中调整流水线各阶段的并发数：
+阶段有积压且所有并发都在忙时加1；错误率过高，或CPU已饱和且吞吐量下降时减半；
+加1后吞吐量没有提高时退回并暂停增加。
+第一次在某台机器上运行时各阶段从1个并发开始，有积压时逐步增加；
+每台机器（及输出目录所在的挂载点）调整出的并发数保存在状态文件中，下次运行从该值开始
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+from typing import Dict, Optional
+
+from . import event_log
+from .file_modes import write_atomic
+
+
+# 错误率超过该值时乘性减少
+ERROR_THRESHOLD = 0.1
+# CPU使用率达到该值视为饱和
+CPU_SATURATED = 0.95
+# 加1后吞吐量至少提高的比例，否则视为已到达平台
+MIN_GAIN = 0.05
+# 到达平台后暂停增加的采样周期数
+PLATEAU_HOLD = 5
+# 一个采样周期内至少完成多少条目，吞吐量才用于判断
+MIN_SAMPLE_ITEMS = 2
+
+
+def mount_point(path: str) -> str:
+    """路径所在的挂载点（不存在的路径取最近的已存在上级目录）"""
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    while not os.path.ismount(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+
+def host_key(output_dir: str) -> str:
+    """状态文件中的键：主机名和输出目录的挂载点（本地磁盘和网络共享的最佳并发数不同）"""
+    return f"{socket.gethostname()}|{mount_point(output_dir)}"
+
+
+class CpuSampler:
+    """整机CPU使用率（/proc/stat，其他平台用平均负载估计，都不可用时返回None）"""
+
+    def __init__(self):
+        self._last = self._read_stat()
+
+    @staticmethod
+    def _read_stat():
+        try:
+            with open('/proc/stat') as f:
+                values = [int(value) for value in f.readline().split()[1:]]
+        except (OSError, ValueError):
+            return None
+        # idle + iowait
+        idle = values[3] + (values[4] if len(values) > 4 else 0)
+        return sum(values), idle
+
+    def sample(self) -> Optional[float]:
+        current = self._read_stat()
+        if current is not None and self._last is not None:
+            total = current[0] - self._last[0]
+            idle = current[1] - self._last[1]
+            self._last = current
+            return (total - idle) / total if total > 0 else None
+        try:
+            return min(1.0, os.getloadavg()[0] / (os.cpu_count() or 1))
+        except (OSError, AttributeError):
+            return None
+
+
+class _StageTuner:
+    """单个阶段的调整状态"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.completed = 0
+        self.failed = 0
+        self.last_throughput: Optional[float] = None
+        self.increased = False
+        self.hold = 0
+        # 吞吐量最高的采样周期使用的并发数
+        self.best_throughput = 0.0
+        self.best_workers: Optional[int] = None
+
+
+class ConcurrencyController:
+    """流水线并发控制器"""
+
+    def __init__(self, state_path: str, key: str, max_workers: Dict[str, int],
+                 interval: float = 2.0, decrease: float = 0.5):
+        """
+        初始化控制器
+
+        Args:
+            state_path: 保存调整结果的JSON文件
+            key: 状态文件中的键（host_key 的结果）
+            max_workers: 阶段名称 -> 可调整到的最大并发数
+            interval: 采样周期（秒）
+            decrease: 乘性减少的系数
+        """
+        self.state_path = state_path
+        self.key = key
+        self.max_workers = {name: max(1, int(value)) for name, value in max_workers.items()}
+        self.interval = max(0.1, interval)
+        self.decrease = min(max(decrease, 0.1), 0.9)
+        self.saved = self._load().get('stages', {})
+        self.adjustments = 0
+        self._tuners: Dict[str, _StageTuner] = {}
+        self._pipeline = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._last_time = 0.0
+        self._cpu: Optional[CpuSampler] = None
+
+    def _load(self) -> Dict:
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get(self.key, {})
+        except (OSError, ValueError, AttributeError):
+            return {}
+
+    def initial_workers(self, stage: str) -> int:
+        """阶段的初始并发数：本机上次保存的值，没有时从1开始"""
+        value = self.saved.get(stage, 1)
+        return min(max(1, int(value)), self.max_workers.get(stage, 1))
+
+    def start(self, pipeline):
+        """开始在后台线程中采样和调整"""
+        self._pipeline = pipeline
+        self._tuners = {stats['name']: _StageTuner(stats['name']) for stats in pipeline.stage_stats()}
+        self._cpu = CpuSampler()
+        self._last_time = time.monotonic()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='autotune', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止调整"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.step()
+            except Exception as e:
+                event_log.get_logger().warning(f"并发自动调整出错: {str(e)}", event='autotune_error')
+                return
+
+    def step(self):
+        """采样一次，按AIMD规则调整各阶段的并发数"""
+        now = time.monotonic()
+        elapsed = max(now - self._last_time, 1e-6)
+        self._last_time = now
+        cpu = self._cpu.sample() if self._cpu else None
+        for stats in self._pipeline.stage_stats():
+            tuner = self._tuners[stats['name']]
+            completed = stats['completed'] - tuner.completed
+            failed = stats['failed'] - tuner.failed
+            tuner.completed, tuner.failed = stats['completed'], stats['failed']
+            workers = stats['workers']
+            throughput = completed / elapsed
+            backlog = stats['queued'] > 0 and stats['busy'] >= workers
+            if completed >= MIN_SAMPLE_ITEMS and throughput > tuner.best_throughput:
+                tuner.best_throughput = throughput
+                tuner.best_workers = workers
+
+            target, reason = workers, None
+            if completed and failed / completed > ERROR_THRESHOLD:
+                target, reason = int(workers * self.decrease), 'errors'
+            elif (cpu is not None and cpu >= CPU_SATURATED and tuner.last_throughput
+                  and throughput < tuner.last_throughput * (1 - MIN_GAIN)):
+                target, reason = int(workers * self.decrease), 'cpu'
+            elif (tuner.increased and tuner.last_throughput and completed >= MIN_SAMPLE_ITEMS
+                  and throughput < tuner.last_throughput * (1 + MIN_GAIN)):
+                # 增加的并发没有带来吞吐量提高：退回并暂停增加
+                target, reason = workers - 1, 'plateau'
+                tuner.hold = PLATEAU_HOLD
+            elif tuner.hold:
+                tuner.hold -= 1
+            elif backlog and workers < stats['max_workers'] and (cpu is None or cpu < CPU_SATURATED):
+                target, reason = workers + 1, 'backlog'
+
+            tuner.increased = target > workers
+            if completed >= MIN_SAMPLE_ITEMS or target != workers:
+                tuner.last_throughput = throughput
+            if target != workers:
+                applied = self._pipeline.set_workers(stats['name'], target)
+                if applied != workers:
+                    self.adjustments += 1
+                    event_log.get_logger().debug(
+                        f"并发调整: {stats['name']} {workers} → {applied}（{reason}）",
+                        event='autotune', stage=stats['name'], workers=applied, previous=workers,
+                        reason=reason, throughput=round(throughput, 3), queued=stats['queued'],
+                        cpu=round(cpu, 3) if cpu is not None else None
+                    )
+
+    def result(self) -> Dict[str, int]:
+        """调整结果：各阶段吞吐量最高时的并发数（没有足够样本时为当前并发数）"""
+        result = dict(self.saved)
+        if self._pipeline is not None:
+            for stats in self._pipeline.stage_stats():
+                tuner = self._tuners.get(stats['name'])
+                best = tuner.best_workers if tuner is not None else None
+                result[stats['name']] = best or stats['workers']
+        return result
+
+    def save(self) -> Dict[str, int]:
+        """
+        保存调整结果（同一状态文件中保留其他主机的记录）
+
+        Returns:
+            Dict[str, int]: 保存的各阶段并发数
+        """
+        result = self.result()
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if not isinstance(state, dict):
+                state = {}
+        except (OSError, ValueError):
+            state = {}
+        state[self.key] = {'stages': result, 'updated': time.strftime('%Y-%m-%dT%H:%M:%S')}
+        # 同一主机上的并发运行各自使用唯一的临时文件
+        write_atomic(self.state_path, json.dumps(state, ensure_ascii=False, indent=2))
+        return result
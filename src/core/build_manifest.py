@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+构建清单模块
+记录每个学生输出文件的构建输入（源文件哈希、名单行、评语库版本、随机种子、转换后端），
+再次运行时只重建输入发生变化的文件
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+from .file_modes import write_atomic
+
+
+# 清单格式版本，格式不兼容时递增
+MANIFEST_VERSION = 1
+
+# 默认清单文件名（位于输出目录中）
+MANIFEST_NAME = ".build_manifest.json"
+
+
+def hash_file(path: str) -> str:
+    """计算文件内容的SHA-256（截取前16字节的十六进制）"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:32]
+
+
+def hash_row(student: Dict) -> str:
+    """计算名单行的哈希（字段顺序无关）"""
+    text = json.dumps(student, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+def file_stamp(path: str) -> Optional[Tuple[int, int]]:
+    """返回文件的 (大小, 修改时间ns)，文件不存在时返回None"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class BuildManifest:
+    """
+    输出目录中的构建清单
+
+    每个学生一条记录：
+        inputs  - 构建docx的输入：source（源文件哈希）、row（名单行哈希）、
+                  library（评语库版本）、seed（随机种子）、fill（是否填写评语）
+        docx    - 输出docx的相对路径和 [大小, 修改时间]
+        backend - 生成PDF的转换后端标识，pdf 为PDF的相对路径和 [大小, 修改时间]
+        timings - 上次实际执行的各阶段耗时（秒），供调度器估计处理成本
+
+    输出文件被手动修改或删除时，对应的大小/修改时间不再匹配，会被视为过期
+    """
+
+    def __init__(self, output_dir: str, name: str = MANIFEST_NAME):
+        """
+        初始化并加载清单
+
+        Args:
+            output_dir: 输出目录
+            name: 清单文件名（分片运行时每个分片使用独立的清单）
+        """
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, name)
+        self.entries: Dict[str, Dict] = {}
+        # 源文件哈希缓存：路径 -> [大小, 修改时间, 哈希]，避免重复读取未变化的源文件
+        self.sources: Dict[str, list] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """从磁盘加载清单，文件不存在或格式不兼容时从空清单开始"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') != MANIFEST_VERSION:
+            return
+        self.entries = data.get('entries', {})
+        self.sources = data.get('sources', {})
+
+    def save(self):
+        """原子地写入清单（键排序、紧凑格式，内容相同时字节相同）"""
+        with self._lock:
+            data = {'version': MANIFEST_VERSION, 'entries': self.entries, 'sources': self.sources}
+            text = json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+        # 共享输出目录的其他用户（如其他分片）也要能读取清单
+        write_atomic(self.path, text)
+
+    def source_hash(self, source_path: str) -> str:
+        """
+        获取源文件哈希，大小和修改时间未变化时直接使用上次的结果
+
+        Args:
+            source_path: 源文件路径
+
+        Returns:
+            str: 源文件内容哈希
+        """
+        key = os.path.abspath(source_path)
+        stamp = file_stamp(source_path)
+        with self._lock:
+            cached = self.sources.get(key)
+        if cached and stamp and tuple(cached[:2]) == stamp:
+            return cached[2]
+        digest = hash_file(source_path)
+        with self._lock:
+            self.sources[key] = [stamp[0], stamp[1], digest]
+        return digest
+
+    def _relative(self, path: str) -> str:
+        return os.path.relpath(path, self.output_dir).replace(os.sep, '/')
+
+    def _absolute(self, relative_path: str) -> str:
+        return os.path.join(self.output_dir, *relative_path.split('/'))
+
+    def _is_stamp_current(self, relative_path: Optional[str], stamp) -> bool:
+        if not relative_path or not stamp:
+            return False
+        current = file_stamp(self._absolute(relative_path))
+        return current is not None and list(current) == list(stamp)
+
+    def is_docx_current(self, student_id: str, inputs: Dict, docx_path: str) -> bool:
+        """
+        判断学生的docx是否仍是最新：输入相同、路径相同且文件未被改动
+
+        Args:
+            student_id: 学号
+            inputs: 本次的构建输入
+            docx_path: 本次的输出路径
+
+        Returns:
+            bool: 是否可以跳过重命名和填写
+        """
+        with self._lock:
+            entry = self.entries.get(student_id)
+        if not entry or entry.get('inputs') != inputs:
+            return False
+        if entry.get('docx') != self._relative(docx_path):
+            return False
+        return self._is_stamp_current(entry.get('docx'), entry.get('docx_stamp'))
+
+    def is_pdf_current(self, student_id: str, backend_identity: str, pdf_path: str) -> bool:
+        """
+        判断学生的PDF是否仍是最新（调用前docx必须是最新的）
+
+        Args:
+            student_id: 学号
+            backend_identity: 本次使用的转换后端标识
+            pdf_path: 本次的PDF输出路径
+
+        Returns:
+            bool: 是否可以跳过转换
+        """
+        with self._lock:
+            entry = self.entries.get(student_id)
+        if not entry or entry.get('backend') != backend_identity:
+            return False
+        if entry.get('pdf') != self._relative(pdf_path):
+            return False
+        return self._is_stamp_current(entry.get('pdf'), entry.get('pdf_stamp'))
+
+    def previous_outputs(self, student_id: str) -> Tuple[Optional[str], Optional[str]]:
+        """返回上次记录的 (docx路径, pdf路径)，用于清理改名后遗留的旧文件"""
+        with self._lock:
+            entry = self.entries.get(student_id) or {}
+        docx = entry.get('docx')
+        pdf = entry.get('pdf')
+        return (self._absolute(docx) if docx else None, self._absolute(pdf) if pdf else None)
+
+    def record(self, student_id: str, inputs: Dict, docx_path: str,
+               pdf_path: Optional[str] = None, backend_identity: Optional[str] = None,
+               timings: Optional[Dict[str, float]] = None):
+        """
+        记录学生输出文件的构建结果
+
+        Args:
+            student_id: 学号
+            inputs: 构建docx的输入
+            docx_path: 输出docx路径
+            pdf_path: 输出PDF路径（未转换时为None）
+            backend_identity: 生成PDF的转换后端标识
+            timings: 本次实际执行的阶段耗时，未执行的阶段保留上次的记录
+        """
+        entry = {
+            'inputs': inputs,
+            'docx': self._relative(docx_path),
+            'docx_stamp': list(file_stamp(docx_path) or ()),
+        }
+        with self._lock:
+            previous = self.entries.get(student_id) or {}
+            merged = dict(previous.get('timings') or {})
+            merged.update({stage: round(seconds, 4) for stage, seconds in (timings or {}).items()})
+            if merged:
+                entry['timings'] = merged
+            if pdf_path and backend_identity:
+                entry['pdf'] = self._relative(pdf_path)
+                entry['pdf_stamp'] = list(file_stamp(pdf_path) or ())
+                entry['backend'] = backend_identity
+            else:
+                # 本次未转换：docx未变化时上次的PDF仍然有效
+                if previous.get('pdf') and previous.get('docx_stamp') == entry['docx_stamp']:
+                    for key in ('pdf', 'pdf_stamp', 'backend'):
+                        entry[key] = previous[key]
+            self.entries[student_id] = entry
+
+    def forget(self, student_id: str):
+        """删除学生的记录（处理失败时调用，下次运行会重建）"""
+        with self._lock:
+            self.entries.pop(student_id, None)
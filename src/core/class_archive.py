@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+班级压缩包模块
+处理完成的文件直接写入每个班级的zip压缩包，省去事后再读取、压缩整个输出目录的步骤
+"""
+
+import os
+import threading
+import time
+import zipfile
+from typing import Dict, List, Tuple
+
+from .file_modes import commit_temp, create_temp
+
+
+class ClassArchiveWriter:
+    """
+    按班级写入zip压缩包：<输出目录>/<班级>.zip
+
+    docx本身已经是压缩过的zip包，PDF的内容流和图片也已经压缩，默认都以存储方式（不压缩）写入，
+    再次deflate只会消耗CPU而几乎不减小体积。
+    压缩包写入过程中使用临时文件名，close() 写入中央目录后再替换为最终文件名
+    """
+
+    def __init__(self, output_dir: str, suffix: str = '.zip'):
+        """
+        初始化压缩包写入器
+
+        Args:
+            output_dir: 输出目录
+            suffix: 压缩包文件名后缀（分片运行时各分片使用不同后缀）
+        """
+        self.output_dir = output_dir
+        self.suffix = suffix
+        # 班级 -> (压缩包, 写入锁, 最终路径, 临时路径)
+        self._archives: Dict[str, Tuple[zipfile.ZipFile, threading.Lock, str, str]] = {}
+        self._lock = threading.Lock()
+        self.entry_count = 0
+
+    def archive_path(self, class_name: str) -> str:
+        """班级压缩包的最终路径"""
+        return os.path.join(self.output_dir, class_name + self.suffix)
+
+    def _get(self, class_name: str) -> Tuple[zipfile.ZipFile, threading.Lock, str, str]:
+        with self._lock:
+            if class_name not in self._archives:
+                final_path = self.archive_path(class_name)
+                temp_path = create_temp(final_path)
+                archive = zipfile.ZipFile(temp_path, 'w', allowZip64=True)
+                self._archives[class_name] = (archive, threading.Lock(), final_path, temp_path)
+            return self._archives[class_name]
+
+    def add(self, class_name: str, arcname: str, data: bytes, compress: bool = False):
+        """
+        写入一个条目
+
+        Args:
+            class_name: 班级名称
+            arcname: 压缩包内的路径
+            data: 文件内容
+            compress: 是否压缩（docx和PDF已经压缩过，应为False）
+        """
+        archive, lock, _, _ = self._get(class_name)
+        info = zipfile.ZipInfo(arcname, time.localtime()[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+        info.external_attr = 0o644 << 16
+        with lock:
+            archive.writestr(info, data)
+        with self._lock:
+            self.entry_count += 1
+
+    def add_file(self, class_name: str, arcname: str, path: str, compress: bool = False):
+        """
+        将已有文件写入压缩包
+
+        Args:
+            class_name: 班级名称
+            arcname: 压缩包内的路径
+            path: 文件路径
+            compress: 是否压缩
+        """
+        with open(path, 'rb') as f:
+            self.add(class_name, arcname, f.read(), compress)
+
+    def close(self) -> List[str]:
+        """
+        写入所有压缩包的中央目录并替换为最终文件名
+
+        Returns:
+            List[str]: 已生成的压缩包路径
+        """
+        with self._lock:
+            archives = list(self._archives.values())
+            self._archives.clear()
+        paths = []
+        for archive, lock, final_path, temp_path in archives:
+            with lock:
+                archive.close()
+            commit_temp(temp_path, final_path)
+            paths.append(final_path)
+        return sorted(paths)
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+文档存储模块
+在流水线各阶段之间以内存形式传递文档内容，超出内存预算时将最久未使用的文档溢出到临时目录
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class DocumentStore:
+    """
+    带内存预算的文档内容存储
+
+    文档以字节形式保存（进程池阶段需要在进程间传递，解析后的对象树无法直接传递），
+    内存中的文档总大小超过预算时，按LRU顺序写入临时目录，再次读取时自动载回内存
+    """
+
+    def __init__(self, max_memory_mb: float = 256, spill_dir: Optional[str] = None):
+        """
+        初始化文档存储
+
+        Args:
+            max_memory_mb: 内存预算（MB），为0时所有文档都保存在临时目录中
+            spill_dir: 溢出文件的父目录，默认使用系统临时目录
+        """
+        self.max_bytes = int(max_memory_mb * 1024 * 1024)
+        self.spill_root = spill_dir or None
+        self._spill_dir: Optional[str] = None
+        # 内存中的文档：键 -> 内容，按最近使用排序
+        self._memory: 'OrderedDict[str, bytes]' = OrderedDict()
+        # 已溢出的文档：键 -> 临时文件路径
+        self._spilled: Dict[str, str] = {}
+        self.memory_bytes = 0
+        self.peak_memory_bytes = 0
+        self.spill_count = 0
+        self._lock = threading.Lock()
+
+    def _spill_path(self, key: str) -> str:
+        """返回文档的溢出文件路径，首次溢出时创建临时目录"""
+        if self._spill_dir is None:
+            if self.spill_root:
+                os.makedirs(self.spill_root, exist_ok=True)
+            self._spill_dir = tempfile.mkdtemp(prefix='docstore-', dir=self.spill_root)
+        return os.path.join(self._spill_dir, key.replace('/', '_').replace(os.sep, '_') + '.docx')
+
+    def _evict(self):
+        """将最久未使用的文档写入临时目录，直到内存占用不超过预算（调用时需持有锁）"""
+        while self.memory_bytes > self.max_bytes and self._memory:
+            key, data = self._memory.popitem(last=False)
+            path = self._spill_path(key)
+            with open(path, 'wb') as f:
+                f.write(data)
+            self._spilled[key] = path
+            self.memory_bytes -= len(data)
+            self.spill_count += 1
+
+    def _remove_spilled(self, key: str):
+        path = self._spilled.pop(key, None)
+        if path and os.path.exists(path):
+            os.remove(path)
+
+    def put(self, key: str, data: bytes):
+        """
+        保存（或替换）文档内容
+
+        Args:
+            key: 文档标识
+            data: 文档内容
+        """
+        with self._lock:
+            self._discard(key)
+            self._memory[key] = data
+            self.memory_bytes += len(data)
+            self.peak_memory_bytes = max(self.peak_memory_bytes, self.memory_bytes)
+            self._evict()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        读取文档内容，已溢出的文档会被载回内存
+
+        Args:
+            key: 文档标识
+
+        Returns:
+            Optional[bytes]: 文档内容，不存在时返回None
+        """
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                return data
+            path = self._spilled.get(key)
+            if path is None:
+                return None
+            with open(path, 'rb') as f:
+                data = f.read()
+            self._remove_spilled(key)
+            self._memory[key] = data
+            self.memory_bytes += len(data)
+            self.peak_memory_bytes = max(self.peak_memory_bytes, self.memory_bytes)
+            self._evict()
+            return data
+
+    def _discard(self, key: str):
+        data = self._memory.pop(key, None)
+        if data is not None:
+            self.memory_bytes -= len(data)
+        self._remove_spilled(key)
+
+    def discard(self, key: str):
+        """删除文档（文档的最终产物写出后调用）"""
+        with self._lock:
+            self._discard(key)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._memory or key in self._spilled
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取存储统计"""
+        with self._lock:
+            return {
+                'documents': len(self._memory) + len(self._spilled),
+                'memory_bytes': self.memory_bytes,
+                'peak_memory_bytes': self.peak_memory_bytes,
+                'spilled': self.spill_count,
+            }
+
+    def close(self):
+        """清空存储并删除临时目录"""
+        with self._lock:
+            self._memory.clear()
+            self._spilled.clear()
+            self.memory_bytes = 0
+            if self._spill_dir:
+                shutil.rmtree(self._spill_dir, ignore_errors=True)
+                self._spill_dir = None
@@ -4,23 +4,77 @@
 功能：自动填写学年鉴定表中的各种评语
 """
 
+import hashlib
+import io
+import json
 import os
 import random
 import shutil
-from docx import Document
-from docx.shared import Pt
-from docx.oxml.ns import qn
+import zipfile
+from typing import Optional, Tuple
+
+from . import tracing
+from .file_modes import write_atomic
+from .event_log import get_logger
+
+
+# docx中各部件使用的固定时间戳，使相同内容保存出相同字节
+FIXED_ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+def student_seed(student_id: str) -> int:
+    """
+    根据学号生成评语选择的随机种子（跨机器、跨进程稳定）
+    
+    Args:
+        student_id: 学号
+        
+    Returns:
+        int: 随机种子
+    """
+    return int.from_bytes(hashlib.sha256(student_id.encode('utf-8')).digest()[:8], 'big')
+
+
+def seed_from_filename(file_path: str) -> int:
+    """从“姓名-学号.docx”文件名中取学号生成随机种子"""
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    return student_seed(stem.rsplit('-', 1)[-1])
 
 
 class EvaluationFiller:
     """评语填写器"""
     
-    def __init__(self):
+    # 学院意见表格中的标记文字
+    OPINION_MARKER = "学院 意见"
+    
+    def __init__(self, snapshot=None):
+        """
+        初始化评语填写器
+        
+        Args:
+            snapshot: 共享只读状态（shared_state.SharedSnapshot），提供时评语库和模板定位方案
+                直接使用映射中的数据，不再在每个工作进程中重新构建
+        """
         self.academic_years = ["2021-2022", "2022-2023", "2023-2024", "2024-2025"]
         self.total_expected_evaluations = 7  # 4个学年意见 + 3个综合鉴定表评语
+        # 模板定位方案：学年 -> 学年标题和学院意见单元格的位置，文档与模板结构一致时跳过全文查找
+        self.locator_plan = None
+        
+        # 共享只读状态快照（填写阶段的工作进程通过它按学号查找学生）
+        self.snapshot = snapshot
+        if snapshot is not None:
+            self.academic_years = list(snapshot.academic_years)
+            self.academic_year_opinions = snapshot.comments('academic_year_opinions')
+            self.class_organization_evaluations = snapshot.comments('class_organization_evaluations')
+            self.class_teacher_evaluations = snapshot.comments('class_teacher_evaluations')
+            self.college_opinions = snapshot.comments('college_opinions')
+            self.library_version = snapshot.library_version
+            self.locator_plan = snapshot.locator_plan
+            return
         
         # 初始化评语库
         self._init_evaluation_templates()
+        self.library_version = self._compute_library_version()
     
     def _init_evaluation_templates(self):
         """初始化评语模板"""
@@ -74,6 +128,18 @@ class EvaluationFiller:
             "\n    该生在学期间遵纪守法，思想态度端正，积极向上。学业成绩突出，专业知识扎实，展现出良好的学术素养。在课外活动中，该生展现出良好的领导力和组织协调能力，深受师生认可。同时，该生具备良好的沟通能力和团队协作精神，是一名全面发展的优秀毕业生。"
         ]
     
+    def _compute_library_version(self) -> str:
+        """评语库版本：所有评语内容的哈希，评语修改后已生成的文件会被视为过期"""
+        library = [
+            self.academic_years,
+            self.academic_year_opinions,
+            self.class_organization_evaluations,
+            self.class_teacher_evaluations,
+            self.college_opinions,
+        ]
+        text = json.dumps(library, ensure_ascii=False)
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()[:12]
+    
     def process_folder(self, folder_path):
         """处理文件夹中的所有docx文件"""
         if not os.path.exists(folder_path):
@@ -113,58 +179,65 @@ class EvaluationFiller:
             'error_folder': error_folder if error_files > 0 else None
         }
     
-    def _process_single_file(self, file_path, error_folder):
+    def process_file(self, file_path: str, error_folder: str, seed: Optional[int] = None) -> bool:
+        """
+        填写单个文件的评语，失败时将文件移动到错误文件夹
+        
+        Args:
+            file_path: docx文件路径
+            error_folder: 错误文件夹路径
+            seed: 评语选择的随机种子，默认由文件名中的学号生成
+            
+        Returns:
+            bool: 是否全部评语填写成功
+        """
+        return self._process_single_file(file_path, error_folder, seed)
+    
+    def fill_bytes(self, data: bytes, seed: int) -> Tuple[bool, bytes]:
+        """
+        在内存中填写docx内容，不读写文件
+        
+        Args:
+            data: docx文件内容
+            seed: 评语选择的随机种子
+            
+        Returns:
+            Tuple[bool, bytes]: (是否全部评语填写成功, 填写后的内容；失败时为原内容)
+        """
+        try:
+            # python-docx 在首次填写时才导入，启动时不加载
+            from docx import Document
+            with tracing.span('fill-load', bytes=len(data)):
+                doc = Document(io.BytesIO(data))
+            with tracing.span('fill-locate'):
+                filled = self._fill_document(doc, random.Random(seed))
+            if filled:
+                with tracing.span('fill-serialize') as span_args:
+                    output = self._reproducible_bytes(doc)
+                    span_args['bytes'] = len(output)
+                return True, output
+        except Exception:
+            pass
+        return False, data
+    
+    def _process_single_file(self, file_path, error_folder, seed=None):
         """处理单个docx文件，自动填写评语"""
+        # 每个学生使用独立的随机数生成器，相同输入总是选出相同的评语
+        rng = random.Random(seed_from_filename(file_path) if seed is None else seed)
         try:
+            from docx import Document
+            file_name = os.path.basename(file_path)
             # 打开文档
-            doc = Document(file_path)
-            
-            # 初始化计数器
-            academic_years_filled = 0
-            comprehensive_filled = 0
-            
-            # 处理各学年的学院意见
-            for i, year_suffix in enumerate(self.academic_years):
-                try:
-                    table = self._find_academic_year_table(doc, year_suffix)
-                    if table:
-                        # 选择评语
-                        if i < len(self.academic_year_opinions) and self.academic_year_opinions[i]:
-                            evaluation_text = random.choice(self.academic_year_opinions[i])
-                        else:
-                            evaluation_text = "学生在本学年表现良好。"
-                        
-                        if self._fill_evaluation_text(table, "学院 意见", evaluation_text):
-                            academic_years_filled += 1
-                except Exception:
-                    pass
-            
-            # 处理综合鉴定表（表格12）
-            try:
-                if len(doc.tables) >= 12:
-                    table12 = doc.tables[11]  # 索引从0开始
-                    
-                    # 1. 班团组织鉴定 (第4行)
-                    if self._fill_table_cell(table12, 3, 1, random.choice(self.class_organization_evaluations)):
-                        comprehensive_filled += 1
-                    
-                    # 2. 班主任综合评语 (第11行)
-                    if self._fill_table_cell(table12, 10, 1, random.choice(self.class_teacher_evaluations)):
-                        comprehensive_filled += 1
-                    
-                    # 3. 学院意见 (第17行)
-                    if self._fill_table_cell(table12, 16, 1, random.choice(self.college_opinions)):
-                        comprehensive_filled += 1
-            except Exception:
-                pass
-            
-            # 计算总数
-            total_filled = academic_years_filled + comprehensive_filled
+            with tracing.span('fill-load', file=file_name):
+                doc = Document(file_path)
             
             # 严格检查：只有所有7个评语都成功填写才算成功
-            if total_filled == self.total_expected_evaluations:
+            with tracing.span('fill-locate', file=file_name):
+                filled = self._fill_document(doc, rng)
+            if filled:
                 # 保存文档
-                doc.save(file_path)
+                with tracing.span('fill-write', file=file_name):
+                    self._save_reproducible(doc, file_path)
                 return True
             else:
                 # 将文件移动到错误文件夹
@@ -176,41 +249,156 @@ class EvaluationFiller:
             self._move_to_error_folder(file_path, error_folder)
             return False
     
+    def _fill_document(self, doc, rng) -> bool:
+        """填写已打开文档中的全部评语，返回是否7个评语都填写成功"""
+        # 初始化计数器
+        academic_years_filled = 0
+        comprehensive_filled = 0
+        
+        # 处理各学年的学院意见
+        for i, year_suffix in enumerate(self.academic_years):
+            try:
+                table = self._find_academic_year_table(doc, year_suffix)
+                if table:
+                    # 选择评语
+                    if i < len(self.academic_year_opinions) and self.academic_year_opinions[i]:
+                        evaluation_text = rng.choice(self.academic_year_opinions[i])
+                    else:
+                        evaluation_text = "学生在本学年表现良好。"
+                    
+                    if self._fill_evaluation_text(table, self.OPINION_MARKER, evaluation_text):
+                        academic_years_filled += 1
+            except Exception:
+                pass
+        
+        # 处理综合鉴定表（表格12）
+        try:
+            if len(doc.tables) >= 12:
+                table12 = doc.tables[11]  # 索引从0开始
+                
+                # 1. 班团组织鉴定 (第4行)
+                if self._fill_table_cell(table12, 3, 1, rng.choice(self.class_organization_evaluations)):
+                    comprehensive_filled += 1
+                
+                # 2. 班主任综合评语 (第11行)
+                if self._fill_table_cell(table12, 10, 1, rng.choice(self.class_teacher_evaluations)):
+                    comprehensive_filled += 1
+                
+                # 3. 学院意见 (第17行)
+                if self._fill_table_cell(table12, 16, 1, rng.choice(self.college_opinions)):
+                    comprehensive_filled += 1
+        except Exception:
+            pass
+        
+        # 计算总数
+        total_filled = academic_years_filled + comprehensive_filled
+        
+        return total_filled == self.total_expected_evaluations
+    
+    def _reproducible_bytes(self, doc) -> bytes:
+        """保存文档到内存并固定zip中的时间戳，相同内容总是得到相同字节"""
+        buffer = io.BytesIO()
+        doc.save(buffer)
+        buffer.seek(0)
+        
+        output = io.BytesIO()
+        with zipfile.ZipFile(buffer) as source, \
+                zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as target:
+            for info in source.infolist():
+                fixed_info = zipfile.ZipInfo(info.filename, FIXED_ZIP_DATE_TIME)
+                fixed_info.compress_type = zipfile.ZIP_DEFLATED
+                fixed_info.external_attr = 0o600 << 16
+                target.writestr(fixed_info, source.read(info.filename))
+        return output.getvalue()
+    
+    def _save_reproducible(self, doc, file_path):
+        """
+        以固定字节保存文档
+        
+        先写入临时文件再替换，避免中断时留下损坏的文档
+        """
+        write_atomic(file_path, self._reproducible_bytes(doc))
+    
     def _find_academic_year_table(self, doc, year_suffix):
         """查找特定学年对应的学院意见表格"""
-        # 先尝试查找包含"学年"的表格
-        for i, table in enumerate(doc.tables):
-            for row in table.rows:
-                for cell in row.cells:
-                    try:
-                        if year_suffix in cell.text and '学年' in cell.text:
-                            # 找到学年标题后，检查当前表格和下一个表格
-                            for next_idx in [i, i + 1]:
-                                if next_idx < len(doc.tables):
-                                    target_table = doc.tables[next_idx]
-                                    if self._find_cell_by_text(target_table, "学院 意见")[0] is not None:
-                                        return target_table
-                    except Exception:
-                        continue
+        table = self._planned_academic_year_table(doc, year_suffix)
+        if table is not None:
+            return table
+        located = self._locate_academic_year(doc, year_suffix)
+        return located[0] if located else None
+    
+    def _planned_academic_year_table(self, doc, year_suffix):
+        """按模板定位方案直接取学院意见表格，只检查两个单元格；文档结构与模板不同时返回None"""
+        plan = self.locator_plan
+        entry = plan['years'].get(year_suffix) if plan else None
+        if entry is None:
+            return None
+        tables = doc.tables
+        if len(tables) != plan['tables']:
+            return None
+        header_table, header_row, header_col, target_index, marker_row, marker_col = entry
+        try:
+            if year_suffix not in tables[header_table].rows[header_row].cells[header_col].text:
+                return None
+            target_table = tables[target_index]
+            marker_text = target_table.rows[marker_row].cells[marker_col].text.replace('\n', ' ')
+        except IndexError:
+            return None
+        return target_table if self.OPINION_MARKER in marker_text else None
+    
+    def _locate_academic_year(self, doc, year_suffix):
+        """
+        在全文中查找学年对应的学院意见表格
         
-        # 再尝试查找只包含年份的表格
-        for i, table in enumerate(doc.tables):
-            for row in table.rows:
-                for cell in row.cells:
-                    try:
-                        cell_text = cell.text
-                        if year_suffix in cell_text:
-                            # 找到年份标题后，检查当前表格和下一个表格
+        Returns:
+            Optional[Tuple[table, list]]: (表格, [标题表格, 标题行, 标题列, 意见表格, 意见行, 意见列])
+        """
+        tables = doc.tables
+        # 先尝试查找包含"学年"的表格，再尝试查找只包含年份的表格
+        for require_label in (True, False):
+            for i, table in enumerate(tables):
+                for row_idx, row in enumerate(table.rows):
+                    for col_idx, cell in enumerate(row.cells):
+                        try:
+                            cell_text = cell.text
+                            if year_suffix not in cell_text or (require_label and '学年' not in cell_text):
+                                continue
+                            # 找到学年标题后，检查当前表格和下一个表格
                             for next_idx in [i, i + 1]:
-                                if next_idx < len(doc.tables):
-                                    target_table = doc.tables[next_idx]
-                                    if self._find_cell_by_text(target_table, "学院 意见")[0] is not None:
-                                        return target_table
-                    except Exception:
-                        continue
-        
+                                if next_idx < len(tables):
+                                    target_table = tables[next_idx]
+                                    marker_row, marker_col, _ = self._find_cell_by_text(
+                                        target_table, self.OPINION_MARKER
+                                    )
+                                    if marker_row is not None:
+                                        return target_table, [i, row_idx, col_idx,
+                                                              next_idx, marker_row, marker_col]
+                        except Exception:
+                            continue
         return None
     
+    def compile_locator_plan(self, data: bytes):
+        """
+        从模板文档生成定位方案，供共享只读状态分发给各工作进程
+        
+        Args:
+            data: 模板（或任一学生的源文件）docx内容
+            
+        Returns:
+            Optional[Dict]: {'tables': 表格数, 'years': {学年: 位置}}，文档无法解析时返回None
+        """
+        try:
+            from docx import Document
+            doc = Document(io.BytesIO(data))
+        except Exception:
+            return None
+        years = {}
+        for year_suffix in self.academic_years:
+            located = self._locate_academic_year(doc, year_suffix)
+            if located:
+                years[year_suffix] = located[1]
+        return {'tables': len(doc.tables), 'years': years}
+    
     def _find_cell_by_text(self, table, search_text):
         """在表格中查找包含指定文本的单元格"""
         for i, row in enumerate(table.rows):
@@ -253,6 +441,8 @@ class EvaluationFiller:
     
     def _format_cell_text(self, cell):
         """设置单元格文本格式"""
+        from docx.oxml.ns import qn
+        from docx.shared import Pt
         for paragraph in cell.paragraphs:
             for run in paragraph.runs:
                 run.font.name = "宋体"
@@ -277,8 +467,9 @@ class EvaluationFiller:
         Returns:
             int: 成功处理的文件数量
         """
+        log = get_logger()
         if not os.path.exists(class_dir):
-            print(f"❌ 班级文件夹不存在: {class_dir}")
+            log.error(f"❌ 班级文件夹不存在: {class_dir}")
             return 0
         
         # 获取所有docx文件
@@ -287,32 +478,42 @@ class EvaluationFiller:
             if file.endswith('.docx') and not file.startswith('~'):
                 docx_files.append(file)
         
+        class_name = os.path.basename(class_dir)
         if not docx_files:
-            print(f"⚠️  班级文件夹中未找到任何docx文件: {class_dir}")
+            log.warning(f"⚠️  班级文件夹中未找到任何docx文件: {class_dir}")
             return 0
-        print(f"📁 处理班级文件夹: {os.path.basename(class_dir)}")
-        print(f"📄 找到 {len(docx_files)} 个文件需要处理")
+        log.info(f"📁 处理班级文件夹: {class_name}")
+        log.info(f"📄 找到 {len(docx_files)} 个文件需要处理")
         
         success_count = 0
         error_folder = os.path.join(class_dir, "处理失败的文件")
+        progress = log.progress(len(docx_files), label='填写评语')
         
-        for i, filename in enumerate(docx_files, 1):
+        for filename in docx_files:
             file_path = os.path.join(class_dir, filename)
-            print(f"[{i}/{len(docx_files)}] 正在填写评语: {filename}")
+            error = None
             
             try:
-                if self._process_single_file(file_path, error_folder):
-                    success_count += 1
-                    print(f"✓ 处理成功: {filename}")
-                else:
-                    print(f"✗ 处理失败: {filename}")
-                    # _process_single_file 已经处理了错误文件的移动
-                    
+                ok = self._process_single_file(file_path, error_folder)
+                # _process_single_file 已经处理了错误文件的移动
             except Exception as e:
-                print(f"✗ 处理失败: {filename} - {str(e)}")
+                ok = False
+                error = str(e)
                 self._move_to_error_folder(file_path, error_folder)
+            
+            if ok:
+                success_count += 1
+                log.event('fill', 'debug', f"✓ 处理成功: {filename}", file=filename, **{'class': class_name})
+            else:
+                detail = f" - {error}" if error else ''
+                log.event('fill', 'warning', f"✗ 处理失败: {filename}{detail}",
+                          file=filename, error=error, **{'class': class_name})
+            progress.update(failed=not ok)
+        progress.close()
         
-        print(f"📊 班级处理完成: 成功 {success_count}/{len(docx_files)} 个文件")
+        log.summary(f"📊 班级处理完成: 成功 {success_count}/{len(docx_files)} 个文件",
+                    event='fill_class_done', succeeded=success_count, total=len(docx_files),
+                    **{'class': class_name})
         
         # 如果错误文件夹为空，删除它
         if os.path.exists(error_folder) and not os.listdir(error_folder):
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+运行日志模块
+结构化事件日志：每个事件是一行JSON，由后台线程批量写入运行日志（JSONL），
+控制台只输出达到级别的消息和限速刷新的进度行，逐文件的输出不再阻塞处理流程
+"""
+
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, TextIO
+
+from .metrics import ProgressMeter
+
+
+# 事件级别
+LEVELS = {'debug': 10, 'info': 20, 'warning': 30, 'error': 40}
+
+# 控制台模式 -> 输出的最低级别：verbose 逐文件输出，normal 输出进度和汇总，quiet 只输出警告、错误和汇总
+CONSOLE_MODES = {'verbose': 10, 'normal': 20, 'quiet': 30}
+
+# 后台写入线程的结束标记
+_STOP = object()
+
+
+class _RunLogWriter(threading.Thread):
+    """后台写入线程：批量把事件写入JSONL文件"""
+
+    def __init__(self, path: str, flush_interval: float = 1.0, batch_size: int = 512):
+        super().__init__(name='run-log-writer', daemon=True)
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.queue: 'queue.SimpleQueue' = queue.SimpleQueue()
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            batch: List[Dict] = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    record = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if record is _STOP:
+                    stopping = True
+                    break
+                batch.append(record)
+            if batch:
+                self._file.write(''.join(
+                    json.dumps(record, ensure_ascii=False, default=str) + '\n' for record in batch
+                ))
+                self._file.flush()
+        self._file.close()
+
+    def stop(self):
+        """写完队列中剩余的事件后关闭文件"""
+        self.queue.put(_STOP)
+        self.join()
+
+
+class ConsoleProgress:
+    """限速刷新的控制台进度行：已完成/总数、失败数、吞吐量和预计剩余时间"""
+
+    def __init__(self, logger: 'EventLogger', total: int, label: str = ''):
+        self.logger = logger
+        self.total = total
+        self.label = label
+        self.meter = ProgressMeter(total)
+        self.failed = 0
+        self._last_shown = 0.0
+
+    def update(self, count: int = 1, failed: bool = False):
+        """记录完成的文件（限速刷新显示）"""
+        self.meter.update(count)
+        if failed:
+            self.failed += count
+        now = time.monotonic()
+        if self.meter.done >= self.total or now - self._last_shown >= self.logger.progress_interval:
+            self._last_shown = now
+            self.logger.show_progress(self.format(), final=self.meter.done >= self.total)
+
+    def format(self) -> str:
+        failed = f" 失败 {self.failed}" if self.failed else ''
+        label = f"{self.label} " if self.label else ''
+        return f"{label}[{self.meter.done}/{self.total}]{failed}  {self.meter.format()}"
+
+    def close(self):
+        """结束进度行（未完成时也换行）"""
+        if self.meter.done < self.total:
+            self.logger.show_progress(self.format(), final=True)
+
+
+class EventLogger:
+    """结构化事件日志"""
+
+    def __init__(self, console: str = 'normal', progress_interval: float = 0.5,
+                 stream: Optional[TextIO] = None):
+        """
+        初始化日志
+
+        Args:
+            console: 控制台模式：verbose / normal / quiet
+            progress_interval: 进度行的最短刷新间隔（秒）
+            stream: 控制台输出流，默认为 sys.stdout
+        """
+        self.console = console if console in CONSOLE_MODES else 'normal'
+        self.console_level = CONSOLE_MODES[self.console]
+        self.progress_interval = progress_interval
+        self.stream = stream
+        self.run_id = uuid.uuid4().hex[:12]
+        self.path: Optional[str] = None
+        self._writer: Optional[_RunLogWriter] = None
+        self._console_lock = threading.Lock()
+        # 控制台上是否有未换行的进度行
+        self._progress_open = False
+
+    @property
+    def _out(self) -> TextIO:
+        return self.stream or sys.stdout
+
+    def open(self, path: str):
+        """开始写入运行日志（追加），已打开时先关闭"""
+        self.close()
+        try:
+            self._writer = _RunLogWriter(path)
+        except OSError as e:
+            self.warning(f"无法写入运行日志 {path} - {str(e)}")
+            return
+        self._writer.start()
+        self.path = path
+        self.event('run_log_opened', level='debug', pid=os.getpid())
+
+    def close(self):
+        """写完剩余事件并关闭运行日志"""
+        writer, self._writer = self._writer, None
+        if writer is not None:
+            writer.stop()
+
+    def event(self, name: str, level: str = 'info', message: Optional[str] = None, **fields):
+        """
+        记录一个事件
+
+        Args:
+            name: 事件名称（如 fill、convert、class_done）
+            level: 级别：debug / info / warning / error
+            message: 控制台消息，达到控制台级别时输出
+            **fields: 事件字段（文件、班级、耗时等）
+        """
+        self._record(name, level, message, fields)
+        if message is not None and LEVELS.get(level, 20) >= self.console_level:
+            self._print(message)
+
+    def _record(self, name: str, level: str, message: Optional[str], fields: Dict):
+        """把事件放入写入队列（未打开运行日志时忽略）"""
+        writer = self._writer
+        if writer is None:
+            return
+        record = {'ts': round(time.time(), 3), 'run': self.run_id, 'level': level, 'event': name}
+        if message is not None:
+            record['message'] = message
+        record.update(fields)
+        writer.queue.put(record)
+
+    def debug(self, message: str, event: str = 'message', **fields):
+        self.event(event, 'debug', message, **fields)
+
+    def info(self, message: str, event: str = 'message', **fields):
+        self.event(event, 'info', message, **fields)
+
+    def warning(self, message: str, event: str = 'message', **fields):
+        self.event(event, 'warning', message, **fields)
+
+    def error(self, message: str, event: str = 'message', **fields):
+        self.event(event, 'error', message, **fields)
+
+    def summary(self, message: str, event: str = 'summary', **fields):
+        """汇总信息：任何控制台模式下都输出"""
+        self._record(event, 'info', message, fields)
+        self._print(message)
+
+    def progress(self, total: int, label: str = '') -> ConsoleProgress:
+        """创建进度行"""
+        return ConsoleProgress(self, total, label)
+
+    def _print(self, message: str):
+        with self._console_lock:
+            out = self._out
+            if self._progress_open:
+                out.write('\n')
+                self._progress_open = False
+            out.write(message + '\n')
+            out.flush()
+
+    def show_progress(self, line: str, final: bool = False):
+        """显示进度行：终端中原地刷新，重定向到文件时逐行输出"""
+        if self.console_level > CONSOLE_MODES['normal']:
+            return
+        with self._console_lock:
+            out = self._out
+            if out.isatty():
+                out.write('\r' + line + ('\n' if final else ''))
+                self._progress_open = not final
+            else:
+                out.write(line + '\n')
+            out.flush()
+
+
+# 全局日志
+_logger: Optional[EventLogger] = None
+
+
+def get_logger() -> EventLogger:
+    """获取全局日志（未配置时为 normal 模式、不写运行日志）"""
+    global _logger
+    if _logger is None:
+        _logger = EventLogger()
+    return _logger
+
+
+def configure(console: str = 'normal', progress_interval: float = 0.5) -> EventLogger:
+    """
+    重新配置全局日志（关闭之前打开的运行日志）
+
+    Args:
+        console: 控制台模式：verbose / normal / quiet
+        progress_interval: 进度行的最短刷新间隔（秒）
+
+    Returns:
+        EventLogger: 新的全局日志
+    """
+    global _logger
+    if _logger is not None:
+        _logger.close()
+    _logger = EventLogger(console, progress_interval)
+    return _logger
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+多名单联合处理模块
+一次运行处理多个学院的名单工作簿和多个源文件夹：各工作簿并行读取后合并为一个全局学生索引，
+检测重复学号（同一学生出现多次）和冲突学号（同一学号对应不同姓名），
+班级名称加上工作簿前缀（<工作簿>-<班级>），所有学生由同一条流水线和同一组工作进程处理
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+from .file_renamer import FileRenamer
+
+
+# 班级名称的工作簿前缀分隔符
+NAMESPACE_SEPARATOR = '-'
+
+# 冲突学号的处理方式：skip 所有记录都不处理，first 处理第一次出现的记录
+CONFLICT_POLICIES = ('skip', 'first')
+
+
+def _load_workbook(excel_file: str) -> List[Dict]:
+    """读取一个名单工作簿（在子进程中执行）"""
+    return FileRenamer().load_excel_data(excel_file)
+
+
+def workbook_namespaces(excel_files: Sequence[str]) -> List[str]:
+    """各工作簿的班级前缀：文件名（不含扩展名），重名时追加序号"""
+    namespaces = []
+    for path in excel_files:
+        stem = os.path.splitext(os.path.basename(path))[0] or 'roster'
+        name, suffix = stem, 2
+        while name in namespaces:
+            name = f"{stem}{suffix}"
+            suffix += 1
+        namespaces.append(name)
+    return namespaces
+
+
+def namespaced_class(namespace: str, class_name: str) -> str:
+    """加上工作簿前缀的班级名称"""
+    return f"{namespace}{NAMESPACE_SEPARATOR}{class_name}"
+
+
+class FederatedIndex:
+    """全局学生索引"""
+
+    def __init__(self):
+        # 合并后的学生（班级已加前缀，保持各名单的顺序）
+        self.students: List[Dict] = []
+        # 学号 -> 源文件路径
+        self.source_index: Dict[str, str] = {}
+        # 工作簿前缀 -> 工作簿路径
+        self.workbooks: Dict[str, str] = {}
+        # 工作簿前缀 -> 读取到的学生数（读取失败时为0）
+        self.loaded: Dict[str, int] = {}
+        # 重复学号：{'学号', '姓名', 'kept', 'dropped'}（班级名称）
+        self.duplicates: List[Dict] = []
+        # 冲突学号：{'学号', 'records': [{'姓名', '班级'}, ...], 'kept'}
+        self.conflicts: List[Dict] = []
+        # 在多个源文件夹中都有的学号：{'学号', 'used', 'ignored'}
+        self.source_duplicates: List[Dict] = []
+
+    def notes(self) -> Dict[str, str]:
+        """未处理学号的原因（冲突的学号），用于回写处理结果"""
+        notes = {}
+        for entry in self.conflicts:
+            if entry['kept'] is None:
+                records = ', '.join(f"{record['班级']}/{record['姓名']}" for record in entry['records'])
+                notes[entry['学号']] = f"学号冲突（{records}），未处理"
+        return notes
+
+    def get_classes(self) -> List[str]:
+        """按工作簿顺序排列的班级名称"""
+        classes = []
+        for student in self.students:
+            if student['班级'] not in classes:
+                classes.append(student['班级'])
+        return classes
+
+
+def _build_source_indexes(source_dirs: Sequence[str], renamer: FileRenamer) -> List[Dict[str, str]]:
+    """并行扫描各源文件夹（网络共享上每次列目录都是一次往返）"""
+    with ThreadPoolExecutor(max_workers=max(1, min(len(source_dirs), 8))) as pool:
+        return list(pool.map(renamer.build_source_index, source_dirs))
+
+
+def load_federated(excel_files: Sequence[str], source_dirs: Sequence[str],
+                   renamer: Optional[FileRenamer] = None, workers: int = 0,
+                   on_conflict: str = 'skip') -> FederatedIndex:
+    """
+    并行读取多个名单工作簿并建立全局学生索引
+
+    源文件夹数与工作簿数相同时一一对应（学生优先在本工作簿的源文件夹中查找），
+    否则所有源文件夹合并查找，同一学号出现在多个源文件夹中时使用先列出的文件夹
+
+    Args:
+        excel_files: 名单工作簿路径
+        source_dirs: 源文件夹路径
+        renamer: 用于扫描源文件夹的 FileRenamer
+        workers: 并行读取工作簿的进程数，0 表示CPU核数，1 表示在当前进程中依次读取
+        on_conflict: 冲突学号的处理方式：skip 或 first
+
+    Returns:
+        FederatedIndex: 全局学生索引
+    """
+    if on_conflict not in CONFLICT_POLICIES:
+        raise ValueError(f"未知的冲突处理方式: {on_conflict}")
+    renamer = renamer or FileRenamer()
+    index = FederatedIndex()
+    namespaces = workbook_namespaces(excel_files)
+    index.workbooks = dict(zip(namespaces, excel_files))
+
+    workers = min(workers or os.cpu_count() or 1, len(excel_files))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rosters = list(pool.map(_load_workbook, excel_files))
+    else:
+        rosters = [_load_workbook(path) for path in excel_files]
+
+    # 第一遍：按学号收集所有记录
+    records: Dict[str, List[Dict]] = {}
+    order: List[str] = []
+    for namespace, roster in zip(namespaces, rosters):
+        index.loaded[namespace] = len(roster)
+        for student in roster:
+            record = {
+                '学号': student['学号'],
+                '姓名': student['姓名'],
+                '班级': namespaced_class(namespace, student['班级']),
+                '_namespace': namespace,
+            }
+            if student['学号'] not in records:
+                records[student['学号']] = []
+                order.append(student['学号'])
+            records[student['学号']].append(record)
+
+    # 第二遍：检测重复和冲突，确定每个学号使用的记录
+    kept: List[Dict] = []
+    for student_id in order:
+        entries = records[student_id]
+        names = {entry['姓名'] for entry in entries}
+        if len(names) > 1:
+            index.conflicts.append({
+                '学号': student_id,
+                'records': [{'姓名': entry['姓名'], '班级': entry['班级']} for entry in entries],
+                'kept': entries[0]['班级'] if on_conflict == 'first' else None,
+            })
+            if on_conflict == 'skip':
+                continue
+        elif len(entries) > 1:
+            index.duplicates.append({
+                '学号': student_id,
+                '姓名': entries[0]['姓名'],
+                'kept': entries[0]['班级'],
+                'dropped': [entry['班级'] for entry in entries[1:]],
+            })
+        kept.append(entries[0])
+
+    # 源文件：一一对应时先查本工作簿的源文件夹，再按顺序查其他文件夹
+    source_indexes = _build_source_indexes(source_dirs, renamer)
+    paired = len(source_dirs) == len(excel_files) and len(source_dirs) > 1
+    root_of = dict(zip(namespaces, range(len(source_dirs)))) if paired else {}
+    for record in kept:
+        student_id = record['学号']
+        own = root_of.get(record.pop('_namespace'))
+        candidates = ([own] if own is not None else []) + \
+            [i for i in range(len(source_indexes)) if i != own]
+        found = [source_indexes[i][student_id] for i in candidates if student_id in source_indexes[i]]
+        if found:
+            index.source_index[student_id] = found[0]
+            if len(found) > 1:
+                index.source_duplicates.append({'学号': student_id, 'used': found[0], 'ignored': found[1:]})
+        index.students.append(record)
+    return index
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+原子写入模块
+输出文件（文档、PDF缓存条目、清单、指标、状态文件等）都先写入同目录的临时文件再替换到位，
+其他进程和机器不会读到写了一半的文件。临时文件用 tempfile.mkstemp 创建（并发运行不会互相覆盖），
+其权限为0600，替换前改为按umask创建普通文件时的权限，共享上的其他用户可以读取
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import IO, Iterator, Optional, Union
+
+
+def _current_umask() -> int:
+    # 读取umask只能先设置再恢复，在导入时读取一次
+    mask = os.umask(0o022)
+    os.umask(mask)
+    return mask
+
+
+_UMASK = _current_umask()
+
+
+def default_file_mode() -> int:
+    """按umask新建普通文件时的权限（通常为0644或0664）"""
+    return 0o666 & ~_UMASK
+
+
+def apply_default_mode(path: str):
+    """把临时文件的权限改为普通文件的权限"""
+    os.chmod(path, default_file_mode())
+
+
+def create_temp(path: str, suffix: str = '.tmp') -> str:
+    """
+    在目标文件所在目录中创建唯一的临时文件
+
+    Args:
+        path: 最终文件路径
+        suffix: 临时文件后缀（以 . 开头、以 .tmp 结尾的文件会被发布和打包时跳过）
+
+    Returns:
+        str: 临时文件路径
+    """
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=folder, prefix=f".{os.path.basename(path)}.", suffix=suffix)
+    os.close(fd)
+    return temp_path
+
+
+def commit_temp(temp_path: str, path: str):
+    """设置普通文件权限后把临时文件替换到最终路径"""
+    apply_default_mode(temp_path)
+    os.replace(temp_path, path)
+
+
+def discard_temp(temp_path: str):
+    """删除未替换到位的临时文件"""
+    try:
+        os.remove(temp_path)
+    except OSError:
+        pass
+
+
+@contextmanager
+def atomic_path(path: str, suffix: str = '.tmp') -> Iterator[str]:
+    """
+    得到一个临时文件路径，with块正常结束后替换到最终路径，出错时删除临时文件
+
+    用于需要按路径写入的场合（如 zipfile、openpyxl）
+    """
+    temp_path = create_temp(path, suffix)
+    try:
+        yield temp_path
+        commit_temp(temp_path, path)
+    except BaseException:
+        discard_temp(temp_path)
+        raise
+
+
+@contextmanager
+def atomic_write(path: str, mode: str = 'wb', encoding: Optional[str] = None) -> Iterator[IO]:
+    """以文件对象原子写入：atomic_write(path, 'w', 'utf-8') as f"""
+    with atomic_path(path) as temp_path:
+        with open(temp_path, mode, encoding=encoding) as f:
+            yield f
+
+
+def write_atomic(path: str, data: Union[bytes, str], encoding: str = 'utf-8'):
+    """原子写入整个文件的内容"""
+    if isinstance(data, str):
+        with atomic_write(path, 'w', encoding) as f:
+            f.write(data)
+    else:
+        with atomic_write(path) as f:
+            f.write(data)
@@ -4,12 +4,15 @@
 功能：从Excel文件中读取学号和姓名，将学年鉴定表文件重命名并按班级分类
 """
 
-import pandas as pd
 import os
 import shutil
 from pathlib import Path
 from typing import List, Dict, Tuple
 
+from . import tracing
+from .event_log import get_logger
+from .roster_reader import read_roster, roster_format
+
 
 class FileRenamer:
     """文件重命名器"""
@@ -17,10 +20,16 @@ class FileRenamer:
     def __init__(self):
         self.possible_id_columns = ['学号', '学生编号', 'ID', 'id', '编号']
         self.possible_name_columns = ['姓名', '名字', 'Name', 'name', '学生姓名']
+        # CSV/TSV/Parquet名单中代替“每个班级一个工作表”的班级列
+        self.possible_class_columns = ['班级', '班级名称', '行政班', 'Class', 'class']
+        # 最近一次处理时读取的学生数据（保持名单顺序）
+        self.student_data: List[Dict] = []
     
     def get_class_list(self, excel_file):
         """获取Excel文件中的所有工作表（班级）名称"""
         try:
+            # pandas 在首次读取名单时才导入，启动时不加载
+            import pandas as pd
             xl_file = pd.ExcelFile(excel_file)
             return xl_file.sheet_names
         except Exception as e:
@@ -29,6 +38,7 @@ class FileRenamer:
     def read_student_data(self, excel_file, class_name):
         """从指定班级的工作表中读取学号和姓名"""
         try:
+            import pandas as pd
             df = pd.read_excel(excel_file, sheet_name=class_name)
             
             # 查找学号和姓名列
@@ -80,6 +90,8 @@ class FileRenamer:
                         # 复制并重命名文件
                         shutil.copy2(source_path, target_path)
                         renamed_count += 1
+                        get_logger().event('rename', 'debug', f"✓ {filename} -> {new_filename}",
+                                           file=filename, **{'class': class_name})
                     except Exception as e:
                         not_found_count += 1
                         raise Exception(f"重命名文件 {filename} 失败: {e}")
@@ -87,6 +99,57 @@ class FileRenamer:
                     pass
         return renamed_count, not_found_count
     
+    def build_source_index(self, source_dir: str) -> Dict[str, str]:
+        """
+        建立源目录中学号到文件路径的索引
+        
+        Args:
+            source_dir: 源文件目录（文件名为“学号.docx”）
+            
+        Returns:
+            Dict[str, str]: 学号到源文件路径的映射
+        """
+        index = {}
+        for filename in os.listdir(source_dir):
+            if filename.endswith('.docx') and not filename.startswith('~'):
+                index[filename.replace('.docx', '')] = os.path.join(source_dir, filename)
+        return index
+    
+    def get_target_path(self, student: Dict, output_dir: str) -> str:
+        """
+        获取学生文件重命名后的路径：<输出目录>/<班级>/姓名-学号.docx
+        
+        Args:
+            student: 学生信息（包含学号、姓名、班级）
+            output_dir: 输出目录
+            
+        Returns:
+            str: 目标文件路径
+        """
+        return os.path.join(output_dir, student['班级'], f"{student['姓名']}-{student['学号']}.docx")
+    
+    def copy_student_file(self, student: Dict, source_path: str, output_dir: str) -> str:
+        """
+        将单个学生的文件复制到班级目录并重命名为“姓名-学号.docx”
+        
+        Args:
+            student: 学生信息（包含学号、姓名、班级）
+            source_path: 源文件路径
+            output_dir: 输出目录
+            
+        Returns:
+            str: 目标文件路径
+        """
+        target_path = self.get_target_path(student, output_dir)
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        try:
+            with tracing.span('copy', file=os.path.basename(source_path),
+                              bytes=os.path.getsize(source_path)):
+                shutil.copy2(source_path, target_path)
+        except Exception as e:
+            raise Exception(f"重命名文件 {os.path.basename(source_path)} 失败: {e}")
+        return target_path
+    
     def _find_column(self, df, possible_columns):
         """查找匹配的列名"""
         for col in possible_columns:
@@ -95,6 +158,7 @@ class FileRenamer:
         return None
     def _process_student_id(self, student_id_raw):
         """处理学号：统一转换为字符串格式"""
+        import pandas as pd
         if pd.isna(student_id_raw):
             return None
         if isinstance(student_id_raw, (int, float)):
@@ -104,7 +168,7 @@ class FileRenamer:
     
     def load_excel_data(self, excel_file: str) -> List[Dict]:
         """
-        从Excel文件中加载所有学生数据
+        从Excel文件中加载所有学生数据（CSV/TSV/Parquet名单按班级列读取）
         
         Args:
             excel_file: Excel文件路径
@@ -112,6 +176,8 @@ class FileRenamer:
         Returns:
             List[Dict]: 学生数据列表，每个字典包含学号、姓名、班级等信息
         """
+        if roster_format(excel_file):
+            return self.load_roster_file(excel_file)
         try:
             student_data = []
             
@@ -133,12 +199,29 @@ class FileRenamer:
                         student_data.append(student_info)
                         
                 except Exception as e:
-                    print(f"警告：读取班级 '{class_name}' 时出错: {e}")
+                    get_logger().warning(f"警告：读取班级 '{class_name}' 时出错: {e}")
                     continue
             return student_data
             
         except Exception as e:
-            print(f"❌ 加载Excel数据失败: {e}")
+            get_logger().error(f"❌ 加载Excel数据失败: {e}")
+            return []
+    
+    def load_roster_file(self, roster_file: str) -> List[Dict]:
+        """
+        从CSV/TSV/Parquet名单中加载所有学生数据
+        
+        Args:
+            roster_file: 名单文件路径
+            
+        Returns:
+            List[Dict]: 学生数据列表，格式与 load_excel_data 相同
+        """
+        try:
+            return read_roster(roster_file, self.possible_id_columns,
+                               self.possible_name_columns, self.possible_class_columns)
+        except Exception as e:
+            get_logger().error(f"❌ 加载名单失败: {e}")
             return []
     
     def rename_files_for_class(self, class_students: List[Dict], source_dir: str, output_dir: str, class_name: str) -> Tuple[int, int]:
@@ -164,7 +247,7 @@ class FileRenamer:
             return self.rename_and_organize_files(student_dict, source_dir, output_dir, class_name)
             
         except Exception as e:
-            print(f"❌ 处理班级 '{class_name}' 时出错: {e}")
+            get_logger().error(f"❌ 处理班级 '{class_name}' 时出错: {e}")
             return 0, len(class_students)
     
     def process_files(self, excel_file: str, source_dir: str, output_dir: str) -> Tuple[bool, List[str]]:
@@ -179,29 +262,31 @@ class FileRenamer:
         Returns:
             Tuple[bool, List[str]]: (是否成功, 可用班级列表)
         """
+        log = get_logger()
         try:
             # 1. 加载Excel数据
-            print("正在读取Excel文件...")
+            log.info("正在读取Excel文件...")
             student_data = self.load_excel_data(excel_file)
             if not student_data:
-                print("❌ Excel文件读取失败或为空")
+                log.error("❌ Excel文件读取失败或为空")
                 return False, []
+            self.student_data = student_data
             
-            print(f"✓ 成功读取 {len(student_data)} 条学生记录")
+            log.info(f"✓ 成功读取 {len(student_data)} 条学生记录")
             
             # 2. 获取可用班级
             available_classes = self.get_available_classes(student_data)
             if not available_classes:
-                print("❌ 未找到任何班级信息")
+                log.error("❌ 未找到任何班级信息")
                 return False, []
             
-            print(f"✓ 发现 {len(available_classes)} 个班级: {', '.join(available_classes)}")
+            log.info(f"✓ 发现 {len(available_classes)} 个班级: {', '.join(available_classes)}")
             
             # 3. 创建输出目录
             os.makedirs(output_dir, exist_ok=True)
             
             # 4. 重命名文件
-            print("\n开始文件重命名...")
+            log.info("\n开始文件重命名...")
             total_success = 0
             total_failed = 0
             
@@ -212,15 +297,16 @@ class FileRenamer:
                 )
                 total_success += success_count
                 total_failed += failed_count
+                log.event('rename_class_done', 'debug', f"  {class_name}: 成功 {success_count}, 失败 {failed_count}",
+                          succeeded=success_count, failed=failed_count, **{'class': class_name})
             
-            print(f"\n文件重命名完成!")
-            print(f"成功: {total_success} 个文件")
-            print(f"失败: {total_failed} 个文件")
+            log.summary(f"\n文件重命名完成!\n成功: {total_success} 个文件\n失败: {total_failed} 个文件",
+                        event='rename_done', succeeded=total_success, failed=total_failed)
             
             return total_success > 0, available_classes
             
         except Exception as e:
-            print(f"❌ 处理过程中出错: {str(e)}")
+            log.error(f"❌ 处理过程中出错: {str(e)}")
             import traceback
             traceback.print_exc()
             return False, []
@@ -241,3 +327,19 @@ class FileRenamer:
                 classes.add(str(student['班级']).strip())
         
         return sorted(list(classes))
+    
+    def get_class_roster_order(self, class_name: str) -> List[str]:
+        """
+        获取班级名单顺序的文件名（不含扩展名）
+        
+        Args:
+            class_name: 班级名称
+            
+        Returns:
+            List[str]: 按名单顺序排列的“姓名-学号”列表
+        """
+        return [
+            f"{student['姓名']}-{student['学号']}"
+            for student in self.student_data
+            if student['班级'] == class_name
+        ]
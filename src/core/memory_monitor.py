@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+内存统计模块
+--memory 模式下用tracemalloc记录各阶段调用前后的内存变化、进程峰值RSS、
+每处理一个文档后仍被占用的内存和主要分配位置，并检查占用是否随文档数线性增长（泄漏）。
+未启用时不替换任何函数，也不启动tracemalloc
+"""
+
+import functools
+import gc
+import json
+import os
+import sys
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from .evaluation_filler import EvaluationFiller
+from .profiler import PROFILE_TARGETS
+from .workflow import StudentWorkflow
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# 判定为泄漏的每文档内存增长（字节）
+DEFAULT_LEAK_THRESHOLD = 64 * 1024
+# 判定为线性增长所需的拟合优度
+LEAK_MIN_R2 = 0.9
+# 每处理多少个文档回收一次垃圾并记录一个样本
+SAMPLE_EVERY = 5
+# 泄漏检查至少需要的样本数
+MIN_SAMPLES = 8
+
+
+def current_rss() -> Optional[int]:
+    """当前进程的常驻内存（字节），无法获取时返回None"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss() -> Optional[int]:
+    """进程启动以来的峰值常驻内存（字节），无法获取时返回None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux上单位为KB，macOS上为字节
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def linear_fit(points: List[Tuple[float, float]]) -> Tuple[float, float]:
+    """
+    最小二乘直线拟合
+
+    Returns:
+        Tuple[float, float]: (斜率, 拟合优度R²)
+    """
+    count = len(points)
+    if count < 2:
+        return 0.0, 0.0
+    mean_x = sum(x for x, _ in points) / count
+    mean_y = sum(y for _, y in points) / count
+    sxx = sum((x - mean_x) ** 2 for x, _ in points)
+    syy = sum((y - mean_y) ** 2 for _, y in points)
+    sxy = sum((x - mean_x) * (y - mean_y) for x, y in points)
+    if not sxx:
+        return 0.0, 0.0
+    slope = sxy / sxx
+    r2 = (sxy * sxy) / (sxx * syy) if syy else 0.0
+    return slope, r2
+
+
+def format_bytes(size: float) -> str:
+    """格式化字节数"""
+    for unit in ('B', 'KB', 'MB'):
+        if abs(size) < 1024:
+            return f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}GB"
+
+
+class MemoryMonitor:
+    """按阶段和文档统计内存占用"""
+
+    def __init__(self, top_n: int = 10, frames: int = 1,
+                 leak_threshold: int = DEFAULT_LEAK_THRESHOLD):
+        """
+        初始化内存统计
+
+        Args:
+            top_n: 报告的主要分配位置数量
+            frames: tracemalloc为每次分配记录的调用栈深度
+            leak_threshold: 每文档内存增长超过该值（字节）且呈线性时判定为泄漏
+        """
+        self.top_n = top_n
+        self.frames = max(1, frames)
+        self.leak_threshold = leak_threshold
+        # 阶段 -> {'calls', 'retained_bytes', 'max_traced_bytes', 'rss_growth_bytes'}
+        self.stages: Dict[str, Dict[str, int]] = {}
+        self.documents = 0
+        # (已处理文档数, tracemalloc当前占用, RSS)
+        self.samples: List[Tuple[int, int, Optional[int]]] = []
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._final: Optional[tracemalloc.Snapshot] = None
+        self.traced_peak: Optional[int] = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _measure(self, stage: str, func: Callable, *args, **kwargs):
+        """调用阶段函数并记录调用前后的内存变化（同一线程中嵌套的调用直接执行）"""
+        if getattr(self._local, 'active', False):
+            return func(*args, **kwargs)
+        self._local.active = True
+        before = tracemalloc.get_traced_memory()[0]
+        rss_before = peak_rss() or 0
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self._local.active = False
+            after = tracemalloc.get_traced_memory()[0]
+            rss_after = peak_rss() or 0
+            with self._lock:
+                stats = self.stages.setdefault(stage, {
+                    'calls': 0, 'retained_bytes': 0, 'max_traced_bytes': 0, 'rss_growth_bytes': 0
+                })
+                stats['calls'] += 1
+                stats['retained_bytes'] += after - before
+                stats['max_traced_bytes'] = max(stats['max_traced_bytes'], after)
+                # 峰值RSS在本阶段执行期间上升，计入本阶段
+                stats['rss_growth_bytes'] += max(0, rss_after - rss_before)
+
+    def document_done(self):
+        """一个文档处理完成；每隔几个文档回收垃圾后记录一次仍被占用的内存"""
+        with self._lock:
+            self.documents += 1
+            if self.documents % SAMPLE_EVERY:
+                return
+            documents = self.documents
+        gc.collect()
+        traced = tracemalloc.get_traced_memory()[0]
+        with self._lock:
+            self.samples.append((documents, traced, current_rss()))
+
+    def _wrap_stage(self, stage: str, func: Callable) -> Callable:
+        monitor = self
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return monitor._measure(stage, func, *args, **kwargs)
+        return wrapper
+
+    def _wrap_done(self, func: Callable) -> Callable:
+        monitor = self
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            finally:
+                monitor.document_done()
+        return wrapper
+
+    @contextmanager
+    def installed(self) -> Iterator['MemoryMonitor']:
+        """启动tracemalloc并包装各阶段函数，退出时恢复并记录最终快照"""
+        tracemalloc.start(self.frames)
+        gc.collect()
+        self._baseline = tracemalloc.take_snapshot()
+        originals = []
+        for owner, attribute, stage, _ in PROFILE_TARGETS:
+            func = getattr(owner, attribute)
+            originals.append((owner, attribute, func))
+            setattr(owner, attribute, self._wrap_stage(stage, func))
+        # 流水线中每个文档结束时写入构建清单；分阶段处理时每个文档填写一次
+        done_hooks = ((StudentWorkflow, 'record'), (EvaluationFiller, '_process_single_file'))
+        for owner, attribute in done_hooks:
+            func = getattr(owner, attribute)
+            originals.append((owner, attribute, func))
+            setattr(owner, attribute, self._wrap_done(func))
+        try:
+            yield self
+        finally:
+            for owner, attribute, func in reversed(originals):
+                setattr(owner, attribute, func)
+            gc.collect()
+            self._final = tracemalloc.take_snapshot()
+            self.traced_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    def leak_check(self) -> Dict:
+        """
+        检查仍被占用的内存是否随文档数线性增长（跳过前1/4的预热样本）
+
+        Returns:
+            Dict: {'samples', 'bytes_per_document', 'r2', 'leak'}
+        """
+        samples = self.samples[len(self.samples) // 4:]
+        slope, r2 = linear_fit([(documents, traced) for documents, traced, _ in samples])
+        enough = len(samples) >= MIN_SAMPLES
+        return {
+            'samples': len(samples),
+            'bytes_per_document': round(slope, 1),
+            'r2': round(r2, 4),
+            'enough_samples': enough,
+            'leak': enough and slope > self.leak_threshold and r2 >= LEAK_MIN_R2,
+        }
+
+    def top_allocations(self) -> List[Dict]:
+        """与开始时相比增长最多的分配位置"""
+        if self._baseline is None or self._final is None:
+            return []
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__),
+                   tracemalloc.Filter(False, '<frozen importlib._bootstrap*>')]
+        final = self._final.filter_traces(filters)
+        baseline = self._baseline.filter_traces(filters)
+        result = []
+        for stat in final.compare_to(baseline, 'lineno')[:self.top_n]:
+            frame = stat.traceback[0]
+            result.append({
+                'site': f"{frame.filename}:{frame.lineno}",
+                'size_diff': stat.size_diff,
+                'size': stat.size,
+                'count_diff': stat.count_diff,
+            })
+        return result
+
+    def report(self) -> Dict:
+        """汇总内存统计"""
+        stages = {}
+        for stage, stats in self.stages.items():
+            stages[stage] = dict(stats, retained_per_call=stats['retained_bytes'] / stats['calls'])
+        return {
+            'documents': self.documents,
+            'peak_rss_bytes': peak_rss(),
+            'traced_peak_bytes': self.traced_peak,
+            'stages': stages,
+            'leak_check': self.leak_check(),
+            'top_allocations': self.top_allocations(),
+            'samples': [{'documents': documents, 'traced_bytes': traced, 'rss_bytes': rss}
+                        for documents, traced, rss in self.samples],
+        }
+
+    def write_report(self, output_dir: str) -> Tuple[str, Dict]:
+        """
+        保存内存报告 memory_report.json
+
+        Returns:
+            Tuple[str, Dict]: (报告路径, 报告内容)
+        """
+        report = self.report()
+        os.makedirs(output_dir, exist_ok=True)
+        path = os.path.join(output_dir, 'memory_report.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        return path, report
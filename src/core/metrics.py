@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+"""
+运行指标模块
+线程安全的计数器、仪表和耗时直方图，按阶段、转换后端和班级分标签统计；
+运行结束后输出JSON摘要和Prometheus文本文件（供node_exporter的textfile收集器读取）
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .file_modes import write_atomic
+
+
+# 指标名前缀
+METRIC_PREFIX = 'student_eval'
+
+# 耗时直方图的桶上限（秒），覆盖从内存读取到WPS转换的耗时范围
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# 已知指标的说明（Prometheus的 HELP 行）
+METRIC_HELP = {
+    'documents_total': '处理完成的文档数（status: done/skipped/failed）',
+    'stage_failures_total': '各阶段失败的文档数',
+    'stage_seconds': '单个文档在各阶段的耗时（秒）',
+    'convert_seconds': '单个文档PDF转换耗时（秒），按转换后端区分',
+    'document_seconds': '单个文档流经全部阶段的总耗时（秒）',
+    'class_stage_seconds': '分阶段处理时每个班级各阶段的总耗时（秒）',
+    'run_duration_seconds': '本次运行的总耗时（秒）',
+    'run_documents_per_second': '本次运行的平均吞吐量（文档/秒）',
+    'store_peak_memory_bytes': '文档存储的内存占用峰值（字节）',
+    'store_spills_total': '文档存储溢出到临时目录的次数',
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Optional[Dict[str, object]]) -> LabelKey:
+    """将标签字典转换为可哈希的有序元组"""
+    if not labels:
+        return ()
+    return tuple(sorted((str(name), str(value)) for name, value in labels.items()))
+
+
+def _escape_label(value: str) -> str:
+    """转义Prometheus标签值中的反斜杠、双引号和换行"""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape_label(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def format_duration(seconds: float) -> str:
+    """将秒数格式化为 时:分:秒 或 分:秒"""
+    seconds = max(0, int(round(seconds)))
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
+
+
+class Histogram:
+    """固定桶直方图"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        # 每个桶（不累积）的计数，最后一个为 +Inf
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def observe(self, value: float):
+        """记录一个观测值"""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """返回累积计数 [(桶上限, 小于等于该上限的观测数), ...]，最后一项为 +Inf"""
+        result = []
+        running = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            running += count
+            result.append((bound, running))
+        return result
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        按桶线性插值估计分位数
+
+        Args:
+            q: 分位（0~1）
+
+        Returns:
+            Optional[float]: 估计值，没有观测值时返回None
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        lower = 0.0
+        previous = 0
+        for bound, running in self.cumulative():
+            if running >= rank:
+                upper = bound if bound != float('inf') else self.max
+                in_bucket = running - previous
+                fraction = (rank - previous) / in_bucket if in_bucket else 0.0
+                estimate = lower + (upper - lower) * fraction
+                return min(max(estimate, self.min), self.max)
+            lower = bound
+            previous = running
+        return self.max
+
+    def to_dict(self) -> Dict:
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'min': self.min,
+            'max': self.max,
+            'mean': self.sum / self.count if self.count else None,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'buckets': {_format_value(bound): running for bound, running in self.cumulative()},
+        }
+
+
+class MetricsRegistry:
+    """
+    指标注册表
+
+    计数器、仪表和直方图都按 (指标名, 标签) 区分；同一个注册表可以被多个工作线程同时写入
+    """
+
+    def __init__(self, prefix: str = METRIC_PREFIX, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        """
+        初始化注册表
+
+        Args:
+            prefix: 输出到Prometheus时的指标名前缀
+            buckets: 直方图的桶上限（秒）
+        """
+        self.prefix = prefix
+        self.buckets = buckets
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, labels: Optional[Dict[str, object]] = None, value: float = 1):
+        """计数器加 value"""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, labels: Optional[Dict[str, object]] = None):
+        """设置仪表的值"""
+        with self._lock:
+            self._gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, object]] = None):
+        """向直方图记录一个观测值（秒）"""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = Histogram(self.buckets)
+            series[key].observe(value)
+
+    @contextmanager
+    def time(self, name: str, labels: Optional[Dict[str, object]] = None) -> Iterator[None]:
+        """计时上下文：退出时把耗时记录到直方图"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, labels)
+
+    def counter_value(self, name: str, labels: Optional[Dict[str, object]] = None) -> float:
+        """读取计数器的值；labels为None时返回所有标签的合计"""
+        with self._lock:
+            series = self._counters.get(name, {})
+            if labels is None:
+                return sum(series.values())
+            return series.get(_label_key(labels), 0)
+
+    @property
+    def elapsed(self) -> float:
+        """注册表创建以来经过的时间（秒）"""
+        return time.perf_counter() - self._start
+
+    def snapshot(self) -> Dict:
+        """
+        导出全部指标
+
+        Returns:
+            Dict: {'counters': ..., 'gauges': ..., 'histograms': ...}，
+                每个指标是 [{'labels': {...}, 'value' 或直方图字段}, ...]
+        """
+        def rows(series, convert):
+            return [dict({'labels': dict(key)}, **convert(value))
+                    for key, value in sorted(series.items())]
+
+        with self._lock:
+            return {
+                'started_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started_at)),
+                'elapsed_seconds': round(self.elapsed, 3),
+                'counters': {name: rows(series, lambda v: {'value': v})
+                             for name, series in sorted(self._counters.items())},
+                'gauges': {name: rows(series, lambda v: {'value': v})
+                           for name, series in sorted(self._gauges.items())},
+                'histograms': {name: rows(series, Histogram.to_dict)
+                               for name, series in sorted(self._histograms.items())},
+            }
+
+    def to_prometheus(self) -> str:
+        """按Prometheus文本格式导出全部指标"""
+        lines = []
+
+        def header(name: str, kind: str):
+            full = f"{self.prefix}_{name}"
+            if name in METRIC_HELP:
+                lines.append(f"# HELP {full} {METRIC_HELP[name]}")
+            lines.append(f"# TYPE {full} {kind}")
+            return full
+
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                full = header(name, 'counter')
+                for key, value in sorted(series.items()):
+                    lines.append(f"{full}{_format_labels(key)} {_format_value(value)}")
+            for name, series in sorted(self._gauges.items()):
+                full = header(name, 'gauge')
+                for key, value in sorted(series.items()):
+                    lines.append(f"{full}{_format_labels(key)} {_format_value(value)}")
+            for name, series in sorted(self._histograms.items()):
+                full = header(name, 'histogram')
+                for key, histogram in sorted(series.items()):
+                    for bound, running in histogram.cumulative():
+                        lines.append(f"{full}_bucket{_format_labels(key, ('le', _format_value(bound)))} "
+                                     f"{running}")
+                    lines.append(f"{full}_sum{_format_labels(key)} {_format_value(histogram.sum)}")
+                    lines.append(f"{full}_count{_format_labels(key)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    def write_summary(self, output_dir: str, basename: str = 'metrics') -> Tuple[str, str]:
+        """
+        写入JSON摘要和Prometheus文本文件（先写临时文件再替换，收集器不会读到写了一半的文件）
+
+        Args:
+            output_dir: 输出目录
+            basename: 文件名（不含扩展名）
+
+        Returns:
+            Tuple[str, str]: (JSON文件路径, .prom文件路径)
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        json_path = os.path.join(output_dir, basename + '.json')
+        prom_path = os.path.join(output_dir, basename + '.prom')
+        contents = (
+            (json_path, json.dumps(self.snapshot(), ensure_ascii=False, indent=2)),
+            (prom_path, self.to_prometheus()),
+        )
+        for path, text in contents:
+            # node_exporter 的 textfile collector 通常以其他用户运行，文件需要可读
+            write_atomic(path, text)
+        return json_path, prom_path
+
+
+class ProgressMeter:
+    """进度估计：根据已完成数量和耗时计算吞吐量（文件/秒）和预计剩余时间"""
+
+    def __init__(self, total: int):
+        """
+        初始化进度估计
+
+        Args:
+            total: 文件总数
+        """
+        self.total = total
+        self.done = 0
+        self._start = time.perf_counter()
+
+    def update(self, count: int = 1):
+        """记录完成的文件数"""
+        self.done += count
+
+    @property
+    def rate(self) -> float:
+        """平均吞吐量（文件/秒）"""
+        elapsed = time.perf_counter() - self._start
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        """预计剩余时间（秒），尚无法估计时返回None"""
+        rate = self.rate
+        if not rate:
+            return None
+        return (self.total - self.done) / rate
+
+    def format(self) -> str:
+        """格式化为进度说明，如 '12.5 个/秒, 剩余约 0:42'"""
+        eta = self.eta
+        if eta is None:
+            return f"{self.rate:.1f} 个/秒"
+        return f"{self.rate:.1f} 个/秒, 剩余约 {format_duration(eta)}"
@@ -0,0 +1,762 @@
+# -*- coding: utf-8 -*-
+"""
+原生PDF渲染模块
+针对固定版式的学年鉴定表，直接将docx的表格布局绘制为PDF，不依赖WPS或LibreOffice
+"""
+
+import io
+import struct
+import zipfile
+import zlib
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional, Tuple, Union
+
+from .event_log import get_logger
+from .file_modes import write_atomic
+
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+R_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+A_NS = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+WP_NS = 'http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing'
+PKG_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+
+# 单位换算
+TWIPS_PER_POINT = 20
+EMU_PER_POINT = 12700
+
+# 默认字号 10.5pt（五号）
+DEFAULT_FONT_SIZE = 10.5
+# 单元格左右内边距（pt）
+CELL_PADDING = 2.0
+# 行距倍数
+LINE_HEIGHT_RATIO = 1.3
+# 字体上升高度占字号的比例（STSong-Light）
+FONT_ASCENT = 0.88
+
+
+def _w(tag: str) -> str:
+    """返回WordprocessingML命名空间下的完整标签名"""
+    return '{%s}%s' % (W_NS, tag)
+
+
+def _char_width(char: str, size: float) -> float:
+    """估算字符宽度：ASCII字符按半角计算，其余按全角计算"""
+    return size * 0.5 if ord(char) < 0x2E80 else size
+
+
+def _text_width(text: str, size: float) -> float:
+    """估算文本宽度"""
+    return sum(_char_width(c, size) for c in text)
+
+
+class LayoutCompiler:
+    """版式编译器，将docx文档编译为按页排列的绘制指令"""
+
+    def __init__(self):
+        self._media: Dict[str, bytes] = {}
+        self._relationships: Dict[str, str] = {}
+
+    def compile(self, docx_source: Union[str, bytes]) -> Dict:
+        """
+        编译文档布局
+
+        Args:
+            docx_source: docx文件路径或文件内容
+
+        Returns:
+            Dict: 包含页面尺寸、图片资源和每页绘制指令的布局
+        """
+        if isinstance(docx_source, bytes):
+            docx_source = io.BytesIO(docx_source)
+
+        with zipfile.ZipFile(docx_source) as package:
+            document = ET.fromstring(package.read('word/document.xml'))
+            self._relationships = self._read_relationships(package)
+            self._media = {}
+            for target in self._relationships.values():
+                name = 'word/' + target.lstrip('/')
+                if target.startswith('media/') and name in package.namelist():
+                    self._media[target] = package.read(name)
+
+        body = document.find(_w('body'))
+        if body is None:
+            raise Exception("文档缺少正文内容")
+
+        self._read_section(body.find(_w('sectPr')))
+        self.pages: List[List[Tuple]] = [[]]
+        self.cursor_y = self.margin_top
+
+        for element in body:
+            if element.tag == _w('p'):
+                self._layout_paragraph(element)
+            elif element.tag == _w('tbl'):
+                self._layout_table(element)
+
+        # 去掉末尾的空白页
+        while len(self.pages) > 1 and not self.pages[-1]:
+            self.pages.pop()
+
+        return {
+            'page_width': self.page_width,
+            'page_height': self.page_height,
+            'pages': self.pages,
+            'images': dict(self._media)
+        }
+
+    def _read_relationships(self, package: zipfile.ZipFile) -> Dict[str, str]:
+        """读取文档关系，获取图片资源的路径"""
+        try:
+            rels = ET.fromstring(package.read('word/_rels/document.xml.rels'))
+        except KeyError:
+            return {}
+        return {
+            rel.get('Id'): rel.get('Target', '')
+            for rel in rels.iter('{%s}Relationship' % PKG_REL_NS)
+        }
+
+    def _read_section(self, sect_pr):
+        """读取页面尺寸和页边距"""
+        # 默认A4，上下2.54cm，左右3.17cm
+        self.page_width = 11906 / TWIPS_PER_POINT
+        self.page_height = 16838 / TWIPS_PER_POINT
+        self.margin_top = self.margin_bottom = 1440 / TWIPS_PER_POINT
+        self.margin_left = self.margin_right = 1800 / TWIPS_PER_POINT
+
+        if sect_pr is None:
+            return
+        pg_size = sect_pr.find(_w('pgSz'))
+        if pg_size is not None:
+            self.page_width = int(pg_size.get(_w('w'), 11906)) / TWIPS_PER_POINT
+            self.page_height = int(pg_size.get(_w('h'), 16838)) / TWIPS_PER_POINT
+        pg_mar = sect_pr.find(_w('pgMar'))
+        if pg_mar is not None:
+            self.margin_top = int(pg_mar.get(_w('top'), 1440)) / TWIPS_PER_POINT
+            self.margin_bottom = int(pg_mar.get(_w('bottom'), 1440)) / TWIPS_PER_POINT
+            self.margin_left = int(pg_mar.get(_w('left'), 1800)) / TWIPS_PER_POINT
+            self.margin_right = int(pg_mar.get(_w('right'), 1800)) / TWIPS_PER_POINT
+
+    @property
+    def content_width(self) -> float:
+        return self.page_width - self.margin_left - self.margin_right
+
+    @property
+    def content_bottom(self) -> float:
+        return self.page_height - self.margin_bottom
+
+    def _new_page(self):
+        """开始新的一页"""
+        self.pages.append([])
+        self.cursor_y = self.margin_top
+
+    # ------------------------------------------------------------------
+    # 段落
+    # ------------------------------------------------------------------
+
+    def _paragraph_lines(self, paragraph, width: float) -> Tuple[List[Tuple], str, bool]:
+        """
+        将段落拆分为行
+
+        Returns:
+            Tuple: (行列表, 对齐方式, 是否包含分页符)
+                行为 ('text', 文本, 字号, 行高) 或 ('image', 媒体路径, 宽, 高)
+        """
+        p_pr = paragraph.find(_w('pPr'))
+        align = 'left'
+        min_line_height = 0.0
+        default_size = DEFAULT_FONT_SIZE
+        page_break = False
+
+        if p_pr is not None:
+            jc = p_pr.find(_w('jc'))
+            if jc is not None:
+                align = jc.get(_w('val'), 'left')
+            spacing = p_pr.find(_w('spacing'))
+            if spacing is not None and spacing.get(_w('line')) and \
+                    spacing.get(_w('lineRule')) in ('atLeast', 'exact'):
+                min_line_height = int(spacing.get(_w('line'))) / TWIPS_PER_POINT
+            default_size = self._run_font_size(p_pr, default_size)
+            if p_pr.find(_w('pageBreakBefore')) is not None:
+                page_break = True
+
+        lines: List[Tuple] = []
+        current = ''
+        current_size = default_size
+        current_width = 0.0
+
+        def flush():
+            nonlocal current, current_width
+            line_height = max(current_size * LINE_HEIGHT_RATIO, min_line_height)
+            lines.append(('text', current, current_size, line_height))
+            current = ''
+            current_width = 0.0
+
+        for run in paragraph.iter(_w('r')):
+            size = self._run_font_size(run.find(_w('rPr')), default_size)
+            for child in run:
+                if child.tag == _w('t'):
+                    current_size = max(current_size, size) if current else size
+                    for char in child.text or '':
+                        char_width = _char_width(char, size)
+                        if current and current_width + char_width > width:
+                            flush()
+                            current_size = size
+                        current += char
+                        current_width += char_width
+                elif child.tag == _w('tab'):
+                    current += '  '
+                    current_width += size
+                elif child.tag == _w('br'):
+                    if child.get(_w('type')) == 'page':
+                        page_break = True
+                    else:
+                        flush()
+                elif child.tag == _w('drawing'):
+                    image = self._drawing_image(child)
+                    if image:
+                        if current:
+                            flush()
+                        lines.append(image)
+
+        if current or not lines:
+            flush()
+
+        return lines, align, page_break
+
+    def _run_font_size(self, r_pr, default: float) -> float:
+        """读取字号（半磅）"""
+        if r_pr is None:
+            return default
+        if r_pr.tag == _w('pPr'):
+            r_pr = r_pr.find(_w('rPr'))
+            if r_pr is None:
+                return default
+        sz = r_pr.find(_w('sz'))
+        if sz is None:
+            return default
+        try:
+            return int(sz.get(_w('val'))) / 2
+        except (TypeError, ValueError):
+            return default
+
+    def _drawing_image(self, drawing) -> Optional[Tuple]:
+        """读取内嵌图片的尺寸和媒体路径"""
+        extent = drawing.find('.//{%s}extent' % WP_NS)
+        blip = drawing.find('.//{%s}blip' % A_NS)
+        if extent is None or blip is None:
+            return None
+        target = self._relationships.get(blip.get('{%s}embed' % R_NS))
+        if target not in self._media:
+            return None
+        width = int(extent.get('cx', 0)) / EMU_PER_POINT
+        height = int(extent.get('cy', 0)) / EMU_PER_POINT
+        return ('image', target, width, height)
+
+    def _lines_height(self, lines: List[Tuple]) -> float:
+        """计算多行内容的总高度"""
+        return sum(line[3] for line in lines)
+
+    def _draw_lines(self, page: List[Tuple], lines: List[Tuple], align: str,
+                    x: float, y: float, width: float):
+        """在指定区域内绘制已拆分的行"""
+        for line in lines:
+            if line[0] == 'image':
+                _, target, image_width, image_height = line
+                offset = self._align_offset(align, width, image_width)
+                page.append(('image', x + offset, y, image_width, image_height, target))
+                y += image_height
+            else:
+                _, text, size, line_height = line
+                if text.strip():
+                    offset = self._align_offset(align, width, _text_width(text, size))
+                    baseline = y + (line_height - size) / 2 + size * FONT_ASCENT
+                    page.append(('text', x + offset, baseline, size, text))
+                y += line_height
+        return y
+
+    def _align_offset(self, align: str, available: float, used: float) -> float:
+        """根据对齐方式计算水平偏移"""
+        if align == 'center':
+            return max((available - used) / 2, 0)
+        if align in ('right', 'end'):
+            return max(available - used, 0)
+        return 0.0
+
+    def _layout_paragraph(self, paragraph):
+        """排版正文段落"""
+        lines, align, page_break = self._paragraph_lines(paragraph, self.content_width)
+        has_content = any(line[0] == 'image' or line[1].strip() for line in lines)
+
+        if has_content:
+            height = self._lines_height(lines)
+            if self.cursor_y + height > self.content_bottom and self.pages[-1]:
+                self._new_page()
+            self.cursor_y = self._draw_lines(
+                self.pages[-1], lines, align, self.margin_left, self.cursor_y, self.content_width
+            )
+        elif not page_break:
+            self.cursor_y += lines[0][3]
+
+        if page_break:
+            self._new_page()
+
+    # ------------------------------------------------------------------
+    # 表格
+    # ------------------------------------------------------------------
+
+    def _layout_table(self, table):
+        """排版表格：计算网格、行高、合并单元格并逐行绘制"""
+        grid = [int(col.get(_w('w'), 0)) / TWIPS_PER_POINT
+                for col in table.iter(_w('gridCol'))]
+        if not grid:
+            return
+
+        # 表格超出版心时等比缩放
+        table_width = sum(grid)
+        if table_width > self.content_width:
+            scale = self.content_width / table_width
+            grid = [w * scale for w in grid]
+            table_width = self.content_width
+
+        tbl_pr = table.find(_w('tblPr'))
+        table_x = self.margin_left
+        table_borders = self._read_borders(tbl_pr.find(_w('tblBorders')) if tbl_pr is not None else None)
+        if tbl_pr is not None:
+            jc = tbl_pr.find(_w('jc'))
+            if jc is not None and jc.get(_w('val')) == 'center':
+                table_x += (self.content_width - table_width) / 2
+
+        col_x = [table_x]
+        for width in grid:
+            col_x.append(col_x[-1] + width)
+
+        # 第一遍：解析单元格
+        rows = []
+        for tr in table.findall(_w('tr')):
+            tr_pr = tr.find(_w('trPr'))
+            min_height = 0.0
+            exact = False
+            col = 0
+            if tr_pr is not None:
+                tr_height = tr_pr.find(_w('trHeight'))
+                if tr_height is not None:
+                    min_height = int(tr_height.get(_w('val'), 0)) / TWIPS_PER_POINT
+                    exact = tr_height.get(_w('hRule')) == 'exact'
+                grid_before = tr_pr.find(_w('gridBefore'))
+                if grid_before is not None:
+                    col = int(grid_before.get(_w('val'), 0))
+
+            cells = []
+            for tc in tr.findall(_w('tc')):
+                tc_pr = tc.find(_w('tcPr'))
+                span = 1
+                v_merge = None
+                v_align = 'top'
+                borders = {}
+                if tc_pr is not None:
+                    grid_span = tc_pr.find(_w('gridSpan'))
+                    if grid_span is not None:
+                        span = int(grid_span.get(_w('val'), 1))
+                    merge = tc_pr.find(_w('vMerge'))
+                    if merge is not None:
+                        v_merge = merge.get(_w('val'), 'continue')
+                    valign = tc_pr.find(_w('vAlign'))
+                    if valign is not None:
+                        v_align = valign.get(_w('val'), 'top')
+                    borders = self._read_borders(tc_pr.find(_w('tcBorders')))
+
+                end = min(col + span, len(grid))
+                width = col_x[end] - col_x[col] - 2 * CELL_PADDING
+                paragraphs = []
+                if v_merge != 'continue':
+                    for p in tc.findall(_w('p')):
+                        lines, align, _ = self._paragraph_lines(p, max(width, 1.0))
+                        paragraphs.append((lines, align))
+
+                cells.append({
+                    'start': col,
+                    'end': end,
+                    'v_merge': v_merge,
+                    'v_align': v_align,
+                    'borders': borders,
+                    'paragraphs': paragraphs,
+                    'content_height': sum(self._lines_height(lines) for lines, _ in paragraphs)
+                })
+                col = end
+            rows.append({'min_height': min_height, 'exact': exact, 'cells': cells})
+
+        # 第二遍：计算行高（固定行高不随内容增长，纵向合并的单元格在最后一行补足高度）
+        heights = []
+        for row in rows:
+            if row['exact']:
+                heights.append(row['min_height'])
+                continue
+            needed = [c['content_height'] for c in row['cells'] if c['v_merge'] is None]
+            heights.append(max([row['min_height']] + needed))
+
+        for row_idx, row in enumerate(rows):
+            for cell in row['cells']:
+                if cell['v_merge'] != 'restart':
+                    continue
+                last = self._merge_end(rows, row_idx, cell['start'])
+                cell['row_span'] = last - row_idx + 1
+                total = sum(heights[row_idx:last + 1])
+                if cell['content_height'] > total and not rows[last]['exact']:
+                    heights[last] += cell['content_height'] - total
+
+        # 第三遍：逐行绘制，超出页面时换页
+        row_count = len(rows)
+        for row_idx, row in enumerate(rows):
+            row_height = heights[row_idx]
+            if self.cursor_y + row_height > self.content_bottom and self.pages[-1]:
+                self._new_page()
+            page = self.pages[-1]
+            top = self.cursor_y
+
+            for cell in row['cells']:
+                x1 = col_x[cell['start']]
+                x2 = col_x[cell['end']]
+                span_rows = cell.get('row_span', 1)
+                if cell['v_merge'] == 'continue':
+                    cell_height = row_height
+                else:
+                    cell_height = sum(heights[row_idx:row_idx + span_rows])
+
+                self._draw_cell_borders(
+                    page, cell, table_borders, x1, top, x2, top + row_height,
+                    is_first_row=row_idx == 0, is_last_row=row_idx == row_count - 1,
+                    is_first_col=cell['start'] == 0, is_last_col=cell['end'] >= len(grid)
+                )
+
+                if cell['paragraphs']:
+                    content_height = cell['content_height']
+                    y = top
+                    if cell['v_align'] == 'center':
+                        y += max((cell_height - content_height) / 2, 0)
+                    elif cell['v_align'] == 'bottom':
+                        y += max(cell_height - content_height, 0)
+                    for lines, align in cell['paragraphs']:
+                        y = self._draw_lines(
+                            page, lines, align, x1 + CELL_PADDING, y,
+                            x2 - x1 - 2 * CELL_PADDING
+                        )
+
+            self.cursor_y += row_height
+
+    def _merge_end(self, rows: List[Dict], row_idx: int, start_col: int) -> int:
+        """查找纵向合并单元格的最后一行"""
+        last = row_idx
+        for next_idx in range(row_idx + 1, len(rows)):
+            match = [c for c in rows[next_idx]['cells'] if c['start'] == start_col]
+            if match and match[0]['v_merge'] == 'continue':
+                last = next_idx
+            else:
+                break
+        return last
+
+    def _read_borders(self, borders_element) -> Dict[str, bool]:
+        """读取边框设置，返回各边是否绘制"""
+        borders = {}
+        if borders_element is None:
+            return borders
+        for side in ('top', 'left', 'bottom', 'right', 'insideH', 'insideV'):
+            element = borders_element.find(_w(side))
+            if element is not None:
+                borders[side] = element.get(_w('val')) not in ('nil', 'none')
+        return borders
+
+    def _draw_cell_borders(self, page: List[Tuple], cell: Dict, table_borders: Dict[str, bool],
+                           x1: float, y1: float, x2: float, y2: float,
+                           is_first_row: bool, is_last_row: bool,
+                           is_first_col: bool, is_last_col: bool):
+        """绘制单元格边框，纵向合并区域内部不绘制横线"""
+        def visible(side: str, is_edge: bool) -> bool:
+            if side in cell['borders']:
+                return cell['borders'][side]
+            inside = 'insideH' if side in ('top', 'bottom') else 'insideV'
+            return table_borders.get(side if is_edge else inside, False)
+
+        draw_top = cell['v_merge'] != 'continue'
+        draw_bottom = cell['v_merge'] is None or is_last_row
+
+        if draw_top and visible('top', is_first_row):
+            page.append(('line', x1, y1, x2, y1))
+        if draw_bottom and visible('bottom', is_last_row):
+            page.append(('line', x1, y2, x2, y2))
+        if visible('left', is_first_col):
+            page.append(('line', x1, y1, x1, y2))
+        if visible('right', is_last_col):
+            page.append(('line', x2, y1, x2, y2))
+
+
+class PDFDocumentWriter:
+    """最小化的PDF写入器，使用Adobe-GB1预定义中文字体"""
+
+    FONT_NAME = 'STSong-Light'
+
+    def __init__(self):
+        self._objects: List[Optional[bytes]] = []
+
+    def _reserve(self) -> int:
+        """预留对象编号"""
+        self._objects.append(None)
+        return len(self._objects)
+
+    def _set(self, obj_id: int, body: bytes):
+        self._objects[obj_id - 1] = body
+
+    def _add(self, body: bytes) -> int:
+        obj_id = self._reserve()
+        self._set(obj_id, body)
+        return obj_id
+
+    def _add_stream(self, data: bytes, extra: bytes = b'') -> int:
+        compressed = zlib.compress(data)
+        header = b'<< /Length %d /Filter /FlateDecode %s>>' % (len(compressed), extra)
+        return self._add(header + b'\nstream\n' + compressed + b'\nendstream')
+
+    def _add_fonts(self) -> int:
+        """写入字体对象，返回Type0字体的对象编号"""
+        descriptor = self._add(
+            b'<< /Type /FontDescriptor /FontName /%s /Flags 6 '
+            b'/FontBBox [-25 -254 1000 880] /ItalicAngle 0 /Ascent 880 '
+            b'/Descent -120 /CapHeight 880 /StemV 93 >>' % self.FONT_NAME.encode()
+        )
+        cid_font = self._add(
+            b'<< /Type /Font /Subtype /CIDFontType0 /BaseFont /%s '
+            b'/CIDSystemInfo << /Registry (Adobe) /Ordering (GB1) /Supplement 2 >> '
+            b'/FontDescriptor %d 0 R /DW 1000 /W [1 95 500] >>'
+            % (self.FONT_NAME.encode(), descriptor)
+        )
+        return self._add(
+            b'<< /Type /Font /Subtype /Type0 /BaseFont /%s-UniGB-UCS2-H '
+            b'/Encoding /UniGB-UCS2-H /DescendantFonts [%d 0 R] >>'
+            % (self.FONT_NAME.encode(), cid_font)
+        )
+
+    def _add_image(self, target: str, data: bytes, source: str = '') -> Optional[int]:
+        """
+        将图片写入为图像对象，不支持的图片记录警告后跳过
+
+        Args:
+            target: 图片在文档中的媒体路径
+            data: 图片内容
+            source: 所属文档（用于警告信息）
+
+        Returns:
+            Optional[int]: 图像对象编号，跳过时为None
+        """
+        try:
+            if data[:8] == b'\x89PNG\r\n\x1a\n':
+                return self._add_png(data)
+            if data[:2] == b'\xff\xd8':
+                return self._add_jpeg(data)
+            raise ValueError("不是PNG或JPEG图片")
+        except (ValueError, struct.error) as e:
+            get_logger().warning(
+                f"原生渲染器跳过了不支持的图片 {target}（{str(e)}）{'：' + source if source else ''}，"
+                f"该图片不会出现在PDF中，需要时请改用WPS后端转换此文档",
+                event='native_image_skipped', file=source, image=target, reason=str(e)
+            )
+            return None
+
+    def _add_png(self, data: bytes) -> int:
+        """
+        将PNG图片写入为图像对象
+
+        支持非隔行的灰度、RGB和调色板图片（1/2/4/8位），IDAT数据可直接作为FlateDecode流使用；
+        隔行、带透明通道和16位图片需要重新解码，不支持时抛出 ValueError
+        """
+        width, height, bit_depth, color_type, _, _, interlace = struct.unpack('>IIBBBBB', data[16:29])
+        if interlace:
+            raise ValueError("隔行扫描PNG")
+        if color_type in (4, 6):
+            raise ValueError("带透明通道的PNG")
+        if color_type not in (0, 2, 3) or bit_depth not in (1, 2, 4, 8) or (color_type == 2 and bit_depth != 8):
+            raise ValueError(f"{bit_depth}位PNG（颜色类型 {color_type}）")
+
+        idat = []
+        palette = b''
+        pos = 8
+        while pos < len(data):
+            length, chunk_type = struct.unpack('>I4s', data[pos:pos + 8])
+            if chunk_type == b'IDAT':
+                idat.append(data[pos + 8:pos + 8 + length])
+            elif chunk_type == b'PLTE':
+                palette = data[pos + 8:pos + 8 + length]
+            pos += length + 12
+
+        colors = 3 if color_type == 2 else 1
+        if color_type == 3:
+            if not palette:
+                raise ValueError("调色板PNG缺少PLTE块")
+            color_space = b'[/Indexed /DeviceRGB %d <%s>]' % (len(palette) // 3 - 1, palette.hex().encode('ascii'))
+        else:
+            color_space = b'/DeviceRGB' if colors == 3 else b'/DeviceGray'
+        stream = b''.join(idat)
+        header = (
+            b'<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace %s '
+            b'/BitsPerComponent %d /Length %d /Filter /FlateDecode '
+            b'/DecodeParms << /Predictor 15 /Colors %d /BitsPerComponent %d /Columns %d >> >>'
+            % (width, height, color_space, bit_depth, len(stream), colors, bit_depth, width)
+        )
+        return self._add(header + b'\nstream\n' + stream + b'\nendstream')
+
+    def _add_jpeg(self, data: bytes) -> int:
+        """将JPEG图片原样写入为DCTDecode图像对象（灰度或RGB）"""
+        pos = 2
+        while pos + 4 <= len(data):
+            if data[pos] != 0xFF:
+                raise ValueError("JPEG数据损坏")
+            marker = data[pos + 1]
+            if marker == 0xFF:
+                pos += 1
+                continue
+            length = struct.unpack('>H', data[pos + 2:pos + 4])[0]
+            # SOF0-SOF15（不含DHT/JPG/DAC）记录图片尺寸和颜色分量数
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                bits, height, width, components = struct.unpack('>BHHB', data[pos + 4:pos + 10])
+                if bits != 8 or components not in (1, 3):
+                    raise ValueError(f"{bits}位、{components}个颜色分量的JPEG")
+                color_space = b'/DeviceRGB' if components == 3 else b'/DeviceGray'
+                header = (
+                    b'<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace %s '
+                    b'/BitsPerComponent 8 /Length %d /Filter /DCTDecode >>'
+                    % (width, height, color_space, len(data))
+                )
+                return self._add(header + b'\nstream\n' + data + b'\nendstream')
+            pos += 2 + length
+        raise ValueError("JPEG缺少尺寸信息")
+
+    def _encode_text(self, text: str) -> bytes:
+        """将文本编码为UCS-2十六进制字符串"""
+        encoded = ''.join(
+            '%04X' % (ord(c) if ord(c) <= 0xFFFF else 0x3F)
+            for c in text
+        )
+        return b'<' + encoded.encode('ascii') + b'>'
+
+    def _page_content(self, operations: List[Tuple], page_height: float,
+                      image_names: Dict[str, bytes]) -> bytes:
+        """生成页面内容流"""
+        out = [b'0.5 w 0 G']
+        for op in operations:
+            kind = op[0]
+            if kind == 'line':
+                _, x1, y1, x2, y2 = op
+                out.append(b'%.2f %.2f m %.2f %.2f l S' % (
+                    x1, page_height - y1, x2, page_height - y2))
+            elif kind == 'text':
+                _, x, baseline, size, text = op
+                out.append(b'BT /F1 %.2f Tf %.2f %.2f Td %s Tj ET' % (
+                    size, x, page_height - baseline, self._encode_text(text)))
+            elif kind == 'image':
+                _, x, y, width, height, target = op
+                name = image_names.get(target)
+                if name:
+                    out.append(b'q %.2f 0 0 %.2f %.2f %.2f cm /%s Do Q' % (
+                        width, height, x, page_height - y - height, name))
+        return b'\n'.join(out)
+
+    def build(self, layout: Dict, source: str = '') -> bytes:
+        """
+        根据布局生成PDF文件内容
+
+        Args:
+            layout: LayoutCompiler.compile 的返回值
+            source: 所属文档（用于警告信息）
+
+        Returns:
+            bytes: PDF文件内容
+        """
+        self._objects = []
+        catalog_id = self._reserve()
+        pages_id = self._reserve()
+        font_id = self._add_fonts()
+
+        # 图片资源只写入一次，供所有页面共享
+        image_ids: Dict[str, int] = {}
+        image_names: Dict[str, bytes] = {}
+        for index, (target, data) in enumerate(sorted(layout['images'].items()), 1):
+            image_id = self._add_image(target, data, source)
+            if image_id:
+                image_ids[target] = image_id
+                image_names[target] = b'Im%d' % index
+        xobjects = b' '.join(
+            b'/%s %d 0 R' % (image_names[target], image_ids[target]) for target in image_ids
+        )
+        resources = b'<< /Font << /F1 %d 0 R >> /XObject << %s >> >>' % (font_id, xobjects)
+
+        page_width = layout['page_width']
+        page_height = layout['page_height']
+        page_ids = []
+        for operations in layout['pages']:
+            content_id = self._add_stream(self._page_content(operations, page_height, image_names))
+            page_ids.append(self._add(
+                b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %.2f %.2f] '
+                b'/Resources %s /Contents %d 0 R >>'
+                % (pages_id, page_width, page_height, resources, content_id)
+            ))
+
+        self._set(pages_id, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (
+            b' '.join(b'%d 0 R' % page_id for page_id in page_ids), len(page_ids)))
+        self._set(catalog_id, b'<< /Type /Catalog /Pages %d 0 R >>' % pages_id)
+
+        buffer = io.BytesIO()
+        buffer.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        offsets = []
+        for obj_id, body in enumerate(self._objects, 1):
+            offsets.append(buffer.tell())
+            buffer.write(b'%d 0 obj\n' % obj_id + body + b'\nendobj\n')
+
+        xref_offset = buffer.tell()
+        buffer.write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(self._objects) + 1))
+        for offset in offsets:
+            buffer.write(b'%010d 00000 n \n' % offset)
+        buffer.write(
+            b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n'
+            % (len(self._objects) + 1, catalog_id, xref_offset)
+        )
+        return buffer.getvalue()
+
+
+class NativePDFRenderer:
+    """原生PDF渲染器，在进程内直接将学年鉴定表渲染为PDF"""
+
+    RENDERER_VERSION = '1.1'
+
+    def __init__(self):
+        self.compiler = LayoutCompiler()
+        self.writer = PDFDocumentWriter()
+
+    def render_bytes(self, docx_source: Union[str, bytes], source: Optional[str] = None) -> bytes:
+        """
+        渲染文档并返回PDF内容
+
+        Args:
+            docx_source: docx文件路径或文件内容
+            source: 文档名称（用于警告信息），默认为文件路径
+
+        Returns:
+            bytes: PDF文件内容
+        """
+        if source is None and isinstance(docx_source, str):
+            source = docx_source
+        layout = self.compiler.compile(docx_source)
+        return self.writer.build(layout, source or '')
+
+    def render(self, input_path: str, output_path: str, data: Optional[bytes] = None) -> bool:
+        """
+        渲染单个文件
+
+        Args:
+            input_path: 输入docx文件路径
+            output_path: 输出PDF文件路径
+            data: 已在内存中的docx内容，提供时不再读取输入文件
+
+        Returns:
+            bool: 是否渲染成功
+        """
+        pdf_bytes = self.render_bytes(data if data is not None else input_path, input_path)
+        write_atomic(output_path, pdf_bytes)
+        return True
@@ -0,0 +1,712 @@
+# -*- coding: utf-8 -*-
+"""
+PDF合并模块
+按名单顺序将班级内的单个PDF合并为一个文件，添加书签并去除重复的字体、图片资源。
+合并时逐个读取输入文件、逐个写出对象，内存占用只与单个输入文件大小有关
+"""
+
+import hashlib
+import os
+import re
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from .file_modes import commit_temp, create_temp, discard_temp
+
+
+WHITESPACE = b' \t\r\n\x0c\x00'
+DELIMITERS = b'()<>[]{}/%'
+# 页面从页面树继承的属性
+INHERITABLE_PAGE_KEYS = ('Resources', 'MediaBox', 'CropBox', 'Rotate')
+
+
+class PDFName(bytes):
+    """PDF名称对象（不含前导斜杠）"""
+
+
+class PDFRawString(bytes):
+    """PDF字符串对象，保留原始写法以便原样输出"""
+
+
+class PDFRef:
+    """间接对象引用"""
+
+    __slots__ = ('num', 'gen')
+
+    def __init__(self, num: int, gen: int = 0):
+        self.num = num
+        self.gen = gen
+
+    def __eq__(self, other):
+        return isinstance(other, PDFRef) and (self.num, self.gen) == (other.num, other.gen)
+
+    def __hash__(self):
+        return hash((self.num, self.gen))
+
+
+class PDFStream:
+    """流对象"""
+
+    __slots__ = ('dict', 'data')
+
+    def __init__(self, stream_dict: Dict, data: bytes):
+        self.dict = stream_dict
+        self.data = data
+
+
+class PDFParseError(Exception):
+    """PDF解析错误"""
+
+
+class PDFReader:
+    """轻量PDF读取器，支持传统交叉引用表、交叉引用流和对象流"""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self.data = f.read()
+        self.path = path
+        # 对象编号 -> ('offset', 偏移) 或 ('stream', 对象流编号, 序号)
+        self.xref: Dict[int, Tuple] = {}
+        self.trailer: Dict = {}
+        self._object_cache: Dict[int, object] = {}
+        self._objstm_cache: Dict[int, Dict[int, object]] = {}
+        self._read_xref()
+        if PDFName(b'Encrypt') in self.trailer:
+            raise PDFParseError(f"不支持加密的PDF: {path}")
+
+    # ------------------------------------------------------------------
+    # 词法与语法解析
+    # ------------------------------------------------------------------
+
+    def _skip_whitespace(self, pos: int) -> int:
+        data = self.data
+        length = len(data)
+        while pos < length:
+            char = data[pos]
+            if char in WHITESPACE:
+                pos += 1
+            elif char == 0x25:  # % 注释
+                while pos < length and data[pos] not in b'\r\n':
+                    pos += 1
+            else:
+                break
+        return pos
+
+    def _read_token(self, pos: int) -> Tuple[bytes, int]:
+        """读取一个普通词元（数字、关键字）"""
+        start = pos
+        data = self.data
+        while pos < len(data) and data[pos] not in WHITESPACE and data[pos] not in DELIMITERS:
+            pos += 1
+        return data[start:pos], pos
+
+    def parse_object(self, pos: int):
+        """
+        从指定位置解析一个PDF对象
+
+        Returns:
+            Tuple: (对象, 结束位置)
+        """
+        data = self.data
+        pos = self._skip_whitespace(pos)
+        char = data[pos:pos + 1]
+
+        if char == b'/':
+            token, end = self._read_token(pos + 1)
+            return PDFName(self._decode_name(token)), end
+        if char == b'<':
+            if data[pos + 1:pos + 2] == b'<':
+                return self._parse_dict(pos + 2)
+            end = data.index(b'>', pos) + 1
+            return PDFRawString(data[pos:end]), end
+        if char == b'(':
+            return self._parse_literal_string(pos)
+        if char == b'[':
+            items = []
+            pos += 1
+            while True:
+                pos = self._skip_whitespace(pos)
+                if data[pos:pos + 1] == b']':
+                    return items, pos + 1
+                item, pos = self.parse_object(pos)
+                items.append(item)
+
+        token, end = self._read_token(pos)
+        if not token:
+            raise PDFParseError(f"无法解析的PDF内容，位置 {pos}")
+        if token == b'true':
+            return True, end
+        if token == b'false':
+            return False, end
+        if token == b'null':
+            return None, end
+        if re.match(rb'^[+-]?\d+$', token):
+            # 可能是间接引用 "num gen R"
+            match = re.match(rb'\s+(\d+)\s+R(?=[\s/<>\[\]()%]|$)', data[end:end + 32])
+            if match:
+                return PDFRef(int(token), int(match.group(1))), end + match.end()
+            return int(token), end
+        try:
+            return float(token), end
+        except ValueError:
+            return token, end
+
+    def _decode_name(self, token: bytes) -> bytes:
+        """处理名称中的 #xx 转义"""
+        if b'#' not in token:
+            return token
+        return re.sub(rb'#([0-9A-Fa-f]{2})', lambda m: bytes([int(m.group(1), 16)]), token)
+
+    def _parse_literal_string(self, pos: int):
+        data = self.data
+        depth = 0
+        end = pos
+        while end < len(data):
+            char = data[end]
+            if char == 0x5C:  # 反斜杠转义
+                end += 2
+                continue
+            if char == 0x28:
+                depth += 1
+            elif char == 0x29:
+                depth -= 1
+                if depth == 0:
+                    end += 1
+                    break
+            end += 1
+        return PDFRawString(data[pos:end]), end
+
+    def _parse_dict(self, pos: int):
+        data = self.data
+        result: Dict = {}
+        while True:
+            pos = self._skip_whitespace(pos)
+            if data[pos:pos + 2] == b'>>':
+                pos += 2
+                break
+            key, pos = self.parse_object(pos)
+            value, pos = self.parse_object(pos)
+            result[key] = value
+
+        # 字典后紧跟stream关键字时读取流数据
+        after = self._skip_whitespace(pos)
+        if data[after:after + 6] == b'stream':
+            start = after + 6
+            if data[start:start + 2] == b'\r\n':
+                start += 2
+            elif data[start:start + 1] in (b'\n', b'\r'):
+                start += 1
+            length = self.resolve(result.get(PDFName(b'Length')))
+            if not isinstance(length, int) or data[start + length:start + length + 20].find(b'endstream') < 0:
+                length = data.index(b'endstream', start) - start
+                # 去掉endstream前的换行
+                while length > 0 and data[start + length - 1] in b'\r\n':
+                    length -= 1
+            end = data.index(b'endstream', start + length) + 9
+            return PDFStream(result, data[start:start + length]), end
+        return result, pos
+
+    # ------------------------------------------------------------------
+    # 交叉引用
+    # ------------------------------------------------------------------
+
+    def _read_xref(self):
+        """读取交叉引用信息（包括增量更新）"""
+        start = self.data.rfind(b'startxref')
+        if start < 0:
+            raise PDFParseError(f"找不到startxref: {self.path}")
+        offset, _ = self.parse_object(start + 9)
+        visited = set()
+
+        while isinstance(offset, int) and offset not in visited:
+            visited.add(offset)
+            pos = self._skip_whitespace(offset)
+            if self.data[pos:pos + 4] == b'xref':
+                trailer = self._read_xref_table(pos + 4)
+                hybrid = trailer.get(PDFName(b'XRefStm'))
+                if isinstance(hybrid, int):
+                    self._read_xref_stream(hybrid)
+            else:
+                trailer = self._read_xref_stream(pos)
+
+            for key, value in trailer.items():
+                self.trailer.setdefault(key, value)
+            offset = trailer.get(PDFName(b'Prev'))
+
+    def _read_xref_table(self, pos: int) -> Dict:
+        data = self.data
+        while True:
+            pos = self._skip_whitespace(pos)
+            if data[pos:pos + 7] == b'trailer':
+                trailer, _ = self.parse_object(pos + 7)
+                return trailer
+            first, pos = self.parse_object(pos)
+            count, pos = self.parse_object(pos)
+            for index in range(count):
+                pos = self._skip_whitespace(pos)
+                match = re.match(rb'(\d{10}) (\d{5}) ([nf])', data[pos:pos + 18])
+                if not match:
+                    raise PDFParseError(f"交叉引用表格式错误: {self.path}")
+                obj_num = first + index
+                if match.group(3) == b'n' and obj_num not in self.xref:
+                    self.xref[obj_num] = ('offset', int(match.group(1)))
+                pos += 18
+
+    def _read_xref_stream(self, pos: int) -> Dict:
+        _, pos = self.parse_object(pos)  # 对象编号
+        _, pos = self.parse_object(pos)  # 代数
+        pos = self._skip_whitespace(pos)
+        if self.data[pos:pos + 3] != b'obj':
+            raise PDFParseError(f"交叉引用流格式错误: {self.path}")
+        stream, _ = self.parse_object(pos + 3)
+        if not isinstance(stream, PDFStream):
+            raise PDFParseError(f"交叉引用流格式错误: {self.path}")
+
+        widths = stream.dict[PDFName(b'W')]
+        size = stream.dict[PDFName(b'Size')]
+        index = stream.dict.get(PDFName(b'Index'), [0, size])
+        raw = self.decode_stream(stream)
+
+        offset = 0
+        for section in range(0, len(index), 2):
+            first, count = index[section], index[section + 1]
+            for obj_num in range(first, first + count):
+                fields = []
+                for width in widths:
+                    value = int.from_bytes(raw[offset:offset + width], 'big') if width else None
+                    fields.append(value)
+                    offset += width
+                entry_type = 1 if fields[0] is None else fields[0]
+                if obj_num in self.xref:
+                    continue
+                if entry_type == 1:
+                    self.xref[obj_num] = ('offset', fields[1])
+                elif entry_type == 2:
+                    self.xref[obj_num] = ('stream', fields[1], fields[2])
+        return stream.dict
+
+    # ------------------------------------------------------------------
+    # 对象访问
+    # ------------------------------------------------------------------
+
+    def decode_stream(self, stream: PDFStream) -> bytes:
+        """解码流数据（支持FlateDecode及PNG预测器）"""
+        filters = stream.dict.get(PDFName(b'Filter'))
+        params = self.resolve(stream.dict.get(PDFName(b'DecodeParms'))) or {}
+        if isinstance(filters, list):
+            if len(filters) > 1:
+                raise PDFParseError("不支持多重过滤器")
+            filters = filters[0] if filters else None
+            params = params[0] if isinstance(params, list) and params else params
+        if filters is None:
+            return stream.data
+        if filters != b'FlateDecode':
+            raise PDFParseError(f"不支持的过滤器: {filters.decode('latin-1')}")
+
+        data = zlib.decompress(stream.data)
+        predictor = params.get(PDFName(b'Predictor'), 1) if isinstance(params, dict) else 1
+        if predictor >= 10:
+            columns = params.get(PDFName(b'Columns'), 1)
+            data = self._undo_png_predictor(data, columns)
+        return data
+
+    def _undo_png_predictor(self, data: bytes, columns: int) -> bytes:
+        """还原PNG预测器（交叉引用流中每个像素为1字节）"""
+        row_size = columns + 1
+        previous = bytearray(columns)
+        output = bytearray()
+        for start in range(0, len(data), row_size):
+            filter_type = data[start]
+            row = bytearray(data[start + 1:start + row_size])
+            for i in range(len(row)):
+                left = row[i - 1] if i > 0 else 0
+                up = previous[i]
+                up_left = previous[i - 1] if i > 0 else 0
+                if filter_type == 1:
+                    row[i] = (row[i] + left) & 0xFF
+                elif filter_type == 2:
+                    row[i] = (row[i] + up) & 0xFF
+                elif filter_type == 3:
+                    row[i] = (row[i] + (left + up) // 2) & 0xFF
+                elif filter_type == 4:
+                    p = left + up - up_left
+                    pa, pb, pc = abs(p - left), abs(p - up), abs(p - up_left)
+                    pred = left if pa <= pb and pa <= pc else (up if pb <= pc else up_left)
+                    row[i] = (row[i] + pred) & 0xFF
+            output.extend(row)
+            previous = row
+        return bytes(output)
+
+    def get_object(self, obj_num: int):
+        """按对象编号读取对象"""
+        if obj_num in self._object_cache:
+            return self._object_cache[obj_num]
+
+        entry = self.xref.get(obj_num)
+        if entry is None:
+            return None
+        if entry[0] == 'offset':
+            _, pos = self.parse_object(entry[1])  # 对象编号
+            _, pos = self.parse_object(pos)       # 代数
+            pos = self._skip_whitespace(pos)
+            value, _ = self.parse_object(pos + 3)  # 跳过 obj
+        else:
+            value = self._read_from_object_stream(entry[1], obj_num)
+
+        self._object_cache[obj_num] = value
+        return value
+
+    def _read_from_object_stream(self, stream_num: int, obj_num: int):
+        if stream_num not in self._objstm_cache:
+            stream = self.get_object(stream_num)
+            content = self.decode_stream(stream)
+            count = stream.dict[PDFName(b'N')]
+            first = stream.dict[PDFName(b'First')]
+            header = content[:first].split()
+            sub_reader = _BufferReader(content)
+            objects = {}
+            for i in range(count):
+                num = int(header[2 * i])
+                offset = int(header[2 * i + 1])
+                objects[num], _ = sub_reader.parse_object(first + offset)
+            self._objstm_cache[stream_num] = objects
+        return self._objstm_cache[stream_num].get(obj_num)
+
+    def resolve(self, value):
+        """解析间接引用"""
+        seen = 0
+        while isinstance(value, PDFRef) and seen < 32:
+            value = self.get_object(value.num)
+            seen += 1
+        return value
+
+    def get_pages(self) -> List[Tuple[int, Dict]]:
+        """
+        按顺序获取所有页面
+
+        Returns:
+            List[Tuple[int, Dict]]: (页面对象编号, 已展开继承属性的页面字典)
+        """
+        root = self.resolve(self.trailer.get(PDFName(b'Root')))
+        if not isinstance(root, dict):
+            raise PDFParseError(f"找不到文档目录: {self.path}")
+        pages = []
+        self._collect_pages(root.get(PDFName(b'Pages')), {}, pages, set())
+        return pages
+
+    def _collect_pages(self, node_ref, inherited: Dict, pages: List, visited: set):
+        if not isinstance(node_ref, PDFRef) or node_ref.num in visited:
+            return
+        visited.add(node_ref.num)
+        node = self.get_object(node_ref.num)
+        if not isinstance(node, dict):
+            return
+
+        attributes = dict(inherited)
+        for key in INHERITABLE_PAGE_KEYS:
+            if PDFName(key.encode()) in node:
+                attributes[PDFName(key.encode())] = node[PDFName(key.encode())]
+
+        if node.get(PDFName(b'Type')) == b'Pages' or PDFName(b'Kids') in node:
+            for kid in self.resolve(node.get(PDFName(b'Kids'), [])):
+                self._collect_pages(kid, attributes, pages, visited)
+        else:
+            page = dict(node)
+            for key, value in attributes.items():
+                page.setdefault(key, value)
+            pages.append((node_ref.num, page))
+
+
+class _BufferReader(PDFReader):
+    """用于解析对象流内容的读取器"""
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+
+def _serialize(value, ref_map: Dict[int, int]) -> bytes:
+    """将PDF对象序列化，并按映射改写引用编号"""
+    if isinstance(value, PDFName):
+        escaped = re.sub(
+            rb'[^!-~]|[#()<>\[\]{}/%]',
+            lambda m: b'#%02X' % m.group(0)[0], bytes(value)
+        )
+        return b'/' + escaped
+    if isinstance(value, PDFRawString):
+        return bytes(value)
+    if isinstance(value, PDFRef):
+        return b'%d 0 R' % ref_map[value.num]
+    if isinstance(value, bool):
+        return b'true' if value else b'false'
+    if value is None:
+        return b'null'
+    if isinstance(value, int):
+        return b'%d' % value
+    if isinstance(value, float):
+        return (b'%.6f' % value).rstrip(b'0').rstrip(b'.') or b'0'
+    if isinstance(value, list):
+        return b'[' + b' '.join(_serialize(v, ref_map) for v in value) + b']'
+    if isinstance(value, dict):
+        return b'<<' + b''.join(
+            _serialize(k, ref_map) + b' ' + _serialize(v, ref_map) for k, v in value.items()
+        ) + b'>>'
+    if isinstance(value, PDFStream):
+        stream_dict = dict(value.dict)
+        stream_dict[PDFName(b'Length')] = len(value.data)
+        stream_dict.pop(PDFName(b'DL'), None)
+        return _serialize(stream_dict, ref_map) + b'\nstream\n' + value.data + b'\nendstream'
+    if isinstance(value, bytes):
+        return value
+    raise PDFParseError(f"无法序列化的对象类型: {type(value)}")
+
+
+def _iter_refs(value):
+    """遍历对象中直接包含的所有引用"""
+    if isinstance(value, PDFRef):
+        yield value
+    elif isinstance(value, list):
+        for item in value:
+            yield from _iter_refs(item)
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _iter_refs(item)
+    elif isinstance(value, PDFStream):
+        yield from _iter_refs(value.dict)
+
+
+def _encode_text_string(text: str) -> PDFRawString:
+    """将文本编码为带BOM的UTF-16BE十六进制字符串"""
+    return PDFRawString(b'<FEFF' + text.encode('utf-16-be').hex().upper().encode('ascii') + b'>')
+
+
+class PDFBundler:
+    """流式PDF合并器"""
+
+    def __init__(self, output_path: str):
+        """
+        初始化合并器
+
+        Args:
+            output_path: 合并后的PDF文件路径
+        """
+        self.output_path = output_path
+        self._file = None
+        self._offsets: Dict[int, int] = {}
+        self._next_num = 1
+        # 已写出对象的内容哈希 -> 对象编号，用于去重
+        self._written_hashes: Dict[bytes, int] = {}
+        self._page_nums: List[int] = []
+        self._bookmarks: List[Tuple[str, int]] = []
+        self.deduplicated_count = 0
+
+    def _allocate(self) -> int:
+        num = self._next_num
+        self._next_num += 1
+        return num
+
+    def _write_object(self, num: int, body: bytes):
+        self._offsets[num] = self._file.tell()
+        self._file.write(b'%d 0 obj\n' % num)
+        self._file.write(body)
+        self._file.write(b'\nendobj\n')
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._abort()
+
+    def open(self):
+        """开始写入合并文件"""
+        self._temp_path = create_temp(self.output_path)
+        self._file = open(self._temp_path, 'wb')
+        self._file.write(b'%PDF-1.7\n%\xe2\xe3\xcf\xd3\n')
+        # 预留页面树、书签根和文档目录的对象编号
+        self._pages_num = self._allocate()
+        self._outlines_num = self._allocate()
+        self._catalog_num = self._allocate()
+
+    def _abort(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+        discard_temp(self._temp_path)
+
+    def add_file(self, pdf_path: str, title: Optional[str] = None) -> int:
+        """
+        追加一个PDF文件的所有页面
+
+        Args:
+            pdf_path: 输入PDF路径
+            title: 书签标题，为None时不添加书签
+
+        Returns:
+            int: 追加的页数
+        """
+        reader = PDFReader(pdf_path)
+        pages = reader.get_pages()
+        if not pages:
+            return 0
+
+        # 本文件内的引用编号 -> 输出编号
+        ref_map: Dict[int, int] = {}
+        page_sources = {}
+        for source_num, page in pages:
+            ref_map[source_num] = self._allocate()
+            page_sources[source_num] = page
+
+        for source_num, page in pages:
+            page = dict(page)
+            page.pop(PDFName(b'Parent'), None)
+            page.pop(PDFName(b'StructParents'), None)
+            for ref in _iter_refs(page):
+                self._copy_object(reader, ref.num, ref_map, page_sources)
+            page[PDFName(b'Parent')] = b'%d 0 R' % self._pages_num
+            self._write_object(ref_map[source_num], _serialize(page, ref_map))
+            self._page_nums.append(ref_map[source_num])
+
+        if title is not None:
+            self._bookmarks.append((title, ref_map[pages[0][0]]))
+        return len(pages)
+
+    def _copy_object(self, reader: PDFReader, source_num: int,
+                     ref_map: Dict[int, int], page_sources: Dict):
+        """
+        深度优先复制对象：先写出其引用的子对象，再写出自身。
+        内容完全相同的对象只写出一次（字体、图片等共享资源）
+        """
+        if source_num in ref_map:
+            return
+
+        # 使用显式栈避免深层嵌套时递归过深
+        stack = [(source_num, False)]
+        in_progress = set()
+        # 在写出前就被循环引用的对象，编号已被使用，不能去重
+        referenced_early = set()
+        while stack:
+            num, children_done = stack.pop()
+            value = reader.get_object(num)
+
+            if not children_done:
+                if num in ref_map:
+                    continue
+                if isinstance(value, dict) and value.get(PDFName(b'Type')) == b'Page' \
+                        and num not in page_sources:
+                    # 指向不在本次合并范围内的页面，改为空引用
+                    ref_map[num] = self._null_num()
+                    continue
+                # 预先分配编号，出现循环引用时子对象可以直接引用
+                ref_map[num] = self._allocate()
+                in_progress.add(num)
+                stack.append((num, True))
+                for ref in _iter_refs(value):
+                    if ref.num not in ref_map:
+                        stack.append((ref.num, False))
+                continue
+
+            in_progress.discard(num)
+            for ref in _iter_refs(value):
+                if ref.num not in ref_map:
+                    ref_map[ref.num] = self._null_num()
+                elif ref.num in in_progress:
+                    referenced_early.add(ref.num)
+            body = _serialize(value, ref_map)
+            digest = hashlib.sha256(body).digest()
+            existing = self._written_hashes.get(digest)
+            if existing is not None and num not in referenced_early:
+                # 重复对象：改用已写出的编号，预分配的编号作废
+                ref_map[num] = existing
+                self.deduplicated_count += 1
+                continue
+            self._write_object(ref_map[num], body)
+            self._written_hashes.setdefault(digest, ref_map[num])
+
+    def _null_num(self) -> int:
+        """返回一个写入null的对象编号"""
+        if not hasattr(self, '_null_obj_num'):
+            self._null_obj_num = self._allocate()
+            self._write_object(self._null_obj_num, b'null')
+        return self._null_obj_num
+
+    def close(self):
+        """写入页面树、书签和交叉引用表并完成文件"""
+        kids = b' '.join(b'%d 0 R' % num for num in self._page_nums)
+        self._write_object(self._pages_num, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (
+            kids, len(self._page_nums)))
+
+        if self._bookmarks:
+            first_num = self._next_num
+            item_nums = [self._allocate() for _ in self._bookmarks]
+            for index, (title, page_num) in enumerate(self._bookmarks):
+                entry = {
+                    PDFName(b'Title'): _encode_text_string(title),
+                    PDFName(b'Parent'): b'%d 0 R' % self._outlines_num,
+                    PDFName(b'Dest'): [b'%d 0 R' % page_num, PDFName(b'Fit')],
+                }
+                if index > 0:
+                    entry[PDFName(b'Prev')] = b'%d 0 R' % item_nums[index - 1]
+                if index < len(item_nums) - 1:
+                    entry[PDFName(b'Next')] = b'%d 0 R' % item_nums[index + 1]
+                self._write_object(item_nums[index], _serialize(entry, {}))
+            self._write_object(self._outlines_num, b'<< /Type /Outlines /First %d 0 R /Last %d 0 R /Count %d >>' % (
+                first_num, item_nums[-1], len(item_nums)))
+            catalog = b'<< /Type /Catalog /Pages %d 0 R /Outlines %d 0 R /PageMode /UseOutlines >>' % (
+                self._pages_num, self._outlines_num)
+        else:
+            self._write_object(self._outlines_num, b'<< /Type /Outlines /Count 0 >>')
+            catalog = b'<< /Type /Catalog /Pages %d 0 R >>' % self._pages_num
+        self._write_object(self._catalog_num, catalog)
+
+        # 交叉引用表：去重作废的编号记为空闲
+        xref_offset = self._file.tell()
+        size = self._next_num
+        self._file.write(b'xref\n0 %d\n0000000000 65535 f \n' % size)
+        for num in range(1, size):
+            offset = self._offsets.get(num)
+            if offset is None:
+                self._file.write(b'0000000000 65535 f \n')
+            else:
+                self._file.write(b'%010d 00000 n \n' % offset)
+        self._file.write(b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (
+            size, self._catalog_num, xref_offset))
+        self._file.close()
+        self._file = None
+        commit_temp(self._temp_path, self.output_path)
+
+
+def bundle_class_pdfs(pdf_dir: str, output_path: str,
+                      roster_order: Optional[List[str]] = None) -> Tuple[int, int]:
+    """
+    按名单顺序合并班级PDF，并以“姓名-学号”作为书签
+
+    Args:
+        pdf_dir: 班级PDF文件夹
+        output_path: 合并后的PDF文件路径
+        roster_order: 名单顺序的文件名（不含扩展名，如“姓名-学号”），
+            不在名单中的文件按文件名排序追加在最后
+
+    Returns:
+        Tuple[int, int]: (合并的文件数, 总页数)
+    """
+    available = {
+        os.path.splitext(name)[0]: os.path.join(pdf_dir, name)
+        for name in os.listdir(pdf_dir)
+        if name.lower().endswith('.pdf') and not name.startswith('~')
+    }
+    ordered = [stem for stem in (roster_order or []) if stem in available]
+    ordered_set = set(ordered)
+    ordered += sorted(stem for stem in available if stem not in ordered_set)
+
+    file_count = 0
+    page_count = 0
+    with PDFBundler(output_path) as bundler:
+        for stem in ordered:
+            pages = bundler.add_file(available[stem], title=stem)
+            if pages:
+                file_count += 1
+                page_count += pages
+    return file_count, page_count
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+PDF缓存模块
+以文档内容哈希为键缓存转换结果，可放在共享目录中供多次运行、多台机器复用。
+命中时把条目复制到输出路径（不使用硬链接：输出与条目共用一个inode时，其他输出目录的命中
+会改变本目录PDF的修改时间，直接修改输出文件也会破坏缓存条目）。
+最近使用时间记录在条目的访问时间中，条目的修改时间保持不变
+"""
+
+import hashlib
+import io
+import json
+import os
+import shutil
+import socket
+import threading
+import time
+import zipfile
+from typing import Dict, List, Optional, Tuple, Union
+
+from .file_modes import atomic_path, atomic_write, write_atomic
+
+
+class PDFCache:
+    """基于内容寻址的PDF缓存，按最近使用时间淘汰超出容量的条目"""
+
+    # 计算文档哈希时忽略的部件（只包含保存时间等元数据，不影响版面）
+    IGNORED_PARTS = ('docProps/core.xml', 'docProps/app.xml')
+
+    # 记录各主机转换后端版本的文件
+    BACKENDS_FILE = 'backends.json'
+
+    def __init__(self, cache_dir: str, max_size_mb: float = 2048):
+        """
+        初始化PDF缓存
+
+        Args:
+            cache_dir: 缓存目录，可以位于共享卷上
+            max_size_mb: 缓存容量上限（MB）
+        """
+        self.cache_dir = cache_dir
+        self.max_size = int(max_size_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        # 多个转换线程共用一个缓存实例
+        self._stats_lock = threading.Lock()
+        # 缓存目录在第一次写入条目时才创建；这里只检查能否创建，不可写时抛出OSError
+        parent = os.path.abspath(self.cache_dir)
+        while not os.path.exists(parent):
+            parent = os.path.dirname(parent)
+        if not os.path.isdir(parent) or not os.access(parent, os.W_OK):
+            raise PermissionError(f"缓存目录不可写: {self.cache_dir}")
+
+    def compute_key(self, docx_source: Union[str, bytes], backend_identity: str) -> str:
+        """
+        计算缓存键：规范化后的docx内容哈希 + 转换后端标识和版本
+
+        docx是zip包，其中的时间戳和压缩参数会随保存而变化，
+        因此按部件名排序后对解压内容求哈希
+
+        Args:
+            docx_source: docx文件路径或文件内容
+            backend_identity: 转换后端标识，如 'native:1.0'
+
+        Returns:
+            str: 十六进制缓存键
+        """
+        digest = hashlib.sha256()
+        digest.update(backend_identity.encode('utf-8'))
+        digest.update(b'\0')
+        source = io.BytesIO(docx_source) if isinstance(docx_source, bytes) else docx_source
+        try:
+            with zipfile.ZipFile(source) as package:
+                for name in sorted(package.namelist()):
+                    if name in self.IGNORED_PARTS or name.endswith('/'):
+                        continue
+                    digest.update(name.encode('utf-8'))
+                    digest.update(b'\0')
+                    digest.update(package.read(name))
+        except zipfile.BadZipFile:
+            # 非zip格式（如.doc）直接对原始字节求哈希
+            if isinstance(docx_source, bytes):
+                digest.update(docx_source)
+                return digest.hexdigest()
+            with open(docx_source, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+        return digest.hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        """返回缓存条目的路径"""
+        return os.path.join(self.cache_dir, key[:2], key + '.pdf')
+
+    def fetch(self, key: str, output_path: str) -> bool:
+        """
+        查询缓存，命中时将缓存的PDF复制到输出路径
+
+        Args:
+            key: 缓存键
+            output_path: 输出文件路径
+
+        Returns:
+            bool: 是否命中
+        """
+        entry_path = self._entry_path(key)
+        hit = os.path.exists(entry_path)
+        if hit:
+            try:
+                # 先复制到临时文件再替换：输出路径上可能是以前硬链接出的文件，不能原地覆盖
+                with atomic_path(output_path) as temp_path:
+                    shutil.copyfile(entry_path, temp_path)
+                self._touch(entry_path)
+            except OSError:
+                hit = False
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return hit
+
+    def fetch_bytes(self, key: str) -> Optional[bytes]:
+        """
+        查询缓存，命中时返回缓存的PDF内容（结果直接写入压缩包、不写出文件时使用）
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            Optional[bytes]: PDF内容，未命中时为None
+        """
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, 'rb') as f:
+                data = f.read()
+            self._touch(entry_path)
+        except OSError:
+            data = None
+        with self._stats_lock:
+            if data is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return data
+
+    @staticmethod
+    def _touch(entry_path: str):
+        """记录最近使用时间：只更新访问时间，修改时间不变"""
+        stat = os.stat(entry_path)
+        os.utime(entry_path, ns=(time.time_ns(), stat.st_mtime_ns))
+
+    def store(self, key: str, pdf_path: str):
+        """
+        将转换结果写入缓存
+
+        Args:
+            key: 缓存键
+            pdf_path: 已生成的PDF文件路径
+        """
+        entry_path = self._entry_path(key)
+        if os.path.exists(entry_path):
+            return
+
+        # 原子写入，其他机器不会读到写了一半的条目；条目对共享卷上的其他用户可读
+        with atomic_write(entry_path) as temp_file, open(pdf_path, 'rb') as source:
+            shutil.copyfileobj(source, temp_file)
+
+    def store_bytes(self, key: str, data: bytes):
+        """
+        将内存中的转换结果写入缓存
+
+        Args:
+            key: 缓存键
+            data: PDF内容
+        """
+        entry_path = self._entry_path(key)
+        if not os.path.exists(entry_path):
+            write_atomic(entry_path, data)
+
+    def _list_entries(self) -> List[Tuple[float, int, str]]:
+        """列出所有缓存条目 (最近使用时间, 大小, 路径)"""
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith('.pdf'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                # 新写入的条目访问时间等于修改时间，命中后访问时间更新
+                entries.append((max(stat.st_atime, stat.st_mtime), stat.st_size, path))
+        return entries
+
+    def evict(self) -> int:
+        """
+        淘汰最久未使用的条目，直到缓存总大小不超过上限
+
+        Returns:
+            int: 被淘汰的条目数量
+        """
+        entries = self._list_entries()
+        total_size = sum(size for _, size, _ in entries)
+        if total_size <= self.max_size:
+            return 0
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+                total_size -= size
+                removed += 1
+            except OSError:
+                # 其他进程可能已经删除了该条目
+                continue
+        return removed
+
+    def _backend_key(self, backend: str) -> str:
+        return f"{socket.gethostname()}|{backend}"
+
+    def load_backend_version(self, backend: str) -> Optional[str]:
+        """
+        读取本机上次记录的转换后端版本，用于在不启动后端的情况下计算缓存键
+
+        Args:
+            backend: 转换后端名称，如 'wps'
+
+        Returns:
+            Optional[str]: 版本号，没有记录时为None
+        """
+        try:
+            with open(os.path.join(self.cache_dir, self.BACKENDS_FILE), 'r', encoding='utf-8') as f:
+                return json.load(f).get(self._backend_key(backend))
+        except (OSError, ValueError, AttributeError):
+            return None
+
+    def save_backend_version(self, backend: str, version: str):
+        """记录本机转换后端的版本（同一文件中保留其他主机的记录）"""
+        path = os.path.join(self.cache_dir, self.BACKENDS_FILE)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                versions = json.load(f)
+            if not isinstance(versions, dict):
+                versions = {}
+        except (OSError, ValueError):
+            versions = {}
+        if versions.get(self._backend_key(backend)) == version:
+            return
+        versions[self._backend_key(backend)] = version
+        try:
+            write_atomic(path, json.dumps(versions, ensure_ascii=False, indent=2))
+        except OSError:
+            pass
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取本次运行的命中统计"""
+        with self._stats_lock:
+            return {'hits': self.hits, 'misses': self.misses}
@@ -1,24 +1,118 @@
 # -*- coding: utf-8 -*-
 """
 PDF转换模块
-使用WPS Office的COM接口进行Word文档到PDF的批量转换
+使用WPS Office的COM接口进行Word文档到PDF的批量转换，
+也可选择原生渲染后端在进程内直接生成PDF
 """
 
 import os
 import sys
+import threading
 import time
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import Callable, Dict, List, Tuple, Optional
 import traceback
 
+from . import tracing
+from .event_log import get_logger
+
 
 class PDFConverter:
     """PDF转换器类，负责Word文档到PDF的转换"""
     
-    def __init__(self):
-        """初始化PDF转换器"""
+    # 支持的转换后端
+    BACKENDS = ('wps', 'native')
+    
+    def __init__(self, timeout: float = 30, poll_interval: float = 0.05, backend: str = 'wps',
+                 cache=None):
+        """
+        初始化PDF转换器
+        
+        Args:
+            timeout: 等待文档就绪和PDF输出完成的超时时间（秒）
+            poll_interval: 轮询间隔（秒）
+            backend: 转换后端，'wps' 使用WPS Office，'native' 使用原生渲染器
+            cache: 可选的PDFCache实例，批量转换时先查询缓存
+        """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"不支持的PDF转换后端: {backend}，可选: {', '.join(self.BACKENDS)}")
+        
+        self.backend = backend
+        self.cache = cache
+        self._backend_identity: Optional[str] = None
         self.wps_app = None
+        self.native_renderer = None
         self.is_initialized = False
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        
+        # 每个文件的耗时记录
+        self.file_timings: List[Dict] = []
+    
+    def initialize_backend(self) -> bool:
+        """
+        初始化当前选择的转换后端
+        
+        Returns:
+            bool: 是否成功初始化
+        """
+        if self.backend == 'native':
+            return self.initialize_native()
+        return self.initialize_wps()
+    
+    def backend_identity(self) -> str:
+        """
+        获取转换后端的标识和版本，用于区分不同后端生成的缓存
+        
+        Returns:
+            str: 如 'native:1.0' 或 'wps:12.0'
+        """
+        if self._backend_identity:
+            return self._backend_identity
+        
+        if self.backend == 'native':
+            from .native_renderer import NativePDFRenderer
+            self._backend_identity = f"native:{NativePDFRenderer.RENDERER_VERSION}"
+            return self._backend_identity
+        
+        # 全部命中缓存时不必启动WPS：使用本机上次记录的版本，WPS启动后再核对
+        if self.wps_app is None and self.cache:
+            version = self.cache.load_backend_version('wps')
+            if version:
+                self._backend_identity = f"wps:{version}"
+                return self._backend_identity
+        
+        self.initialize_wps()
+        self._backend_identity = f"wps:{self._wps_version()}"
+        return self._backend_identity
+    
+    def _wps_version(self) -> str:
+        """已启动的WPS的版本，并记录到缓存目录中"""
+        version = 'unknown'
+        if self.wps_app is not None:
+            try:
+                version = str(self.wps_app.Version)
+            except Exception:
+                pass
+        if self.cache and version != 'unknown':
+            self.cache.save_backend_version('wps', version)
+        return version
+    
+    def initialize_native(self) -> bool:
+        """
+        初始化原生PDF渲染器
+        
+        Returns:
+            bool: 是否成功初始化
+        """
+        if self.is_initialized:
+            return True
+        
+        from .native_renderer import NativePDFRenderer
+        
+        self.native_renderer = NativePDFRenderer()
+        self.is_initialized = True
+        return True
     
     def initialize_wps(self) -> bool:
         """
@@ -31,8 +125,13 @@ class PDFConverter:
             return True
             
         try:
+            import comtypes
             import comtypes.client
             
+            # 在工作线程中使用COM需要先初始化COM库
+            if threading.current_thread() is not threading.main_thread():
+                comtypes.CoInitialize()
+            
             print("正在启动WPS Writer...")
             
             # 尝试不同的WPS应用程序标识
@@ -52,6 +151,16 @@ class PDFConverter:
             self.is_initialized = True
             
             print("✓ WPS Writer启动成功")
+            
+            # 按记录的版本计算缓存键后WPS已升级：之后的文件使用新版本的缓存键
+            if self._backend_identity:
+                identity = f"wps:{self._wps_version()}"
+                if identity != self._backend_identity:
+                    get_logger().warning(
+                        f"WPS版本已变化: {self._backend_identity} → {identity}",
+                        event='backend_version_changed', previous=self._backend_identity, current=identity
+                    )
+                    self._backend_identity = identity
             return True
             
         except ImportError:
@@ -63,26 +172,41 @@ class PDFConverter:
             print("请确保已安装WPS Office")
             return False
     
-    def convert_single_file(self, input_path: str, output_path: str) -> bool:
+    def convert_single_file(self, input_path: str, output_path: str,
+                            data: Optional[bytes] = None) -> bool:
         """
         转换单个文件
         
         Args:
             input_path: 输入文件路径
             output_path: 输出文件路径
+            data: 已在内存中的docx内容（仅原生后端使用，WPS始终从文件打开）
             
         Returns:
             bool: 是否转换成功
         """
         if not self.is_initialized:
-            if not self.initialize_wps():
+            if not self.initialize_backend():
                 return False
         
+        if self.backend == 'native':
+            return self._convert_native(input_path, output_path, data)
+        
         doc = None
+        timing = {'file': os.path.basename(input_path)}
+        start_time = time.perf_counter()
         try:
-            # 打开文档
+            # 删除旧的输出文件，避免把上次的结果误判为本次完成
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            
+            # 打开文档并等待就绪
             doc = self.wps_app.Documents.Open(os.path.abspath(input_path))
-            time.sleep(0.5)  # 等待文档完全加载
+            if not self._wait_until(lambda: self._is_document_ready(doc)):
+                print(f"警告: 等待文档就绪超时 - {input_path}")
+                return False
+            opened_time = time.perf_counter()
+            timing['open'] = opened_time - start_time
             
             # 导出为PDF
             doc.ExportAsFixedFormat(
@@ -95,12 +219,11 @@ class PDFConverter:
                 CreateBookmarks=False
             )
             
-            # 关闭文档
-            doc.Close(SaveChanges=False)
-            time.sleep(0.2)  # 等待文档关闭
+            # 等待输出文件写入完成
+            completed = self._wait_for_output(output_path)
+            timing['export'] = time.perf_counter() - opened_time
             
-            # 验证输出文件是否存在
-            if os.path.exists(output_path):
+            if completed:
                 return True
             else:
                 print(f"警告: 输出文件未生成 - {output_path}")
@@ -108,12 +231,207 @@ class PDFConverter:
                 
         except Exception as e:
             print(f"转换文件时出错: {str(e)}")
+            return False
+        finally:
+            # 关闭文档（包括等待就绪超时的情况），避免文档留在长期运行的WPS中
             try:
                 if doc:
                     doc.Close(SaveChanges=False)
             except:
                 pass
+            timing['total'] = time.perf_counter() - start_time
+            self.file_timings.append(timing)
+    
+    def convert_file(self, input_path: str, output_path: str,
+                     data: Optional[bytes] = None) -> Tuple[bool, bool]:
+        """
+        转换单个文件，先查询缓存，转换成功后写入缓存
+        
+        Args:
+            input_path: 输入文件路径
+            output_path: 输出文件路径
+            data: 已在内存中的docx内容，提供时用于计算缓存键和原生渲染
+            
+        Returns:
+            Tuple[bool, bool]: (是否成功, 是否来自缓存)
+        """
+        with tracing.span('convert', file=os.path.basename(input_path),
+                          backend=self.backend) as span_args:
+            cache_key = None
+            if self.cache:
+                cache_key = self.cache.compute_key(
+                    data if data is not None else input_path, self.backend_identity()
+                )
+                if self.cache.fetch(cache_key, output_path):
+                    span_args.update(cache='hit', bytes=os.path.getsize(output_path))
+                    return True, True
+            
+            if not self.convert_single_file(input_path, output_path, data):
+                span_args['failed'] = True
+                return False, False
+            
+            span_args.update(cache='miss', bytes=os.path.getsize(output_path))
+            if cache_key:
+                self.cache.store(cache_key, output_path)
+            return True, False
+    
+    def render_bytes(self, input_path: str, data: bytes) -> Tuple[Optional[bytes], bool]:
+        """
+        使用原生后端在内存中转换，不写出PDF文件（结果直接写入班级压缩包时使用），先查询缓存
+
+        Args:
+            input_path: 输入文件路径（用于日志和警告信息）
+            data: docx内容
+
+        Returns:
+            Tuple[Optional[bytes], bool]: (PDF内容，失败时为None, 是否来自缓存)
+        """
+        if self.backend != 'native':
+            raise ValueError("只有原生后端支持在内存中转换")
+        if not self.is_initialized:
+            self.initialize_backend()
+
+        with tracing.span('convert', file=os.path.basename(input_path),
+                          backend=self.backend) as span_args:
+            cache_key = None
+            if self.cache:
+                cache_key = self.cache.compute_key(data, self.backend_identity())
+                pdf = self.cache.fetch_bytes(cache_key)
+                if pdf is not None:
+                    span_args.update(cache='hit', bytes=len(pdf))
+                    return pdf, True
+
+            timing = {'file': os.path.basename(input_path)}
+            start_time = time.perf_counter()
+            try:
+                pdf = self.native_renderer.render_bytes(data, input_path)
+            except Exception as e:
+                print(f"转换文件时出错: {str(e)}")
+                span_args['failed'] = True
+                return None, False
+            finally:
+                timing['total'] = timing['export'] = time.perf_counter() - start_time
+                self.file_timings.append(timing)
+
+            span_args.update(cache='miss', bytes=len(pdf))
+            if cache_key:
+                self.cache.store_bytes(cache_key, pdf)
+            return pdf, False
+
+    def _convert_native(self, input_path: str, output_path: str,
+                        data: Optional[bytes] = None) -> bool:
+        """
+        使用原生渲染器转换单个文件
+        
+        Args:
+            input_path: 输入文件路径
+            output_path: 输出文件路径
+            data: 已在内存中的docx内容
+            
+        Returns:
+            bool: 是否转换成功
+        """
+        timing = {'file': os.path.basename(input_path)}
+        start_time = time.perf_counter()
+        try:
+            return self.native_renderer.render(input_path, output_path, data)
+        except Exception as e:
+            print(f"转换文件时出错: {str(e)}")
             return False
+        finally:
+            timing['total'] = timing['export'] = time.perf_counter() - start_time
+            self.file_timings.append(timing)
+    
+    def _wait_until(self, predicate: Callable[[], bool], timeout: Optional[float] = None) -> bool:
+        """
+        轮询等待条件成立
+        
+        Args:
+            predicate: 条件函数
+            timeout: 超时时间（秒），默认使用配置的超时时间
+            
+        Returns:
+            bool: 条件是否在超时前成立
+        """
+        if timeout is None:
+            timeout = self.timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            if predicate():
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(self.poll_interval)
+    
+    def _is_document_ready(self, doc) -> bool:
+        """
+        检查文档是否已加载完成
+        
+        WPS在文档加载期间会拒绝COM调用，能够正常访问文档内容即视为就绪
+        """
+        try:
+            doc.Content.End
+        except Exception:
+            return False
+        try:
+            return not self.wps_app.BackgroundSavingStatus
+        except Exception:
+            # 部分WPS版本不支持该属性
+            return True
+    
+    def _wait_for_output(self, output_path: str) -> bool:
+        """
+        等待PDF输出文件写入完成且大小稳定
+        
+        Args:
+            output_path: 输出文件路径
+            
+        Returns:
+            bool: 输出文件是否完整生成
+        """
+        last_size = [-1]
+        
+        def is_complete() -> bool:
+            try:
+                size = os.path.getsize(output_path)
+            except OSError:
+                return False
+            stable = size > 0 and size == last_size[0]
+            last_size[0] = size
+            if not stable:
+                return False
+            # 文件仍被占用时无法以追加方式打开（Windows）
+            try:
+                with open(output_path, 'ab'):
+                    pass
+            except OSError:
+                return False
+            return True
+        
+        return self._wait_until(is_complete)
+    
+    def get_timing_summary(self, start: int = 0) -> Dict[str, float]:
+        """
+        获取转换耗时统计
+        
+        Args:
+            start: 从第几条耗时记录开始统计
+            
+        Returns:
+            Dict[str, float]: 文件数量、总耗时、平均耗时、平均导出耗时
+        """
+        timings = self.file_timings[start:]
+        count = len(timings)
+        if count == 0:
+            return {'count': 0, 'total': 0.0, 'average': 0.0, 'average_export': 0.0}
+        total = sum(t['total'] for t in timings)
+        export_total = sum(t.get('export', 0.0) for t in timings)
+        return {
+            'count': count,
+            'total': total,
+            'average': total / count,
+            'average_export': export_total / count
+        }
     
     def convert_batch(self, source_folder: str, output_folder: str, 
                      file_extension: str = '.docx') -> Tuple[int, int, List[str]]:
@@ -131,9 +449,10 @@ class PDFConverter:
         if not os.path.exists(source_folder):
             raise FileNotFoundError(f"源文件夹不存在: {source_folder}")
         
+        log = get_logger()
         # 创建输出文件夹
         os.makedirs(output_folder, exist_ok=True)
-        print(f"输出文件夹: {output_folder}")
+        log.info(f"输出文件夹: {output_folder}")
         
         # 获取所有待转换文件
         files_to_convert = []
@@ -142,57 +461,76 @@ class PDFConverter:
                 files_to_convert.append(file)
         
         if not files_to_convert:
-            print(f"未找到任何{file_extension}文件")
+            log.warning(f"未找到任何{file_extension}文件")
             return 0, 0, []
         
-        print(f"找到 {len(files_to_convert)} 个{file_extension}文件")
+        log.info(f"找到 {len(files_to_convert)} 个{file_extension}文件")
         
-        # 初始化WPS
-        if not self.initialize_wps():
+        # 初始化转换后端
+        if not self.initialize_backend():
             return 0, len(files_to_convert), files_to_convert
         
-        print("开始批量转换...")
-        print("=" * 60)
+        log.info("开始批量转换...")
+        log.info("=" * 60)
         
         success_count = 0
         error_count = 0
+        cached_count = 0
         failed_files = []
+        timing_start = len(self.file_timings)
+        progress = log.progress(len(files_to_convert), label='转换PDF')
         
-        for i, filename in enumerate(files_to_convert, 1):
+        for filename in files_to_convert:
+            error = None
+            from_cache = False
             try:
                 input_path = os.path.join(source_folder, filename)
                 output_filename = filename.replace(file_extension, '.pdf')
                 output_path = os.path.join(output_folder, output_filename)
                 
-                print(f"[{i}/{len(files_to_convert)}] 正在转换: {filename}")
-                
-                if self.convert_single_file(input_path, output_path):
-                    success_count += 1
-                    print(f"✓ 转换成功: {output_filename}")
-                else:
-                    error_count += 1
-                    failed_files.append(filename)
-                    print(f"✗ 转换失败: {filename}")
-                
+                success, from_cache = self.convert_file(input_path, output_path)
             except Exception as e:
+                success = False
+                error = str(e)
+            
+            if from_cache:
+                success_count += 1
+                cached_count += 1
+                log.event('convert', 'debug', f"✓ 使用缓存: {output_filename}", file=filename, cache='hit')
+            elif success:
+                success_count += 1
+                elapsed = self.file_timings[-1]['total']
+                log.event('convert', 'debug', f"✓ 转换成功: {output_filename} ({elapsed:.2f}s)",
+                          file=filename, cache='miss', seconds=round(elapsed, 4))
+            else:
                 error_count += 1
                 failed_files.append(filename)
-                print(f"✗ 转换失败: {filename}")
-                print(f"  错误详情: {str(e)}")
+                detail = f"\n  错误详情: {error}" if error else ''
+                log.event('convert', 'warning', f"✗ 转换失败: {filename}{detail}", file=filename, error=error)
+            progress.update(failed=not success)
+        progress.close()
         
-        print("=" * 60)
-        print(f"转换完成! 成功: {success_count}, 失败: {error_count}")
+        log.info("=" * 60)
+        log.summary(f"转换完成! 成功: {success_count}, 失败: {error_count}", event='convert_batch_done',
+                    succeeded=success_count, failed=error_count, cached=cached_count)
+        if self.cache:
+            log.summary(f"缓存命中: {cached_count} 个文件")
+            self.cache.evict()
+        summary = self.get_timing_summary(timing_start)
+        if summary['count']:
+            log.summary(f"平均每个文件耗时: {summary['average']:.2f}s (导出 {summary['average_export']:.2f}s)")
         
         return success_count, error_count, failed_files
     
     def cleanup(self):
         """清理资源"""
         try:
+            self.native_renderer = None
+            self.is_initialized = False
             if self.wps_app:
                 self.wps_app.Quit()
                 self.wps_app = None
-            self.is_initialized = False
-            print("✓ WPS应用程序已关闭")
+                print("✓ WPS应用程序已关闭")
         except Exception as e:
             print(f"清理WPS应用程序时出错: {str(e)}")
     
@@ -201,13 +539,15 @@ class PDFConverter:
         self.cleanup()
 
 
-def convert_folder_to_pdf(source_folder: str, output_folder: str = None) -> bool:
+def convert_folder_to_pdf(source_folder: str, output_folder: str = None,
+                          backend: str = 'wps') -> bool:
     """
     便捷函数：将文件夹中的所有Word文档转换为PDF
     
     Args:
         source_folder: 源文件夹路径
         output_folder: 输出文件夹路径，如果为None则自动生成
+        backend: 转换后端
         
     Returns:
         bool: 是否有文件转换成功
@@ -215,7 +555,7 @@ def convert_folder_to_pdf(source_folder: str, output_folder: str = None) -> bool
     if output_folder is None:
         output_folder = source_folder + "_PDF"
     
-    converter = PDFConverter()
+    converter = PDFConverter(backend=backend)
     try:
         success_count, error_count, failed_files = converter.convert_batch(
             source_folder, output_folder
@@ -233,10 +573,10 @@ def convert_folder_to_pdf(source_folder: str, output_folder: str = None) -> bool
 
 
 if __name__ == "__main__":
-    # 测试用例
+    # 本模块使用相对导入，需要在项目根目录以模块方式运行：python -m src.core.pdf_converter <源文件夹>
     if len(sys.argv) >= 2:
         source_folder = sys.argv[1]
         output_folder = sys.argv[2] if len(sys.argv) >= 3 else None
         convert_folder_to_pdf(source_folder, output_folder)
     else:
-        print("用法: python pdf_converter.py <源文件夹> [输出文件夹]")
+        print("用法: python -m src.core.pdf_converter <源文件夹> [输出文件夹]")
@@ -0,0 +1,387 @@
+# -*- coding: utf-8 -*-
+"""
+流水线模块
+多阶段流式处理引擎：各阶段之间使用有界队列连接，每个阶段可配置并发数（运行中可调整），
+通过在途数量和内存上限实现反压，使各阶段可以重叠执行
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from . import tracing
+
+
+# 队列结束标记
+_STOP = object()
+
+# 进程阶段中每个工作进程的上下文
+_process_context = None
+
+
+def _init_process_stage(setup: Optional[Callable[[], Any]]):
+    """进程阶段的工作进程初始化函数"""
+    global _process_context
+    _process_context = setup() if setup else None
+
+
+def _run_process_stage(handler: Callable, item: 'PipelineItem', trace: bool = False):
+    """在工作进程中执行阶段处理函数，并把更新后的条目（及追踪区间）传回"""
+    if not trace:
+        return handler(item, _process_context), item
+    with tracing.capture() as spans:
+        ok = handler(item, _process_context)
+    for span in spans:
+        span[5].setdefault('item', item.key)
+    item.spans = spans
+    return ok, item
+
+
+class PipelineItem:
+    """流水线中流转的一个工作条目"""
+
+    def __init__(self, key: str, data: Optional[Dict] = None, size: int = 0):
+        """
+        初始化工作条目
+
+        Args:
+            key: 条目标识（如学号）
+            data: 各阶段共享的数据
+            size: 条目占用的内存估计（字节），用于反压
+        """
+        self.key = key
+        self.data = data or {}
+        self.size = size
+        self.status = 'pending'
+        self.error: Optional[str] = None
+        self.failed_stage: Optional[str] = None
+        # 各阶段耗时（秒）
+        self.timings: Dict[str, float] = {}
+        # 在子进程中记录、待合并的追踪区间
+        self.spans: List = []
+
+
+class PipelineStage:
+    """流水线阶段定义"""
+
+    def __init__(self, name: str, handler: Callable[[PipelineItem, Any], bool],
+                 workers: int = 1, setup: Optional[Callable[[], Any]] = None,
+                 teardown: Optional[Callable[[Any], None]] = None,
+                 use_processes: bool = False,
+                 prepare: Optional[Callable[[PipelineItem], None]] = None,
+                 complete: Optional[Callable[[PipelineItem, bool], bool]] = None,
+                 max_workers: Optional[int] = None,
+                 payload: Optional[Callable[[PipelineItem], Dict]] = None):
+        """
+        初始化阶段
+
+        Args:
+            name: 阶段名称
+            handler: 处理函数 handler(item, context)，返回False表示处理失败
+            workers: 并发数
+            setup: 每个工作线程（或进程）启动时调用，返回值作为context
+            teardown: 工作线程结束时调用，参数为context（仅线程阶段）
+            use_processes: 是否在进程池中执行（CPU密集型阶段），
+                此时handler和setup必须可以被pickle
+            prepare: 处理前在主进程中调用，可向条目载入handler需要的数据
+            complete: 处理后在主进程中调用 complete(item, ok)，返回最终是否成功，
+                可从条目中取回数据（如写入文档存储或输出文件）
+            max_workers: 运行中可调整到的最大并发数（默认等于workers，不可调整）
+            payload: 进程阶段只把 payload(item) 作为条目数据传给子进程（默认传整个条目），
+                子进程处理后的数据合并回条目，其余数据留在主进程中
+        """
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, int(workers))
+        self.setup = setup
+        self.teardown = teardown
+        self.use_processes = use_processes
+        self.prepare = prepare
+        self.complete = complete
+        self.max_workers = max(self.workers, int(max_workers or 0))
+        self.payload = payload
+
+
+class _StageGate:
+    """阶段并发闸门：限制同时处理条目的工作线程数（上限可在运行中调整），并统计处理结果"""
+
+    def __init__(self, limit: int, max_limit: int):
+        self.max_limit = max_limit
+        self.limit = min(max(1, limit), max_limit)
+        self.busy = 0
+        self.completed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self.busy >= self.limit:
+                self._condition.wait()
+            self.busy += 1
+
+    def release(self, item: Optional['PipelineItem'] = None, seconds: float = 0.0):
+        with self._condition:
+            self.busy -= 1
+            if item is not None:
+                self.completed += 1
+                self.failed += item.status == 'failed'
+                self.busy_seconds += seconds
+            self._condition.notify_all()
+
+    def set_limit(self, limit: int) -> int:
+        with self._condition:
+            self.limit = min(max(1, int(limit)), self.max_limit)
+            self._condition.notify_all()
+            return self.limit
+
+
+class _InFlightLimiter:
+    """在途条目限制器：限制同时处理的条目数量和内存占用"""
+
+    def __init__(self, max_items: int, max_bytes: Optional[int] = None):
+        self.max_items = max(1, max_items)
+        self.max_bytes = max_bytes
+        self.items = 0
+        self.bytes = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, size: int):
+        with self._condition:
+            while self.items >= self.max_items or (
+                self.max_bytes is not None and self.items > 0
+                and self.bytes + size > self.max_bytes
+            ):
+                self._condition.wait()
+            self.items += 1
+            self.bytes += size
+
+    def release(self, size: int):
+        with self._condition:
+            self.items -= 1
+            self.bytes -= size
+            self._condition.notify_all()
+
+
+class StreamingPipeline:
+    """流式流水线：条目逐个流经所有阶段，而不是等待上一阶段全部完成"""
+
+    def __init__(self, stages: List[PipelineStage], queue_size: int = 16,
+                 max_in_flight: int = 64, max_memory_mb: Optional[float] = None,
+                 on_item_done: Optional[Callable[[PipelineItem], None]] = None,
+                 controller=None):
+        """
+        初始化流水线
+
+        Args:
+            stages: 阶段列表，按执行顺序排列
+            queue_size: 阶段之间队列的容量
+            max_in_flight: 同时在途的最大条目数
+            max_memory_mb: 在途条目的内存上限（MB），None表示不限制
+            on_item_done: 条目完成（成功或失败）时的回调
+            controller: 并发控制器（如 autotune.ConcurrencyController），
+                运行期间调用 controller.start(pipeline) / controller.stop()
+        """
+        if not stages:
+            raise ValueError("流水线至少需要一个阶段")
+        self.stages = stages
+        self.queue_size = max(1, queue_size)
+        self.limiter = _InFlightLimiter(
+            max_in_flight,
+            int(max_memory_mb * 1024 * 1024) if max_memory_mb else None
+        )
+        self.on_item_done = on_item_done
+        self.controller = controller
+        self._results: List[PipelineItem] = []
+        self._results_lock = threading.Lock()
+        self._gates: List[_StageGate] = []
+        self._queues: List[queue.Queue] = []
+
+    def stage_stats(self) -> List[Dict]:
+        """
+        各阶段的当前状态（供并发控制器采样）
+
+        Returns:
+            List[Dict]: [{'name', 'workers', 'max_workers', 'busy', 'queued',
+                          'completed', 'failed', 'busy_seconds'}, ...]
+        """
+        stats = []
+        for stage, gate, stage_queue in zip(self.stages, self._gates, self._queues):
+            stats.append({
+                'name': stage.name,
+                'workers': gate.limit,
+                'max_workers': gate.max_limit,
+                'busy': gate.busy,
+                'queued': stage_queue.qsize(),
+                'completed': gate.completed,
+                'failed': gate.failed,
+                'busy_seconds': gate.busy_seconds,
+            })
+        return stats
+
+    def set_workers(self, stage_name: str, workers: int) -> int:
+        """
+        调整阶段的并发数（限制在 1 和阶段的 max_workers 之间）
+
+        Returns:
+            int: 调整后的并发数
+        """
+        for stage, gate in zip(self.stages, self._gates):
+            if stage.name == stage_name:
+                return gate.set_limit(workers)
+        raise KeyError(stage_name)
+
+    def _finish(self, item: PipelineItem):
+        """条目离开流水线"""
+        if item.status == 'pending':
+            item.status = 'done'
+        self.limiter.release(item.size)
+        with self._results_lock:
+            self._results.append(item)
+        if self.on_item_done:
+            try:
+                self.on_item_done(item)
+            except Exception:
+                pass
+
+    def _handle(self, stage: PipelineStage, item: PipelineItem, context, executor) -> PipelineItem:
+        """执行一个阶段，返回（可能由子进程更新后的）条目"""
+        start_time = time.perf_counter()
+        try:
+            if stage.prepare:
+                stage.prepare(item)
+            if executor is not None and stage.payload:
+                sent = PipelineItem(item.key, stage.payload(item), item.size)
+                ok, returned = executor.submit(
+                    _run_process_stage, stage.handler, sent, tracing.is_enabled()
+                ).result()
+                item.data.update(returned.data)
+                item.error = returned.error or item.error
+                tracing.merge(returned.spans)
+            elif executor is not None:
+                ok, item = executor.submit(
+                    _run_process_stage, stage.handler, item, tracing.is_enabled()
+                ).result()
+                tracing.merge(item.spans)
+                item.spans = []
+            else:
+                ok = stage.handler(item, context)
+            if stage.complete:
+                ok = stage.complete(item, ok)
+            if not ok:
+                item.status = 'failed'
+                item.failed_stage = stage.name
+        except Exception as e:
+            item.status = 'failed'
+            item.failed_stage = stage.name
+            item.error = str(e)
+        item.timings[stage.name] = time.perf_counter() - start_time
+        return item
+
+    def _worker(self, stage_index: int, input_queue: queue.Queue,
+                output_queue: Optional[queue.Queue], executor, remaining: List[int],
+                remaining_lock: threading.Lock):
+        """阶段工作线程（取得闸门许可后才取条目，取到第一个条目时才初始化上下文）"""
+        stage = self.stages[stage_index]
+        gate = self._gates[stage_index]
+        context = None
+        initialized = executor is not None or stage.setup is None
+        try:
+            while True:
+                gate.acquire()
+                item = input_queue.get()
+                if item is _STOP:
+                    gate.release()
+                    break
+                start_time = time.perf_counter()
+                try:
+                    if not initialized:
+                        context = stage.setup()
+                        initialized = True
+                    item = self._handle(stage, item, context, executor)
+                except Exception as e:
+                    item.status = 'failed'
+                    item.failed_stage = stage.name
+                    item.error = str(e)
+                gate.release(item, time.perf_counter() - start_time)
+                if item.status == 'failed' or output_queue is None:
+                    self._finish(item)
+                else:
+                    output_queue.put(item)
+        finally:
+            if executor is None and stage.teardown and context is not None:
+                try:
+                    stage.teardown(context)
+                except Exception:
+                    pass
+            # 本阶段最后一个工作线程退出时通知下一阶段结束
+            with remaining_lock:
+                remaining[stage_index] -= 1
+                last = remaining[stage_index] == 0
+            if last and output_queue is not None:
+                for _ in range(self.stages[stage_index + 1].max_workers):
+                    output_queue.put(_STOP)
+
+    def run(self, items: Iterable[PipelineItem]) -> List[PipelineItem]:
+        """
+        运行流水线直到所有条目处理完毕
+
+        Args:
+            items: 待处理条目（可以是生成器，按需读取）
+
+        Returns:
+            List[PipelineItem]: 所有条目（按完成顺序）
+        """
+        self._results = []
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        self._queues = queues
+        self._gates = [_StageGate(stage.workers, stage.max_workers) for stage in self.stages]
+        # 每个阶段按 max_workers 启动工作线程，闸门决定其中多少个同时处理
+        remaining = [stage.max_workers for stage in self.stages]
+        remaining_lock = threading.Lock()
+        executors = []
+        threads = []
+
+        try:
+            for index, stage in enumerate(self.stages):
+                executor = None
+                if stage.use_processes:
+                    executor = ProcessPoolExecutor(
+                        max_workers=stage.max_workers,
+                        initializer=_init_process_stage,
+                        initargs=(stage.setup,)
+                    )
+                    executors.append(executor)
+                output_queue = queues[index + 1] if index + 1 < len(queues) else None
+                for worker_index in range(stage.max_workers):
+                    thread = threading.Thread(
+                        target=self._worker,
+                        args=(index, queues[index], output_queue, executor,
+                              remaining, remaining_lock),
+                        name=f"{stage.name}-{worker_index + 1}",
+                        daemon=True
+                    )
+                    thread.start()
+                    threads.append(thread)
+
+            if self.controller is not None:
+                self.controller.start(self)
+
+            # 按反压限制逐个投放条目
+            for item in items:
+                self.limiter.acquire(item.size)
+                queues[0].put(item)
+            for _ in range(self.stages[0].max_workers):
+                queues[0].put(_STOP)
+
+            for thread in threads:
+                thread.join()
+        finally:
+            if self.controller is not None:
+                self.controller.stop()
+            for executor in executors:
+                executor.shutdown(wait=True)
+
+        return list(self._results)
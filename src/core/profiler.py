@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""
+性能剖析模块
+--profile 模式下用cProfile包装各阶段的处理函数：汇总每个阶段的调用剖析，
+保留最慢的N个文档各自的剖析结果，并找出占用时间最多的辅助函数。
+未启用时不替换任何函数，没有额外开销
+"""
+
+import cProfile
+import functools
+import heapq
+import itertools
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from . import workflow as workflow_module
+from .evaluation_filler import EvaluationFiller
+from .file_renamer import FileRenamer
+from .pdf_converter import PDFConverter
+from .workflow import StudentWorkflow
+
+
+# pstats中函数的标识：(文件名, 行号, 函数名)
+FunctionKey = Tuple[str, int, str]
+
+# 调用方占比超过该比例的被调函数视为薄包装，继续向下查找真正耗时的辅助函数
+WRAPPER_SHARE = 0.9
+
+# Python 3.12起cProfile基于sys.monitoring，同一时刻只能有一个剖析器处于启用状态
+_EXCLUSIVE_PROFILING = sys.version_info >= (3, 12)
+
+
+def _basename_of(index: int) -> Callable:
+    """返回从第index个位置参数（路径）中取文件名的函数"""
+    return lambda *args, **kwargs: os.path.basename(str(args[index]))
+
+
+def _item_name(*args, **kwargs) -> str:
+    """从流水线条目中取源文件名"""
+    item = next(arg for arg in args if hasattr(arg, 'data'))
+    return os.path.basename(item.data.get('source_path') or item.key)
+
+
+# 被剖析的函数：(所属对象, 属性名, 阶段, 取文档名称的函数)
+# 分阶段处理使用 process_files / _process_single_file / convert_single_file，
+# 流水线使用 StudentWorkflow.rename / fill_student_item，原生后端转换使用 _convert_native
+PROFILE_TARGETS = (
+    (FileRenamer, 'process_files', 'rename', _basename_of(2)),
+    (StudentWorkflow, 'rename', 'rename', _item_name),
+    (EvaluationFiller, '_process_single_file', 'fill', _basename_of(1)),
+    (workflow_module, 'fill_student_item', 'fill', _item_name),
+    (PDFConverter, 'convert_single_file', 'convert', _basename_of(1)),
+    (PDFConverter, '_convert_native', 'convert', _basename_of(1)),
+)
+
+
+def _function_key(func: Callable) -> FunctionKey:
+    code = func.__code__
+    return code.co_filename, code.co_firstlineno, code.co_name
+
+
+def format_function(key: FunctionKey) -> str:
+    """格式化函数标识，如 evaluation_filler.py:294(_find_academic_year_table)"""
+    filename, line, name = key
+    if filename == '~':
+        # 内置函数
+        return name
+    return f"{os.path.basename(filename)}:{line}({name})"
+
+
+def dominant_helpers(stats: pstats.Stats, roots: Set[FunctionKey], limit: int = 3,
+                     through_wrappers: bool = True) -> List[Tuple[FunctionKey, float, float]]:
+    """
+    找出被剖析函数中占用时间最多的辅助函数
+
+    从入口函数出发，沿占调用方绝大部分时间的被调函数（薄包装）向下查找，
+    直到耗时分散在几个被调函数上，返回这一层耗时最多的几个
+
+    Args:
+        stats: 剖析统计
+        roots: 入口函数（被包装的阶段函数）
+        limit: 返回的函数数量
+        through_wrappers: 是否把剖析包装和内存统计包装视为入口的一部分（从阶段入口查找时为True）
+
+    Returns:
+        List[Tuple[FunctionKey, float, float]]: [(函数, 累计耗时, 占入口总耗时的比例), ...]
+    """
+    entries = stats.stats
+
+    def outer_time(nodes: Set[FunctionKey]) -> float:
+        # 入口函数之间可能互相调用（如 convert_single_file 调用 _convert_native），只计最外层
+        return sum(entries[node][3] for node in nodes
+                   if not any(caller in nodes for caller in entries[node][4]))
+
+    # 嵌套调用经过的剖析包装和 --memory 的统计包装（_WRAPPER_FILES 中的函数）也视为入口的一部分
+    nodes = {func for func in entries
+             if func in roots or (through_wrappers and func[0] in _WRAPPER_FILES)}
+    total = outer_time(nodes)
+    if not total:
+        return []
+    visited = set(nodes)
+    while True:
+        node_time = outer_time(nodes)
+        callees: Dict[FunctionKey, float] = {}
+        for func, (_, _, _, _, callers) in entries.items():
+            if func in nodes:
+                continue
+            # 调用边上的统计为 (调用次数, 原始调用次数, 自身耗时, 累计耗时)
+            edge_time = sum(callers[node][3] for node in nodes if node in callers)
+            if edge_time:
+                callees[func] = edge_time
+        ranked = sorted(callees.items(), key=lambda pair: pair[1], reverse=True)
+        if not ranked:
+            return []
+        top, top_time = ranked[0]
+        if top_time >= WRAPPER_SHARE * node_time and top not in visited and top[0] != '~':
+            nodes = {top}
+            visited.add(top)
+            continue
+        return [(func, seconds, seconds / total) for func, seconds in ranked[:limit]]
+
+
+_MODULE_FILE = dominant_helpers.__code__.co_filename
+# 只转发调用的包装所在的文件：本模块和 memory_monitor（它导入本模块，这里不能反过来导入它）
+_WRAPPER_FILES = {_MODULE_FILE, os.path.join(os.path.dirname(_MODULE_FILE), 'memory_monitor.py')}
+
+
+class StageProfiler:
+    """按阶段收集cProfile剖析结果"""
+
+    def __init__(self, top_n: int = 10):
+        """
+        初始化剖析器
+
+        Args:
+            top_n: 每个阶段保留剖析结果的最慢文档数量
+        """
+        self.top_n = max(1, int(top_n))
+        # 阶段 -> 汇总统计
+        self._stats: Dict[str, pstats.Stats] = {}
+        # 阶段 -> 最慢文档的最小堆 [(耗时, 序号, 文档, 剖析结果)]
+        self._slowest: Dict[str, List[Tuple[float, int, str, cProfile.Profile]]] = {}
+        # 阶段 -> [文档数, 总耗时]
+        self._totals: Dict[str, List[float]] = {}
+        # 阶段 -> 入口函数
+        self._roots: Dict[str, Set[FunctionKey]] = {}
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._exclusive = threading.Lock() if _EXCLUSIVE_PROFILING else nullcontext()
+        self._local = threading.local()
+
+    def profile_call(self, stage: str, name: str, func: Callable, *args, **kwargs):
+        """
+        在cProfile下调用函数并记录结果（同一线程中嵌套的被剖析函数直接调用）
+
+        Args:
+            stage: 阶段名称
+            name: 文档名称
+            func: 被调用的函数
+        """
+        if getattr(self._local, 'active', False):
+            return func(*args, **kwargs)
+        self._local.active = True
+        try:
+            with self._exclusive:
+                profile = cProfile.Profile()
+                start_time = time.perf_counter()
+                profile.enable()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    profile.disable()
+                    self._collect(stage, name, time.perf_counter() - start_time, profile)
+        finally:
+            self._local.active = False
+
+    def _collect(self, stage: str, name: str, elapsed: float, profile: cProfile.Profile):
+        """汇总一次调用的剖析结果"""
+        profile.create_stats()
+        with self._lock:
+            if stage in self._stats:
+                self._stats[stage].add(profile)
+            else:
+                self._stats[stage] = pstats.Stats(profile)
+            totals = self._totals.setdefault(stage, [0, 0.0])
+            totals[0] += 1
+            totals[1] += elapsed
+            heap = self._slowest.setdefault(stage, [])
+            entry = (elapsed, next(self._sequence), name, profile)
+            if len(heap) < self.top_n:
+                heapq.heappush(heap, entry)
+            else:
+                heapq.heappushpop(heap, entry)
+
+    def _wrap(self, stage: str, func: Callable, name_of: Callable) -> Callable:
+        profiler = self
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                name = name_of(*args, **kwargs)
+            except Exception:
+                name = '?'
+            return profiler.profile_call(stage, name, func, *args, **kwargs)
+        return wrapper
+
+    @contextmanager
+    def installed(self) -> Iterator['StageProfiler']:
+        """在上下文中用剖析包装替换各阶段的处理函数，退出时恢复"""
+        originals = []
+        for owner, attribute, stage, name_of in PROFILE_TARGETS:
+            func = getattr(owner, attribute)
+            originals.append((owner, attribute, func))
+            self._roots.setdefault(stage, set()).add(_function_key(func))
+            setattr(owner, attribute, self._wrap(stage, func, name_of))
+        try:
+            yield self
+        finally:
+            for owner, attribute, func in reversed(originals):
+                setattr(owner, attribute, func)
+
+    def slowest(self, stage: str) -> List[Tuple[float, str, cProfile.Profile]]:
+        """阶段中最慢的文档，按耗时降序"""
+        with self._lock:
+            heap = sorted(self._slowest.get(stage, []), reverse=True)
+        return [(elapsed, name, profile) for elapsed, _, name, profile in heap]
+
+    def report_lines(self) -> List[str]:
+        """生成剖析报告"""
+        lines = []
+        with self._lock:
+            stages = sorted(self._stats, key=lambda s: self._totals[s][1], reverse=True)
+        for stage in stages:
+            count, seconds = self._totals[stage]
+            lines.append(f"[{stage}] {int(count)} 次调用，共 {seconds:.2f}s，平均 {seconds / count:.3f}s")
+            helpers = dominant_helpers(self._stats[stage], self._roots[stage])
+            for func, func_time, share in helpers:
+                lines.append(f"    {share:6.1%}  {func_time:8.3f}s  {format_function(func)}")
+            if helpers and helpers[0][2] >= 0.5 and helpers[0][0][0] != '~':
+                # 主要耗时函数再展开一层
+                inner = dominant_helpers(self._stats[stage], {helpers[0][0]}, through_wrappers=False)
+                for func, func_time, share in inner:
+                    lines.append(f"        其中 {share:6.1%}  {func_time:8.3f}s  {format_function(func)}")
+            lines.append(f"  最慢的 {min(self.top_n, int(count))} 个文档:")
+            for elapsed, name, profile in self.slowest(stage):
+                helpers = dominant_helpers(pstats.Stats(profile), self._roots[stage], limit=1)
+                hint = f"  主要耗时: {format_function(helpers[0][0])} ({helpers[0][2]:.0%})" if helpers else ''
+                lines.append(f"    {elapsed:8.3f}s  {name}{hint}")
+        return lines
+
+    def write_report(self, output_dir: str) -> Optional[str]:
+        """
+        保存剖析结果：<阶段>.prof 为阶段汇总，slowest/ 下为最慢文档各自的剖析，
+        profile_report.txt 为文字报告（.prof 文件可用 python -m pstats 或 snakeviz 查看）
+
+        Args:
+            output_dir: 保存目录
+
+        Returns:
+            Optional[str]: 报告文件路径，没有剖析数据时返回None
+        """
+        if not self._stats:
+            return None
+        slowest_dir = os.path.join(output_dir, 'slowest')
+        os.makedirs(slowest_dir, exist_ok=True)
+        for stage, stats in self._stats.items():
+            stats.dump_stats(os.path.join(output_dir, f"{stage}.prof"))
+            for rank, (_, name, profile) in enumerate(self.slowest(stage), 1):
+                safe_name = re.sub(r'[^\w.-]', '_', name)
+                profile.dump_stats(os.path.join(slowest_dir, f"{stage}-{rank:02d}-{safe_name}.prof"))
+        report_path = os.path.join(output_dir, 'profile_report.txt')
+        with open(report_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(self.report_lines()) + '\n')
+        return report_path
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+处理结果回写模块
+生成名单的副本，在每个班级工作表的末尾追加 处理状态、失败原因、输出文件、PDF文件、耗时 列，
+管理员可以直接在名单中查看每个学生的处理情况。
+xlsx名单用openpyxl只读模式逐行读取、只写模式逐行写出，内存占用不随名单行数增长；
+CSV/TSV名单逐行复制。数据来自流水线返回的条目，不重新扫描输出目录
+"""
+
+import csv
+import os
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .file_modes import atomic_path
+from .pipeline import PipelineItem
+from .roster_reader import iter_csv_rows, normalize_student_id, resolve_csv_format, roster_format
+
+
+# 追加的列
+RESULT_COLUMNS = ['处理状态', '失败原因', '输出文件', 'PDF文件', '耗时(秒)']
+
+# 失败阶段的中文名称
+STAGE_NAMES = {'rename': '重命名', 'fill': '填写评语', 'convert': '转换PDF'}
+
+
+def item_status(item: PipelineItem) -> List:
+    """
+    条目的处理结果列
+
+    Returns:
+        List: [处理状态, 失败原因, 输出文件, PDF文件, 耗时]
+    """
+    data = item.data
+    if item.status == 'failed':
+        stage = STAGE_NAMES.get(item.failed_stage, item.failed_stage or '')
+        # 填写失败的文档写入了错误文件夹
+        return ['失败', f"{stage}: {item.error or '处理失败'}", data.get('error_path') or '', '',
+                round(sum(item.timings.values()), 3)]
+    elif data.get('up_to_date'):
+        status, reason = '未变化', ''
+    elif data.get('pdf_path'):
+        status, reason = '已转换', ''
+    elif data.get('fill'):
+        status, reason = '已填写', ''
+    else:
+        status, reason = '已重命名', ''
+    return [status, reason, data.get('docx_path') or '', data.get('pdf_path') or '',
+            round(sum(item.timings.values()), 3)]
+
+
+def _find_index(header: Sequence, candidates: Sequence[str]) -> Optional[int]:
+    names = [str(value).strip() if value is not None else '' for value in header]
+    for candidate in candidates:
+        if candidate in names:
+            return names.index(candidate)
+    return None
+
+
+class _RowAnnotator:
+    """为名单行生成结果列"""
+
+    def __init__(self, results: Iterable[PipelineItem], class_name: Callable[[str], str],
+                 notes: Optional[Dict[str, str]] = None):
+        # (学号, 班级) -> 条目；同一学号出现在多个班级时按学号查到的是其中一个
+        self.by_key: Dict[Tuple[str, str], PipelineItem] = {}
+        self.by_id: Dict[str, PipelineItem] = {}
+        for item in results:
+            if 'student' in item.data:
+                student_id = item.data['student']['学号']
+                self.by_key[(student_id, item.data['class_name'])] = item
+                self.by_id.setdefault(student_id, item)
+        self.class_name = class_name
+        self.notes = notes or {}
+        self.counts: Dict[str, int] = {}
+
+    def columns(self, student_id, group: str) -> List:
+        student_id = normalize_student_id(student_id)
+        if not student_id:
+            return [''] * len(RESULT_COLUMNS)
+        expected = self.class_name(group)
+        item = self.by_key.get((student_id, expected)) or self.by_id.get(student_id)
+        if item is None:
+            reason = self.notes.get(student_id, '源文件夹中没有对应文件，或未选择该班级')
+            values = ['未处理', reason, '', '', '']
+        elif item.data['class_name'] != expected:
+            # 同一学号在其他班级（或其他名单）中已处理
+            values = ['未处理', f"学号重复，已按 {item.data['class_name']} 处理", '', '', '']
+        else:
+            values = item_status(item)
+        self.counts[values[0]] = self.counts.get(values[0], 0) + 1
+        return values
+
+
+def _annotate(rows: Iterator[Sequence], annotator: _RowAnnotator, id_columns: Sequence[str],
+              class_columns: Sequence[str], group: str) -> Iterator[List]:
+    """在表头和每一行后追加结果列；没有学号列的表原样复制"""
+    header = next(rows, None)
+    if header is None:
+        return
+    id_index = _find_index(header, id_columns)
+    if id_index is None:
+        yield list(header)
+        for row in rows:
+            yield list(row)
+        return
+    class_index = _find_index(header, class_columns)
+    yield list(header) + RESULT_COLUMNS
+    for row in rows:
+        row = list(row)
+        if not any(value not in (None, '') for value in row):
+            yield row
+            continue
+        student_id = row[id_index] if id_index < len(row) else None
+        row_group = group
+        if class_index is not None and class_index < len(row) and row[class_index] not in (None, ''):
+            row_group = str(row[class_index]).strip()
+        yield row + annotator.columns(student_id, row_group)
+
+
+def _write_xlsx(roster_path: str, output_path: str, annotator: _RowAnnotator,
+                id_columns: Sequence[str], class_columns: Sequence[str]):
+    from openpyxl import Workbook, load_workbook
+
+    source = load_workbook(roster_path, read_only=True, data_only=True)
+    target = Workbook(write_only=True)
+    try:
+        for sheet in source.worksheets:
+            # 工作表名称即班级名称（与 FileRenamer 读取名单时相同）
+            out_sheet = target.create_sheet(sheet.title)
+            for row in _annotate(sheet.iter_rows(values_only=True), annotator,
+                                 id_columns, [], sheet.title):
+                out_sheet.append(row)
+        target.save(output_path)
+    finally:
+        source.close()
+
+
+def _write_csv(roster_path: str, output_path: str, annotator: _RowAnnotator,
+               id_columns: Sequence[str], class_columns: Sequence[str]):
+    # 与读取名单时相同的编码和分隔符（包括样本之后才出现GBK字节的名单）
+    encoding, delimiter = resolve_csv_format(roster_path)
+    group = os.path.splitext(os.path.basename(roster_path))[0]
+    # 副本使用带BOM的UTF-8，Excel可以直接打开
+    with open(output_path, 'w', encoding='utf-8-sig', newline='') as target:
+        writer = csv.writer(target, delimiter=delimiter)
+        writer.writerows(_annotate(iter_csv_rows(roster_path, delimiter, encoding), annotator,
+                                   id_columns, class_columns, group))
+
+
+def results_path(roster_path: str, output_dir: str, suffix: str = '_处理结果') -> str:
+    """结果名单的路径：<输出目录>/<名单文件名><后缀><扩展名>"""
+    stem, extension = os.path.splitext(os.path.basename(roster_path))
+    return os.path.join(output_dir, f"{stem}{suffix}{extension}")
+
+
+def write_results(roster_path: str, results: Iterable[PipelineItem], output_path: str,
+                  id_columns: Sequence[str], class_columns: Sequence[str] = (),
+                  class_name: Optional[Callable[[str], str]] = None,
+                  notes: Optional[Dict[str, str]] = None) -> Dict[str, int]:
+    """
+    生成追加了处理结果列的名单副本
+
+    Args:
+        roster_path: 名单文件（.xlsx / .xlsm / .csv / .tsv）
+        results: 流水线返回的条目
+        output_path: 副本路径
+        id_columns: 学号列的候选列名
+        class_columns: CSV/TSV名单中班级列的候选列名
+        class_name: 工作表名称（或班级列的值）到条目班级名称的映射，多名单联合处理时加上名单前缀
+        notes: 学号 -> 未处理的原因（如学号冲突），没有对应条目的行使用
+
+    Returns:
+        Dict[str, int]: 各处理状态的行数
+
+    Raises:
+        ValueError: 不支持的名单格式
+    """
+    extension = os.path.splitext(roster_path)[1].lower()
+    if extension in ('.xlsx', '.xlsm'):
+        writer = _write_xlsx
+    elif roster_format(roster_path) in ('csv', 'tsv'):
+        writer = _write_csv
+    else:
+        raise ValueError(f"不支持回写该格式的名单: {extension}")
+    annotator = _RowAnnotator(results, class_name or (lambda group: group), notes)
+
+    with atomic_path(output_path, suffix='.tmp' + extension) as temp_path:
+        writer(roster_path, temp_path, annotator, id_columns, class_columns)
+    return annotator.counts
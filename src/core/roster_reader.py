@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""
+名单读取模块（CSV / TSV / Parquet）
+学生信息系统导出的CSV、TSV或Parquet文件直接作为名单，不必先转换为多工作表的xlsx：
+CSV/TSV 逐行流式读取并自动识别编码（UTF-8 / GBK）和分隔符，Parquet 只读取学号、姓名、班级三列。
+“班级”列代替每个班级一个工作表的约定，没有班级列时整个文件作为一个班级（以文件名命名）。
+结果与 FileRenamer.load_excel_data 相同：[{'学号', '姓名', '班级'}, ...]
+"""
+
+import codecs
+import csv
+import math
+import os
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+
+# 扩展名 -> 格式
+ROSTER_FORMATS = {
+    '.csv': 'csv',
+    '.tsv': 'tsv',
+    '.tab': 'tsv',
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+}
+
+# 识别编码时读取的字节数
+ENCODING_SAMPLE_SIZE = 64 * 1024
+# 确认整个文件都是UTF-8时每次读取的字节数
+_UTF8_CHECK_CHUNK = 1024 * 1024
+
+# CSV候选分隔符（按表头中出现的次数选择）
+CSV_DELIMITERS = (',', '\t', ';', '|')
+
+
+def roster_format(path: str) -> Optional[str]:
+    """名单文件的格式：csv / tsv / parquet，Excel等其他文件返回None"""
+    return ROSTER_FORMATS.get(os.path.splitext(path)[1].lower())
+
+
+def detect_encoding(path: str, sample_size: int = ENCODING_SAMPLE_SIZE) -> str:
+    """
+    识别文本名单的编码：有BOM时为 utf-8-sig，前 sample_size 字节是合法UTF-8时为 utf-8，
+    否则为 gb18030（GBK的超集，Excel在中文Windows上导出的CSV使用GBK）
+    """
+    with open(path, 'rb') as f:
+        sample = f.read(sample_size)
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    try:
+        # 样本末尾可能截断了多字节字符，用增量解码器且不结束
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'gb18030'
+
+
+def _is_utf8(path: str) -> bool:
+    """整个文件是否都是合法的UTF-8（分块解码，不解析CSV）"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(_UTF8_CHECK_CHUNK), b''):
+                decoder.decode(chunk)
+        decoder.decode(b'', final=True)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def resolve_csv_format(path: str, delimiter: Optional[str] = None,
+                       encoding: Optional[str] = None) -> Tuple[str, str]:
+    """
+    确定CSV/TSV名单的编码和分隔符（读取名单和回写处理结果共用）
+
+    编码默认自动识别：样本判断为UTF-8时再确认整个文件都是UTF-8，
+    样本之后才出现GBK字节（前面几千行都是ASCII）的文件按GBK读取；
+    分隔符默认TSV为制表符，CSV按表头中出现次数最多的候选分隔符
+
+    Returns:
+        Tuple[str, str]: (编码, 分隔符)
+    """
+    if encoding is None:
+        encoding = detect_encoding(path)
+        if encoding != 'gb18030' and not _is_utf8(path):
+            encoding = 'gb18030'
+    if delimiter is None:
+        if roster_format(path) == 'tsv':
+            delimiter = '\t'
+        else:
+            with open(path, 'r', encoding=encoding, newline='') as f:
+                header = f.readline()
+            delimiter = max(CSV_DELIMITERS, key=header.count)
+    return encoding, delimiter
+
+
+def iter_csv_rows(path: str, delimiter: Optional[str] = None,
+                  encoding: Optional[str] = None) -> Iterator[List[str]]:
+    """逐行读取CSV/TSV文件（编码和分隔符见 resolve_csv_format）"""
+    encoding, delimiter = resolve_csv_format(path, delimiter, encoding)
+    with open(path, 'r', encoding=encoding, newline='') as f:
+        yield from csv.reader(f, delimiter=delimiter)
+
+
+def normalize_student_id(value) -> Optional[str]:
+    """学号统一为字符串：数值去掉小数部分，空值返回None"""
+    if value is None:
+        return None
+    if isinstance(value, float):
+        if math.isnan(value):
+            return None
+        return str(int(value))
+    if isinstance(value, int):
+        return str(value)
+    text = str(value).strip()
+    # 数值列导出为文本时可能带有“.0”
+    if text.endswith('.0') and text[:-2].isdigit():
+        text = text[:-2]
+    return text or None
+
+
+def _find_column(columns: Sequence[str], candidates: Sequence[str]) -> Optional[str]:
+    for name in candidates:
+        if name in columns:
+            return name
+    return None
+
+
+def _resolve_columns(columns: Sequence[str], id_columns: Sequence[str], name_columns: Sequence[str],
+                     class_columns: Sequence[str], path: str) -> Tuple[str, str, Optional[str]]:
+    columns = [str(column).strip() for column in columns]
+    id_column = _find_column(columns, id_columns)
+    name_column = _find_column(columns, name_columns)
+    if not id_column or not name_column:
+        raise ValueError(f"名单 '{os.path.basename(path)}' 中找不到学号或姓名列。可用列名: {columns}")
+    return id_column, name_column, _find_column(columns, class_columns)
+
+
+def _collect(rows: Iterable[Tuple], default_class: str) -> List[Dict]:
+    """
+    按班级归集 (学号, 姓名, 班级) 行：班级按首次出现的顺序，班级内按名单顺序，
+    同一班级中重复的学号以最后一行的姓名为准（与按工作表读取时相同）
+    """
+    classes: Dict[str, Dict[str, str]] = {}
+    for raw_id, raw_name, raw_class in rows:
+        student_id = normalize_student_id(raw_id)
+        if raw_name is None or (isinstance(raw_name, float) and math.isnan(raw_name)):
+            continue
+        student_name = str(raw_name).strip()
+        if not student_id or not student_name or student_id == 'nan' or student_name == 'nan':
+            continue
+        class_name = str(raw_class).strip() if raw_class is not None else ''
+        classes.setdefault(class_name or default_class, {})[student_id] = student_name
+    return [
+        {'学号': student_id, '姓名': student_name, '班级': class_name}
+        for class_name, students in classes.items()
+        for student_id, student_name in students.items()
+    ]
+
+
+def read_csv_roster(path: str, id_columns: Sequence[str], name_columns: Sequence[str],
+                    class_columns: Sequence[str], delimiter: Optional[str] = None,
+                    encoding: Optional[str] = None) -> List[Dict]:
+    """
+    逐行读取CSV/TSV名单
+
+    Args:
+        path: 名单文件路径
+        id_columns / name_columns / class_columns: 学号、姓名、班级列的候选列名
+        delimiter: 分隔符，默认TSV为制表符，CSV按表头识别
+        encoding: 编码，默认自动识别
+
+    Returns:
+        List[Dict]: 学生数据列表
+    """
+    rows = iter_csv_rows(path, delimiter, encoding)
+    header = next(rows, None)
+    if header is None:
+        return []
+    id_column, name_column, class_column = _resolve_columns(
+        header, id_columns, name_columns, class_columns, path
+    )
+    header = [column.strip() for column in header]
+    id_index, name_index = header.index(id_column), header.index(name_column)
+    class_index = header.index(class_column) if class_column else None
+    width = max(id_index, name_index, class_index or 0) + 1
+    default_class = os.path.splitext(os.path.basename(path))[0]
+
+    def fields() -> Iterator[Tuple]:
+        for row in rows:
+            if len(row) < width:
+                row = row + [''] * (width - len(row))
+            yield row[id_index], row[name_index], row[class_index] if class_index is not None else None
+    return _collect(fields(), default_class)
+
+
+def read_parquet_roster(path: str, id_columns: Sequence[str], name_columns: Sequence[str],
+                        class_columns: Sequence[str], batch_size: int = 65536) -> List[Dict]:
+    """
+    读取Parquet名单，只读取学号、姓名、班级三列（需要 pyarrow）
+
+    Args:
+        path: 名单文件路径
+        id_columns / name_columns / class_columns: 学号、姓名、班级列的候选列名
+        batch_size: 每批读取的行数
+
+    Returns:
+        List[Dict]: 学生数据列表
+    """
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("读取Parquet名单需要安装 pyarrow: pip install pyarrow")
+    parquet_file = pq.ParquetFile(path)
+    id_column, name_column, class_column = _resolve_columns(
+        parquet_file.schema_arrow.names, id_columns, name_columns, class_columns, path
+    )
+    columns = [id_column, name_column] + ([class_column] if class_column else [])
+    default_class = os.path.splitext(os.path.basename(path))[0]
+
+    def fields() -> Iterator[Tuple]:
+        for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+            values = [batch.column(i).to_pylist() for i in range(len(columns))]
+            if not class_column:
+                values.append([None] * batch.num_rows)
+            yield from zip(*values)
+    return _collect(fields(), default_class)
+
+
+def read_roster(path: str, id_columns: Sequence[str], name_columns: Sequence[str],
+                class_columns: Sequence[str]) -> List[Dict]:
+    """按扩展名读取CSV/TSV/Parquet名单"""
+    if roster_format(path) == 'parquet':
+        return read_parquet_roster(path, id_columns, name_columns, class_columns)
+    return read_csv_roster(path, id_columns, name_columns, class_columns)
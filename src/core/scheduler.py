@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+调度模块
+根据文件大小、构建清单中的历史耗时和转换后端估计每个文档的处理成本，
+按“最长处理时间优先”(LPT)安排文档进入流水线的顺序，避免大班级排在最后拖长总耗时
+"""
+
+import heapq
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+from .build_manifest import BuildManifest
+from .pipeline import PipelineItem
+
+
+# 没有历史数据时各阶段每个文档的默认耗时（秒）
+DEFAULT_STAGE_SECONDS = {
+    'native': {'rename': 0.005, 'fill': 0.15, 'convert': 0.1},
+    'wps': {'rename': 0.005, 'fill': 0.15, 'convert': 2.0},
+}
+
+# 输出仍是最新、将被跳过的文档的估计耗时（秒）
+UP_TO_DATE_SECONDS = 0.001
+
+
+class CostModel:
+    """文档处理成本估计"""
+
+    def __init__(self, manifest: Optional[BuildManifest] = None, backend: str = 'wps'):
+        """
+        初始化成本模型
+
+        Args:
+            manifest: 构建清单，提供每个学生上次各阶段的耗时
+            backend: 本次使用的PDF转换后端
+        """
+        self.manifest = manifest
+        self.backend = backend
+        self.defaults = DEFAULT_STAGE_SECONDS.get(backend, DEFAULT_STAGE_SECONDS['wps'])
+        # 各阶段的平均每字节耗时，用于没有该学生历史记录时按大小估计
+        self.rates: Dict[str, float] = {}
+        if manifest is not None:
+            self._learn_rates()
+
+    def _history(self, entry: Dict) -> Dict[str, float]:
+        """返回可用的历史耗时（转换后端变化后，转换阶段的历史不再适用）"""
+        timings = dict(entry.get('timings') or {})
+        backend = entry.get('backend') or ''
+        if 'convert' in timings and backend.split(':')[0] != self.backend:
+            del timings['convert']
+        return timings
+
+    def _learn_rates(self):
+        """根据清单中的历史记录计算各阶段的平均每字节耗时"""
+        totals: Dict[str, float] = {}
+        sizes: Dict[str, int] = {}
+        for entry in self.manifest.entries.values():
+            stamp = entry.get('docx_stamp') or ()
+            if not stamp or not stamp[0]:
+                continue
+            for stage, seconds in self._history(entry).items():
+                totals[stage] = totals.get(stage, 0.0) + seconds
+                sizes[stage] = sizes.get(stage, 0) + stamp[0]
+        self.rates = {stage: totals[stage] / sizes[stage] for stage in totals if sizes[stage]}
+
+    def stage_cost(self, item: PipelineItem, stage: str) -> float:
+        """估计单个文档在某个阶段的耗时（秒）"""
+        if self.manifest is not None:
+            entry = self.manifest.entries.get(item.data['student']['学号'])
+            if entry:
+                history = self._history(entry)
+                if stage in history:
+                    return history[stage]
+        if stage in self.rates and item.size:
+            return self.rates[stage] * item.size
+        return self.defaults.get(stage, 0.0)
+
+    def estimate(self, item: PipelineItem) -> float:
+        """
+        估计单个文档的总处理成本（秒）
+
+        Args:
+            item: 工作条目
+
+        Returns:
+            float: 估计耗时
+        """
+        if item.data.get('docx_current'):
+            # docx无需重建；PDF是否最新要到转换阶段才能确定，按需要转换估计
+            cost = UP_TO_DATE_SECONDS
+            if item.data.get('convert') and not self._pdf_recorded(item):
+                cost += self.stage_cost(item, 'convert')
+            return cost
+        cost = self.stage_cost(item, 'rename')
+        if item.data.get('fill'):
+            cost += self.stage_cost(item, 'fill')
+        if item.data.get('convert'):
+            cost += self.stage_cost(item, 'convert')
+        return cost
+
+    def _pdf_recorded(self, item: PipelineItem) -> bool:
+        """清单中是否有同一后端生成的PDF记录"""
+        if self.manifest is None:
+            return False
+        entry = self.manifest.entries.get(item.data['student']['学号']) or {}
+        return (entry.get('backend') or '').split(':')[0] == self.backend
+
+
+class WorkStealingScheduler:
+    """
+    按班级分队列的LPT调度器
+
+    每个班级的文档按估计成本从大到小排成一个队列，班级按总成本用LPT分配给各工作通道；
+    通道上的班级处理完后，从剩余成本最大的通道窃取其最大的文档。
+    调度在成本估计上模拟执行，输出文档进入流水线的顺序；运行时各阶段共享队列，
+    空闲的工作线程会立即取走下一个文档，因此实际执行与模拟的通道负载保持一致
+    """
+
+    def __init__(self, items: List[PipelineItem], lanes: int, cost_model: CostModel):
+        """
+        初始化调度器
+
+        Args:
+            items: 待处理的工作条目
+            lanes: 并行工作通道数（通常为最慢阶段的并发数）
+            cost_model: 成本模型
+        """
+        self.lanes = max(1, int(lanes))
+        self.costs = {id(item): cost_model.estimate(item) for item in items}
+        for item in items:
+            item.data['estimated_cost'] = self.costs[id(item)]
+
+        # 每个班级一个按成本降序排列的队列
+        class_queues: Dict[str, List[PipelineItem]] = {}
+        for item in items:
+            class_queues.setdefault(item.data['class_name'], []).append(item)
+        for queue in class_queues.values():
+            queue.sort(key=lambda item: self.costs[id(item)], reverse=True)
+
+        # 按班级总成本LPT分配到通道：最大的班级交给当前负载最小的通道
+        self.lane_queues: List[Deque[Deque[PipelineItem]]] = [deque() for _ in range(self.lanes)]
+        self.lane_remaining = [0.0] * self.lanes
+        ordered = sorted(
+            class_queues.items(),
+            key=lambda pair: (-sum(self.costs[id(item)] for item in pair[1]), pair[0])
+        )
+        loads = [(0.0, lane) for lane in range(self.lanes)]
+        for _, queue in ordered:
+            load, lane = heapq.heappop(loads)
+            total = sum(self.costs[id(item)] for item in queue)
+            self.lane_queues[lane].append(deque(queue))
+            self.lane_remaining[lane] += total
+            heapq.heappush(loads, (load + total, lane))
+
+        self.steals = 0
+        self.makespan = 0.0
+
+    def _take(self, lane: int) -> Optional[PipelineItem]:
+        """从通道自己的班级队列中取下一个文档"""
+        queues = self.lane_queues[lane]
+        while queues and not queues[0]:
+            queues.popleft()
+        if not queues:
+            return None
+        item = queues[0].popleft()
+        self.lane_remaining[lane] -= self.costs[id(item)]
+        return item
+
+    def _steal(self) -> Optional[PipelineItem]:
+        """从剩余成本最大的通道窃取其成本最大的文档"""
+        candidates = [lane for lane in range(self.lanes) if any(self.lane_queues[lane])]
+        if not candidates:
+            return None
+        victim = max(candidates, key=lambda lane: self.lane_remaining[lane])
+        best_queue = None
+        for queue in self.lane_queues[victim]:
+            if queue and (best_queue is None
+                          or self.costs[id(queue[0])] > self.costs[id(best_queue[0])]):
+                best_queue = queue
+        if best_queue is None:
+            return None
+        item = best_queue.popleft()
+        self.lane_remaining[victim] -= self.costs[id(item)]
+        self.steals += 1
+        return item
+
+    def order(self) -> List[PipelineItem]:
+        """
+        模拟各通道执行，返回文档进入流水线的顺序
+
+        Returns:
+            List[PipelineItem]: 调度后的条目列表
+        """
+        result = []
+        # (通道空闲时刻, 通道号)
+        free_at = [(0.0, lane) for lane in range(self.lanes)]
+        heapq.heapify(free_at)
+        while free_at:
+            time_at, lane = heapq.heappop(free_at)
+            item = self._take(lane) or self._steal()
+            if item is None:
+                self.makespan = max(self.makespan, time_at)
+                continue
+            result.append(item)
+            heapq.heappush(free_at, (time_at + self.costs[id(item)], lane))
+        return result
+
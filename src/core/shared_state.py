@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+共享只读状态模块
+把工作进程需要的只读数据（名单、评语库、模板定位方案）序列化为一个快照文件，
+工作进程通过mmap直接访问，不再各自解析名单和模板、各自保存一份副本：
+启动时只需映射文件（O(1)），字符串在使用时才从映射中解码，
+同一台机器上所有工作进程共用操作系统页缓存中的同一份数据
+
+快照格式（小端）：
+    头部      MAGIC(8) + 段数(uint32) + 每段 名称(8) 偏移(uint64) 长度(uint64)
+    strings   所有字符串的UTF-8字节
+    students  按学号字节序排序的记录，每条6个uint32：学号、姓名、班级在字符串表中的 (偏移, 长度)
+    comments  评语数组，每条2个uint32：在字符串表中的 (偏移, 长度)
+    meta      JSON：评语库版本、学年、各评语组在 comments 中的位置、模板定位方案
+"""
+
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+MAGIC = b'SEVSNAP1'
+_HEADER = struct.Struct('<8sI')
+_SECTION = struct.Struct('<8sQQ')
+# 学生记录：学号、姓名、班级各一对 (偏移, 长度)
+_STUDENT_FIELDS = 6
+
+# 评语组（EvaluationFiller 的属性名）；academic_year_opinions 为每个学年一组
+COMMENT_GROUPS = ('academic_year_opinions', 'class_organization_evaluations',
+                  'class_teacher_evaluations', 'college_opinions')
+
+
+class _StringTable:
+    """构建快照时收集字符串，相同的字符串只保存一次"""
+
+    def __init__(self):
+        self.data = bytearray()
+        self._index: Dict[str, Tuple[int, int]] = {}
+
+    def add(self, text: str) -> Tuple[int, int]:
+        if text not in self._index:
+            encoded = text.encode('utf-8')
+            self._index[text] = (len(self.data), len(encoded))
+            self.data += encoded
+        return self._index[text]
+
+
+def build_snapshot(students: List[Dict], filler, locator_plan: Optional[Dict] = None) -> bytes:
+    """
+    序列化只读状态
+
+    Args:
+        students: 学生数据（学号、姓名、班级）
+        filler: 提供评语库的 EvaluationFiller
+        locator_plan: 模板定位方案（EvaluationFiller.compile_locator_plan 的结果）
+
+    Returns:
+        bytes: 快照内容
+    """
+    strings = _StringTable()
+
+    # 学号唯一，按UTF-8字节排序，二分查找时直接比较映射中的字节
+    unique = {str(student['学号']): student for student in students}
+    student_words: List[int] = []
+    for student_id in sorted(unique, key=lambda value: value.encode('utf-8')):
+        student = unique[student_id]
+        for text in (student_id, str(student['姓名']), str(student['班级'])):
+            student_words.extend(strings.add(text))
+
+    comment_words: List[int] = []
+    groups: Dict[str, object] = {}
+
+    def add_group(texts: Sequence[str]) -> List[int]:
+        start = len(comment_words) // 2
+        for text in texts:
+            comment_words.extend(strings.add(text))
+        return [start, len(texts)]
+
+    for name in COMMENT_GROUPS:
+        value = getattr(filler, name)
+        if name == 'academic_year_opinions':
+            groups[name] = [add_group(texts) for texts in value]
+        else:
+            groups[name] = add_group(value)
+
+    meta = json.dumps({
+        'library_version': filler.library_version,
+        'academic_years': list(filler.academic_years),
+        'comment_groups': groups,
+        'locator_plan': locator_plan,
+        'students': len(unique),
+    }, ensure_ascii=False).encode('utf-8')
+
+    sections = [
+        (b'strings', bytes(strings.data)),
+        (b'students', struct.pack(f'<{len(student_words)}I', *student_words)),
+        (b'comments', struct.pack(f'<{len(comment_words)}I', *comment_words)),
+        (b'meta', meta),
+    ]
+    offset = _HEADER.size + _SECTION.size * len(sections)
+    header = [_HEADER.pack(MAGIC, len(sections))]
+    body = []
+    for name, data in sections:
+        # 各段按8字节对齐，数组段可以直接按uint32访问
+        padding = -offset % 8
+        body.append(b'\0' * padding)
+        offset += padding
+        header.append(_SECTION.pack(name, offset, len(data)))
+        body.append(data)
+        offset += len(data)
+    return b''.join(header + body)
+
+
+def write_snapshot(data: bytes, folder: Optional[str] = None) -> str:
+    """
+    写出快照文件
+
+    Args:
+        data: 快照内容
+        folder: 存放目录，默认使用系统临时目录
+
+    Returns:
+        str: 快照文件路径（由调用方在处理结束后删除）
+    """
+    fd, path = tempfile.mkstemp(prefix='shared-state-', suffix='.snap', dir=folder)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    return path
+
+
+class StringArray(Sequence):
+    """映射在快照中的字符串数组，按下标访问时才解码"""
+
+    def __init__(self, strings: memoryview, words: memoryview, start: int, count: int):
+        self._strings = strings
+        self._words = words
+        self._start = start
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        position = (self._start + index) * 2
+        offset, length = self._words[position], self._words[position + 1]
+        return str(self._strings[offset:offset + length], 'utf-8')
+
+
+class SharedSnapshot:
+    """只读映射的快照"""
+
+    def __init__(self, path: str):
+        """
+        映射快照文件（只读）
+
+        Args:
+            path: 快照文件路径
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        magic, count = _HEADER.unpack_from(view, 0)
+        if magic != MAGIC:
+            view.release()
+            self._mmap.close()
+            raise ValueError(f"不是有效的共享状态快照: {path}")
+        sections = {}
+        for index in range(count):
+            name, offset, length = _SECTION.unpack_from(view, _HEADER.size + index * _SECTION.size)
+            sections[name.rstrip(b'\0').decode('ascii')] = view[offset:offset + length]
+        self._view = view
+        self._strings = sections['strings']
+        self._students = sections['students'].cast('I')
+        self._comments = sections['comments'].cast('I')
+        meta = json.loads(str(sections['meta'], 'utf-8'))
+        self.library_version: str = meta['library_version']
+        self.academic_years: List[str] = meta['academic_years']
+        self.locator_plan: Optional[Dict] = meta['locator_plan']
+        self.student_count: int = meta['students']
+        self._groups: Dict = meta['comment_groups']
+
+    def _text(self, offset: int, length: int) -> str:
+        return str(self._strings[offset:offset + length], 'utf-8')
+
+    def _student_id_bytes(self, index: int) -> bytes:
+        position = index * _STUDENT_FIELDS
+        offset, length = self._students[position], self._students[position + 1]
+        return self._strings[offset:offset + length].tobytes()
+
+    def find_student(self, student_id: str) -> Optional[Dict]:
+        """
+        按学号查找学生（在排序的学号数组中二分查找）
+
+        Returns:
+            Optional[Dict]: {'学号', '姓名', '班级'}，不存在时返回None
+        """
+        target = str(student_id).encode('utf-8')
+        low, high = 0, self.student_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._student_id_bytes(middle) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low == self.student_count or self._student_id_bytes(low) != target:
+            return None
+        words = self._students[low * _STUDENT_FIELDS:(low + 1) * _STUDENT_FIELDS]
+        return {
+            '学号': self._text(words[0], words[1]),
+            '姓名': self._text(words[2], words[3]),
+            '班级': self._text(words[4], words[5]),
+        }
+
+    def comments(self, name: str):
+        """
+        评语组
+
+        Returns:
+            StringArray，academic_year_opinions 为每个学年一个 StringArray 的列表
+        """
+        group = self._groups[name]
+        if name == 'academic_year_opinions':
+            return [StringArray(self._strings, self._comments, start, count) for start, count in group]
+        start, count = group
+        return StringArray(self._strings, self._comments, start, count)
+
+    def close(self):
+        """解除映射，之后不能再访问学生和评语（仍被引用的切片由垃圾回收释放）"""
+        for view in (self._students, self._comments, self._strings, self._view):
+            view.release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+
+
+# 每个进程中已映射的快照：同一进程的多个工作线程共用一个映射
+_attached: Dict[str, SharedSnapshot] = {}
+_attach_lock = threading.Lock()
+
+
+def attach(path: str) -> SharedSnapshot:
+    """映射快照（同一进程中只映射一次）"""
+    with _attach_lock:
+        snapshot = _attached.get(path)
+        if snapshot is None:
+            snapshot = _attached[path] = SharedSnapshot(path)
+        return snapshot
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+源文件夹监视模块
+在Linux上通过ctypes调用inotify监视源文件夹，其他平台退回定时扫描；
+文件在一段时间内不再变化后才作为一批交给处理流程（去抖动）
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+
+# inotify 事件掩码（见 <sys/inotify.h>）
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# inotify_event 结构头：wd, mask, cookie, len
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+def is_document(filename: str) -> bool:
+    """是否为需要处理的学年鉴定表文件（跳过Office临时文件）"""
+    return filename.endswith('.docx') and not filename.startswith('~')
+
+
+class PollingWatcher:
+    """定时扫描文件夹，比较文件大小和修改时间"""
+
+    def __init__(self, folder: str, interval: float = 1.0):
+        """
+        初始化扫描监视器
+
+        Args:
+            folder: 监视的文件夹
+            interval: 扫描间隔（秒）
+        """
+        self.folder = folder
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        """扫描文件夹，返回 文件名 -> (大小, 修改时间)"""
+        snapshot = {}
+        try:
+            entries = list(os.scandir(self.folder))
+        except OSError:
+            return snapshot
+        for entry in entries:
+            if not is_document(entry.name):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            snapshot[entry.name] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def poll(self, timeout: float) -> Set[str]:
+        """
+        等待并返回新增或变化的文件名
+
+        Args:
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            Set[str]: 变化的文件名
+        """
+        time.sleep(min(timeout, self.interval))
+        snapshot = self._scan()
+        changed = {name for name, stamp in snapshot.items() if self._snapshot.get(name) != stamp}
+        self._snapshot = snapshot
+        return changed
+
+    def close(self):
+        """定时扫描没有需要释放的资源"""
+
+
+class InotifyWatcher:
+    """通过inotify接收文件写入完成和移入事件"""
+
+    MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MODIFY
+
+    def __init__(self, folder: str):
+        """
+        初始化inotify监视器
+
+        Args:
+            folder: 监视的文件夹
+
+        Raises:
+            OSError: 当前系统不支持inotify
+        """
+        self.folder = folder
+        libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(folder), self.MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"无法监视文件夹: {folder}")
+
+    def poll(self, timeout: float) -> Set[str]:
+        """
+        等待并返回有事件的文件名（事件队列溢出时返回文件夹中的全部文件）
+
+        Args:
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            Set[str]: 变化的文件名
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        changed = set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0').decode('utf-8', 'replace')
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                # 事件丢失，重新扫描整个文件夹
+                changed.update(name for name in os.listdir(self.folder) if is_document(name))
+            elif is_document(name):
+                changed.add(name)
+        return changed
+
+    def close(self):
+        """关闭inotify文件描述符"""
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def create_watcher(folder: str, poll_interval: float = 1.0, force_polling: bool = False):
+    """
+    创建文件夹监视器：Linux上优先使用inotify，不可用时（其他平台、网络文件系统等）退回定时扫描
+
+    Args:
+        folder: 监视的文件夹
+        poll_interval: 定时扫描的间隔（秒）
+        force_polling: 强制使用定时扫描（inotify收不到网络共享上其他机器写入的事件）
+
+    Returns:
+        InotifyWatcher 或 PollingWatcher
+    """
+    if sys.platform.startswith('linux') and not force_polling:
+        try:
+            return InotifyWatcher(folder)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(folder, poll_interval)
+
+
+class DebouncedWatcher:
+    """去抖动监视：文件在 debounce 秒内没有新的变化后才输出"""
+
+    def __init__(self, folder: str, debounce: float = 2.0, poll_interval: float = 1.0,
+                 force_polling: bool = False):
+        """
+        初始化去抖动监视器
+
+        Args:
+            folder: 监视的文件夹
+            debounce: 文件静止多长时间（秒）后视为写入完成
+            poll_interval: 定时扫描的间隔（秒）
+            force_polling: 强制使用定时扫描
+        """
+        self.folder = folder
+        self.debounce = debounce
+        self.watcher = create_watcher(folder, poll_interval, force_polling)
+        # 文件名 -> 最后一次变化的时间
+        self._pending: Dict[str, float] = {}
+
+    @property
+    def backend(self) -> str:
+        """当前使用的监视方式"""
+        return 'inotify' if isinstance(self.watcher, InotifyWatcher) else 'polling'
+
+    def poll(self, timeout: float = 0.5) -> List[str]:
+        """
+        处理一轮事件，返回已经静止的文件路径
+
+        Args:
+            timeout: 本轮最长等待时间（秒）
+
+        Returns:
+            List[str]: 可以处理的文件路径（按文件名排序）
+        """
+        now = time.monotonic()
+        wait = timeout
+        if self._pending:
+            wait = min(timeout, max(0.0, min(self._pending.values()) + self.debounce - now))
+        for name in self.watcher.poll(wait):
+            self._pending[name] = time.monotonic()
+
+        now = time.monotonic()
+        ready = sorted(name for name, changed_at in self._pending.items()
+                       if now - changed_at >= self.debounce)
+        for name in ready:
+            del self._pending[name]
+        return [os.path.join(self.folder, name) for name in ready
+                if os.path.exists(os.path.join(self.folder, name))]
+
+    def batches(self, stop_after: Optional[float] = None) -> Iterator[List[str]]:
+        """
+        持续输出静止的文件批次
+
+        Args:
+            stop_after: 运行多长时间（秒）后停止，None表示一直运行
+
+        Yields:
+            List[str]: 一批文件路径
+        """
+        deadline = None if stop_after is None else time.monotonic() + stop_after
+        try:
+            while deadline is None or time.monotonic() < deadline:
+                batch = self.poll()
+                if batch:
+                    yield batch
+        finally:
+            self.watcher.close()
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+暂存输出模块
+输出目录位于网络共享（SMB）上时，逐个创建、写入、移动大量小文件很慢（每次元数据操作都是一次网络往返）。
+暂存模式下所有输出先写入本地磁盘上的镜像目录，处理结束后一次性批量发布：
+多个线程并行复制有变化的文件，每个班级文件夹先完整复制到共享上的临时文件夹，再整体替换，
+共享上不会出现写了一半的班级文件夹。
+镜像目录在多次运行之间保留，构建清单和增量处理都基于镜像，只发布有变化的条目
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from . import event_log
+from .file_modes import write_atomic
+
+
+# 镜像中记录上次发布内容的文件（不发布）
+PUBLISH_STATE_NAME = ".publish_state.json"
+
+
+def mirror_dir(output_dir: str, staging_root: str) -> str:
+    """输出目录在本地暂存根目录中的镜像目录（每个输出目录一个）"""
+    output_dir = os.path.abspath(output_dir)
+    digest = hashlib.sha1(output_dir.encode('utf-8')).hexdigest()[:12]
+    name = os.path.basename(output_dir.rstrip('\\/')) or 'output'
+    return os.path.join(os.path.abspath(staging_root), f"{name}-{digest}")
+
+
+def _fingerprint(path: str) -> List:
+    """条目的指纹：文件的 (相对路径, 大小, 修改时间ns) 列表"""
+    if os.path.isfile(path):
+        stat = os.stat(path)
+        return [['', stat.st_size, stat.st_mtime_ns]]
+    entries = []
+    for root, _, files in os.walk(path):
+        for name in files:
+            full = os.path.join(root, name)
+            stat = os.stat(full)
+            entries.append([os.path.relpath(full, path).replace(os.sep, '/'),
+                            stat.st_size, stat.st_mtime_ns])
+    return sorted(entries)
+
+
+class StagedOutput:
+    """本地镜像目录及其发布"""
+
+    def __init__(self, output_dir: str, staging_root: str = './cache/staging', workers: int = 8):
+        """
+        初始化暂存输出
+
+        Args:
+            output_dir: 最终输出目录（如网络共享）
+            staging_root: 本地暂存根目录，每个输出目录在其中有一个镜像目录
+            workers: 发布时并行复制的线程数
+        """
+        self.output_dir = output_dir
+        self.path = mirror_dir(output_dir, staging_root)
+        self.workers = max(1, workers)
+        os.makedirs(self.path, exist_ok=True)
+
+    def _load_state(self) -> Dict:
+        try:
+            with open(os.path.join(self.path, PUBLISH_STATE_NAME), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self, state: Dict):
+        write_atomic(os.path.join(self.path, PUBLISH_STATE_NAME), json.dumps(state, ensure_ascii=False))
+
+    def changed_entries(self) -> Tuple[List[str], Dict]:
+        """
+        镜像中自上次发布以来有变化（或共享上不存在）的顶层条目
+
+        Returns:
+            Tuple[List[str], Dict]: (有变化的条目名称, 各条目的当前指纹)
+        """
+        previous = self._load_state()
+        changed, current = [], {}
+        for name in sorted(os.listdir(self.path)):
+            if name == PUBLISH_STATE_NAME or name.endswith('.tmp'):
+                continue
+            current[name] = _fingerprint(os.path.join(self.path, name))
+            if previous.get(name) != current[name] or \
+                    not os.path.exists(os.path.join(self.output_dir, name)):
+                changed.append(name)
+        return changed, current
+
+    def _swap(self, name: str, temp_dir: str, run_id: str) -> Optional[str]:
+        """把复制完成的临时文件夹替换到位，返回需要删除的旧文件夹（替换失败时恢复旧文件夹）"""
+        target = os.path.join(self.output_dir, name)
+        old_dir = None
+        if os.path.exists(target):
+            old_dir = os.path.join(self.output_dir, f".{name}.old-{run_id}")
+            os.replace(target, old_dir)
+        try:
+            os.replace(temp_dir, target)
+        except OSError:
+            if old_dir is not None:
+                os.replace(old_dir, target)
+            raise
+        return old_dir
+
+    def publish(self) -> Dict:
+        """
+        发布有变化的条目
+
+        文件先复制为 <名称>.<编号>.tmp 再替换；文件夹先完整复制到 .<名称>.publishing-<编号>，
+        再把旧文件夹改名为 .<名称>.old-<编号>、新文件夹改名到位，最后删除旧文件夹。
+        所有文件的复制在同一个线程池中并行执行
+
+        Returns:
+            Dict: {'entries': 发布的条目数, 'files': 复制的文件数, 'bytes': 复制的字节数, 'seconds': 耗时}
+        """
+        start_time = time.perf_counter()
+        log = event_log.get_logger()
+        changed, fingerprints = self.changed_entries()
+        run_id = uuid.uuid4().hex[:8]
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        # 每个条目的复制任务：(源文件, 共享上的临时路径)
+        jobs: List[Tuple[str, str]] = []
+        folders: List[Tuple[str, str]] = []
+        files: List[Tuple[str, str]] = []
+        copied_bytes = 0
+        for name in changed:
+            source = os.path.join(self.path, name)
+            if os.path.isdir(source):
+                temp_dir = os.path.join(self.output_dir, f".{name}.publishing-{run_id}")
+                for root, _, names in os.walk(source):
+                    target_root = os.path.join(temp_dir, os.path.relpath(root, source))
+                    os.makedirs(target_root, exist_ok=True)
+                    for file_name in names:
+                        jobs.append((os.path.join(root, file_name), os.path.join(target_root, file_name)))
+                folders.append((name, temp_dir))
+            else:
+                temp_path = os.path.join(self.output_dir, f"{name}.{run_id}.tmp")
+                jobs.append((source, temp_path))
+                files.append((name, temp_path))
+        for source, _ in jobs:
+            copied_bytes += os.path.getsize(source)
+
+        stale: List[str] = []
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='publish') as pool:
+                list(pool.map(lambda job: shutil.copy2(*job), jobs))
+                for name, temp_path in files:
+                    os.replace(temp_path, os.path.join(self.output_dir, name))
+                for name, temp_dir in folders:
+                    old_dir = self._swap(name, temp_dir, run_id)
+                    if old_dir is not None:
+                        stale.append(old_dir)
+                    log.debug(f"✓ 已发布 {name}", event='publish_entry', entry=name)
+                # 被替换的旧文件夹并行删除
+                list(pool.map(lambda path: shutil.rmtree(path, ignore_errors=True), stale))
+        except Exception:
+            # 未替换到位的临时文件和文件夹不留在共享上
+            for _, temp_path in files:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+            for path in [temp_dir for _, temp_dir in folders] + stale:
+                if os.path.exists(path):
+                    shutil.rmtree(path, ignore_errors=True)
+            raise
+
+        state = self._load_state()
+        state.update({name: fingerprints[name] for name in changed})
+        self._save_state(state)
+        return {
+            'entries': len(changed),
+            'files': len(jobs),
+            'bytes': copied_bytes,
+            'seconds': time.perf_counter() - start_time,
+        }
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+时间线追踪模块
+把每个工作单元（发现、分派、复制、填写的载入/定位/写出、转换、合并）记录为一个区间，
+导出为Chrome trace-event JSON，可在 Perfetto (ui.perfetto.dev) 或 chrome://tracing 中查看，
+直观看出哪个工作池在空等、哪个转换器把所有任务串行化了。
+未启用追踪时 span() 直接返回，不记录任何内容
+"""
+
+import json
+import multiprocessing
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+# 一个区间：(名称, 开始时间ns, 持续时间ns, 进程号, 工作者, 参数)
+SpanRecord = Tuple[str, int, int, int, str, Dict]
+
+
+class Tracer:
+    """区间记录器（线程安全）"""
+
+    def __init__(self):
+        self.pid = os.getpid()
+        # 时间使用单调时钟（Linux上各进程共用），子进程记录的区间可以直接合并
+        self.origin_ns = time.perf_counter_ns()
+        self._spans: List[SpanRecord] = []
+        self._lock = threading.Lock()
+
+    def record(self, name: str, start_ns: int, duration_ns: int,
+               worker: Optional[str] = None, pid: Optional[int] = None, args: Optional[Dict] = None):
+        """记录一个已结束的区间"""
+        span = (name, start_ns, duration_ns, pid or os.getpid(),
+                worker or threading.current_thread().name, args or {})
+        with self._lock:
+            self._spans.append(span)
+
+    def extend(self, spans: List[SpanRecord]):
+        """合并子进程中记录的区间"""
+        with self._lock:
+            self._spans.extend(spans)
+
+    @property
+    def span_count(self) -> int:
+        with self._lock:
+            return len(self._spans)
+
+    def to_chrome_trace(self) -> Dict:
+        """
+        转换为Chrome trace-event格式
+
+        每个工作线程（或进程池中的工作进程）是一条轨道，区间为完整事件（ph='X'），
+        时间单位为微秒，从追踪开始时计时
+        """
+        with self._lock:
+            spans = list(self._spans)
+        events = []
+        # (进程号, 工作者名称) -> 轨道号
+        tracks: Dict[Tuple[int, str], int] = {}
+        for pid in sorted({span[3] for span in spans} | {self.pid}):
+            label = '主进程' if pid == self.pid else f'工作进程 {pid}'
+            events.append({'ph': 'M', 'name': 'process_name', 'pid': pid, 'tid': 0,
+                           'args': {'name': label}})
+        for name, start_ns, duration_ns, pid, worker, args in sorted(spans, key=lambda s: s[1]):
+            track = tracks.get((pid, worker))
+            if track is None:
+                track = tracks[(pid, worker)] = len(tracks) + 1
+                events.append({'ph': 'M', 'name': 'thread_name', 'pid': pid, 'tid': track,
+                               'args': {'name': worker}})
+            events.append({
+                'ph': 'X', 'name': name, 'cat': name.split('-')[0],
+                'ts': (start_ns - self.origin_ns) / 1000, 'dur': duration_ns / 1000,
+                'pid': pid, 'tid': track, 'args': dict(args, worker=worker),
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write(self, path: str) -> str:
+        """
+        写入trace JSON文件
+
+        Args:
+            path: 文件路径
+
+        Returns:
+            str: 文件路径
+        """
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_chrome_trace(), f, ensure_ascii=False)
+        return path
+
+
+# 当前启用的追踪器
+_tracer: Optional[Tracer] = None
+# 子进程中收集区间的缓冲（随流水线条目传回主进程）
+_capture = threading.local()
+
+
+def start() -> Tracer:
+    """启用追踪，返回追踪器"""
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def stop() -> Optional[Tracer]:
+    """停止追踪，返回停止前的追踪器"""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def is_enabled() -> bool:
+    """是否正在追踪"""
+    return _tracer is not None
+
+
+def merge(spans: List[SpanRecord]):
+    """把子进程传回的区间合并到当前追踪器"""
+    if _tracer is not None and spans:
+        _tracer.extend(spans)
+
+
+@contextmanager
+def span(name: str, **args) -> Iterator[Dict]:
+    """
+    记录一个区间
+
+    Args:
+        name: 区间名称（discover/route/copy/fill-load/fill-locate/fill-serialize/fill-write/convert/merge）
+        **args: 附加信息（文件、字节数等）
+
+    Yields:
+        Dict: 参数字典，区间结束前可以继续补充（如输出字节数）
+    """
+    buffer = getattr(_capture, 'spans', None)
+    tracer = _tracer
+    if buffer is None and (tracer is None or tracer.pid != os.getpid()):
+        # 未启用，或位于没有收集缓冲的子进程中（fork继承了主进程的追踪器）
+        yield args
+        return
+    start_ns = time.perf_counter_ns()
+    try:
+        yield args
+    finally:
+        duration_ns = time.perf_counter_ns() - start_ns
+        if buffer is not None:
+            buffer.append((name, start_ns, duration_ns, os.getpid(),
+                           multiprocessing.current_process().name, args))
+        else:
+            tracer.record(name, start_ns, duration_ns, args=args)
+
+
+@contextmanager
+def capture() -> Iterator[List[SpanRecord]]:
+    """在子进程中收集区间，供主进程合并"""
+    _capture.spans = spans = []
+    try:
+        yield spans
+    finally:
+        _capture.spans = None
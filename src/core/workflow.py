@@ -0,0 +1,527 @@
+# -*- coding: utf-8 -*-
+"""
+学生处理流程模块
+将每个学生的文件按 重命名 → 填写评语 → PDF转换 的顺序送入流式流水线
+"""
+
+import functools
+import hashlib
+import os
+import shutil
+import tempfile
+from typing import Callable, Dict, List, Optional
+
+from .build_manifest import BuildManifest, hash_row
+from .class_archive import ClassArchiveWriter
+from .document_store import DocumentStore
+from .evaluation_filler import EvaluationFiller, student_seed
+from .file_modes import write_atomic
+from .file_renamer import FileRenamer
+from .metrics import MetricsRegistry
+from .pipeline import PipelineItem, PipelineStage, StreamingPipeline
+from . import shared_state, tracing
+
+
+# 评语填写失败的文件存放的文件夹名（与 EvaluationFiller.process_class_files 一致）
+FILL_ERROR_FOLDER = "处理失败的文件"
+
+
+def shard_of(student_id: str, shard_count: int) -> int:
+    """
+    按学号的稳定哈希计算所属分片
+
+    使用SHA-1而不是内置hash()，保证不同机器、不同进程得到相同结果
+
+    Args:
+        student_id: 学号
+        shard_count: 分片总数
+
+    Returns:
+        int: 分片序号（从0开始）
+    """
+    digest = hashlib.sha1(student_id.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % shard_count
+
+
+def filter_shard(student_data: List[Dict], shard_index: int, shard_count: int) -> List[Dict]:
+    """
+    筛选属于指定分片的学生，各分片互不相交且合起来覆盖全部学生
+
+    Args:
+        student_data: 学生数据列表
+        shard_index: 分片序号（从0开始）
+        shard_count: 分片总数
+
+    Returns:
+        List[Dict]: 属于该分片的学生
+    """
+    return [s for s in student_data if shard_of(s['学号'], shard_count) == shard_index]
+
+
+def fill_payload(item: PipelineItem) -> Dict:
+    """
+    进程池填写时传给子进程的条目数据：只有学号、是否填写和文档内容，
+    学生记录由子进程在共享快照中查找，路径、构建输入等留在主进程中
+    """
+    return {
+        'student_id': str(item.data['student']['学号']),
+        'fill': item.data.get('fill'),
+        'docx_bytes': item.data.get('docx_bytes'),
+    }
+
+
+def fill_student_item(item: PipelineItem, filler: EvaluationFiller) -> bool:
+    """
+    填写阶段处理函数（可在子进程中执行），直接在内存中填写 item.data['docx_bytes']
+
+    进程池中的条目只带学号（fill_payload），学生记录在共享快照中查找
+
+    Args:
+        item: 工作条目
+        filler: 当前工作线程/进程的评语填写器
+
+    Returns:
+        bool: 是否填写成功
+    """
+    if not item.data.get('fill') or item.data.get('docx_bytes') is None:
+        return True
+    seed = item.data.get('seed')
+    if seed is None:
+        student = filler.snapshot.find_student(item.data['student_id']) if filler.snapshot else None
+        if student is None:
+            item.error = f"共享状态中没有学号 {item.data['student_id']}"
+            return False
+        seed = student_seed(student['学号'])
+    ok, item.data['docx_bytes'] = filler.fill_bytes(item.data['docx_bytes'], seed)
+    if ok:
+        return True
+    item.error = "评语未能全部填写，文件已移至错误文件夹"
+    return False
+
+
+def shared_filler(snapshot_path: str) -> EvaluationFiller:
+    """填写阶段的工作进程/线程初始化函数：映射共享只读状态并创建评语填写器"""
+    return EvaluationFiller(snapshot=shared_state.attach(snapshot_path))
+
+
+class StudentWorkflow:
+    """学生文件流式处理流程"""
+
+    def __init__(self, file_renamer: FileRenamer, output_dir: str, fill_classes: List[str],
+                 convert: bool = False,
+                 converter_factory: Optional[Callable[[], object]] = None,
+                 manifest: Optional[BuildManifest] = None, incremental: bool = True,
+                 store: Optional[DocumentStore] = None,
+                 archive: Optional[ClassArchiveWriter] = None, keep_files: bool = True,
+                 metrics: Optional[MetricsRegistry] = None,
+                 filler_factory: Optional[Callable[[], EvaluationFiller]] = None,
+                 bundle_pdfs: bool = True):
+        """
+        初始化处理流程
+
+        Args:
+            file_renamer: 文件重命名器
+            output_dir: 输出目录
+            fill_classes: 需要填写评语的班级（其余班级只重命名）
+            convert: 是否转换PDF
+            converter_factory: 创建PDF转换器的函数，每个转换工作线程调用一次
+            manifest: 构建清单，为None时不记录构建输入
+            incremental: 是否跳过清单中仍为最新的输出（False时全部重建，但仍更新清单）
+            store: 阶段之间传递文档内容的存储，默认创建256MB预算的存储；
+                只有最终的docx和PDF会写入输出目录
+            archive: 班级压缩包写入器，提供时完成的docx和PDF直接写入 <班级>.zip
+            keep_files: 是否在输出目录中保留散装文件（使用压缩包时可以关闭）
+            metrics: 运行指标注册表，提供时记录每个文件各阶段的耗时和结果
+            filler_factory: 创建评语填写器的函数，每个填写工作线程调用一次（调用方复用已预热的填写器时提供；
+                使用进程池时必须可以pickle），默认新建填写器或映射共享快照
+            bundle_pdfs: 之后是否合并班级PDF；不保留散装文件且不合并时，原生后端生成的PDF
+                直接写入班级压缩包，不再写出临时文件
+        """
+        self.file_renamer = file_renamer
+        self.output_dir = output_dir
+        self.fill_classes = set(fill_classes)
+        self.convert = convert and converter_factory is not None
+        self.converter_factory = converter_factory
+        self.filler_factory = filler_factory
+        self.manifest = manifest
+        self.incremental = incremental and manifest is not None
+        self.library_version = EvaluationFiller().library_version
+        self.store = store if store is not None else DocumentStore()
+        self.archive = archive
+        self.keep_files = keep_files or archive is None
+        self.metrics = metrics
+        # 不保留散装文件时，PDF先生成在临时目录中，供合并班级PDF后删除
+        self.pdf_root = output_dir if self.keep_files else tempfile.mkdtemp(prefix='archive-work-')
+        # 只写压缩包且不合并班级PDF时，PDF不需要落盘
+        self.pdf_in_memory = not self.keep_files and not bundle_pdfs
+        # 共享只读状态快照文件（publish_shared_state 创建，finish 时删除）
+        self.snapshot_path: Optional[str] = None
+
+    def build_items(self, student_data: List[Dict], source_dir: Optional[str],
+                    source_index: Optional[Dict[str, str]] = None) -> List[PipelineItem]:
+        """
+        为名单中在源目录里有对应文件的学生创建工作条目
+
+        Args:
+            student_data: 学生数据列表
+            source_dir: 源文件目录
+            source_index: 学号到源文件路径的索引（多个源文件夹时由调用方建立），提供时不再扫描 source_dir
+
+        Returns:
+            List[PipelineItem]: 工作条目列表
+        """
+        if source_index is None:
+            with tracing.span('discover', folder=source_dir) as span_args:
+                source_index = self.file_renamer.build_source_index(source_dir)
+                span_args['files'] = len(source_index)
+        items = []
+        for student in student_data:
+            source_path = source_index.get(student['学号'])
+            if not source_path:
+                continue
+            with tracing.span('route', file=os.path.basename(source_path)):
+                items.append(self._build_item(student, source_path))
+        return items
+
+    def _build_item(self, student: Dict, source_path: str) -> PipelineItem:
+        """为一个学生创建工作条目：确定班级、是否填写/转换，以及上次的输出是否仍是最新"""
+        class_name = student['班级']
+        class_dir = os.path.join(self.output_dir, class_name)
+        fill = class_name in self.fill_classes
+        data = {
+            'student': student,
+            'source_path': source_path,
+            'class_name': class_name,
+            'error_folder': os.path.join(class_dir, FILL_ERROR_FOLDER),
+            'pdf_dir': self.pdf_dir(class_name),
+            'fill': fill,
+            'convert': self.convert and fill,
+            'seed': student_seed(student['学号']),
+        }
+        if self.manifest is not None:
+            self._check_current(data)
+        return PipelineItem(
+            f"{class_name}/{student['学号']}", data=data,
+            size=os.path.getsize(source_path)
+        )
+
+    def _check_current(self, data: Dict):
+        """计算学生的构建输入，并判断上次的输出是否仍是最新"""
+        student = data['student']
+        data['inputs'] = {
+            'source': self.manifest.source_hash(data['source_path']),
+            'row': hash_row(student),
+            'fill': data['fill'],
+            # 不填写评语时评语库和种子不影响输出
+            'library': self.library_version if data['fill'] else None,
+            'seed': data['seed'] if data['fill'] else None,
+        }
+        target_path = self.file_renamer.get_target_path(student, self.output_dir)
+        if self.incremental and self.manifest.is_docx_current(
+                student['学号'], data['inputs'], target_path):
+            data['docx_current'] = True
+            data['docx_path'] = target_path
+
+    def publish_shared_state(self, items: List[PipelineItem],
+                             folder: Optional[str] = None) -> Optional[str]:
+        """
+        生成共享只读状态快照：本次处理的学生、评语库，以及从第一个需要填写的源文件生成的模板定位方案
+
+        Args:
+            items: 工作条目
+            folder: 快照文件存放目录，默认使用系统临时目录
+
+        Returns:
+            Optional[str]: 快照文件路径，没有需要填写的文件时返回None
+        """
+        to_fill = [item for item in items if item.data.get('fill') and not item.data.get('docx_current')]
+        if not to_fill:
+            return None
+        filler = EvaluationFiller()
+        with open(to_fill[0].data['source_path'], 'rb') as f:
+            locator_plan = filler.compile_locator_plan(f.read())
+        data = shared_state.build_snapshot(
+            [item.data['student'] for item in items], filler, locator_plan
+        )
+        self.snapshot_path = shared_state.write_snapshot(data, folder)
+        return self.snapshot_path
+
+    def pdf_dir(self, class_name: str) -> str:
+        """班级PDF文件夹（不保留散装文件时位于临时目录中）"""
+        return os.path.join(self.pdf_root, class_name) + "_PDF"
+
+    def _archive_name(self, path: str, root: str) -> str:
+        return os.path.relpath(path, root).replace(os.sep, '/')
+
+    def _publish_docx(self, item: PipelineItem, path: str, data: bytes):
+        """写出最终docx：散装文件和/或班级压缩包（docx已压缩，以存储方式写入）"""
+        if self.keep_files:
+            write_atomic(path, data)
+        if self.archive is not None:
+            self.archive.add(item.data['class_name'], self._archive_name(path, self.output_dir),
+                             data, compress=False)
+
+    def _pdf_path(self, item: PipelineItem) -> str:
+        docx_name = os.path.basename(item.data['docx_path'])
+        return os.path.join(item.data['pdf_dir'], docx_name.replace('.docx', '.pdf'))
+
+    def rename(self, item: PipelineItem, context=None) -> bool:
+        """重命名阶段：读取源文件到文档存储，确定输出路径（输出仍是最新时跳过）"""
+        if item.data.get('docx_current'):
+            # 压缩包每次运行都重新生成，仍是最新的docx也要写入
+            if self.archive is not None:
+                self.archive.add_file(item.data['class_name'],
+                                      self._archive_name(item.data['docx_path'], self.output_dir),
+                                      item.data['docx_path'], compress=False)
+            return True
+        with tracing.span('copy', file=os.path.basename(item.data['source_path'])) as span_args:
+            with open(item.data['source_path'], 'rb') as f:
+                data = f.read()
+            self.store.put(item.key, data)
+            span_args['bytes'] = len(data)
+        item.data['docx_path'] = self.file_renamer.get_target_path(
+            item.data['student'], self.output_dir
+        )
+        if self.manifest is not None:
+            # 名单中姓名或班级改变后，删除上次生成的旧文件
+            current_paths = {os.path.abspath(item.data['docx_path']),
+                             os.path.abspath(self._pdf_path(item))}
+            for old_path in self.manifest.previous_outputs(item.data['student']['学号']):
+                if old_path and os.path.abspath(old_path) not in current_paths \
+                        and os.path.exists(old_path):
+                    os.remove(old_path)
+        return True
+
+    def load_document(self, item: PipelineItem):
+        """填写阶段前：从文档存储取出内容随条目传递（进程池阶段会随条目传到子进程）"""
+        if not item.data.get('docx_current'):
+            item.data['docx_bytes'] = self.store.get(item.key)
+
+    def store_document(self, item: PipelineItem, ok: bool) -> bool:
+        """
+        填写阶段后：写出最终docx；需要转换时把内容放回文档存储供转换阶段使用
+
+        填写失败的文档写入错误文件夹
+        """
+        data = item.data.pop('docx_bytes', None)
+        if data is None:
+            return ok
+        if not ok:
+            self.store.discard(item.key)
+            item.data['error_path'] = os.path.join(item.data['error_folder'],
+                                                   os.path.basename(item.data['docx_path']))
+            self._publish_docx(item, item.data['error_path'], data)
+            return False
+        with tracing.span('fill-write', file=os.path.basename(item.data['docx_path']),
+                          bytes=len(data)):
+            self._publish_docx(item, item.data['docx_path'], data)
+        if item.data.get('convert'):
+            self.store.put(item.key, data)
+        else:
+            self.store.discard(item.key)
+        return True
+
+    def convert_item(self, item: PipelineItem, converter) -> bool:
+        """转换阶段：使用当前工作线程的转换器生成PDF（优先使用文档存储中的内容）"""
+        if not item.data.get('convert'):
+            return True
+        pdf_path = self._pdf_path(item)
+        backend_identity = converter.backend_identity()
+        if item.data.get('docx_current') and self.manifest.is_pdf_current(
+                item.data['student']['学号'], backend_identity, pdf_path):
+            item.data['pdf_path'] = pdf_path
+            item.data['up_to_date'] = True
+            if self.archive is not None:
+                self.archive.add_file(item.data['class_name'],
+                                      self._archive_name(pdf_path, self.pdf_root), pdf_path)
+            return True
+        data = self.store.get(item.key)
+        docx_path = item.data['docx_path']
+        if self.pdf_in_memory and converter.backend == 'native':
+            return self._convert_to_archive(item, converter, pdf_path, data, backend_identity)
+        os.makedirs(item.data['pdf_dir'], exist_ok=True)
+        temp_docx = None
+        if not os.path.exists(docx_path) and converter.backend != 'native':
+            # 不保留散装文件时，WPS需要从文件打开，临时写出一份
+            temp_docx = os.path.join(item.data['pdf_dir'], os.path.basename(docx_path))
+            write_atomic(temp_docx, data)
+            docx_path = temp_docx
+        try:
+            success, from_cache = converter.convert_file(docx_path, pdf_path, data)
+        finally:
+            if temp_docx and os.path.exists(temp_docx):
+                os.remove(temp_docx)
+        self.store.discard(item.key)
+        item.data['from_cache'] = from_cache
+        if success:
+            item.data['pdf_path'] = pdf_path
+            item.data['backend'] = backend_identity
+            if self.archive is not None:
+                self.archive.add_file(item.data['class_name'],
+                                      self._archive_name(pdf_path, self.pdf_root), pdf_path)
+            return True
+        item.error = "PDF转换失败"
+        return False
+
+    def _convert_to_archive(self, item: PipelineItem, converter, pdf_path: str, data: bytes,
+                            backend_identity: str) -> bool:
+        """在内存中渲染PDF并直接写入班级压缩包（只写压缩包、不合并班级PDF时）"""
+        pdf_bytes, from_cache = converter.render_bytes(item.data['docx_path'], data)
+        self.store.discard(item.key)
+        item.data['from_cache'] = from_cache
+        if pdf_bytes is None:
+            item.error = "PDF转换失败"
+            return False
+        item.data['backend'] = backend_identity
+        self.archive.add(item.data['class_name'], self._archive_name(pdf_path, self.pdf_root), pdf_bytes)
+        return True
+
+    def create_pipeline(self, rename_workers: int = 4, fill_workers: int = 2,
+                        convert_workers: int = 1, fill_use_processes: bool = True,
+                        queue_size: int = 16, max_in_flight: int = 64,
+                        max_memory_mb: Optional[float] = 512,
+                        on_item_done: Optional[Callable[[PipelineItem], None]] = None,
+                        close_converters: bool = True, controller=None) -> StreamingPipeline:
+        """
+        创建 重命名 → 填写 → 转换 流水线
+
+        Args:
+            rename_workers: 重命名（读取源文件）线程数
+            fill_workers: 评语填写并发数
+            convert_workers: PDF转换并发数（每个工作线程拥有独立的转换器）
+            fill_use_processes: 评语填写是否使用进程池（绕过GIL）
+            queue_size: 阶段间队列容量
+            max_in_flight: 最大在途文件数
+            max_memory_mb: 在途文件总大小上限（MB）
+            on_item_done: 单个文件处理完成时的回调
+            close_converters: 转换工作线程结束时是否关闭转换器（转换器由调用方复用时为False）
+            controller: 并发控制器（autotune.ConcurrencyController），给出时忽略上面的并发数，
+                各阶段从本机上次保存的并发数开始（没有保存时为1），运行中在1到控制器的上限之间自动调整
+
+        已调用 publish_shared_state 时，填写阶段的每个工作进程只映射快照，不再各自构建评语库
+
+        Returns:
+            StreamingPipeline: 流水线实例
+        """
+        if controller is not None:
+            rename_workers, fill_workers, convert_workers = (
+                controller.initial_workers(name) for name in ('rename', 'fill', 'convert')
+            )
+
+        # 使用共享快照时，填写进程只接收学号和文档内容，学生记录在快照中查找
+        use_snapshot = self.filler_factory is None and bool(self.snapshot_path)
+        if self.filler_factory is not None:
+            filler_setup = self.filler_factory
+        elif use_snapshot:
+            filler_setup = functools.partial(shared_filler, self.snapshot_path)
+        else:
+            filler_setup = EvaluationFiller
+        stages = [
+            PipelineStage('rename', self.rename, workers=rename_workers),
+            PipelineStage('fill', fill_student_item, workers=fill_workers,
+                          setup=filler_setup,
+                          use_processes=fill_use_processes,
+                          prepare=self.load_document, complete=self.store_document,
+                          payload=fill_payload if use_snapshot and fill_use_processes else None),
+        ]
+        if self.convert:
+            stages.append(PipelineStage(
+                'convert', self.convert_item, workers=convert_workers,
+                setup=self.converter_factory,
+                teardown=(lambda converter: converter.cleanup()) if close_converters else None
+            ))
+        if controller is not None:
+            for stage in stages:
+                stage.max_workers = max(stage.workers, controller.max_workers.get(stage.name, 1))
+
+        def item_done(item: PipelineItem):
+            # 失败的条目可能还留在文档存储中
+            self.store.discard(item.key)
+            self.record(item)
+            self.record_metrics(item)
+            if on_item_done:
+                on_item_done(item)
+
+        return StreamingPipeline(
+            stages, queue_size=queue_size, max_in_flight=max_in_flight,
+            max_memory_mb=max_memory_mb, on_item_done=item_done, controller=controller
+        )
+
+    def finish(self) -> List[str]:
+        """
+        处理结束：关闭班级压缩包并删除临时目录
+
+        Returns:
+            List[str]: 生成的压缩包路径
+        """
+        paths = self.archive.close() if self.archive is not None else []
+        if not self.keep_files:
+            shutil.rmtree(self.pdf_root, ignore_errors=True)
+        if self.snapshot_path:
+            try:
+                os.remove(self.snapshot_path)
+            except OSError:
+                # Windows上仍被映射的文件无法删除，留在临时目录中
+                pass
+            self.snapshot_path = None
+        return paths
+
+    def record(self, item: PipelineItem):
+        """将条目的处理结果写入构建清单（失败的条目下次运行时重建）"""
+        if self.manifest is None or 'inputs' not in item.data:
+            return
+        student_id = item.data['student']['学号']
+        if item.status == 'failed':
+            self.manifest.forget(student_id)
+            return
+        if item.data.get('docx_current') and not item.data.get('convert'):
+            item.data['up_to_date'] = True
+        # 只记录实际执行的阶段耗时，跳过的阶段保留上次的记录
+        stages = [] if item.data.get('docx_current') else ['rename', 'fill']
+        if item.data.get('backend'):
+            stages.append('convert')
+        self.manifest.record(
+            student_id, item.data['inputs'], item.data['docx_path'],
+            pdf_path=item.data.get('pdf_path'), backend_identity=item.data.get('backend'),
+            timings={stage: item.timings[stage] for stage in stages if stage in item.timings}
+        )
+
+    def record_metrics(self, item: PipelineItem):
+        """将条目的结果和各阶段耗时写入指标注册表"""
+        if self.metrics is None:
+            return
+        class_name = item.data['class_name']
+        if item.status == 'failed':
+            status = 'failed'
+            self.metrics.inc('stage_failures_total', {'stage': item.failed_stage})
+        else:
+            status = 'skipped' if item.data.get('up_to_date') else 'done'
+        self.metrics.inc('documents_total', {'class': class_name, 'status': status})
+        if status == 'skipped':
+            # 跳过的文件不计入耗时分布，否则会拉低各阶段的真实耗时
+            return
+        for stage, seconds in item.timings.items():
+            self.metrics.observe('stage_seconds', seconds, {'stage': stage, 'class': class_name})
+        if 'convert' in item.timings and item.data.get('backend'):
+            self.metrics.observe('convert_seconds', item.timings['convert'], {
+                'backend': item.data['backend'].split(':')[0],
+                'cache': 'hit' if item.data.get('from_cache') else 'miss',
+            })
+        self.metrics.observe('document_seconds', sum(item.timings.values()), {'class': class_name})
+
+    @staticmethod
+    def summarize(results: List[PipelineItem]) -> Dict[str, Dict[str, int]]:
+        """
+        按班级统计处理结果
+
+        Returns:
+            Dict[str, Dict[str, int]]: 班级 -> {'success': 成功数, 'failed': 失败数}
+        """
+        summary: Dict[str, Dict[str, int]] = {}
+        for item in results:
+            stats = summary.setdefault(item.data['class_name'], {'success': 0, 'failed': 0})
+            if item.status == 'failed':
+                stats['failed'] += 1
+            else:
+                stats['success'] += 1
+        return summary
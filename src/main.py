@@ -6,8 +6,10 @@
 
 import sys
 import os
+import multiprocessing
+import time
 from pathlib import Path
-from typing import Optional, List
+from typing import Dict, Optional, List
 
 # 添加项目根目录到Python路径
 project_root = Path(__file__).parent.parent
@@ -16,6 +18,20 @@ sys.path.insert(0, str(project_root))
 from src.core.file_renamer import FileRenamer
 from src.core.evaluation_filler import EvaluationFiller
 from src.core.pdf_converter import PDFConverter
+from src.core.pdf_cache import PDFCache
+from src.core.pdf_bundler import bundle_class_pdfs
+from src.core.build_manifest import BuildManifest, MANIFEST_NAME
+from src.core.document_store import DocumentStore
+from src.core.class_archive import ClassArchiveWriter
+from src.core.metrics import MetricsRegistry, format_duration
+from src.core.scheduler import CostModel, WorkStealingScheduler
+from src.core.autotune import ConcurrencyController, host_key
+from src.core.staging import StagedOutput
+from src.core.federation import FederatedIndex, load_federated, namespaced_class
+from src.core.results_writer import results_path, write_results
+from src.core.pipeline import PipelineItem
+from src.core.workflow import StudentWorkflow
+from src.core import event_log, tracing
 from src.utils.config_handler import get_config
 from src.utils.dependency_manager import check_dependencies
 
@@ -28,12 +44,145 @@ class AutomationApp:
         self.config = get_config()
         self.file_renamer = FileRenamer()
         self.evaluation_filler = EvaluationFiller()
-        self.pdf_converter = PDFConverter()
+        self.pdf_cache = self._create_pdf_cache()
+        self.pdf_converter = self.create_pdf_converter()
+        self.metrics = MetricsRegistry()
+        self.log = self.setup_logging()
         
         print("=" * 70)
         print("          学年鉴定表自动化处理工具 v2.0")
         print("=" * 70)
     
+    def create_pdf_converter(self) -> PDFConverter:
+        """按配置创建PDF转换器（流水线中每个转换工作线程各创建一个）"""
+        return PDFConverter(
+            timeout=self.config.get('pdf_conversion.wps_timeout', 30),
+            backend=self.config.get_pdf_backend(),
+            cache=self.pdf_cache
+        )
+    
+    def create_controller(self, output_dir: str) -> Optional[ConcurrencyController]:
+        """按配置创建流水线并发控制器，未启用自动调整时返回None"""
+        if not self.config.get('pipeline.autotune.enabled', True):
+            return None
+        limit = self.config.get('pipeline.autotune.max_workers', 0) or (os.cpu_count() or 1)
+        # 每个WPS转换器都是一个Office实例，WPS后端的转换并发数不超过配置值
+        convert_limit = (limit if self.config.get_pdf_backend() == 'native'
+                         else self.config.get('pipeline.convert_workers', 1))
+        return ConcurrencyController(
+            self.config.get('pipeline.autotune.state_file', './cache/autotune.json'),
+            host_key(output_dir),
+            {'rename': limit, 'fill': limit, 'convert': convert_limit},
+            interval=self.config.get('pipeline.autotune.interval', 2.0),
+            decrease=self.config.get('pipeline.autotune.decrease', 0.5)
+        )
+    
+    def create_staging(self, output_dir: str) -> Optional[StagedOutput]:
+        """按配置创建本地暂存镜像，未启用暂存模式时返回None"""
+        if not self.config.get('output.staging.enabled', False):
+            return None
+        try:
+            return StagedOutput(
+                output_dir,
+                self.config.get('output.staging.dir', './cache/staging'),
+                self.config.get('output.staging.publish_workers', 8)
+            )
+        except OSError as e:
+            print(f"警告: 无法创建本地暂存目录，将直接写入输出目录 - {str(e)}")
+            return None
+    
+    def publish_staged(self, staging: StagedOutput) -> bool:
+        """将暂存镜像中有变化的条目发布到输出目录"""
+        print(f"\n发布到输出目录: {staging.output_dir}")
+        try:
+            stats = staging.publish()
+        except OSError as e:
+            self.log.error(f"❌ 发布失败，输出目录保持发布前的状态 - {str(e)}",
+                           event='publish_failed', error=str(e))
+            return False
+        self.metrics.set('publish_seconds', stats['seconds'])
+        self.metrics.inc('publish_files_total', value=stats['files'])
+        self.log.summary(f"✓ 已发布 {stats['entries']} 个条目（{stats['files']} 个文件，"
+                         f"{stats['bytes'] / 1024 / 1024:.1f}MB），耗时 {stats['seconds']:.1f} 秒",
+                         event='publish_done', **stats)
+        return True
+    
+    def _create_pdf_cache(self) -> Optional[PDFCache]:
+        """根据配置创建PDF缓存，未启用时返回None"""
+        if not self.config.get('pdf_conversion.cache.enabled', True):
+            return None
+        try:
+            return PDFCache(
+                self.config.get('pdf_conversion.cache.dir', './cache/pdf'),
+                self.config.get('pdf_conversion.cache.max_size_mb', 2048)
+            )
+        except OSError as e:
+            print(f"警告: 无法创建PDF缓存目录，将不使用缓存 - {str(e)}")
+            return None
+    
+    def setup_logging(self) -> event_log.EventLogger:
+        """按配置（重新）创建全局运行日志"""
+        self.log = event_log.configure(
+            self.config.get('logging.console', 'normal'),
+            self.config.get('logging.progress_interval', 0.5)
+        )
+        return self.log
+    
+    def open_run_log(self, output_dir: str) -> Optional[str]:
+        """
+        开始写入运行日志（JSONL，每行一个事件），已经打开时直接返回
+        
+        Args:
+            output_dir: 输出目录，未配置 logging.file 时写入 <输出目录>/logs/run-<时间>-<编号>.jsonl
+            
+        Returns:
+            Optional[str]: 日志路径，未启用时返回None
+        """
+        if self.log.path or not self.config.get('logging.run_log', True):
+            return self.log.path
+        path = self.config.get('logging.file') or os.path.join(
+            output_dir, 'logs', f"run-{time.strftime('%Y%m%d-%H%M%S')}-{self.log.run_id}.jsonl"
+        )
+        self.log.open(path)
+        return self.log.path
+    
+    def close_run_log(self):
+        """写完剩余事件并关闭运行日志"""
+        path = self.log.path
+        self.log.close()
+        if path:
+            print(f"📝 运行日志: {path}")
+            self.log.path = None
+    
+    def write_metrics(self, output_dir: str, basename: str = 'metrics') -> Optional[tuple]:
+        """
+        输出本次运行的指标摘要（JSON和Prometheus文本文件）
+        
+        Args:
+            output_dir: 输出目录（配置了 metrics.dir 时写入该目录）
+            basename: 文件名（不含扩展名），分片运行时各分片独立
+            
+        Returns:
+            Optional[tuple]: (JSON路径, .prom路径)，未启用或写入失败时返回None
+        """
+        if not self.config.get('metrics.enabled', True):
+            return None
+        elapsed = self.metrics.elapsed
+        processed = self.metrics.counter_value('documents_total')
+        self.metrics.set('run_duration_seconds', round(elapsed, 3))
+        if processed and elapsed > 0:
+            self.metrics.set('run_documents_per_second', round(processed / elapsed, 3))
+        try:
+            paths = self.metrics.write_summary(self.config.get('metrics.dir') or output_dir, basename)
+        except OSError as e:
+            print(f"警告: 无法写入运行指标 - {str(e)}")
+            return None
+        print(f"📊 运行指标: {paths[0]}")
+        if processed:
+            print(f"   共 {int(processed)} 个文件，耗时 {format_duration(elapsed)}，"
+                  f"平均 {processed / elapsed:.1f} 个/秒")
+        return paths
+    
     def check_dependencies(self) -> bool:
         """检查依赖项"""
         print("\n检查系统依赖项...")
@@ -148,63 +297,19 @@ class AutomationApp:
     
     def process_workflow(self):
         """执行完整的处理工作流程"""
+        output_dir = None
         try:
             # 1. 获取路径
             print("\n步骤 1: 获取文件路径")
             excel_file, source_dir, output_dir = self.get_user_paths()
             
-            # 2. 文件重命名
-            print("\n步骤 2: 文件重命名")
-            print("正在读取Excel文件并重命名文件...")
-            
-            success, available_classes = self.file_renamer.process_files(
-                excel_file, source_dir, output_dir
-            )
-            
-            if not success or not available_classes:
-                print("文件重命名失败，程序终止。")
-                return False
-            
-            # 3. 选择要处理的班级
-            print("\n步骤 3: 选择填写评语的班级")
-            selected_classes = self.select_classes(available_classes)
-            
-            if not selected_classes:
-                print("未选择任何班级，程序终止。")
+            if self.config.is_pipeline_enabled():
+                success = self.process_streaming(excel_file, source_dir, output_dir)
+            else:
+                success = self.process_in_stages(excel_file, source_dir, output_dir)
+            if not success:
                 return False
             
-            # 4. 填写评语
-            print("\n步骤 4: 填写评语")
-            for class_name in selected_classes:
-                print(f"\n正在处理班级: {class_name}")
-                class_dir = os.path.join(output_dir, class_name)
-                
-                if os.path.exists(class_dir):
-                    self.evaluation_filler.process_class_files(class_dir)
-                else:
-                    print(f"警告: 班级文件夹不存在 - {class_dir}")
-            
-            # 5. PDF转换
-            if self.config.is_pdf_conversion_enabled():
-                print("\n步骤 5: PDF转换")
-                choice = input("是否要转换为PDF格式? (y/n): ").lower()
-                
-                if choice in ['y', 'yes', '是']:
-                    for class_name in selected_classes:
-                        class_dir = os.path.join(output_dir, class_name)
-                        pdf_dir = class_dir + "_PDF"
-                        
-                        if os.path.exists(class_dir):
-                            print(f"\n转换班级 {class_name} 的文件...")
-                            success_count, error_count, failed_files = self.pdf_converter.convert_batch(
-                                class_dir, pdf_dir
-                            )
-                            
-                            if failed_files:
-                                print(f"班级 {class_name} 中有 {error_count} 个文件转换失败")
-                        else:
-                            print(f"跳过不存在的班级文件夹: {class_dir}")
-            
             print("\n" + "=" * 70)
             print("                    处理完成!")
             print("=" * 70)
@@ -221,6 +326,377 @@ class AutomationApp:
         finally:
             # 清理资源
             self.pdf_converter.cleanup()
+            if output_dir:
+                self.write_metrics(output_dir)
+            self.close_run_log()
+    
+    def ask_pdf_conversion(self) -> bool:
+        """询问是否转换PDF"""
+        if not self.config.is_pdf_conversion_enabled():
+            return False
+        choice = input("是否要转换为PDF格式? (y/n): ").lower()
+        return choice in ['y', 'yes', '是']
+    
+    def process_in_stages(self, excel_file: str, source_dir: str, output_dir: str) -> bool:
+        """
+        分阶段处理：全部重命名完成后再填写评语，全部填写完成后再转换PDF
+        
+        Returns:
+            bool: 是否成功
+        """
+        self.open_run_log(output_dir)
+        # 2. 文件重命名
+        print("\n步骤 2: 文件重命名")
+        print("正在读取Excel文件并重命名文件...")
+        
+        with self.metrics.time('class_stage_seconds', {'stage': 'rename', 'class': 'all'}):
+            success, available_classes = self.file_renamer.process_files(
+                excel_file, source_dir, output_dir
+            )
+        
+        if not success or not available_classes:
+            print("文件重命名失败，程序终止。")
+            return False
+        
+        # 3. 选择要处理的班级
+        print("\n步骤 3: 选择填写评语的班级")
+        selected_classes = self.select_classes(available_classes)
+        
+        if not selected_classes:
+            print("未选择任何班级，程序终止。")
+            return False
+        
+        # 4. 填写评语
+        print("\n步骤 4: 填写评语")
+        for class_name in selected_classes:
+            print(f"\n正在处理班级: {class_name}")
+            class_dir = os.path.join(output_dir, class_name)
+            
+            if os.path.exists(class_dir):
+                with self.metrics.time('class_stage_seconds', {'stage': 'fill', 'class': class_name}):
+                    self.evaluation_filler.process_class_files(class_dir)
+            else:
+                print(f"警告: 班级文件夹不存在 - {class_dir}")
+        
+        # 5. PDF转换
+        if self.config.is_pdf_conversion_enabled():
+            print("\n步骤 5: PDF转换")
+            if self.ask_pdf_conversion():
+                for class_name in selected_classes:
+                    class_dir = os.path.join(output_dir, class_name)
+                    pdf_dir = class_dir + "_PDF"
+                    
+                    if os.path.exists(class_dir):
+                        print(f"\n转换班级 {class_name} 的文件...")
+                        timing_start = len(self.pdf_converter.file_timings)
+                        with self.metrics.time('class_stage_seconds',
+                                               {'stage': 'convert', 'class': class_name}):
+                            success_count, error_count, failed_files = self.pdf_converter.convert_batch(
+                                class_dir, pdf_dir
+                            )
+                        for timing in self.pdf_converter.file_timings[timing_start:]:
+                            self.metrics.observe('convert_seconds', timing['total'], {
+                                'backend': self.pdf_converter.backend, 'cache': 'miss'
+                            })
+                        self.metrics.inc('documents_total', {'class': class_name, 'status': 'done'},
+                                         success_count)
+                        self.metrics.inc('documents_total', {'class': class_name, 'status': 'failed'},
+                                         error_count)
+                        
+                        if failed_files:
+                            print(f"班级 {class_name} 中有 {error_count} 个文件转换失败")
+                        
+                        if self.config.get('pdf_conversion.bundle_classes', True) and success_count:
+                            self.bundle_class(class_name, pdf_dir, output_dir)
+                    else:
+                        print(f"跳过不存在的班级文件夹: {class_dir}")
+        return True
+    
+    def load_federated(self, excel_files: List[str], source_dirs: List[str]) -> Optional[FederatedIndex]:
+        """
+        并行读取多个名单，合并为全局学生索引并报告重复和冲突的学号
+        
+        Args:
+            excel_files: 名单工作簿路径
+            source_dirs: 源文件夹路径（为空时不建立源文件索引）
+            
+        Returns:
+            Optional[FederatedIndex]: 全局索引，读取失败时返回None
+        """
+        print(f"\n读取 {len(excel_files)} 个名单、{len(source_dirs)} 个源文件夹")
+        try:
+            index = load_federated(
+                excel_files, source_dirs, self.file_renamer,
+                workers=self.config.get('federation.load_workers', 0),
+                on_conflict=self.config.get('federation.on_conflict', 'skip')
+            )
+        except (OSError, ValueError) as e:
+            self.log.error(f"❌ 读取名单失败: {str(e)}", event='federation_failed', error=str(e))
+            return None
+        for namespace, count in index.loaded.items():
+            mark = '✓' if count else '❌'
+            self.log.info(f"  {mark} {namespace}: {count} 名学生（{index.workbooks[namespace]}）",
+                          event='roster_loaded', namespace=namespace, students=count)
+        for entry in index.duplicates:
+            self.log.debug(f"  重复学号 {entry['学号']} {entry['姓名']}: 使用 {entry['kept']}，"
+                           f"忽略 {', '.join(entry['dropped'])}", event='roster_duplicate', **entry)
+        for entry in index.conflicts:
+            records = ', '.join(f"{record['班级']}/{record['姓名']}" for record in entry['records'])
+            action = f"使用 {entry['kept']}" if entry['kept'] else "均不处理"
+            self.log.warning(f"⚠️  学号冲突 {entry['学号']}: {records}（{action}）",
+                             event='roster_conflict', **entry)
+        for entry in index.source_duplicates:
+            self.log.debug(f"  学号 {entry['学号']} 在多个源文件夹中都有文件，使用 {entry['used']}",
+                           event='source_duplicate', **entry)
+        self.log.summary(
+            f"✓ 全局索引: {len(index.students)} 名学生，{len(index.get_classes())} 个班级，"
+            f"{len(index.source_index)} 个源文件；重复学号 {len(index.duplicates)} 个，"
+            f"冲突学号 {len(index.conflicts)} 个",
+            event='federation_done', students=len(index.students),
+            duplicates=len(index.duplicates), conflicts=len(index.conflicts)
+        )
+        self.file_renamer.student_data = index.students
+        return index
+    
+    def write_back_results(self, excel_files: Dict[str, str], results: List[PipelineItem],
+                           output_dir: str, namespaced: bool = False,
+                           notes: Optional[Dict[str, str]] = None) -> List[str]:
+        """
+        生成追加了处理结果列（状态、失败原因、输出文件、耗时）的名单副本
+        
+        Args:
+            excel_files: 名单前缀 -> 名单路径（单个名单时前缀不使用）
+            results: 流水线返回的条目
+            output_dir: 输出目录，副本保存为 <名单文件名>_处理结果.<扩展名>
+            namespaced: 班级名称是否带有名单前缀（多名单联合处理）
+            notes: 学号 -> 未处理的原因（如学号冲突）
+            
+        Returns:
+            List[str]: 生成的副本路径
+        """
+        if not self.config.get('output.write_back.enabled', True):
+            return []
+        suffix = self.config.get('output.write_back.suffix', '_处理结果')
+        paths = []
+        for namespace, roster_path in excel_files.items():
+            output_path = results_path(roster_path, output_dir, suffix)
+            class_name = (lambda group, namespace=namespace: namespaced_class(namespace, group)) \
+                if namespaced else None
+            try:
+                counts = write_results(roster_path, results, output_path,
+                                       self.file_renamer.possible_id_columns,
+                                       self.file_renamer.possible_class_columns, class_name, notes)
+            except (OSError, ValueError) as e:
+                self.log.warning(f"无法回写处理结果到名单副本 {roster_path} - {str(e)}",
+                                 event='write_back_failed', roster=roster_path, error=str(e))
+                continue
+            summary = "，".join(f"{status} {count}" for status, count in counts.items())
+            self.log.summary(f"📋 处理结果名单: {output_path}（{summary}）",
+                             event='write_back_done', path=output_path, counts=counts)
+            paths.append(output_path)
+        return paths
+    
+    def process_streaming(self, excel_file: str, source_dir: str, output_dir: str) -> bool:
+        """
+        流式处理：每个学生的文件依次流经 重命名 → 填写评语 → PDF转换，
+        各阶段并发执行，第一个文件填写完成后即可开始转换
+        
+        Returns:
+            bool: 是否成功
+        """
+        # 2. 读取名单
+        print("\n步骤 2: 读取学生名单")
+        student_data = self.file_renamer.load_excel_data(excel_file)
+        if not student_data:
+            print("❌ Excel文件读取失败或为空，程序终止。")
+            return False
+        self.file_renamer.student_data = student_data
+        available_classes = self.file_renamer.get_available_classes(student_data)
+        print(f"✓ 成功读取 {len(student_data)} 条学生记录")
+        
+        # 3. 选择要处理的班级
+        print("\n步骤 3: 选择填写评语的班级")
+        selected_classes = self.select_classes(available_classes)
+        if not selected_classes:
+            print("未选择任何班级，程序终止。")
+            return False
+        convert = self.ask_pdf_conversion()
+        
+        # 4. 流水线处理
+        print("\n步骤 4: 重命名、填写评语" + ("并转换PDF" if convert else ""))
+        results = self.run_streaming(student_data, source_dir, output_dir, selected_classes, convert)
+        if results is not None:
+            self.write_back_results({'': excel_file}, results, output_dir)
+        return results is not None
+    
+    def run_streaming(self, student_data: List[Dict], source_dir: str, output_dir: str,
+                      selected_classes: List[str], convert: bool,
+                      bundle: bool = True, force: bool = False,
+                      manifest_name: str = MANIFEST_NAME,
+                      archive_suffix: str = '.zip',
+                      source_index: Optional[Dict[str, str]] = None) -> Optional[List[PipelineItem]]:
+        """
+        使用流水线处理给定的学生，不进行任何交互
+        
+        Args:
+            student_data: 要处理的学生数据
+            source_dir: 源文件目录
+            output_dir: 输出目录
+            selected_classes: 需要填写评语（及转换PDF）的班级
+            convert: 是否转换PDF
+            bundle: 转换后是否合并班级PDF
+            force: 忽略构建清单，重建所有文件
+            manifest_name: 构建清单文件名（分片运行时每个分片独立）
+            archive_suffix: 班级压缩包文件名后缀（分片运行时每个分片独立）
+            source_index: 学号到源文件路径的索引（多名单联合处理时使用），提供时不扫描 source_dir
+            
+        Returns:
+            Optional[List[PipelineItem]]: 处理结果，没有可处理的文件时返回None
+        """
+        self.open_run_log(output_dir)
+        # 暂存模式：所有输出先写入本地镜像目录，处理结束后批量发布到输出目录
+        staging = self.create_staging(output_dir)
+        if staging is not None:
+            output_dir = staging.path
+        # 输出方式：files 散装文件，archive 只写班级压缩包，both 两者都写
+        output_mode = self.config.get('output.mode', 'files')
+        keep_files = output_mode != 'archive'
+        archive = ClassArchiveWriter(output_dir, archive_suffix) if output_mode in ('archive', 'both') else None
+        # 只写压缩包时没有散装文件可供比较，每次全部重建
+        manifest = BuildManifest(output_dir, manifest_name) if keep_files else None
+        store = DocumentStore(
+            self.config.get('pipeline.store_memory_mb', 256),
+            self.config.get('pipeline.spill_dir') or None
+        )
+        workflow = StudentWorkflow(
+            self.file_renamer, output_dir, selected_classes,
+            convert=convert, converter_factory=self.create_pdf_converter,
+            manifest=manifest,
+            incremental=not force and self.config.get('pipeline.incremental', True),
+            store=store, archive=archive, keep_files=keep_files,
+            metrics=self.metrics,
+            bundle_pdfs=convert and bundle and self.config.get('pdf_conversion.bundle_classes', True)
+        )
+        items = workflow.build_items(student_data, source_dir, source_index)
+        if not items:
+            workflow.finish()
+            print("❌ 源文件夹中没有与名单匹配的文件，程序终止。")
+            return None
+        
+        if self.config.get('pipeline.scheduler', 'lpt') == 'lpt':
+            lanes = max(self.config.get('pipeline.fill_workers', 2),
+                        self.config.get('pipeline.convert_workers', 1) if convert else 1)
+            scheduler = WorkStealingScheduler(
+                items, lanes, CostModel(manifest, self.config.get_pdf_backend())
+            )
+            items = scheduler.order()
+            self.log.info(f"调度: {len(items)} 个文件分配到 {lanes} 个通道，"
+                          f"预计耗时 {scheduler.makespan:.1f} 秒",
+                          event='schedule', files=len(items), lanes=lanes,
+                          makespan=round(scheduler.makespan, 3))
+        
+        if self.config.get('pipeline.shared_state', True):
+            # 名单、评语库和模板定位方案只构建一次，填写阶段的工作进程映射同一个快照文件
+            workflow.publish_shared_state(items, self.config.get('pipeline.spill_dir') or None)
+        
+        controller = self.create_controller(output_dir)
+        progress = self.log.progress(len(items), label='处理')
+        up_to_date = [0]
+        
+        def report(item):
+            # 在流水线的结果线程中调用：只把事件放入日志队列，控制台进度限速刷新
+            name = os.path.basename(item.data.get('docx_path') or item.data['source_path'])
+            fields = {'file': name, 'class': item.data['class_name'], 'item': item.key}
+            if item.status == 'failed':
+                self.log.event('document', 'warning',
+                               f"✗ {name} ({item.failed_stage}: {item.error or '处理失败'})",
+                               status='failed', stage=item.failed_stage, error=item.error, **fields)
+            elif item.data.get('up_to_date'):
+                up_to_date[0] += 1
+                self.log.event('document', 'debug', f"✓ {name} (未变化，跳过)", status='skipped', **fields)
+            else:
+                self.log.event('document', 'debug', f"✓ {name}", status='done', **fields)
+            progress.update(failed=item.status == 'failed')
+        
+        pipeline = workflow.create_pipeline(
+            rename_workers=self.config.get('pipeline.rename_workers', 4),
+            fill_workers=self.config.get('pipeline.fill_workers', 2),
+            convert_workers=self.config.get('pipeline.convert_workers', 1),
+            fill_use_processes=self.config.get('pipeline.fill_use_processes', True),
+            queue_size=self.config.get('pipeline.queue_size', 16),
+            max_in_flight=self.config.get('pipeline.max_in_flight', 64),
+            max_memory_mb=self.config.get('pipeline.max_memory_mb', 512),
+            on_item_done=report,
+            controller=controller
+        )
+        try:
+            results = pipeline.run(items)
+        finally:
+            progress.close()
+            if manifest is not None:
+                manifest.save()
+            store_stats = store.get_stats()
+            store.close()
+        if controller is not None:
+            try:
+                tuned = controller.save()
+                self.log.info("并发自动调整: " + ", ".join(f"{name} {value}" for name, value in tuned.items())
+                              + f"（调整 {controller.adjustments} 次，下次运行从该值开始）",
+                              event='autotune_saved', workers=tuned, adjustments=controller.adjustments)
+            except OSError as e:
+                self.log.warning(f"无法保存并发自动调整结果 - {str(e)}")
+        self.metrics.set('store_peak_memory_bytes', store_stats['peak_memory_bytes'])
+        self.metrics.inc('store_spills_total', value=store_stats['spilled'])
+        
+        print("\n处理结果:")
+        if up_to_date[0]:
+            print(f"  {up_to_date[0]} 个文件的输入未变化，已跳过")
+        if store_stats['spilled']:
+            print(f"  文档存储超出内存预算，{store_stats['spilled']} 次溢出到临时目录")
+        for class_name, stats in sorted(workflow.summarize(results).items()):
+            print(f"  {class_name}: 成功 {stats['success']}, 失败 {stats['failed']}")
+        
+        if convert and bundle and self.config.get('pdf_conversion.bundle_classes', True):
+            for class_name in selected_classes:
+                pdf_dir = workflow.pdf_dir(class_name)
+                if os.path.exists(pdf_dir):
+                    bundle_dir = output_dir if keep_files else workflow.pdf_root
+                    if self.bundle_class(class_name, pdf_dir, bundle_dir) and archive is not None:
+                        archive.add_file(class_name, f"{class_name}.pdf",
+                                         os.path.join(bundle_dir, f"{class_name}.pdf"))
+        for archive_path in workflow.finish():
+            print(f"✓ 已生成班级压缩包: {archive_path}")
+        if self.pdf_cache:
+            self.pdf_cache.evict()
+        if staging is not None:
+            self.publish_staged(staging)
+        return results
+    
+    def bundle_class(self, class_name: str, pdf_dir: str, output_dir: str) -> bool:
+        """
+        将班级的PDF按名单顺序合并为一个文件
+        
+        Args:
+            class_name: 班级名称
+            pdf_dir: 班级PDF文件夹
+            output_dir: 输出目录，合并文件保存为 <班级>.pdf
+            
+        Returns:
+            bool: 是否合并成功
+        """
+        bundle_path = os.path.join(output_dir, f"{class_name}.pdf")
+        try:
+            with tracing.span('merge', file=os.path.basename(bundle_path)) as span_args:
+                file_count, page_count = bundle_class_pdfs(
+                    pdf_dir, bundle_path, self.file_renamer.get_class_roster_order(class_name)
+                )
+                span_args.update(files=file_count, pages=page_count,
+                                 bytes=os.path.getsize(bundle_path))
+            print(f"✓ 已合并班级PDF: {bundle_path} ({file_count} 个文件, {page_count} 页)")
+            return True
+        except Exception as e:
+            print(f"✗ 合并班级 {class_name} 的PDF失败: {str(e)}")
+            return False
     
     def run(self):
         """运行应用程序"""
@@ -250,6 +726,14 @@ class AutomationApp:
 
 def main():
     """主函数"""
+    # 打包为exe后使用进程池需要此调用
+    multiprocessing.freeze_support()
+    
+    # 带命令行参数时以非交互的批处理模式运行
+    if len(sys.argv) > 1:
+        from src.cli import main as cli_main
+        sys.exit(cli_main())
+    
     app = AutomationApp()
     app.run()
 
@@ -0,0 +1,630 @@
+# -*- coding: utf-8 -*-
+"""
+学年鉴定表自动化处理工具 - 本地HTTP批处理服务
+各院系通过浏览器或脚本上传名单和文档压缩包，服务在预先启动的工作进程中运行流水线，
+处理完成后下载结果压缩包。仅使用标准库，不依赖外部服务
+
+接口：
+    POST   /jobs              上传 multipart/form-data：roster（名单Excel）、documents（docx压缩包），
+                              可选 classes（逗号分隔的班级）、pdf（true/false）
+    GET    /jobs/<id>         查询任务状态（JSON）
+    GET    /jobs/<id>/result  下载结果压缩包
+    DELETE /jobs/<id>         删除任务及其文件
+    GET    /health            服务状态
+
+工作进程意外退出时，它正在处理的任务标记为失败并重新启动一个工作进程；
+已结束的任务及其文件在保留时间（service.job_ttl_hours）后自动删除
+"""
+
+import email.parser
+import email.policy
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import threading
+import time
+import uuid
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.core.event_log import get_logger
+from src.core.file_modes import atomic_path
+from src.utils.config_handler import get_config
+
+
+# 预热时使用的样例文档
+WARMUP_DOCUMENT = project_root / "data" / "templates" / "四年制学年鉴定表" / "22920216666666.docx"
+
+
+def parse_multipart(content_type: str, body: bytes) -> Dict[str, Tuple[Optional[str], bytes]]:
+    """
+    解析 multipart/form-data 请求体
+
+    Args:
+        content_type: 请求的Content-Type头（包含boundary）
+        body: 请求体
+
+    Returns:
+        Dict[str, Tuple[Optional[str], bytes]]: 字段名 -> (文件名, 内容)
+    """
+    header = f"Content-Type: {content_type}\r\nMIME-Version: 1.0\r\n\r\n".encode('utf-8')
+    message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(header + body)
+    if not message.is_multipart():
+        raise ValueError("请求体不是 multipart/form-data")
+    fields = {}
+    for part in message.iter_parts():
+        name = part.get_param('name', header='content-disposition')
+        if name:
+            fields[name] = (part.get_filename(), part.get_payload(decode=True) or b'')
+    return fields
+
+
+def list_documents(archive: zipfile.ZipFile) -> Dict[str, zipfile.ZipInfo]:
+    """
+    列出压缩包中的docx文件（忽略目录结构）
+
+    Returns:
+        Dict[str, zipfile.ZipInfo]: 文件名 -> 压缩包条目
+
+    Raises:
+        ValueError: 不同文件夹中有同名文件（解压到同一文件夹时会互相覆盖）
+    """
+    documents: Dict[str, zipfile.ZipInfo] = {}
+    duplicates: List[str] = []
+    for info in archive.infolist():
+        name = os.path.basename(info.filename.replace('\\', '/'))
+        if info.is_dir() or not name.endswith('.docx') or name.startswith('~'):
+            continue
+        if name in documents and name not in duplicates:
+            duplicates.append(name)
+        documents[name] = info
+    if duplicates:
+        shown = '、'.join(duplicates[:5]) + (f" 等 {len(duplicates)} 个" if len(duplicates) > 5 else '')
+        raise ValueError(f"压缩包的不同文件夹中有同名文件: {shown}，请重命名后重新上传")
+    return documents
+
+
+def extract_documents(archive_path: str, target_dir: str) -> int:
+    """
+    从压缩包中解压docx文件到目标文件夹（忽略目录结构，防止路径穿越）
+
+    Returns:
+        int: 解压的文件数量
+
+    Raises:
+        ValueError: 不同文件夹中有同名文件
+    """
+    os.makedirs(target_dir, exist_ok=True)
+    with zipfile.ZipFile(archive_path) as archive:
+        documents = list_documents(archive)
+        for name, info in documents.items():
+            with archive.open(info) as source, open(os.path.join(target_dir, name), 'wb') as target:
+                shutil.copyfileobj(source, target)
+    return len(documents)
+
+
+def archive_outputs(output_dir: str, archive_path: str):
+    """将输出文件夹打包为结果压缩包（不包含构建清单等内部文件）"""
+    with atomic_path(archive_path) as temp_path:
+        with zipfile.ZipFile(temp_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for root, _, files in os.walk(output_dir):
+                for name in sorted(files):
+                    if name.startswith('.') or name.endswith('.tmp'):
+                        continue
+                    path = os.path.join(root, name)
+                    archive.write(path, os.path.relpath(path, output_dir))
+
+
+class _WorkerState:
+    """工作进程中常驻的组件（进程启动时创建一次，供所有任务复用）"""
+
+    def __init__(self, settings: Dict):
+        from src.core.evaluation_filler import EvaluationFiller
+        from src.core.pdf_cache import PDFCache
+        from src.core.pdf_converter import PDFConverter
+
+        self.settings = settings
+        self.cache = None
+        if settings.get('cache_dir'):
+            try:
+                self.cache = PDFCache(settings['cache_dir'], settings.get('cache_max_size_mb', 2048))
+            except OSError:
+                self.cache = None
+        self.filler = EvaluationFiller()
+        self.converter = PDFConverter(backend=settings['backend'], cache=self.cache)
+        self._warm_up()
+
+    def _warm_up(self):
+        """填写并渲染一次样例文档，预先加载docx解析、评语库和PDF渲染器"""
+        if not WARMUP_DOCUMENT.exists():
+            return
+        try:
+            data = WARMUP_DOCUMENT.read_bytes()
+            self.filler.fill_bytes(data, 0)
+            if self.settings['backend'] == 'native' and self.converter.initialize_backend():
+                self.converter.native_renderer.render_bytes(data)
+        except Exception:
+            pass
+
+    def run_job(self, job: Dict, report) -> Dict:
+        """
+        在当前进程中处理一个任务
+
+        Args:
+            job: 任务参数（job_dir、classes、pdf）
+            report: 进度回调 report(fields)
+
+        Returns:
+            Dict: 各班级处理结果
+        """
+        from src.core.build_manifest import BuildManifest
+        from src.core.document_store import DocumentStore
+        from src.core.file_renamer import FileRenamer
+        from src.core.pdf_bundler import bundle_class_pdfs
+        from src.core.workflow import StudentWorkflow
+
+        job_dir = job['job_dir']
+        source_dir = os.path.join(job_dir, 'source')
+        output_dir = os.path.join(job_dir, 'output')
+        document_count = extract_documents(os.path.join(job_dir, 'documents.zip'), source_dir)
+        if document_count == 0:
+            raise ValueError("压缩包中没有docx文件")
+
+        file_renamer = FileRenamer()
+        student_data = file_renamer.load_excel_data(os.path.join(job_dir, job['roster_name']))
+        if not student_data:
+            raise ValueError("名单读取失败或为空")
+        file_renamer.student_data = student_data
+        classes = file_renamer.get_available_classes(student_data)
+        if job.get('classes'):
+            classes = [name for name in classes if name in job['classes']]
+
+        convert = job.get('pdf', True)
+        store = DocumentStore(self.settings.get('store_memory_mb', 256))
+        # 填写和转换都使用进程启动时预热的组件
+        workflow = StudentWorkflow(
+            file_renamer, output_dir, classes, convert=convert,
+            converter_factory=lambda: self.converter,
+            manifest=BuildManifest(output_dir), store=store,
+            filler_factory=lambda: self.filler
+        )
+        items = workflow.build_items(student_data, source_dir)
+        if not items:
+            raise ValueError("压缩包中没有与名单匹配的文件")
+        report({'total': len(items), 'done': 0})
+
+        done = [0]
+
+        def item_done(item):
+            done[0] += 1
+            report({'done': done[0]})
+
+        # 任务之间复用同一个转换器，流水线结束时不关闭它；
+        # 工作进程本身就是并行单位，填写阶段不再另开进程池
+        pipeline = workflow.create_pipeline(
+            fill_workers=1, convert_workers=1, fill_use_processes=False,
+            on_item_done=item_done, close_converters=False
+        )
+        try:
+            results = pipeline.run(items)
+        finally:
+            workflow.manifest.save()
+            store.close()
+
+        if convert:
+            for class_name in classes:
+                pdf_dir = os.path.join(output_dir, class_name) + "_PDF"
+                if os.path.exists(pdf_dir):
+                    bundle_class_pdfs(pdf_dir, os.path.join(output_dir, f"{class_name}.pdf"),
+                                      file_renamer.get_class_roster_order(class_name))
+        archive_outputs(output_dir, os.path.join(job_dir, 'result.zip'))
+        if self.cache:
+            self.cache.evict()
+        return workflow.summarize(results)
+
+
+def _worker_main(job_queue, status_queue, settings: Dict):
+    """工作进程入口：加载组件后循环处理任务，收到None时退出"""
+    state = _WorkerState(settings)
+    status_queue.put((None, {'worker_ready': os.getpid()}))
+    while True:
+        job = job_queue.get()
+        if job is None:
+            break
+        job_id = job['id']
+
+        def report(fields, job_id=job_id):
+            status_queue.put((job_id, fields))
+
+        report({'state': 'running', 'started_at': time.time(), 'worker': os.getpid()})
+        try:
+            summary = state.run_job(job, report)
+            report({'state': 'done', 'finished_at': time.time(), 'summary': summary})
+        except Exception as e:
+            report({'state': 'failed', 'finished_at': time.time(), 'error': str(e)})
+    state.converter.cleanup()
+
+
+class BatchService:
+    """批处理服务：HTTP服务器 + 预先启动的工作进程池"""
+
+    # 检查工作进程是否存活的间隔（秒）
+    CHECK_INTERVAL = 1.0
+    # 清理过期任务的间隔（秒）
+    EXPIRE_INTERVAL = 60.0
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8765, workers: int = 2,
+                 jobs_dir: str = './service_jobs', max_upload_mb: float = 512,
+                 settings: Optional[Dict] = None, job_ttl_hours: float = 24):
+        """
+        初始化服务
+
+        Args:
+            host: 监听地址
+            port: 监听端口
+            workers: 工作进程数
+            jobs_dir: 任务文件存放目录
+            max_upload_mb: 单次上传大小上限（MB）
+            settings: 传给工作进程的处理设置（backend、cache_dir等）
+            job_ttl_hours: 已结束任务的保留时间（小时），之后删除任务及其文件；0 表示不删除
+        """
+        self.host = host
+        self.port = port
+        self.workers = max(1, workers)
+        self.jobs_dir = os.path.abspath(jobs_dir)
+        self.max_upload = int(max_upload_mb * 1024 * 1024)
+        self.settings = settings or {'backend': 'native'}
+        self.job_ttl = job_ttl_hours * 3600
+        self.jobs: Dict[str, Dict] = {}
+        # 已加载完成的工作进程PID
+        self._ready_pids = set()
+        self.restarted_workers = 0
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        # Linux上使用fork：工作进程直接继承主进程中已经导入的模块
+        methods = multiprocessing.get_all_start_methods()
+        self._context = multiprocessing.get_context('fork' if 'fork' in methods else 'spawn')
+        self._job_queue = self._context.Queue()
+        self._status_queue = self._context.Queue()
+        self._processes = []
+        self.httpd: Optional[ThreadingHTTPServer] = None
+
+    def start(self):
+        """预加载依赖并启动工作进程和状态收集线程"""
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        # 在fork之前导入较慢的依赖，工作进程无需重复导入
+        import src.core.workflow  # noqa: F401
+        import src.core.pdf_bundler  # noqa: F401
+        import src.core.native_renderer  # noqa: F401
+        import pandas  # noqa: F401
+
+        self._expire_jobs()
+        for _ in range(self.workers):
+            self._processes.append(self._spawn_worker())
+        threading.Thread(target=self._collect_status, name='status', daemon=True).start()
+        threading.Thread(target=self._supervise, name='supervisor', daemon=True).start()
+
+        self.httpd = ThreadingHTTPServer((self.host, self.port), _ServiceHandler)
+        self.httpd.service = self
+        self.port = self.httpd.server_address[1]
+
+    @property
+    def ready_workers(self) -> int:
+        """已加载完成且仍在运行的工作进程数"""
+        with self._lock:
+            return len(self._ready_pids)
+
+    def _spawn_worker(self):
+        """启动一个工作进程"""
+        process = self._context.Process(
+            target=_worker_main, args=(self._job_queue, self._status_queue, self.settings),
+            daemon=True
+        )
+        process.start()
+        return process
+
+    def _collect_status(self):
+        """接收工作进程发回的任务状态"""
+        while True:
+            try:
+                job_id, fields = self._status_queue.get()
+            except (EOFError, OSError):
+                return
+            with self._lock:
+                if job_id is None:
+                    self._ready_pids.add(fields['worker_ready'])
+                elif job_id in self.jobs and self.jobs[job_id]['state'] not in ('done', 'failed'):
+                    # 已判定失败的任务（工作进程退出）不再接受迟到的状态
+                    self.jobs[job_id].update(fields)
+
+    def _supervise(self):
+        """定期检查工作进程和清理过期任务，直到服务停止"""
+        last_expire = time.monotonic()
+        while not self._stopping.wait(self.CHECK_INTERVAL):
+            self._check_workers()
+            if time.monotonic() - last_expire >= self.EXPIRE_INTERVAL:
+                last_expire = time.monotonic()
+                self._expire_jobs()
+
+    def _check_workers(self):
+        """把退出的工作进程正在处理的任务标记为失败，并启动新的工作进程替代它"""
+        for index, process in enumerate(self._processes):
+            if process.is_alive() or self._stopping.is_set():
+                continue
+            pid = process.pid
+            failed = []
+            with self._lock:
+                self._ready_pids.discard(pid)
+                for job_id, status in self.jobs.items():
+                    if status['state'] == 'running' and status.get('worker') == pid:
+                        status.update({
+                            'state': 'failed', 'finished_at': time.time(),
+                            'error': f"工作进程意外退出（退出码 {process.exitcode}）"
+                        })
+                        failed.append(job_id)
+                self.restarted_workers += 1
+            get_logger().warning(
+                f"工作进程 {pid} 意外退出（退出码 {process.exitcode}），"
+                f"{'任务 ' + '、'.join(failed) + ' 已标记为失败，' if failed else ''}正在重新启动",
+                event='service_worker_died', pid=pid, exitcode=process.exitcode, jobs=failed
+            )
+            self._processes[index] = self._spawn_worker()
+
+    def _expire_jobs(self, now: Optional[float] = None) -> List[str]:
+        """
+        删除超过保留时间的已结束任务及其文件（包括服务上次运行时留下的任务文件夹）
+
+        Returns:
+            List[str]: 删除的任务ID
+        """
+        if self.job_ttl <= 0:
+            return []
+        now = time.time() if now is None else now
+        with self._lock:
+            expired = [
+                job_id for job_id, status in self.jobs.items()
+                if status['state'] in ('done', 'failed') and now - status['finished_at'] > self.job_ttl
+            ]
+            for job_id in expired:
+                del self.jobs[job_id]
+            known = set(self.jobs)
+        try:
+            names = os.listdir(self.jobs_dir)
+        except OSError:
+            names = []
+        for name in names:
+            path = os.path.join(self.jobs_dir, name)
+            if name in expired:
+                shutil.rmtree(path, ignore_errors=True)
+            elif name not in known and os.path.isdir(path):
+                try:
+                    stale = now - os.path.getmtime(path) > self.job_ttl
+                except OSError:
+                    continue
+                if stale:
+                    shutil.rmtree(path, ignore_errors=True)
+                    expired.append(name)
+        return expired
+
+    def submit(self, fields: Dict[str, Tuple[Optional[str], bytes]]) -> Dict:
+        """
+        创建任务并放入队列
+
+        Args:
+            fields: 上传的表单字段
+
+        Returns:
+            Dict: 任务状态
+
+        Raises:
+            ValueError: 缺少名单或压缩包
+        """
+        roster_name, roster = fields.get('roster', (None, b''))
+        _, documents = fields.get('documents', (None, b''))
+        if not roster or not documents:
+            raise ValueError("需要上传 roster（名单Excel）和 documents（docx压缩包）")
+        from src.core.roster_reader import roster_format
+        extension = os.path.splitext(roster_name or '')[1].lower() or '.xlsx'
+        if extension not in ('.xlsx', '.xls') and not roster_format('roster' + extension):
+            raise ValueError("名单必须是 .xlsx、.xls、.csv、.tsv 或 .parquet 文件")
+        # 上传时就检查压缩包，同名文件等问题直接返回给提交者
+        try:
+            with zipfile.ZipFile(io.BytesIO(documents)) as archive:
+                document_count = len(list_documents(archive))
+        except zipfile.BadZipFile:
+            raise ValueError("documents 不是有效的zip压缩包")
+        if document_count == 0:
+            raise ValueError("压缩包中没有docx文件")
+
+        job_id = uuid.uuid4().hex[:12]
+        job_dir = os.path.join(self.jobs_dir, job_id)
+        os.makedirs(job_dir)
+        with open(os.path.join(job_dir, 'roster' + extension), 'wb') as f:
+            f.write(roster)
+        with open(os.path.join(job_dir, 'documents.zip'), 'wb') as f:
+            f.write(documents)
+
+        classes_text = fields.get('classes', (None, b''))[1].decode('utf-8').strip()
+        pdf_text = fields.get('pdf', (None, b'true'))[1].decode('utf-8').strip().lower()
+        job = {
+            'id': job_id,
+            'job_dir': job_dir,
+            'roster_name': 'roster' + extension,
+            'classes': [name.strip() for name in classes_text.split(',') if name.strip()],
+            'pdf': pdf_text not in ('0', 'false', 'no'),
+        }
+        status = {'id': job_id, 'state': 'queued', 'submitted_at': time.time(),
+                  'done': 0, 'total': None}
+        with self._lock:
+            self.jobs[job_id] = status
+        self._job_queue.put(job)
+        return dict(status)
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        """获取任务状态的副本"""
+        with self._lock:
+            status = self.jobs.get(job_id)
+            return dict(status) if status else None
+
+    def result_path(self, job_id: str) -> str:
+        """任务结果压缩包的路径"""
+        return os.path.join(self.jobs_dir, job_id, 'result.zip')
+
+    def delete_job(self, job_id: str) -> bool:
+        """删除已结束的任务及其文件，运行中的任务不能删除"""
+        with self._lock:
+            status = self.jobs.get(job_id)
+            if not status or status['state'] in ('queued', 'running'):
+                return False
+            del self.jobs[job_id]
+        shutil.rmtree(os.path.join(self.jobs_dir, job_id), ignore_errors=True)
+        return True
+
+    def serve_forever(self):
+        """处理请求直到 Ctrl+C"""
+        print(f"🌐 批处理服务已启动: http://{self.host}:{self.port}/ "
+              f"（{self.workers} 个工作进程，按 Ctrl+C 停止）")
+        try:
+            self.httpd.serve_forever()
+        except KeyboardInterrupt:
+            print("\n正在停止服务...")
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        """停止HTTP服务和工作进程"""
+        self._stopping.set()
+        if self.httpd:
+            self.httpd.server_close()
+        for _ in self._processes:
+            self._job_queue.put(None)
+        for process in self._processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+
+
+class _ServiceHandler(BaseHTTPRequestHandler):
+    """HTTP请求处理"""
+
+    server_version = "StudentEvaluationService/1.0"
+
+    @property
+    def service(self) -> BatchService:
+        """所属的批处理服务"""
+        return self.server.service
+
+    def log_message(self, format, *args):
+        """输出访问日志"""
+        sys.stderr.write("[%s] %s\n" % (self.log_date_time_string(), format % args))
+
+    def _send_json(self, status: int, data: Dict):
+        """发送JSON响应"""
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _job_path(self):
+        """解析 /jobs/<id>[/result]，返回 (任务ID, 是否请求结果)"""
+        parts = [part for part in self.path.split('?')[0].split('/') if part]
+        if len(parts) >= 2 and parts[0] == 'jobs':
+            return parts[1], len(parts) == 3 and parts[2] == 'result'
+        return None, False
+
+    def do_GET(self):
+        """查询服务状态、任务状态或下载结果"""
+        if self.path.split('?')[0] == '/health':
+            with self.service._lock:
+                states = [job['state'] for job in self.service.jobs.values()]
+            self._send_json(200, {
+                'workers': self.service.workers,
+                'ready_workers': self.service.ready_workers,
+                'restarted_workers': self.service.restarted_workers,
+                'queued': states.count('queued'),
+                'running': states.count('running'),
+            })
+            return
+
+        job_id, want_result = self._job_path()
+        status = self.service.get_job(job_id) if job_id else None
+        if status is None:
+            self._send_json(404, {'error': '任务不存在'})
+            return
+        if not want_result:
+            self._send_json(200, status)
+            return
+        if status['state'] != 'done':
+            self._send_json(409, {'error': '任务尚未完成', 'state': status['state']})
+            return
+
+        result_path = self.service.result_path(job_id)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/zip')
+        self.send_header('Content-Length', str(os.path.getsize(result_path)))
+        self.send_header('Content-Disposition', f'attachment; filename="{job_id}.zip"')
+        self.end_headers()
+        with open(result_path, 'rb') as f:
+            shutil.copyfileobj(f, self.wfile, 1024 * 1024)
+
+    def do_POST(self):
+        """上传名单和文档，创建任务"""
+        if self.path.split('?')[0] != '/jobs':
+            self._send_json(404, {'error': '接口不存在'})
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        if length <= 0:
+            self._send_json(411, {'error': '缺少请求体'})
+            return
+        if length > self.service.max_upload:
+            self._send_json(413, {'error': '上传文件过大'})
+            return
+        try:
+            fields = parse_multipart(self.headers.get('Content-Type', ''), self.rfile.read(length))
+            status = self.service.submit(fields)
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        self._send_json(202, status)
+
+    def do_DELETE(self):
+        """删除任务"""
+        job_id, _ = self._job_path()
+        if job_id and self.service.delete_job(job_id):
+            self._send_json(200, {'deleted': job_id})
+        else:
+            self._send_json(409, {'error': '任务不存在或仍在处理中'})
+
+
+def create_service(host: Optional[str] = None, port: Optional[int] = None,
+                   workers: Optional[int] = None) -> BatchService:
+    """按配置文件创建批处理服务，参数可覆盖配置"""
+    config = get_config()
+    cache_dir = None
+    if config.get('pdf_conversion.cache.enabled', True):
+        cache_dir = config.get('pdf_conversion.cache.dir', './cache/pdf')
+    return BatchService(
+        host=host or config.get('service.host', '127.0.0.1'),
+        port=port if port is not None else config.get('service.port', 8765),
+        workers=workers or config.get('service.workers', 2),
+        jobs_dir=config.get('service.jobs_dir', './service_jobs'),
+        max_upload_mb=config.get('service.max_upload_mb', 512),
+        job_ttl_hours=config.get('service.job_ttl_hours', 24),
+        settings={
+            'backend': config.get_pdf_backend(),
+            'cache_dir': cache_dir,
+            'cache_max_size_mb': config.get('pdf_conversion.cache.max_size_mb', 2048),
+            'store_memory_mb': config.get('pipeline.store_memory_mb', 256),
+        }
+    )
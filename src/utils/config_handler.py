@@ -38,8 +38,71 @@ class ConfigHandler:
             },
             "pdf_conversion": {
                 "enabled": True,
+                "backend": "wps",
                 "wps_timeout": 30,
-                "retry_count": 3
+                "retry_count": 3,
+                "bundle_classes": True,
+                "cache": {
+                    "enabled": True,
+                    "dir": "./cache/pdf",
+                    "max_size_mb": 2048
+                }
+            },
+            "output": {
+                "mode": "files",
+                "write_back": {
+                    "enabled": True,
+                    "suffix": "_处理结果"
+                },
+                "staging": {
+                    "enabled": False,
+                    "dir": "./cache/staging",
+                    "publish_workers": 8
+                }
+            },
+            "pipeline": {
+                "enabled": True,
+                "incremental": True,
+                "scheduler": "lpt",
+                "rename_workers": 4,
+                "fill_workers": 2,
+                "fill_use_processes": True,
+                "convert_workers": 1,
+                "queue_size": 16,
+                "max_in_flight": 64,
+                "max_memory_mb": 512,
+                "store_memory_mb": 256,
+                "spill_dir": "",
+                "shared_state": True,
+                "autotune": {
+                    "enabled": True,
+                    "interval": 2.0,
+                    "decrease": 0.5,
+                    "max_workers": 0,
+                    "state_file": "./cache/autotune.json"
+                }
+            },
+            "federation": {
+                "load_workers": 0,
+                "on_conflict": "skip"
+            },
+            "metrics": {
+                "enabled": True,
+                "dir": ""
+            },
+            "logging": {
+                "console": "normal",
+                "progress_interval": 0.5,
+                "run_log": True,
+                "file": ""
+            },
+            "service": {
+                "host": "127.0.0.1",
+                "port": 8765,
+                "workers": 2,
+                "jobs_dir": "./service_jobs",
+                "max_upload_mb": 512,
+                "job_ttl_hours": 24
             },
             "file_operations": {
                 "allowed_extensions": [".docx", ".doc"],
@@ -59,9 +122,8 @@ class ConfigHandler:
                     # 合并默认配置和加载的配置
                     self.config = self._merge_configs(self.default_config, loaded_config)
             else:
-                # 如果配置文件不存在，使用默认配置并保存
+                # 如果配置文件不存在，使用默认配置（只在调用 save_config 时写入文件）
                 self.config = self.default_config.copy()
-                self.save_config()
                 
         except Exception as e:
             print(f"警告: 加载配置文件失败 - {str(e)}")
@@ -189,6 +251,14 @@ class ConfigHandler:
         """检查是否启用PDF转换"""
         return self.get('pdf_conversion.enabled', True)
     
+    def is_pipeline_enabled(self) -> bool:
+        """检查是否使用流式流水线（各阶段重叠执行）"""
+        return self.get('pipeline.enabled', True)
+    
+    def get_pdf_backend(self) -> str:
+        """获取PDF转换后端（wps 或 native）"""
+        return self.get('pdf_conversion.backend', 'wps')
+    
     def get_allowed_extensions(self) -> list:
         """获取允许的文件扩展名列表"""
         return self.get('file_operations.allowed_extensions', ['.docx', '.doc'])
@@ -224,12 +294,15 @@ class ConfigHandler:
         return json.dumps(self.config, ensure_ascii=False, indent=2)
 
 
-# 全局配置实例
-config_handler = ConfigHandler()
+# 全局配置实例（首次调用 get_config 时创建，导入本模块不读写任何文件）
+config_handler: Optional[ConfigHandler] = None
 
 
 def get_config() -> ConfigHandler:
     """获取全局配置处理器实例"""
+    global config_handler
+    if config_handler is None:
+        config_handler = ConfigHandler()
     return config_handler
 
 
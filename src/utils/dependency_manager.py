@@ -7,9 +7,14 @@
 import sys
 import subprocess
 import importlib
+import importlib.util
 from typing import List, Dict, Tuple, Optional
 
 
+# 导入名 -> 是否已安装（只查找模块位置，不导入）
+_package_cache: Dict[str, bool] = {}
+
+
 class DependencyManager:
     """依赖管理器类"""
     
@@ -48,6 +53,12 @@ class DependencyManager:
                 'description': '彩色终端输出（可选）',
                 'install_name': 'colorama',
                 'import_name': 'colorama'
+            },
+            'pyarrow': {
+                'name': 'pyarrow',
+                'description': 'Parquet名单读取（可选）',
+                'install_name': 'pyarrow',
+                'import_name': 'pyarrow'
             }
         }
     
@@ -55,17 +66,22 @@ class DependencyManager:
         """
         检查单个包是否已安装
         
+        只用 importlib.util.find_spec 查找模块，不执行导入（pandas等包导入需要数秒），
+        结果在进程内缓存
+        
         Args:
             package_info: 包信息字典
             
         Returns:
             bool: 是否已安装
         """
-        try:
-            importlib.import_module(package_info['import_name'])
-            return True
-        except ImportError:
-            return False
+        import_name = package_info['import_name']
+        if import_name not in _package_cache:
+            try:
+                _package_cache[import_name] = importlib.util.find_spec(import_name) is not None
+            except (ImportError, ValueError):
+                _package_cache[import_name] = False
+        return _package_cache[import_name]
     
     def check_all_dependencies(self) -> Tuple[List[str], List[str]]:
         """
@@ -128,6 +144,9 @@ class DependencyManager:
             
             if result.returncode == 0:
                 print(f"✓ {package_info['name']} 安装成功")
+                # 新安装的包需要重新查找
+                importlib.invalidate_caches()
+                _package_cache.pop(package_info['import_name'], None)
                 return True
             else:
                 print(f"✗ {package_info['name']} 安装失败:")
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+测试公共夹具
+"""
+
+from typing import Callable, List
+
+import pytest
+
+
+def _build_pdf(page_texts: List[str]) -> bytes:
+    """生成最小的PDF：每页一段文字，所有页面共用一个字体对象"""
+    objects = []
+    font_num = 3
+    page_nums = []
+    next_num = 4
+    bodies = {font_num: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"}
+    for text in page_texts:
+        page_num, content_num = next_num, next_num + 1
+        next_num += 2
+        stream = b"BT /F1 12 Tf 72 720 Td (" + text.encode('latin-1') + b") Tj ET"
+        bodies[content_num] = b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+        bodies[page_num] = (
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (font_num, content_num)
+        )
+        page_nums.append(page_num)
+    bodies[1] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    bodies[2] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % num for num in page_nums), len(page_nums)
+    )
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for num in sorted(bodies):
+        offsets[num] = len(output)
+        output += b"%d 0 obj\n%s\nendobj\n" % (num, bodies[num])
+        objects.append(num)
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for num in objects:
+        output += b"%010d 00000 n \n" % offsets[num]
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, xref_offset
+    )
+    return bytes(output)
+
+
+@pytest.fixture
+def make_pdf() -> Callable[..., str]:
+    """写出测试用PDF：make_pdf(path, 'page 1', 'page 2', ...)"""
+    def make(path, *page_texts: str) -> str:
+        with open(path, 'wb') as f:
+            f.write(_build_pdf(list(page_texts) or ['page']))
+        return str(path)
+    return make
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+并发自动调整测试
+"""
+
+import json
+import time
+
+from src.core import autotune
+from src.core.autotune import ConcurrencyController
+
+
+class FakePipeline:
+    """只提供 stage_stats()/set_workers() 的流水线"""
+
+    def __init__(self, **workers):
+        self.stats = {
+            name: {'name': name, 'workers': count, 'max_workers': 8, 'busy': 0, 'queued': 0,
+                   'completed': 0, 'failed': 0, 'busy_seconds': 0.0}
+            for name, count in workers.items()
+        }
+
+    def stage_stats(self):
+        return [dict(stats) for stats in self.stats.values()]
+
+    def set_workers(self, name, workers):
+        stats = self.stats[name]
+        stats['workers'] = min(max(1, workers), stats['max_workers'])
+        return stats['workers']
+
+    def advance(self, name, completed=0, failed=0, queued=None, busy=None):
+        stats = self.stats[name]
+        stats['completed'] += completed
+        stats['failed'] += failed
+        stats['queued'] = stats['queued'] if queued is None else queued
+        stats['busy'] = stats['workers'] if busy is None else busy
+
+
+class FakeCpu:
+    def __init__(self, usage):
+        self.usage = usage
+
+    def sample(self):
+        return self.usage
+
+
+def make_controller(tmp_path, pipeline, cpu=None):
+    controller = ConcurrencyController(str(tmp_path / 'autotune.json'), 'host|/', {'fill': 8},
+                                       interval=3600)
+    controller.start(pipeline)
+    controller.stop()
+    controller._cpu = FakeCpu(cpu)
+    return controller
+
+
+def step(controller, seconds=1.0):
+    """以 seconds 秒为采样周期调整一次"""
+    controller._last_time = time.monotonic() - seconds
+    controller.step()
+
+
+def test_first_run_starts_at_one_worker(tmp_path):
+    state = tmp_path / 'autotune.json'
+    assert ConcurrencyController(str(state), 'host|/', {'fill': 8}).initial_workers('fill') == 1
+
+    state.write_text(json.dumps({'host|/': {'stages': {'fill': 6, 'convert': 20}}}), encoding='utf-8')
+    controller = ConcurrencyController(str(state), 'host|/', {'fill': 8, 'convert': 4})
+    assert controller.initial_workers('fill') == 6
+    assert controller.initial_workers('convert') == 4
+
+
+def test_backlog_adds_one_worker(tmp_path):
+    pipeline = FakePipeline(fill=1)
+    controller = make_controller(tmp_path, pipeline, cpu=0.5)
+
+    for expected in (2, 3, 4):
+        pipeline.advance('fill', completed=10 * expected, queued=5)
+        step(controller)
+        assert pipeline.stats['fill']['workers'] == expected
+
+    # 没有积压或CPU已饱和时不增加
+    pipeline.advance('fill', completed=50, queued=0)
+    step(controller)
+    controller._cpu = FakeCpu(0.99)
+    pipeline.advance('fill', completed=60, queued=5)
+    step(controller)
+    assert pipeline.stats['fill']['workers'] == 4
+    assert controller.adjustments == 3
+
+
+def test_errors_halve_workers(tmp_path):
+    pipeline = FakePipeline(fill=6)
+    controller = make_controller(tmp_path, pipeline)
+
+    pipeline.advance('fill', completed=10, failed=2)
+    step(controller)
+
+    assert pipeline.stats['fill']['workers'] == 3
+
+
+def test_saturated_cpu_with_falling_throughput_halves_workers(tmp_path):
+    pipeline = FakePipeline(fill=4)
+    controller = make_controller(tmp_path, pipeline, cpu=0.99)
+
+    pipeline.advance('fill', completed=20)
+    step(controller)
+    assert pipeline.stats['fill']['workers'] == 4
+
+    pipeline.advance('fill', completed=10)
+    step(controller)
+    assert pipeline.stats['fill']['workers'] == 2
+
+
+def test_plateau_reverts_and_holds(tmp_path):
+    pipeline = FakePipeline(fill=2)
+    controller = make_controller(tmp_path, pipeline, cpu=0.5)
+
+    pipeline.advance('fill', completed=10, queued=5)
+    step(controller)
+    assert pipeline.stats['fill']['workers'] == 3
+
+    # 第三个并发没有提高吞吐量：退回，之后暂停增加 PLATEAU_HOLD 个周期
+    pipeline.advance('fill', completed=10, queued=5)
+    step(controller)
+    assert pipeline.stats['fill']['workers'] == 2
+    for _ in range(autotune.PLATEAU_HOLD):
+        pipeline.advance('fill', completed=10, queued=5)
+        step(controller)
+        assert pipeline.stats['fill']['workers'] == 2
+
+    pipeline.advance('fill', completed=10, queued=5)
+    step(controller)
+    assert pipeline.stats['fill']['workers'] == 3
+
+
+def test_save_keeps_best_workers_and_other_hosts(tmp_path):
+    state = tmp_path / 'autotune.json'
+    state.write_text(json.dumps({'other|/': {'stages': {'fill': 5}}}), encoding='utf-8')
+    pipeline = FakePipeline(fill=2)
+    controller = make_controller(tmp_path, pipeline, cpu=0.5)
+
+    pipeline.advance('fill', completed=10, queued=5)
+    step(controller)
+    pipeline.advance('fill', completed=30, queued=5)
+    step(controller)
+    pipeline.advance('fill', completed=5, failed=5)
+    step(controller)
+
+    assert controller.save() == {'fill': 3}
+    saved = json.loads(state.read_text(encoding='utf-8'))
+    assert saved['other|/'] == {'stages': {'fill': 5}}
+    assert saved['host|/']['stages'] == {'fill': 3}
+    assert [path.name for path in tmp_path.iterdir()] == ['autotune.json']
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+构建清单（增量处理）测试
+"""
+
+import os
+
+import pytest
+
+from src.core.build_manifest import BuildManifest, hash_row
+
+
+STUDENT = {'学号': '1001', '姓名': '张三', '班级': '一班'}
+
+
+@pytest.fixture
+def built(tmp_path):
+    """上次运行生成的docx、PDF和清单"""
+    output_dir = tmp_path / 'out'
+    (output_dir / '一班').mkdir(parents=True)
+    docx_path = output_dir / '一班' / '张三-1001.docx'
+    docx_path.write_bytes(b'docx')
+    pdf_path = output_dir / '一班_PDF' / '张三-1001.pdf'
+    pdf_path.parent.mkdir()
+    pdf_path.write_bytes(b'pdf')
+    inputs = {'source': 'abc', 'row': hash_row(STUDENT), 'fill': True, 'library': 'v1', 'seed': 1}
+
+    manifest = BuildManifest(str(output_dir))
+    manifest.record('1001', inputs, str(docx_path), str(pdf_path), 'native:1.0', {'fill': 0.5})
+    manifest.save()
+    return output_dir, docx_path, pdf_path, inputs
+
+
+def test_unchanged_inputs_are_skipped(built):
+    output_dir, docx_path, pdf_path, inputs = built
+    manifest = BuildManifest(str(output_dir))
+    assert manifest.is_docx_current('1001', dict(inputs), str(docx_path))
+    assert manifest.is_pdf_current('1001', 'native:1.0', str(pdf_path))
+
+
+@pytest.mark.parametrize('field, value', [
+    ('source', 'changed'),
+    ('row', hash_row(dict(STUDENT, 姓名='张三丰'))),
+    ('library', 'v2'),
+    ('seed', 2),
+])
+def test_changed_input_is_rebuilt(built, field, value):
+    output_dir, docx_path, _, inputs = built
+    manifest = BuildManifest(str(output_dir))
+    assert not manifest.is_docx_current('1001', dict(inputs, **{field: value}), str(docx_path))
+
+
+def test_modified_or_missing_output_is_rebuilt(built):
+    output_dir, docx_path, pdf_path, inputs = built
+    docx_path.write_bytes(b'edited by hand')
+    os.remove(pdf_path)
+    manifest = BuildManifest(str(output_dir))
+    assert not manifest.is_docx_current('1001', inputs, str(docx_path))
+    assert not manifest.is_pdf_current('1001', 'native:1.0', str(pdf_path))
+
+
+def test_other_backend_or_path_is_rebuilt(built):
+    output_dir, docx_path, pdf_path, inputs = built
+    manifest = BuildManifest(str(output_dir))
+    assert not manifest.is_pdf_current('1001', 'wps:12.0', str(pdf_path))
+    assert not manifest.is_docx_current('1001', inputs, str(output_dir / '二班' / '张三-1001.docx'))
+    assert not manifest.is_docx_current('9999', inputs, str(docx_path))
+
+
+def test_record_without_conversion_keeps_previous_pdf(built):
+    output_dir, docx_path, pdf_path, inputs = built
+    manifest = BuildManifest(str(output_dir))
+    manifest.record('1001', inputs, str(docx_path), timings={'rename': 0.1})
+    assert manifest.is_pdf_current('1001', 'native:1.0', str(pdf_path))
+    assert manifest.entries['1001']['timings'] == {'fill': 0.5, 'rename': 0.1}
+
+
+def test_forgotten_student_is_rebuilt(built):
+    output_dir, docx_path, _, inputs = built
+    manifest = BuildManifest(str(output_dir))
+    manifest.forget('1001')
+    manifest.save()
+    assert not BuildManifest(str(output_dir)).is_docx_current('1001', inputs, str(docx_path))
+
+
+def test_source_hash_follows_content(tmp_path):
+    source = tmp_path / '1001.docx'
+    source.write_bytes(b'first')
+    manifest = BuildManifest(str(tmp_path / 'out'))
+    first = manifest.source_hash(str(source))
+    assert manifest.source_hash(str(source)) == first
+    source.write_bytes(b'second version')
+    assert manifest.source_hash(str(source)) != first
+
+
+def test_corrupt_manifest_starts_empty(tmp_path):
+    (tmp_path / '.build_manifest.json').write_text('{not json', encoding='utf-8')
+    assert BuildManifest(str(tmp_path)).entries == {}
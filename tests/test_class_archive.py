@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+班级压缩包写入测试
+"""
+
+import os
+import shutil
+import threading
+import zipfile
+
+from src.core.class_archive import ClassArchiveWriter
+from src.core.file_renamer import FileRenamer
+from src.core.pdf_converter import PDFConverter
+from src.core.workflow import StudentWorkflow
+
+
+TEMPLATE = os.path.join(os.path.dirname(__file__), '..', 'data', 'templates',
+                        '四年制学年鉴定表', '22920216666666.docx')
+
+
+def test_entries_written_per_class(tmp_path):
+    writer = ClassArchiveWriter(str(tmp_path))
+    writer.add('一班', '一班/张三-1001.docx', b'docx-1')
+    writer.add('二班', '二班/李四-2001.docx', b'docx-2')
+    pdf = tmp_path / 'a.pdf'
+    pdf.write_bytes(b'%PDF' + b'0' * 1000)
+    writer.add_file('一班', '一班_PDF/张三-1001.pdf', str(pdf))
+
+    # 关闭前只有临时文件
+    assert not os.path.exists(writer.archive_path('一班'))
+    paths = writer.close()
+
+    assert paths == sorted([str(tmp_path / '一班.zip'), str(tmp_path / '二班.zip')])
+    assert writer.entry_count == 3
+    assert not any(name.endswith('.tmp') for name in os.listdir(tmp_path))
+    with zipfile.ZipFile(tmp_path / '一班.zip') as archive:
+        assert archive.namelist() == ['一班/张三-1001.docx', '一班_PDF/张三-1001.pdf']
+        assert archive.read('一班/张三-1001.docx') == b'docx-1'
+        # docx和PDF都已压缩，以存储方式写入
+        assert archive.getinfo('一班/张三-1001.docx').compress_type == zipfile.ZIP_STORED
+        assert archive.getinfo('一班_PDF/张三-1001.pdf').compress_type == zipfile.ZIP_STORED
+
+
+def test_close_replaces_previous_archive(tmp_path):
+    first = ClassArchiveWriter(str(tmp_path))
+    first.add('一班', 'old.docx', b'old')
+    first.close()
+
+    second = ClassArchiveWriter(str(tmp_path))
+    second.add('一班', 'new.docx', b'new')
+    second.close()
+
+    with zipfile.ZipFile(tmp_path / '一班.zip') as archive:
+        assert archive.namelist() == ['new.docx']
+
+
+def test_concurrent_adds(tmp_path):
+    writer = ClassArchiveWriter(str(tmp_path), suffix='.shard1.zip')
+
+    def add_range(start):
+        for i in range(start, start + 25):
+            writer.add('一班', f'一班/{i}.docx', str(i).encode())
+
+    threads = [threading.Thread(target=add_range, args=(n * 25,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    writer.close()
+
+    with zipfile.ZipFile(tmp_path / '一班.shard1.zip') as archive:
+        assert archive.testzip() is None
+        assert sorted(archive.namelist()) == sorted(f'一班/{i}.docx' for i in range(100))
+
+
+def test_archive_only_native_pdfs_skip_the_disk(tmp_path):
+    source_dir = tmp_path / 'source'
+    source_dir.mkdir()
+    shutil.copy(TEMPLATE, source_dir / '22920216666666.docx')
+    student = {'学号': '22920216666666', '姓名': '有名字', '班级': '一班'}
+    renamer = FileRenamer()
+    renamer.student_data = [student]
+    output_dir = tmp_path / 'output'
+    workflow = StudentWorkflow(
+        renamer, str(output_dir), ['一班'], convert=True,
+        converter_factory=lambda: PDFConverter(backend='native'),
+        archive=ClassArchiveWriter(str(output_dir)), keep_files=False, bundle_pdfs=False
+    )
+    items = workflow.build_items([student], str(source_dir))
+
+    results = workflow.create_pipeline(fill_use_processes=False).run(items)
+    pdf_files = [name for _, _, files in os.walk(workflow.pdf_root) for name in files]
+    workflow.finish()
+
+    assert [item.status for item in results] == ['done']
+    # PDF直接从内存写入压缩包，没有写出临时文件
+    assert pdf_files == []
+    with zipfile.ZipFile(output_dir / '一班.zip') as zipped:
+        pdf_names = [name for name in zipped.namelist() if name.endswith('.pdf')]
+        assert len(pdf_names) == 1
+        assert zipped.getinfo(pdf_names[0]).compress_type == zipfile.ZIP_STORED
+        assert zipped.read(pdf_names[0]).startswith(b'%PDF-1.4')
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+配置处理器测试
+"""
+
+import json
+import os
+
+from src.utils.config_handler import ConfigHandler
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def flatten(config, prefix=''):
+    keys = set()
+    for key, value in config.items():
+        path = f'{prefix}{key}'
+        if isinstance(value, dict) and value:
+            keys |= flatten(value, path + '.')
+        else:
+            keys.add(path)
+    return keys
+
+
+def test_missing_file_uses_defaults(tmp_path):
+    handler = ConfigHandler(str(tmp_path / 'settings.json'))
+    assert handler.get('pipeline.enabled') is True
+    assert handler.get('pipeline.no_such_key', 'fallback') == 'fallback'
+    # 只在保存时写入文件
+    assert not os.path.exists(tmp_path / 'settings.json')
+
+
+def test_loaded_values_merge_with_defaults(tmp_path):
+    path = tmp_path / 'settings.json'
+    path.write_text(json.dumps({'pipeline': {'fill_workers': 7}}), encoding='utf-8')
+    handler = ConfigHandler(str(path))
+    assert handler.get('pipeline.fill_workers') == 7
+    # 未出现在文件中的同级键保留默认值
+    assert handler.get('pipeline.enabled') is True
+
+
+def test_set_and_save_round_trip(tmp_path):
+    path = tmp_path / 'config' / 'settings.json'
+    handler = ConfigHandler(str(path))
+    handler.set('output.write_back.suffix', '_结果')
+    handler.set('new.section.value', 3)
+    handler.save_config()
+
+    reloaded = ConfigHandler(str(path))
+    assert reloaded.get('output.write_back.suffix') == '_结果'
+    assert reloaded.get('new.section.value') == 3
+
+
+def test_shipped_settings_match_defaults():
+    handler = ConfigHandler(os.path.join(PROJECT_ROOT, 'config', 'settings.json'))
+    with open(handler.config_file, encoding='utf-8') as f:
+        shipped = json.load(f)
+    # config/settings.json 中的每个键都有默认值
+    assert flatten(shipped) <= flatten(handler.default_config)
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+文件重命名器测试
+"""
+
+import os
+
+from openpyxl import Workbook
+
+from src.core.file_renamer import FileRenamer
+
+
+def test_source_index_maps_student_ids(tmp_path):
+    for name in ('1001.docx', '1002.docx', '~$1001.docx', 'notes.txt'):
+        (tmp_path / name).write_bytes(b'x')
+    index = FileRenamer().build_source_index(str(tmp_path))
+    assert index == {
+        '1001': os.path.join(str(tmp_path), '1001.docx'),
+        '1002': os.path.join(str(tmp_path), '1002.docx'),
+    }
+
+
+def test_copy_student_file_to_class_folder(tmp_path):
+    source = tmp_path / '1001.docx'
+    source.write_bytes(b'docx')
+    student = {'学号': '1001', '姓名': '张三', '班级': '一班'}
+    target = FileRenamer().copy_student_file(student, str(source), str(tmp_path / 'out'))
+    assert target == os.path.join(str(tmp_path / 'out'), '一班', '张三-1001.docx')
+    assert open(target, 'rb').read() == b'docx'
+
+
+def test_load_excel_data_reads_every_sheet(tmp_path):
+    roster = tmp_path / 'roster.xlsx'
+    workbook = Workbook()
+    first = workbook.active
+    first.title = '一班'
+    first.append(['学号', '姓名'])
+    first.append([22920210000001, '张三'])
+    first.append([None, '无学号'])
+    second = workbook.create_sheet('二班')
+    second.append(['ID', 'Name'])
+    second.append(['2001', '李四'])
+    workbook.save(roster)
+
+    students = FileRenamer().load_excel_data(str(roster))
+    assert students == [
+        {'学号': '22920210000001', '姓名': '张三', '班级': '一班'},
+        {'学号': '2001', '姓名': '李四', '班级': '二班'},
+    ]
+
+
+def test_csv_roster_goes_through_roster_reader(tmp_path):
+    roster = tmp_path / 'roster.csv'
+    roster.write_text('学号,姓名,班级\n1001,张三,一班\n', encoding='utf-8')
+    assert FileRenamer().load_excel_data(str(roster)) == [{'学号': '1001', '姓名': '张三', '班级': '一班'}]
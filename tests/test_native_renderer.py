@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+原生PDF渲染器测试
+"""
+
+import os
+import re
+import struct
+import zlib
+
+from src.core.evaluation_filler import EvaluationFiller
+from src.core.native_renderer import NativePDFRenderer, PDFDocumentWriter
+
+
+TEMPLATE = os.path.join(os.path.dirname(__file__), '..', 'data', 'templates',
+                        '四年制学年鉴定表', '22920216666666.docx')
+
+
+def _pdf_text(pdf: bytes) -> str:
+    """解压内容流并按顺序拼接所有 Tj 文本（去掉空白，不受换行位置影响）"""
+    text = []
+    for stream in re.findall(rb'/FlateDecode >>\nstream\n(.*?)\nendstream', pdf, re.S):
+        content = zlib.decompress(stream)
+        for encoded in re.findall(rb'<([0-9A-F]+)> Tj', content):
+            text.append(bytes.fromhex(encoded.decode('ascii')).decode('utf-16-be'))
+    return re.sub(r'\s', '', ''.join(text))
+
+
+def _page_count(pdf: bytes) -> int:
+    return int(re.search(rb'/Type /Pages /Kids \[[^\]]*\] /Count (\d+)', pdf).group(1))
+
+
+def _chunk(chunk_type: bytes, data: bytes) -> bytes:
+    return struct.pack('>I', len(data)) + chunk_type + data + b'\0' * 4
+
+
+def _png(color_type: int, bit_depth: int = 8, interlace: int = 0, palette: bytes = b'') -> bytes:
+    """只有文件头（和调色板）的PNG，足以判断是否支持"""
+    ihdr = struct.pack('>IIBBBBB', 1, 1, bit_depth, color_type, 0, 0, interlace)
+    return b'\x89PNG\r\n\x1a\n' + _chunk(b'IHDR', ihdr) + (_chunk(b'PLTE', palette) if palette else b'')
+
+
+def _layout(images):
+    return {'page_width': 595.0, 'page_height': 842.0, 'images': images,
+            'pages': [[('image', 10.0, 10.0, 50.0, 50.0, target) for target in images]]}
+
+
+def test_filled_template_renders_all_pages_and_comments():
+    with open(TEMPLATE, 'rb') as f:
+        template = f.read()
+    filler = EvaluationFiller()
+    success, filled = filler.fill_bytes(template, seed=1)
+    assert success
+
+    pdf = NativePDFRenderer().render_bytes(filled)
+
+    assert pdf.startswith(b'%PDF-1.4')
+    # 封面、填表说明、四个学年各两页、综合鉴定表两页
+    assert _page_count(pdf) == 12
+    text = _pdf_text(pdf)
+    assert '22920216666666' in text
+    # 每个学年的学院意见都是候选评语之一
+    for options in filler.academic_year_opinions[:len(filler.academic_years)]:
+        assert any(re.sub(r'\s', '', option) in text for option in options)
+    for options in (filler.class_organization_evaluations, filler.class_teacher_evaluations,
+                    filler.college_opinions):
+        assert any(re.sub(r'\s', '', option) in text for option in options)
+    # 模板中的两张RGB图片都写入了PDF
+    assert pdf.count(b'/Subtype /Image') == 2
+
+
+def test_render_is_deterministic(tmp_path):
+    renderer = NativePDFRenderer()
+    output = tmp_path / 'out.pdf'
+    assert renderer.render(TEMPLATE, str(output))
+    assert output.read_bytes() == renderer.render_bytes(TEMPLATE)
+
+
+def test_supported_images_are_embedded():
+    writer = PDFDocumentWriter()
+    palette = _png(3, bit_depth=4, palette=b'\x00\x00\x00\xff\xff\xff')
+    jpeg = b'\xff\xd8' + b'\xff\xe0' + struct.pack('>H', 4) + b'\0\0' + \
+        b'\xff\xc0' + struct.pack('>HBHHB', 11, 8, 2, 3, 3) + b'\0' * 6
+
+    pdf = writer.build(_layout({'media/a.png': _png(2), 'media/b.png': palette, 'media/c.jpg': jpeg}))
+
+    assert pdf.count(b'/Subtype /Image') == 3
+    assert b'/ColorSpace [/Indexed /DeviceRGB 1 <000000ffffff>] /BitsPerComponent 4' in pdf
+    assert b'/Width 3 /Height 2 /ColorSpace /DeviceRGB /BitsPerComponent 8 /Length %d /Filter /DCTDecode' % len(jpeg) in pdf
+
+
+def test_unsupported_images_are_reported(capsys):
+    writer = PDFDocumentWriter()
+    images = {
+        'media/alpha.png': _png(6),
+        'media/interlaced.png': _png(2, interlace=1),
+        'media/deep.png': _png(0, bit_depth=16),
+        'media/image.gif': b'GIF89a',
+    }
+
+    pdf = writer.build(_layout(images), source='张三-1001.docx')
+
+    assert b'/Subtype /Image' not in pdf
+    out = capsys.readouterr().out
+    for target in images:
+        assert target in out
+    assert '带透明通道的PNG' in out
+    assert '隔行扫描PNG' in out
+    assert '张三-1001.docx' in out
+    # 跳过的图片不在页面上引用
+    assert b' Do Q' not in zlib.decompress(
+        re.search(rb'/FlateDecode >>\nstream\n(.*?)\nendstream', pdf, re.S).group(1))
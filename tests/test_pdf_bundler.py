@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+班级PDF合并测试
+"""
+
+import os
+
+import pytest
+
+from src.core.pdf_bundler import PDFBundler, PDFName, PDFReader, bundle_class_pdfs
+
+
+def page_texts(path):
+    """合并结果中每页内容流里的文字"""
+    reader = PDFReader(path)
+    texts = []
+    for _, page in reader.get_pages():
+        stream = reader.resolve(page[PDFName(b'Contents')])
+        content = reader.decode_stream(stream)
+        texts.append(content[content.index(b'(') + 1:content.index(b')')].decode('latin-1'))
+    return reader, texts
+
+
+def bookmark_titles(reader):
+    catalog = reader.resolve(reader.trailer[PDFName(b'Root')])
+    outlines = reader.resolve(catalog[PDFName(b'Outlines')])
+    titles = []
+    entry = reader.resolve(outlines.get(PDFName(b'First')))
+    while isinstance(entry, dict):
+        # 书签标题写为带BOM的UTF-16十六进制字符串 <FEFF...>
+        title = bytes.fromhex(bytes(entry[PDFName(b'Title')]).strip(b'<>').decode('ascii'))
+        titles.append(title[2:].decode('utf-16-be'))
+        entry = reader.resolve(entry.get(PDFName(b'Next')))
+    return titles
+
+
+def test_bundle_follows_roster_order(tmp_path, make_pdf):
+    pdf_dir = tmp_path / '一班_PDF'
+    pdf_dir.mkdir()
+    make_pdf(pdf_dir / '张三-1001.pdf', 'zhang-1', 'zhang-2')
+    make_pdf(pdf_dir / '李四-1002.pdf', 'li-1')
+    make_pdf(pdf_dir / '额外-9999.pdf', 'extra-1')
+    output = str(tmp_path / '一班.pdf')
+
+    files, pages = bundle_class_pdfs(str(pdf_dir), output, ['李四-1002', '张三-1001'])
+
+    assert (files, pages) == (3, 4)
+    reader, texts = page_texts(output)
+    # 名单中的文件按名单顺序，不在名单中的追加在最后
+    assert texts == ['li-1', 'zhang-1', 'zhang-2', 'extra-1']
+    assert bookmark_titles(reader) == ['李四-1002', '张三-1001', '额外-9999']
+    assert not os.path.exists(output + '.tmp')
+
+
+def test_shared_resources_are_written_once(tmp_path, make_pdf):
+    first = make_pdf(tmp_path / 'a.pdf', 'a')
+    second = make_pdf(tmp_path / 'b.pdf', 'b')
+    output = str(tmp_path / 'merged.pdf')
+
+    with PDFBundler(output) as bundler:
+        assert bundler.add_file(first, title='a') == 1
+        assert bundler.add_file(second, title='b') == 1
+
+    # 两个文件中相同的字体对象只写出一次
+    assert bundler.deduplicated_count >= 1
+    with open(output, 'rb') as f:
+        assert f.read().count(b'/BaseFont /Helvetica') == 1
+
+
+def test_failed_bundle_leaves_no_output(tmp_path, make_pdf):
+    good = make_pdf(tmp_path / 'good.pdf', 'ok')
+    broken = tmp_path / 'broken.pdf'
+    broken.write_bytes(b'not a pdf')
+    output = str(tmp_path / 'merged.pdf')
+
+    with pytest.raises(Exception):
+        with PDFBundler(output) as bundler:
+            bundler.add_file(good)
+            bundler.add_file(str(broken))
+
+    assert not os.path.exists(output)
+    assert not os.path.exists(output + '.tmp')
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+PDF缓存测试
+"""
+
+import io
+import os
+import threading
+import time
+import zipfile
+
+import pytest
+
+from src.core.file_modes import default_file_mode
+from src.core.pdf_cache import PDFCache
+
+
+def make_docx(body, compression=zipfile.ZIP_DEFLATED, date_time=(2024, 1, 1, 0, 0, 0),
+              core='<created>2024</created>'):
+    """生成只有几个部件的docx包"""
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, 'w') as package:
+        for name, data in (('word/document.xml', body), ('docProps/core.xml', core),
+                           ('[Content_Types].xml', '<Types/>')):
+            info = zipfile.ZipInfo(name, date_time)
+            info.compress_type = compression
+            package.writestr(info, data)
+    return output.getvalue()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return PDFCache(str(tmp_path / 'cache'))
+
+
+def test_key_ignores_zip_metadata(cache):
+    key = cache.compute_key(make_docx('<p>张三</p>'), 'native:1.0')
+    # 重新保存后时间戳、压缩方式、保存时间元数据变化，版面不变
+    resaved = make_docx('<p>张三</p>', zipfile.ZIP_STORED, (2025, 6, 1, 12, 0, 0), '<created>2025</created>')
+    assert cache.compute_key(resaved, 'native:1.0') == key
+
+
+def test_key_depends_on_content_and_backend(cache, tmp_path):
+    data = make_docx('<p>张三</p>')
+    key = cache.compute_key(data, 'native:1.0')
+    assert cache.compute_key(make_docx('<p>李四</p>'), 'native:1.0') != key
+    assert cache.compute_key(data, 'wps:12.0') != key
+    # 路径和内容得到相同的键
+    path = tmp_path / 'doc.docx'
+    path.write_bytes(data)
+    assert cache.compute_key(str(path), 'native:1.0') == key
+
+
+def test_key_for_non_zip_document(cache):
+    assert cache.compute_key(b'old .doc bytes', 'wps:12.0') != cache.compute_key(b'other', 'wps:12.0')
+
+
+def test_store_then_fetch_copies_entry(cache, tmp_path):
+    pdf = tmp_path / 'a.pdf'
+    pdf.write_bytes(b'%PDF-1.7 a')
+    output = tmp_path / 'out' / 'a.pdf'
+    output.parent.mkdir()
+
+    assert not cache.fetch('ab' * 32, str(output))
+    cache.store('ab' * 32, str(pdf))
+    assert cache.fetch('ab' * 32, str(output))
+
+    assert output.read_bytes() == b'%PDF-1.7 a'
+    entry = cache._entry_path('ab' * 32)
+    assert os.stat(entry).st_mode & 0o777 == default_file_mode()
+    # 输出是独立的文件，修改输出不影响缓存条目
+    assert os.stat(output).st_ino != os.stat(entry).st_ino
+    output.write_bytes(b'edited')
+    assert open(entry, 'rb').read() == b'%PDF-1.7 a'
+    assert cache.get_stats() == {'hits': 1, 'misses': 1}
+
+
+def test_store_then_fetch_bytes(cache):
+    key = cache.compute_key(make_docx('<p>张三</p>'), 'native:1.1')
+    assert cache.fetch_bytes(key) is None
+
+    cache.store_bytes(key, b'%PDF-bytes')
+
+    assert cache.fetch_bytes(key) == b'%PDF-bytes'
+    assert cache.get_stats()['hits'] == 1 and cache.get_stats()['misses'] == 1
+    assert os.stat(cache._entry_path(key)).st_mode & 0o777 == default_file_mode()
+
+
+def test_later_hit_does_not_touch_earlier_output(cache, tmp_path):
+    pdf = tmp_path / 'a.pdf'
+    pdf.write_bytes(b'%PDF-1.7 a')
+    cache.store('cd' * 32, str(pdf))
+    first = tmp_path / 'first.pdf'
+    cache.fetch('cd' * 32, str(first))
+    before = os.stat(first).st_mtime_ns
+    entry_mtime = os.stat(cache._entry_path('cd' * 32)).st_mtime_ns
+
+    time.sleep(0.01)
+    cache.fetch('cd' * 32, str(tmp_path / 'second.pdf'))
+
+    # 其他输出目录的命中不会让本目录的PDF看起来被修改过（增量处理依赖修改时间）
+    assert os.stat(first).st_mtime_ns == before
+    assert os.stat(cache._entry_path('cd' * 32)).st_mtime_ns == entry_mtime
+
+
+def test_evict_removes_least_recently_used(tmp_path):
+    cache = PDFCache(str(tmp_path / 'cache'), max_size_mb=2500 / (1024 * 1024))
+    source = tmp_path / 'a.pdf'
+    source.write_bytes(b'x' * 1000)
+    keys = ['0' * 64, '1' * 64, '2' * 64]
+    for index, key in enumerate(keys):
+        cache.store(key, str(source))
+        os.utime(cache._entry_path(key), (1000 + index, 1000 + index))
+    # 最早写入的条目刚被使用过
+    cache.fetch(keys[0], str(tmp_path / 'out.pdf'))
+
+    assert cache.evict() == 1
+    assert os.path.exists(cache._entry_path(keys[0]))
+    assert not os.path.exists(cache._entry_path(keys[1]))
+    assert os.path.exists(cache._entry_path(keys[2]))
+    assert cache.evict() == 0
+
+
+def test_concurrent_fetch_counts(cache, tmp_path):
+    pdf = tmp_path / 'a.pdf'
+    pdf.write_bytes(b'%PDF')
+    cache.store('ef' * 32, str(pdf))
+
+    def fetch(index):
+        for n in range(50):
+            cache.fetch('ef' * 32 if n % 2 else '00' * 32, str(tmp_path / f'out-{index}.pdf'))
+
+    threads = [threading.Thread(target=fetch, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.get_stats() == {'hits': 100, 'misses': 100}
+
+
+def test_backend_version_record(cache):
+    assert cache.load_backend_version('wps') is None
+    cache.save_backend_version('wps', '12.1')
+    assert cache.load_backend_version('wps') == '12.1'
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+流式流水线测试
+"""
+
+import threading
+
+from src.core.pipeline import PipelineItem, PipelineStage, StreamingPipeline
+
+
+def make_items(count):
+    return [PipelineItem(str(i), {'value': i}) for i in range(count)]
+
+
+def test_items_pass_through_all_stages():
+    visited = []
+    lock = threading.Lock()
+
+    def record(stage):
+        def handler(item, context):
+            with lock:
+                visited.append((stage, item.key))
+            return True
+        return handler
+
+    pipeline = StreamingPipeline([
+        PipelineStage('first', record('first'), workers=2),
+        PipelineStage('second', record('second'), workers=3),
+    ])
+    results = pipeline.run(make_items(10))
+
+    assert sorted(item.key for item in results) == [str(i) for i in range(10)]
+    assert all(item.status == 'done' for item in results)
+    assert all(set(item.timings) == {'first', 'second'} for item in results)
+    assert len(visited) == 20
+
+
+def test_failed_item_stops_at_failing_stage():
+    later = []
+
+    def check(item, context):
+        if item.data['value'] == 3:
+            return False
+        if item.data['value'] == 5:
+            raise RuntimeError('源文件损坏')
+        return True
+
+    def after(item, context):
+        later.append(item.key)
+        return True
+
+    pipeline = StreamingPipeline([
+        PipelineStage('check', check, workers=2),
+        PipelineStage('after', after),
+    ])
+    results = {item.key: item for item in pipeline.run(make_items(8))}
+
+    assert results['3'].status == 'failed'
+    assert results['3'].failed_stage == 'check'
+    assert results['5'].status == 'failed'
+    assert results['5'].error == '源文件损坏'
+    # 失败的条目不再进入后续阶段，其余条目不受影响
+    assert sorted(later) == ['0', '1', '2', '4', '6', '7']
+    assert all(results[key].status == 'done' for key in later)
+
+
+def test_complete_hook_decides_result():
+    pipeline = StreamingPipeline([
+        PipelineStage('stage', lambda item, context: True,
+                      complete=lambda item, ok: ok and item.data['value'] % 2 == 0),
+    ])
+    results = {item.key: item.status for item in pipeline.run(make_items(4))}
+    assert results == {'0': 'done', '1': 'failed', '2': 'done', '3': 'failed'}
+
+
+def test_setup_and_teardown_run_per_worker():
+    contexts = []
+    closed = []
+
+    def setup():
+        context = {'id': len(contexts)}
+        contexts.append(context)
+        return context
+
+    pipeline = StreamingPipeline([
+        PipelineStage('stage', lambda item, context: context is not None, workers=2,
+                      setup=setup, teardown=closed.append),
+    ])
+    results = pipeline.run(make_items(6))
+
+    assert all(item.status == 'done' for item in results)
+    assert 1 <= len(contexts) <= 2
+    assert sorted(c['id'] for c in closed) == sorted(c['id'] for c in contexts)
+
+
+def test_failing_setup_fails_items_without_hanging():
+    def setup():
+        raise RuntimeError('无法启动转换器')
+
+    pipeline = StreamingPipeline([PipelineStage('convert', lambda item, context: True, setup=setup)])
+    results = pipeline.run(make_items(3))
+    assert [item.status for item in results] == ['failed'] * 3
+    assert all(item.error == '无法启动转换器' for item in results)
+
+
+def test_on_item_done_called_for_every_item():
+    done = []
+    pipeline = StreamingPipeline(
+        [PipelineStage('stage', lambda item, context: item.data['value'] != 1)],
+        on_item_done=lambda item: done.append(item.key),
+    )
+    pipeline.run(make_items(3))
+    assert sorted(done) == ['0', '1', '2']
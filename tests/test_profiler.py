@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+阶段剖析测试
+"""
+
+import os
+
+from src.core.memory_monitor import MemoryMonitor
+from src.core.pdf_converter import PDFConverter
+from src.core.profiler import StageProfiler
+
+
+TEMPLATE = os.path.join(os.path.dirname(__file__), '..', 'data', 'templates',
+                        '四年制学年鉴定表', '22920216666666.docx')
+
+
+def convert_template(tmp_path, profiler, memory=None):
+    with profiler.installed():
+        if memory is None:
+            PDFConverter(backend='native').convert_single_file(TEMPLATE, str(tmp_path / 'out.pdf'))
+        else:
+            with memory.installed():
+                PDFConverter(backend='native').convert_single_file(TEMPLATE, str(tmp_path / 'out.pdf'))
+
+
+def test_report_names_the_renderer(tmp_path):
+    profiler = StageProfiler(top_n=1)
+    convert_template(tmp_path, profiler)
+
+    report = '\n'.join(profiler.report_lines())
+
+    assert report.startswith('[convert] 1 次调用')
+    assert 'native_renderer.py' in report
+
+
+def test_memory_wrappers_are_pass_through(tmp_path):
+    # --profile --memory：内存统计包装在剖析包装之外，嵌套的阶段函数也经过它
+    profiler = StageProfiler(top_n=1)
+    convert_template(tmp_path, profiler, MemoryMonitor())
+
+    report = '\n'.join(profiler.report_lines())
+
+    assert 'memory_monitor.py' not in report
+    assert 'native_renderer.py' in report
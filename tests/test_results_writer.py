@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+处理结果回写测试
+"""
+
+import csv
+
+import pytest
+from openpyxl import Workbook, load_workbook
+
+from src.core.pipeline import PipelineItem
+from src.core.results_writer import RESULT_COLUMNS, item_status, results_path, write_results
+
+
+ID_COLUMNS = ['学号']
+
+
+def make_item(student_id, name, class_name, status='done', **data):
+    item = PipelineItem(student_id, dict({
+        'student': {'学号': student_id, '姓名': name, '班级': class_name},
+        'class_name': class_name,
+        'docx_path': f'out/{class_name}/{name}-{student_id}.docx',
+    }, **data))
+    item.status = status
+    item.timings = {'rename': 0.25, 'fill': 0.5}
+    return item
+
+
+@pytest.fixture
+def results():
+    failed = make_item('1003', '王五', '一班', status='failed', fill=True,
+                       error_path='out/一班/处理失败的文件/王五-1003.docx')
+    failed.failed_stage = 'fill'
+    failed.error = '评语未能全部填写'
+    return [
+        make_item('1001', '张三', '一班', fill=True, pdf_path='out/一班_PDF/张三-1001.pdf'),
+        make_item('1002', '李四', '一班', fill=True, up_to_date=True),
+        failed,
+        make_item('2001', '赵六', '二班'),
+    ]
+
+
+def test_item_status_columns(results):
+    converted, current, failed, renamed = (item_status(item) for item in results)
+    assert converted == ['已转换', '', 'out/一班/张三-1001.docx', 'out/一班_PDF/张三-1001.pdf', 0.75]
+    assert current[0] == '未变化'
+    assert failed == ['失败', '填写评语: 评语未能全部填写', 'out/一班/处理失败的文件/王五-1003.docx', '', 0.75]
+    assert renamed[0] == '已重命名'
+
+
+def test_xlsx_roster_gets_result_columns(tmp_path, results):
+    roster = tmp_path / 'roster.xlsx'
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = '一班'
+    sheet.append(['学号', '姓名'])
+    for row in ([1001, '张三'], ['1002', '李四'], [1003, '王五'], [1004, '孙七'], [None, None]):
+        sheet.append(row)
+    other = workbook.create_sheet('二班')
+    other.append(['学号', '姓名'])
+    other.append([2001, '赵六'])
+    workbook.create_sheet('说明').append(['本表没有学号列'])
+    workbook.save(roster)
+
+    output = results_path(str(roster), str(tmp_path / 'out'))
+    assert output.endswith('roster_处理结果.xlsx')
+    counts = write_results(str(roster), results, output, ID_COLUMNS)
+
+    assert counts == {'已转换': 1, '未变化': 1, '失败': 1, '未处理': 1, '已重命名': 1}
+    copy = load_workbook(output)
+    rows = list(copy['一班'].iter_rows(values_only=True))
+    assert list(rows[0]) == ['学号', '姓名'] + RESULT_COLUMNS
+    # 原有的值保持不变
+    assert rows[1][:3] == (1001, '张三', '已转换')
+    assert rows[2][2] == '未变化'
+    assert rows[3][2:4] == ('失败', '填写评语: 评语未能全部填写')
+    assert rows[4][2] == '未处理'
+    assert list(copy['二班'].iter_rows(values_only=True))[1][2] == '已重命名'
+    assert list(copy['说明'].iter_rows(values_only=True)) == [('本表没有学号列',)]
+
+
+def test_csv_roster_uses_class_column_and_notes(tmp_path, results):
+    roster = tmp_path / 'roster.csv'
+    roster.write_text('学号,姓名,班级\n1001,张三,一班\n2001,赵六,一班\n3001,周八,三班\n',
+                      encoding='gbk')
+    output = str(tmp_path / 'roster_处理结果.csv')
+
+    write_results(str(roster), results, output, ID_COLUMNS, ['班级'],
+                  notes={'3001': '学号冲突，未处理'})
+
+    with open(output, encoding='utf-8-sig', newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ['学号', '姓名', '班级'] + RESULT_COLUMNS
+    assert rows[1][3] == '已转换'
+    # 同一学号已在其他班级处理
+    assert rows[2][3:5] == ['未处理', '学号重复，已按 二班 处理']
+    assert rows[3][3:5] == ['未处理', '学号冲突，未处理']
+
+
+def test_class_name_mapping_for_federated_rosters(tmp_path):
+    roster = tmp_path / '学院A.csv'
+    roster.write_text('学号,姓名,班级\n1001,张三,一班\n', encoding='utf-8')
+    output = str(tmp_path / 'out.csv')
+    items = [make_item('1001', '张三', '学院A-一班', fill=True)]
+
+    counts = write_results(str(roster), items, output, ID_COLUMNS, ['班级'],
+                           class_name=lambda group: f'学院A-{group}')
+
+    assert counts == {'已填写': 1}
+
+
+def test_csv_roster_with_late_gbk_bytes(tmp_path, results):
+    # 编码识别样本中全是ASCII，样本之后才出现GBK字节：与读取名单时一样按GBK处理
+    roster = tmp_path / 'roster.csv'
+    rows = ''.join(f'{100000 + i};name{i}\n' for i in range(5000))
+    roster.write_bytes(('ID;Name\n' + rows).encode('ascii') + '1001;张三\n'.encode('gbk'))
+    output = str(tmp_path / 'roster_处理结果.csv')
+
+    counts = write_results(str(roster), results, output, ['ID'], class_name=lambda group: '一班')
+
+    with open(output, encoding='utf-8-sig', newline='') as f:
+        copied = list(csv.reader(f, delimiter=';'))
+    assert len(copied) == 5002
+    assert copied[0] == ['ID', 'Name'] + RESULT_COLUMNS
+    assert copied[-1][:3] == ['1001', '张三', '已转换']
+    assert counts['已转换'] == 1
+
+
+def test_unsupported_roster_format(tmp_path):
+    with pytest.raises(ValueError):
+        write_results(str(tmp_path / 'roster.parquet'), [], str(tmp_path / 'out.parquet'), ID_COLUMNS)
+
+
+def test_copy_is_readable_by_other_users(tmp_path, results):
+    from src.core.file_modes import default_file_mode
+
+    roster = tmp_path / 'roster.csv'
+    roster.write_text('学号,姓名\n1001,张三\n', encoding='utf-8')
+    output = tmp_path / 'roster_处理结果.csv'
+    write_results(str(roster), results, str(output), ID_COLUMNS)
+    assert output.stat().st_mode & 0o777 == default_file_mode()
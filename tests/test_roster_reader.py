@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+CSV / TSV 名单读取测试
+"""
+
+import pytest
+
+from src.core.roster_reader import (
+    detect_encoding, normalize_student_id, read_csv_roster, read_roster, resolve_csv_format,
+    roster_format
+)
+
+
+ID_COLUMNS = ['学号', 'ID']
+NAME_COLUMNS = ['姓名', 'Name']
+CLASS_COLUMNS = ['班级', 'Class']
+
+
+def write_text(path, text, encoding):
+    with open(path, 'w', encoding=encoding, newline='') as f:
+        f.write(text)
+    return str(path)
+
+
+def test_roster_format_by_extension():
+    assert roster_format('名单.csv') == 'csv'
+    assert roster_format('名单.TSV') == 'tsv'
+    assert roster_format('名单.parquet') == 'parquet'
+    assert roster_format('名单.xlsx') is None
+
+
+@pytest.mark.parametrize('encoding, expected', [
+    ('utf-8', 'utf-8'),
+    ('utf-8-sig', 'utf-8-sig'),
+    ('gbk', 'gb18030'),
+])
+def test_detect_encoding(tmp_path, encoding, expected):
+    path = write_text(tmp_path / 'roster.csv', '学号,姓名\n1,张三\n', encoding)
+    assert detect_encoding(path) == expected
+
+
+def test_gbk_roster_is_decoded(tmp_path):
+    path = write_text(tmp_path / 'roster.csv', '学号,姓名,班级\n1001,张三,一班\n', 'gbk')
+    students = read_csv_roster(path, ID_COLUMNS, NAME_COLUMNS, CLASS_COLUMNS)
+    assert students == [{'学号': '1001', '姓名': '张三', '班级': '一班'}]
+
+
+def test_non_utf8_bytes_after_sample_fall_back_to_gbk(tmp_path):
+    # 编码识别样本中全是ASCII（判断为UTF-8），样本之后才出现GBK字节
+    path = tmp_path / 'roster.csv'
+    rows = ''.join(f'{100000 + i},name{i},A\n' for i in range(5000))
+    path.write_bytes(('ID,Name,Class\n' + rows).encode('ascii') + '999999,李四,乙班\n'.encode('gbk'))
+    assert detect_encoding(str(path)) == 'utf-8'
+    students = read_csv_roster(str(path), ID_COLUMNS, NAME_COLUMNS, CLASS_COLUMNS)
+    assert len(students) == 5001
+    assert students[-1] == {'学号': '999999', '姓名': '李四', '班级': '乙班'}
+
+
+def test_resolve_csv_format(tmp_path):
+    late_gbk = tmp_path / 'late.csv'
+    rows = ''.join(f'{100000 + i};name{i}\n' for i in range(5000))
+    late_gbk.write_bytes(('ID;Name\n' + rows).encode('ascii') + '999999;李四\n'.encode('gbk'))
+    assert resolve_csv_format(str(late_gbk)) == ('gb18030', ';')
+
+    tsv = write_text(tmp_path / 'roster.tsv', '学号,备注\t姓名\n1,a,b\t张三\n', 'utf-8-sig')
+    assert resolve_csv_format(tsv) == ('utf-8-sig', '\t')
+    # 调用方给出的编码和分隔符不再识别
+    assert resolve_csv_format(tsv, ',', 'utf-8') == ('utf-8', ',')
+
+
+def test_columns_are_matched_by_candidates_and_order_kept(tmp_path):
+    path = write_text(tmp_path / 'roster.csv',
+                      'Name,备注,ID,Class\n王五,x,2002,二班\n赵六,,2001,一班\n孙七,,2003,二班\n',
+                      'utf-8')
+    students = read_roster(path, ID_COLUMNS, NAME_COLUMNS, CLASS_COLUMNS)
+    # 班级按首次出现的顺序，班级内按名单顺序
+    assert [(s['班级'], s['学号']) for s in students] == [('二班', '2002'), ('二班', '2003'), ('一班', '2001')]
+
+
+def test_tsv_without_class_column_uses_file_name(tmp_path):
+    path = write_text(tmp_path / '三班.tsv', '学号\t姓名\n3001.0\t周八\n\t空学号\n', 'utf-8')
+    students = read_roster(path, ID_COLUMNS, NAME_COLUMNS, CLASS_COLUMNS)
+    assert students == [{'学号': '3001', '姓名': '周八', '班级': '三班'}]
+
+
+def test_missing_id_column_raises(tmp_path):
+    path = write_text(tmp_path / 'roster.csv', '编号,姓名\n1,张三\n', 'utf-8')
+    with pytest.raises(ValueError):
+        read_csv_roster(path, ID_COLUMNS, NAME_COLUMNS, CLASS_COLUMNS)
+
+
+@pytest.mark.parametrize('value, expected', [
+    (22920210000001, '22920210000001'),
+    (1001.0, '1001'),
+    (' 1001.0 ', '1001'),
+    ('A01', 'A01'),
+    (float('nan'), None),
+    (None, None),
+])
+def test_normalize_student_id(value, expected):
+    assert normalize_student_id(value) == expected
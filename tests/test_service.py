@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+HTTP批处理服务测试
+"""
+
+import io
+import json
+import os
+import threading
+import time
+import urllib.request
+import zipfile
+
+import pytest
+
+import src.service as service_module
+from src.service import BatchService, extract_documents, list_documents, parse_multipart
+
+
+TEMPLATE = os.path.join(os.path.dirname(__file__), '..', 'data', 'templates',
+                        '四年制学年鉴定表', '22920216666666.docx')
+
+
+def make_zip(entries) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, data in entries.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def encode_multipart(fields):
+    """编码 multipart/form-data：fields 为 名称 -> (文件名, 内容)"""
+    boundary = 'test-boundary-1234'
+    body = b''
+    for name, (filename, data) in fields.items():
+        disposition = f'form-data; name="{name}"' + (f'; filename="{filename}"' if filename else '')
+        body += (f'--{boundary}\r\nContent-Disposition: {disposition}\r\n\r\n').encode('utf-8')
+        body += data + b'\r\n'
+    body += f'--{boundary}--\r\n'.encode('utf-8')
+    return f'multipart/form-data; boundary={boundary}', body
+
+
+def wait_for(condition, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def roster_fields(documents: bytes):
+    roster = '学号,姓名,班级\n22920216666666,有名字,一班\n'.encode('utf-8')
+    return {'roster': ('名单.csv', roster), 'documents': ('docs.zip', documents), 'pdf': (None, b'false')}
+
+
+def test_parse_multipart_round_trip():
+    content_type, body = encode_multipart({
+        'roster': ('名单.csv', '学号\n1\n'.encode('utf-8')),
+        'classes': (None, '一班,二班'.encode('utf-8')),
+    })
+    fields = parse_multipart(content_type, body)
+    assert fields['roster'] == ('名单.csv', '学号\n1\n'.encode('utf-8'))
+    assert fields['classes'] == (None, '一班,二班'.encode('utf-8'))
+
+
+def test_extract_documents_flattens_paths(tmp_path):
+    archive_path = tmp_path / 'docs.zip'
+    archive_path.write_bytes(make_zip({
+        '一班/张三-1001.docx': b'a',
+        '../../李四-1002.docx': b'b',
+        '一班/~$张三-1001.docx': b'lock',
+        '说明.txt': b'c',
+    }))
+
+    assert extract_documents(str(archive_path), str(tmp_path / 'source')) == 2
+    assert sorted(os.listdir(tmp_path / 'source')) == ['张三-1001.docx', '李四-1002.docx']
+
+
+def test_duplicate_basenames_are_rejected(tmp_path):
+    data = make_zip({'一班/张三.docx': b'a', '二班/张三.docx': b'b', '二班/李四.docx': b'c'})
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        with pytest.raises(ValueError, match='张三.docx'):
+            list_documents(archive)
+
+    service = BatchService(jobs_dir=str(tmp_path / 'jobs'))
+    with pytest.raises(ValueError, match='同名文件'):
+        service.submit(roster_fields(data))
+    with pytest.raises(ValueError, match='zip'):
+        service.submit(roster_fields(b'not a zip'))
+    assert service.jobs == {}
+
+
+def test_finished_jobs_expire(tmp_path):
+    jobs_dir = tmp_path / 'jobs'
+    service = BatchService(jobs_dir=str(jobs_dir), job_ttl_hours=1)
+    now = time.time()
+    for job_id, state, finished_at in (('old', 'done', now - 7200), ('recent', 'failed', now - 60),
+                                       ('busy', 'running', None)):
+        (jobs_dir / job_id).mkdir(parents=True)
+        service.jobs[job_id] = {'id': job_id, 'state': state, 'finished_at': finished_at}
+    # 服务上次运行留下的任务文件夹
+    (jobs_dir / 'leftover').mkdir()
+    os.utime(jobs_dir / 'leftover', (now - 7200, now - 7200))
+
+    expired = service._expire_jobs(now)
+
+    assert sorted(expired) == ['leftover', 'old']
+    assert sorted(service.jobs) == ['busy', 'recent']
+    assert sorted(os.listdir(jobs_dir)) == ['busy', 'recent']
+
+
+def _dying_worker(job_queue, status_queue, settings):
+    """领取任务后立即退出的工作进程"""
+    status_queue.put((None, {'worker_ready': os.getpid()}))
+    job = job_queue.get()
+    if job is None:
+        return
+    status_queue.put((job['id'], {'state': 'running', 'worker': os.getpid()}))
+    status_queue.close()
+    status_queue.join_thread()
+    os._exit(1)
+
+
+def test_dead_worker_fails_its_job_and_is_replaced(tmp_path, monkeypatch):
+    monkeypatch.setattr(service_module, '_worker_main', _dying_worker)
+    service = BatchService(port=0, workers=1, jobs_dir=str(tmp_path / 'jobs'))
+    service.CHECK_INTERVAL = 0.05
+    service.start()
+    try:
+        assert wait_for(lambda: service.ready_workers == 1)
+        job = service.submit(roster_fields(make_zip({'22920216666666.docx': b'x'})))
+
+        assert wait_for(lambda: service.get_job(job['id'])['state'] == 'failed')
+        assert '工作进程意外退出' in service.get_job(job['id'])['error']
+        assert wait_for(lambda: service.restarted_workers == 1 and service.ready_workers == 1)
+    finally:
+        service.shutdown()
+
+
+def test_job_runs_end_to_end(tmp_path):
+    with open(TEMPLATE, 'rb') as f:
+        documents = make_zip({'一班/22920216666666.docx': f.read()})
+    service = BatchService(port=0, workers=1, jobs_dir=str(tmp_path / 'jobs'))
+    service.start()
+    threading.Thread(target=service.httpd.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{service.port}'
+    try:
+        content_type, body = encode_multipart(roster_fields(documents))
+        request = urllib.request.Request(f'{base}/jobs', data=body, headers={'Content-Type': content_type})
+        with urllib.request.urlopen(request) as response:
+            assert response.status == 202
+            job_id = json.load(response)['id']
+
+        def finished():
+            with urllib.request.urlopen(f'{base}/jobs/{job_id}') as response:
+                return json.load(response)['state'] in ('done', 'failed')
+        assert wait_for(finished, timeout=60)
+        status = service.get_job(job_id)
+        assert status['state'] == 'done', status
+        assert status['done'] == status['total'] == 1
+
+        with urllib.request.urlopen(f'{base}/jobs/{job_id}/result') as response:
+            result = zipfile.ZipFile(io.BytesIO(response.read()))
+        assert any(name.endswith('.docx') for name in result.namelist())
+        with urllib.request.urlopen(f'{base}/health') as response:
+            health = json.load(response)
+        assert health['ready_workers'] == 1 and health['restarted_workers'] == 0
+    finally:
+        service.httpd.shutdown()
+        service.shutdown()
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+共享只读状态快照测试
+"""
+
+import functools
+import os
+import struct
+
+from src.core import shared_state
+from src.core.evaluation_filler import EvaluationFiller
+from src.core.pipeline import PipelineItem, PipelineStage, StreamingPipeline
+from src.core.workflow import fill_payload, fill_student_item, shared_filler
+
+
+TEMPLATE = os.path.join(os.path.dirname(__file__), '..', 'data', 'templates',
+                        '四年制学年鉴定表', '22920216666666.docx')
+
+# 长度不同、含2~4字节UTF-8字符的学号
+STUDENT_IDS = ['9', '10', 'b2', 'B2', 'é1', '学号2', '０', '𝟘1']
+
+
+def make_students():
+    return [{'学号': student_id, '姓名': f'学生{index}', '班级': '一班' if index % 2 else '二班'}
+            for index, student_id in enumerate(STUDENT_IDS)]
+
+
+def read_sections(data: bytes):
+    magic, count = struct.unpack_from('<8sI', data, 0)
+    assert magic == shared_state.MAGIC
+    sections = {}
+    for index in range(count):
+        name, offset, length = struct.unpack_from('<8sQQ', data, 12 + index * 24)
+        sections[name.rstrip(b'\0').decode('ascii')] = (offset, length)
+    return sections
+
+
+def test_binary_layout():
+    data = shared_state.build_snapshot(make_students(), EvaluationFiller())
+    sections = read_sections(data)
+
+    assert list(sections) == ['strings', 'students', 'comments', 'meta']
+    for offset, length in sections.values():
+        assert offset % 8 == 0
+        assert offset + length <= len(data)
+
+    strings_offset, strings_length = sections['strings']
+    strings = data[strings_offset:strings_offset + strings_length]
+    students_offset, students_length = sections['students']
+    words = struct.unpack_from(f'<{students_length // 4}I', data, students_offset)
+    assert len(words) == 6 * len(STUDENT_IDS)
+    ids = [strings[words[i]:words[i] + words[i + 1]] for i in range(0, len(words), 6)]
+    assert ids == sorted(student_id.encode('utf-8') for student_id in STUDENT_IDS)
+
+
+def test_round_trip(tmp_path):
+    filler = EvaluationFiller()
+    path = shared_state.write_snapshot(
+        shared_state.build_snapshot(make_students(), filler, {'plan': 1}), str(tmp_path))
+    snapshot = shared_state.SharedSnapshot(path)
+    try:
+        for student in make_students():
+            assert snapshot.find_student(student['学号']) == student
+        for missing in ('', '0', '1', 'b', '学号', '𝟘2'):
+            assert snapshot.find_student(missing) is None
+
+        assert snapshot.student_count == len(STUDENT_IDS)
+        assert snapshot.library_version == filler.library_version
+        assert snapshot.academic_years == list(filler.academic_years)
+        assert snapshot.locator_plan == {'plan': 1}
+        for name in shared_state.COMMENT_GROUPS:
+            if name == 'academic_year_opinions':
+                assert [list(group) for group in snapshot.comments(name)] == \
+                    [list(group) for group in filler.academic_year_opinions]
+            else:
+                assert list(snapshot.comments(name)) == list(getattr(filler, name))
+    finally:
+        snapshot.close()
+
+
+def test_process_workers_receive_only_student_ids(tmp_path):
+    with open(TEMPLATE, 'rb') as f:
+        template = f.read()
+    path = shared_state.write_snapshot(
+        shared_state.build_snapshot([{'学号': '22920216666666', '姓名': '有名字', '班级': '一班'}],
+                                    EvaluationFiller()), str(tmp_path))
+    items = [
+        PipelineItem(student_id, {'student': {'学号': student_id}, 'fill': True,
+                                  'docx_bytes': template, 'output_path': f'{student_id}.docx'})
+        for student_id in ('22920216666666', '22920219999999')
+    ]
+
+    pipeline = StreamingPipeline([
+        PipelineStage('fill', fill_student_item, workers=1,
+                      setup=functools.partial(shared_filler, path),
+                      use_processes=True, payload=fill_payload),
+    ])
+    results = {item.key: item for item in pipeline.run(items)}
+
+    found, missing = results['22920216666666'], results['22920219999999']
+    assert found.status == 'done'
+    assert found.data['docx_bytes'] != template
+    # 只传给子进程的数据被合并回来，留在主进程的数据不变
+    assert found.data['output_path'] == '22920216666666.docx'
+    assert missing.status == 'failed'
+    assert '共享状态中没有学号 22920219999999' in missing.error
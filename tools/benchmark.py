@@ -0,0 +1,309 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+性能基准测试脚本
+
+根据模板 data/templates/四年制学年鉴定表/22920216666666.docx 生成指定规模的模拟名单和学年鉴定表，
+分别计时 名单读取、发现、分派、复制、填写、审核、转换 各阶段，
+并与基准JSON比较，任一阶段的单文件耗时明显变慢时返回非零退出码。
+
+用法:
+    python tools/benchmark.py                                  # 100 / 1000 / 10000 三种规模
+    python tools/benchmark.py --check                          # 按已提交的基准的规模运行并比较
+    python tools/benchmark.py --scales 100,1000 --sample 50 --save-baseline tools/benchmark_baseline.json
+    python tools/benchmark.py --scales 100,1000 --baseline tools/benchmark_baseline.json
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+TEMPLATE = PROJECT_ROOT / "data" / "templates" / "四年制学年鉴定表" / "22920216666666.docx"
+BASELINE_VERSION = 1
+# 已提交的基准（--check 使用）
+DEFAULT_BASELINE = PROJECT_ROOT / "tools" / "benchmark_baseline.json"
+
+# 名单工作表的列布局：学号和姓名列使用 FileRenamer 支持的不同列名，并带有无关的列
+SHEET_LAYOUTS = {
+    'standard': lambda student_id, name, index: {'序号': index, '学号': student_id, '姓名': name},
+    'alternate': lambda student_id, name, index: {'学生姓名': name, '性别': '男' if index % 2 else '女',
+                                                  '学生编号': student_id},
+    'numeric': lambda student_id, name, index: {'学号': int(student_id), '姓名': name, '备注': ''},
+}
+
+
+def generate_cohort(root: str, scale: int, classes: int, layout: str = 'mixed') -> Tuple[str, str]:
+    """
+    生成模拟名单和学年鉴定表
+
+    Args:
+        root: 工作目录
+        scale: 学生总数
+        classes: 班级数
+        layout: 工作表列布局（SHEET_LAYOUTS 中的名称，mixed 表示各班级轮流使用）
+
+    Returns:
+        Tuple[str, str]: (名单Excel路径, 源文件夹)
+    """
+    import pandas as pd
+
+    source_dir = os.path.join(root, 'source')
+    os.makedirs(source_dir, exist_ok=True)
+    layouts = list(SHEET_LAYOUTS) if layout == 'mixed' else [layout]
+    classes = max(1, min(classes, scale))
+    roster_path = os.path.join(root, 'roster.xlsx')
+    template_path = str(TEMPLATE)
+
+    with pd.ExcelWriter(roster_path, engine='openpyxl') as writer:
+        for class_index in range(classes):
+            # 学生尽量平均分到各班级
+            count = scale // classes + (1 if class_index < scale % classes else 0)
+            make_row = SHEET_LAYOUTS[layouts[class_index % len(layouts)]]
+            rows = []
+            for index in range(count):
+                student_id = f"2292021{class_index:03d}{index:04d}"
+                rows.append(make_row(student_id, f"学生{class_index}-{index}", index + 1))
+                target = os.path.join(source_dir, f"{student_id}.docx")
+                try:
+                    # 所有文档内容相同，使用硬链接避免大规模时占用大量磁盘
+                    os.link(template_path, target)
+                except OSError:
+                    shutil.copyfile(template_path, target)
+            pd.DataFrame(rows).to_excel(writer, sheet_name=f"班级{class_index:03d}", index=False)
+    return roster_path, source_dir
+
+
+def timed(results: Dict, stage: str, count: int, func: Callable):
+    """执行并记录一个阶段的耗时，返回函数结果"""
+    start_time = time.perf_counter()
+    value = func()
+    seconds = time.perf_counter() - start_time
+    results[stage] = {
+        'count': count,
+        'seconds': round(seconds, 6),
+        'per_doc': seconds / count if count else 0.0,
+    }
+    print(f"  {stage:<10} {count:>6} 个  {seconds:9.3f}s  ({results[stage]['per_doc'] * 1000:.3f} ms/个)")
+    return value
+
+
+def run_scale(scale: int, classes: int, layout: str, sample: int, keep: bool) -> Dict:
+    """
+    在一个规模下运行全部阶段
+
+    名单读取、发现、分派处理全部学生；复制、填写、审核、转换按 sample 抽样（单文件耗时与规模无关）
+
+    Returns:
+        Dict: 阶段 -> {'count', 'seconds', 'per_doc'}
+    """
+    from src.core.evaluation_filler import EvaluationFiller, student_seed
+    from src.core.file_renamer import FileRenamer
+    from src.core.pdf_converter import PDFConverter
+    from src.core.workflow import StudentWorkflow
+
+    root = tempfile.mkdtemp(prefix=f'benchmark-{scale}-')
+    print(f"\n规模 {scale}（{classes} 个班级，工作目录 {root}）")
+    try:
+        roster_path, source_dir = generate_cohort(root, scale, classes, layout)
+        output_dir = os.path.join(root, 'output')
+        results: Dict[str, Dict] = {}
+        renamer = FileRenamer()
+
+        students = timed(results, 'roster', scale, lambda: renamer.load_excel_data(roster_path))
+        if len(students) != scale:
+            raise RuntimeError(f"名单读取结果不完整: {len(students)}/{scale}")
+        renamer.student_data = students
+        index = timed(results, 'discover', scale, lambda: renamer.build_source_index(source_dir))
+        workflow = StudentWorkflow(renamer, output_dir, renamer.get_available_classes(students))
+        items = timed(results, 'route', scale, lambda: workflow.build_items(students, source_dir))
+        if len(items) != scale:
+            raise RuntimeError(f"分派结果不完整: {len(items)}/{scale}")
+
+        # 均匀抽样，覆盖所有班级
+        step = max(1, scale // sample)
+        sampled = students[::step][:sample]
+        count = len(sampled)
+
+        copied = timed(results, 'copy', count, lambda: [
+            renamer.copy_student_file(student, index[student['学号']], output_dir)
+            for student in sampled
+        ])
+
+        filler = EvaluationFiller()
+        documents = []
+        for path in copied:
+            with open(path, 'rb') as f:
+                documents.append(f.read())
+
+        def fill_all() -> List[bytes]:
+            filled = []
+            for student, data in zip(sampled, documents):
+                ok, output = filler.fill_bytes(data, student_seed(student['学号']))
+                if not ok:
+                    raise RuntimeError(f"评语填写失败: {student['学号']}")
+                filled.append(output)
+            return filled
+        filled = timed(results, 'fill', count, fill_all)
+
+        def audit_all():
+            # 审核输出：zip结构完整且可以重新载入
+            from docx import Document
+            for data in filled:
+                with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                    if archive.testzip() is not None:
+                        raise RuntimeError("输出文档损坏")
+                Document(io.BytesIO(data))
+        timed(results, 'audit', count, audit_all)
+
+        # 转换使用不依赖WPS的内置渲染器，不使用缓存
+        converter = PDFConverter(backend='native', cache=None)
+        pdf_dir = os.path.join(root, 'pdf')
+        os.makedirs(pdf_dir, exist_ok=True)
+
+        def convert_all():
+            for path, data in zip(copied, filled):
+                pdf_path = os.path.join(pdf_dir, os.path.basename(path).replace('.docx', '.pdf'))
+                if not converter.convert_file(path, pdf_path, data)[0]:
+                    raise RuntimeError(f"转换失败: {path}")
+        timed(results, 'convert', count, convert_all)
+        converter.cleanup()
+        return results
+    finally:
+        if keep:
+            print(f"  保留工作目录: {root}")
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float, min_delta: float) -> List[str]:
+    """
+    与基准比较单文件耗时
+
+    Args:
+        current: 本次结果
+        baseline: 基准结果
+        tolerance: 允许变慢的比例
+        min_delta: 单文件耗时至少变慢多少秒才视为回退（避免计时噪声）
+
+    Returns:
+        List[str]: 回退说明，为空表示没有回退
+    """
+    regressions = []
+    print(f"\n与基准比较（允许变慢 {tolerance:.0%}）:")
+    if (baseline.get('platform'), baseline.get('python')) != (current['platform'], current['python']):
+        # 不同机器的耗时不能直接比较，需要在本机重新保存基准
+        print(f"  注意: 基准记录于 {baseline.get('platform')} / Python {baseline.get('python')}，"
+              f"与本机不同，差异可能来自机器本身")
+    for scale, stages in sorted(current['results'].items(), key=lambda pair: int(pair[0])):
+        base_stages = baseline.get('results', {}).get(scale)
+        if not base_stages:
+            print(f"  规模 {scale}: 基准中没有该规模，跳过")
+            continue
+        for stage, result in stages.items():
+            base = base_stages.get(stage)
+            if not base or not base['per_doc']:
+                continue
+            ratio = result['per_doc'] / base['per_doc']
+            regressed = (ratio > 1 + tolerance
+                         and result['per_doc'] - base['per_doc'] > min_delta)
+            mark = '❌' if regressed else '✓'
+            print(f"  {mark} 规模 {scale:>6} {stage:<10} {base['per_doc'] * 1000:9.3f} → "
+                  f"{result['per_doc'] * 1000:9.3f} ms/个 ({ratio:.2f}x)")
+            if regressed:
+                regressions.append(f"规模 {scale} 的 {stage} 阶段变慢 {ratio:.2f} 倍")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """主函数"""
+    parser = argparse.ArgumentParser(description='学年鉴定表处理性能基准测试')
+    parser.add_argument('--scales', default='100,1000,10000',
+                        help='学生总数，用逗号分隔（默认 100,1000,10000）')
+    parser.add_argument('--students-per-class', type=int, default=40,
+                        help='每个班级的学生数（默认40）')
+    parser.add_argument('--layout', choices=['mixed'] + list(SHEET_LAYOUTS), default='mixed',
+                        help='名单工作表的列布局（默认各班级轮流使用不同布局）')
+    parser.add_argument('--sample', type=int, default=200,
+                        help='复制、填写、审核、转换阶段每个规模抽样的文档数（默认200）')
+    parser.add_argument('--baseline', help='与该基准JSON比较，有阶段回退时退出码为1')
+    parser.add_argument('--check', action='store_true',
+                        help=f'与已提交的基准 {DEFAULT_BASELINE.relative_to(PROJECT_ROOT).as_posix()} 比较，'
+                             '使用基准中的规模和抽样数')
+    parser.add_argument('--save-baseline', help='将本次结果保存为基准JSON')
+    parser.add_argument('--output', help='将本次结果保存到该JSON文件')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='比较时允许单文件耗时变慢的比例（默认0.25）')
+    parser.add_argument('--min-delta-ms', type=float, default=0.2,
+                        help='单文件耗时至少变慢多少毫秒才视为回退（默认0.2）')
+    parser.add_argument('--keep', action='store_true', help='保留生成的工作目录')
+    args = parser.parse_args(argv)
+
+    if not TEMPLATE.exists():
+        print(f"❌ 模板文件不存在: {TEMPLATE}")
+        return 2
+    if args.check:
+        args.baseline = args.baseline or str(DEFAULT_BASELINE)
+        try:
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"❌ 无法读取基准文件: {args.baseline} - {str(e)}")
+            return 2
+        args.scales = ','.join(sorted(baseline.get('results', {}), key=int))
+        args.sample = baseline.get('sample', args.sample)
+    try:
+        scales = [int(value) for value in args.scales.split(',') if value.strip()]
+    except ValueError:
+        print(f"❌ 规模格式错误: {args.scales}")
+        return 2
+
+    print("学年鉴定表自动化处理工具 - 性能基准测试")
+    print("=" * 60)
+    report = {
+        'version': BASELINE_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'sample': args.sample,
+        'results': {},
+    }
+    for scale in scales:
+        classes = max(1, -(-scale // max(1, args.students_per_class)))
+        report['results'][str(scale)] = run_scale(scale, classes, args.layout,
+                                                  max(1, args.sample), args.keep)
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n✓ 结果已保存: {path}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('version') != BASELINE_VERSION:
+            print(f"❌ 基准文件版本不匹配: {args.baseline}")
+            return 2
+        regressions = compare(report, baseline, args.tolerance, args.min_delta_ms / 1000)
+        if regressions:
+            print("\n❌ 发现性能回退:")
+            for message in regressions:
+                print(f"  - {message}")
+            return 1
+        print("\n✅ 没有发现性能回退")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
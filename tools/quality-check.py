@@ -48,6 +48,7 @@ def main():
         ("python -m flake8 src/ tests/", "代码风格检查"),
         ("python -m mypy src/", "类型检查"),
         ("python -m pytest tests/ -v", "单元测试"),
+        ("python tools/benchmark.py --check", "性能回退检查"),
     ]
     
     results = []
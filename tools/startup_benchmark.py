@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+启动时间基准测试脚本
+
+在新的解释器中分别计时：
+  import       导入主程序 src.main
+  first_prompt 导入主程序、创建 AutomationApp 并检查依赖（即出现第一个输入提示之前的全部工作）
+并用 -X importtime 列出导入耗时最多的模块。启动过程中导入了 pandas / python-docx 等重型依赖、
+在工作目录中写入了文件，或 first_prompt 超过预算时返回非零退出码。
+
+用法:
+    python tools/startup_benchmark.py
+    python tools/startup_benchmark.py --repeat 10 --output startup.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+# 启动时不应导入的模块（首次读取名单或填写评语时才需要）
+HEAVY_MODULES = ('pandas', 'numpy', 'docx', 'lxml', 'openpyxl')
+
+SNIPPETS = {
+    'import': "import src.main",
+    'first_prompt': (
+        "import contextlib, io, src.main\n"
+        "from src.utils.dependency_manager import DependencyManager\n"
+        "with contextlib.redirect_stdout(io.StringIO()):\n"
+        "    app = src.main.AutomationApp()\n"
+        "    DependencyManager().check_all_dependencies()\n"
+    ),
+}
+
+
+def _command(snippet: str, *options: str) -> List[str]:
+    prelude = f"import sys; sys.path.insert(0, {str(PROJECT_ROOT)!r})\n"
+    return [sys.executable, *options, '-c', prelude + snippet]
+
+
+def time_snippet(snippet: str, repeat: int, cwd: str) -> List[float]:
+    """在新的解释器中运行 repeat 次，返回每次的耗时（秒）"""
+    timings = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        subprocess.run(_command(snippet), cwd=cwd, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start_time)
+    return timings
+
+
+def import_profile(snippet: str, cwd: str) -> List[Tuple[str, int, int]]:
+    """
+    用 -X importtime 记录导入耗时
+
+    Returns:
+        List[Tuple[str, int, int]]: [(模块, 自身耗时us, 累计耗时us), ...]
+    """
+    result = subprocess.run(_command(snippet, '-X', 'importtime'), cwd=cwd, check=True,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """主函数"""
+    parser = argparse.ArgumentParser(description='学年鉴定表处理工具启动时间基准测试')
+    parser.add_argument('--repeat', type=int, default=5, help='每项计时的运行次数（默认5，取中位数）')
+    parser.add_argument('--top', type=int, default=10, help='列出导入累计耗时最多的模块数（默认10）')
+    parser.add_argument('--budget-ms', type=float, default=1000,
+                        help='first_prompt 的耗时预算（毫秒，默认1000）')
+    parser.add_argument('--output', help='将结果保存到该JSON文件')
+    args = parser.parse_args(argv)
+
+    print("学年鉴定表自动化处理工具 - 启动时间基准测试")
+    print("=" * 60)
+    # 在空目录中运行，检查启动过程是否写入了文件（如 config/settings.json）
+    workdir = tempfile.mkdtemp(prefix='startup-benchmark-')
+    problems = []
+    report: Dict = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': {},
+    }
+    try:
+        for stage, snippet in SNIPPETS.items():
+            timings = time_snippet(snippet, max(1, args.repeat), workdir)
+            median = statistics.median(timings)
+            report['results'][stage] = {'median_ms': round(median * 1000, 1),
+                                        'min_ms': round(min(timings) * 1000, 1)}
+            print(f"  {stage:<13} 中位数 {median * 1000:8.1f} ms  最快 {min(timings) * 1000:8.1f} ms")
+
+        modules = import_profile(SNIPPETS['first_prompt'], workdir)
+        heavy = sorted({name.split('.')[0] for name, _, _ in modules if name.split('.')[0] in HEAVY_MODULES})
+        report['imported_heavy_modules'] = heavy
+        report['slowest_imports'] = [
+            {'module': name, 'self_us': self_us, 'cumulative_us': cumulative_us}
+            for name, self_us, cumulative_us in sorted(modules, key=lambda m: m[2], reverse=True)[:args.top]
+        ]
+        print(f"\n导入累计耗时最多的 {args.top} 个模块（-X importtime）:")
+        for entry in report['slowest_imports']:
+            print(f"  {entry['cumulative_us'] / 1000:8.1f} ms  {entry['module']}")
+
+        written = sorted(os.listdir(workdir))
+        report['files_written'] = written
+        if heavy:
+            problems.append(f"启动时导入了重型依赖: {', '.join(heavy)}")
+        if written:
+            problems.append(f"启动时在工作目录中写入了文件: {', '.join(written)}")
+        if report['results']['first_prompt']['median_ms'] > args.budget_ms:
+            problems.append(f"first_prompt 超过预算 {args.budget_ms:.0f} ms")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n✓ 结果已保存: {args.output}")
+
+    if problems:
+        print("\n❌ 启动检查未通过:")
+        for message in problems:
+            print(f"  - {message}")
+        return 1
+    print("\n✅ 启动过程没有导入重型依赖，也没有写入文件")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())